@@ -0,0 +1,76 @@
+<?php
+
+/**
+ * Score SMIL answer sheets with the module's calculators, one JSON line per sheet.
+ *
+ * Used by docs/archive/scripts/bench-scoring.py to time the PHP scoring path
+ * and compare its results with the Python batch scorer.
+ *
+ * Usage:
+ *   php bin/score-smil-sheets.php sheets.jsonl > scores.jsonl
+ *
+ * Each input line is a session's answers object ({"1": 0, ..., "gender": "female"})
+ * or an object with an "answers" field. Each output line holds raw_scores,
+ * t_scores, validity and additional_scores as calculateResults() builds them,
+ * and "ns": the time spent in the four calculators for that sheet.
+ */
+
+declare(strict_types=1);
+
+require __DIR__ . '/../vendor/autoload.php';
+
+use PsyTest\Modules\Smil\Scoring\AdditionalScalesCalculator;
+use PsyTest\Modules\Smil\Scoring\RawScoreCalculator;
+use PsyTest\Modules\Smil\Scoring\TScoreCalculator;
+use PsyTest\Modules\Smil\Scoring\ValidityAssessor;
+
+$smilDir = dirname(__DIR__) . '/modules/smil';
+
+function loadJson(string $path): array
+{
+    $data = json_decode((string) file_get_contents($path), true);
+    if (!is_array($data)) {
+        fwrite(STDERR, "Failed to parse JSON in {$path}: " . json_last_error_msg() . "\n");
+        exit(2);
+    }
+    return $data;
+}
+
+$questions = loadJson($smilDir . '/questions-566-full.json');
+$rawScoreCalc = new RawScoreCalculator($questions['questions'] ?? $questions);
+$tScoreCalc = new TScoreCalculator(loadJson($smilDir . '/basic_scales_norms.json')['scales'] ?? []);
+$validityAssessor = new ValidityAssessor();
+$additionalCalc = new AdditionalScalesCalculator(loadJson($smilDir . '/additional-scales-norms.json')['scales'] ?? []);
+
+$input = $argv[1] ?? 'php://stdin';
+$handle = fopen($input, 'rb');
+if ($handle === false) {
+    fwrite(STDERR, "Cannot open {$input}\n");
+    exit(2);
+}
+
+while (($line = fgets($handle)) !== false) {
+    if (trim($line) === '') {
+        continue;
+    }
+    $record = json_decode($line, true);
+    $answers = $record['answers'] ?? $record;
+    $gender = $answers['gender'] ?? 'male';
+
+    $started = hrtime(true);
+    $rawScores = $rawScoreCalc->calculate($answers, $gender);
+    $tScores = $tScoreCalc->calculate($rawScores, $gender);
+    $validity = $validityAssessor->assess($tScores, $answers);
+    $additionalScores = $additionalCalc->calculate($answers, $gender);
+    $elapsed = hrtime(true) - $started;
+
+    echo json_encode([
+        'ns' => $elapsed,
+        'raw_scores' => $rawScores,
+        't_scores' => $tScores,
+        'validity' => $validity,
+        'additional_scores' => $additionalScores,
+    ], JSON_UNESCAPED_UNICODE | JSON_PRESERVE_ZERO_FRACTION), "\n";
+}
+
+fclose($handle);
@@ -1,54 +1,95 @@
 #!/usr/bin/env python3
 """
-Анализ структуры sob-01.pdf для поиска вопросов
+Индекс структуры sob-01.pdf: где вопросы, где ключи
+
+Первый запуск извлекает все страницы (параллельно, через кэш страниц) и
+сохраняет признаки каждой страницы в storage/cache/page-index (см.
+psytools/page_index.py). Повторные запуски отвечают по индексу, не открывая PDF.
 
 Использование:
-    python3 bin/analyze-pdf-structure.py > pdf-structure.txt
+    python3 docs/archive/scripts/analyze-pdf-structure.py                     # сводка
+    python3 docs/archive/scripts/analyze-pdf-structure.py --query questions --range 1-566
+    python3 docs/archive/scripts/analyze-pdf-structure.py --query keys
+    python3 docs/archive/scripts/analyze-pdf-structure.py --dump 12 > page-12.txt
 """
 
-import re
-from pathlib import Path
+import argparse
+import sys
+
+from psytools import pdf_text
+from psytools.page_cache import PageCache
+from psytools.page_index import MARKERS, load_index, page_ranges
+from psytools.paths import SOB_PDF
+
+
+def parse_range(value: str) -> tuple:
+    first, _, last = value.partition("-")
+    return int(first), int(last or first)
 
-try:
-    import PyPDF2
-except ImportError:
-    print("Ошибка: Требуется установить PyPDF2")
-    print("Выполните: pip install PyPDF2")
-    exit(1)
+
+def print_summary(index):
+    print(f"\nВсего страниц: {len(index)}")
+    print(f"Страницы с вопросами: {page_ranges(index.question_pages()) or '—'}")
+    print(f"Вопросник целиком: {page_ranges(index.questionnaire_span()) or '—'}")
+    print(f"Таблицы ключей: {page_ranges(index.key_pages()) or '—'}")
+    for marker in MARKERS:
+        pages = index.with_marker(marker)
+        if pages:
+            print(f"  {marker}: {page_ranges(pages)}")
+
+    print(f"\n{'стр.':>5} {'вопросы':>11} {'серия':>11} {'плотн.':>7} {'кирил.':>7} {'числа':>6}  маркеры")
+    for number, page in enumerate(index.pages):
+        ids = page["ids"]
+        if not ids["count"] and not page["markers"]:
+            continue
+        length, first, last = ids["run"]
+        span = f"{ids['first']}-{ids['last']}" if ids["count"] else ""
+        run = f"{first}-{last}" if length else ""
+        print(f"{number + 1:>5} {span:>11} {run:>11} {page['density']:>7} {page['cyrillic']:>7} "
+              f"{page['numbers']:>6}  {', '.join(page['markers'])}")
 
 
 def main():
-    project_root = Path(__file__).parent.parent
-    pdf_path = project_root / "source" / "metod" / "sob-01.pdf"
-    
-    print("=" * 80)
-    print(f"Анализ структуры: {pdf_path.name}")
-    print("=" * 80)
-    
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        
-        print(f"\nВсего страниц: {len(reader.pages)}\n")
-        
-        # Ищем страницы с вопросами (номера 1-566)
-        for page_num in range(len(reader.pages)):
-            text = reader.pages[page_num].extract_text()
-            
-            # Ищем паттерны вопросов
-            if re.search(r'\b[1-9]\.\s+[А-Яа-я]', text):
-                print(f"\n{'='*80}")
-                print(f"СТРАНИЦА {page_num + 1}")
-                print(f"{'='*80}")
-                
-                # Показываем первые 2000 символов
-                print(text[:2000])
-                
-                # Ищем номера вопросов
-                question_nums = re.findall(r'\b(\d{1,3})\.\s+[А-Яа-я]', text)
-                if question_nums:
-                    nums = [int(n) for n in question_nums if int(n) <= 566]
-                    if nums:
-                        print(f"\n>>> Найдены вопросы: {min(nums)}-{max(nums)}")
+    parser = argparse.ArgumentParser(description="Индекс структуры sob-01.pdf")
+    parser.add_argument("--pdf", default=str(SOB_PDF))
+    parser.add_argument("--backend", choices=pdf_text.BACKENDS, default=pdf_text.DEFAULT_BACKEND)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш текста страниц")
+    parser.add_argument("--rebuild", action="store_true", help="пересобрать индекс страниц")
+    parser.add_argument("--query", choices=("questions", "questionnaire", "keys"),
+                        help="вывести только номера страниц (с 1)")
+    parser.add_argument("--range", default="1-566", help="диапазон вопросов для --query questions")
+    parser.add_argument("--dump", type=int, metavar="PAGE", help="вывести текст страницы (с 1)")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else PageCache()
+    try:
+        if args.dump:
+            print(pdf_text.extract_pages(args.pdf, args.backend, pages=[args.dump - 1], cache=cache)[0])
+            return
+        index = load_index(args.pdf, args.backend, args.workers, cache, rebuild=args.rebuild)
+    except pdf_text.ExtractionError as e:
+        print(f"Ошибка: {e}")
+        exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if args.query == "questions":
+        print(" ".join(str(n + 1) for n in index.question_pages(*parse_range(args.range))))
+    elif args.query == "questionnaire":
+        print(" ".join(str(n + 1) for n in index.questionnaire_span(*parse_range(args.range))))
+    elif args.query == "keys":
+        print(" ".join(str(n + 1) for n in index.key_pages()))
+    else:
+        print("=" * 80)
+        print(f"Структура: {args.pdf}")
+        print("=" * 80)
+        print_summary(index)
+    if cache is not None:
+        # в режиме --query только номера страниц идут в stdout
+        print(f"\nКэш страниц: {cache.hits} попаданий, {cache.misses} промахов",
+              file=sys.stderr if args.query else sys.stdout)
 
 
 if __name__ == "__main__":
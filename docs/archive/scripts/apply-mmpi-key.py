@@ -1,36 +1,36 @@
 #!/usr/bin/env python3
-"""Apply corrected MMPI key (multi-scale) to questions-566-full.json."""
+"""Apply corrected MMPI key (multi-scale) to questions-566-full.json.
+
+Usage:
+    python3 docs/archive/scripts/apply-mmpi-key.py [--compact]
+"""
+import argparse
 import json
 
-with open('modules/smil/Scoring/keys/mmpi-key-solomin.json') as f:
-    key_items = json.load(f)['items']
+from psytools.json_writer import write_json
+from psytools.paths import SMIL_DIR
+from psytools.smil_records import KEYED_DESCRIPTION, apply_key_record
 
-with open('modules/smil/questions-566-full.json') as f:
-    data = json.load(f)
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--compact', action='store_true', help='write without whitespace (production artifact)')
+args = parser.parse_args()
 
-updated = 0
-empty_scales = 0
+with open(SMIL_DIR / 'Scoring/keys/mmpi-key-solomin.json') as f:
+    key_items = json.load(f)['items']
 
-for q in data['questions']:
-    qid = str(q['id'])
-    old_scale = q.pop('scale', None)
-    old_direction = q.pop('direction', None)
+with open(SMIL_DIR / 'questions-566-full.json') as f:
+    data = json.load(f)
 
-    if qid in key_items:
-        new_scales = key_items[qid]
-        q['scales'] = new_scales
-        updated += 1
-    else:
-        q['scales'] = []
-        empty_scales += 1
+data['questions'] = [apply_key_record(q, key_items) for q in data['questions']]
+updated = sum(1 for q in data['questions'] if q['scales'])
+empty_scales = len(data['questions']) - updated
 
-data['description'] = '566 вопросов СМИЛ (MMPI) — multi-scale ключи по Соломину'
-data['source'] = 'Ключ: И.Л. Соломин, Личностный опросник MMPI, стр. 63-68'
-data['note'] = 'Формат scales (массив scale/direction). Тексты вопросов без изменений.'
+data.update(KEYED_DESCRIPTION)
 
-with open('modules/smil/questions-566-full.json', 'w') as f:
-    json.dump(data, f, ensure_ascii=False, indent=2)
+written = write_json(SMIL_DIR / 'questions-566-full.json', data, indent=2, compact=args.compact)
 
 print(f"Questions with scales: {updated}")
 print(f"Questions without scales (empty): {empty_scales}")
 print(f"Total: {len(data['questions'])}")
+if not written:
+    print("questions-566-full.json unchanged, not rewritten")
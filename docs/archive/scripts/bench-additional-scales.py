@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: additional SMIL scales, compiled CSR scorer vs a per-scale loop.
+
+Usage:
+    python3 docs/archive/scripts/bench-additional-scales.py [--sheets 100000] [--naive 2000] [--seed 1]
+
+The loop (psytools.additional_scales.naive_scores) follows
+AdditionalScalesCalculator::calculate() and runs on the first --naive sheets;
+the compiled scorer runs on all of them. Answer encoding is timed separately.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from psytools.additional_scales import NORMS_PATH, AdditionalScales, naive_scores
+from psytools.answers import QUESTION_COUNT, encode_sheets, strict_answer_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Additional SMIL scales benchmark")
+    parser.add_argument("--sheets", type=int, default=100_000)
+    parser.add_argument("--naive", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(NORMS_PATH, encoding="utf-8") as f:
+        scales = json.load(f)["scales"]
+    started = time.perf_counter()
+    compiled = AdditionalScales(scales)
+    compile_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(args.seed)
+    answers = rng.choice(3, size=(args.sheets, QUESTION_COUNT), p=[0.45, 0.45, 0.1]).astype(np.uint8)
+    genders = rng.integers(0, 2, args.sheets, dtype=np.uint8)
+    labels = ["female" if g else "male" for g in genders]
+    sheets = [dict(zip(map(str, range(1, QUESTION_COUNT + 1)), row.tolist())) for row in answers[:args.naive]]
+
+    started = time.perf_counter()
+    naive = [naive_scores(scales, sheet, label) for sheet, label in zip(sheets, labels)]
+    naive_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    encoded, _ = encode_sheets(sheets, labels[:args.naive], code=strict_answer_code)
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    raw, t = compiled.score(answers, genders)
+    score_seconds = time.perf_counter() - started
+
+    check_raw, check_t = compiled.score(encoded, genders[:args.naive])
+    expected = [[r[code]["raw"] for code in compiled.codes] for r in naive]
+    expected_t = [[r[code]["t"] for code in compiled.codes] for r in naive]
+    if check_raw.tolist() != expected or check_t.astype(int).tolist() != expected_t:
+        raise SystemExit("⚠️ compiled scores differ from the per-scale loop")
+
+    print(f"{len(compiled)} scales, {compiled.indices.size} key entries, compiled in {compile_seconds * 1000:.1f} ms")
+    rows = (
+        (f"per-scale loop ({args.naive} sheets)", naive_seconds, args.naive),
+        (f"encode answer maps ({args.naive} sheets)", encode_seconds, args.naive),
+        (f"CSR scorer ({args.sheets} sheets)", score_seconds, args.sheets),
+    )
+    for label, seconds, n in rows:
+        print(f"{label:<40} {seconds * 1000:>9.1f} ms {n / seconds:>12,.0f} sheets/s")
+    print(f"✅ speed-up over the loop: {(naive_seconds / args.naive) / (score_seconds / args.sheets):.0f}x"
+          f" (mean raw A: {raw[:, compiled.codes.index('A')].mean():.1f})")
+
+
+if __name__ == "__main__":
+    main()
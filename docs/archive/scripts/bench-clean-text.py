@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: single-pass normalize() vs the legacy multi-pass clean_text().
+
+Usage:
+    python3 docs/archive/scripts/bench-clean-text.py [--copies 20] [--seed 1]
+
+Input is every shipped SMIL question text with PDF-style artifacts injected:
+random intra-word splits, doubled whitespace and spaces around punctuation.
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+from psytools.paths import SMIL_DIR
+from psytools.text_normalizer import bank_lexicon, normalize
+
+
+def legacy_clean_text(text: str) -> str:
+    """clean-questions-text.py:clean_text() before the single-pass normaliser."""
+    text = re.sub(r'([а-яА-ЯёЁ])\s+([а-яА-ЯёЁ]{1,2})\s+', r'\1\2 ', text)
+    for _ in range(3):
+        text = re.sub(r'([а-яА-ЯёЁ])\s+([а-яА-ЯёЁ]{1,2})\s+', r'\1\2 ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+([,.:;!?»)])', r'\1', text)
+    text = re.sub(r'([«(])\s+', r'\1', text)
+    return text.strip()
+
+
+def add_artifacts(text: str, rng: random.Random) -> str:
+    words = []
+    for word in text.split(" "):
+        if len(word) > 4 and word.isalpha() and rng.random() < 0.3:
+            cut = rng.randrange(1, len(word))
+            word = f"{word[:cut]} {word[cut:]}"
+        words.append(word)
+    return "  ".join(words).replace(",", " ,")
+
+
+def measure(label, func, texts, clean):
+    started = time.perf_counter()
+    result = [func(text) for text in texts]
+    elapsed = time.perf_counter() - started
+    chars = sum(map(len, texts))
+    recovered = sum(a == b for a, b in zip(result, clean)) / len(texts)
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms {chars / elapsed / 1e6:>7.2f} Mchar/s {recovered:>7.1%} recovered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question text normaliser microbenchmark")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(SMIL_DIR / "questions-566-full.json", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+    shipped = [q[key] for q in questions for key in ("text_male", "text_female")]
+
+    rng = random.Random(args.seed)
+    texts, clean = [], []
+    for _ in range(args.copies):
+        texts.extend(add_artifacts(text, rng) for text in shipped)
+        clean.extend(shipped)
+    print(f"Texts: {len(texts)}, {sum(map(len, texts)) / 1024 / 1024:.1f} MB")
+
+    started = time.perf_counter()
+    lexicon = bank_lexicon()
+    print(f"lexicon: {len(lexicon)} words, built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    measure("legacy clean_text", legacy_clean_text, texts, clean)
+    measure("normalize (no lexicon)", normalize, texts, clean)
+    measure("normalize (bank lexicon)", lambda text: normalize(text, lexicon), texts, clean)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF text extraction backends (PyPDF2 vs PyMuPDF) on a generated document.
+
+Usage:
+    python3 docs/archive/scripts/bench-pdf-extract.py [--pages 400] [--workers 0 1 4]
+
+Requires PyMuPDF (to generate the document) and PyPDF2.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from psytools import pdf_text
+
+LINES_PER_PAGE = 40
+
+
+def generate_pdf(path: Path, pages: int) -> None:
+    """Write a questionnaire-like document: numbered items, ~40 lines per page."""
+    fitz = pdf_text.load_backend("fitz")
+
+    doc = fitz.open()
+    item = 1
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 50
+        for _ in range(LINES_PER_PAGE):
+            page.insert_text((50, y), f"{item}. Statement number {item} about sleep, mood and daily habits", fontsize=9)
+            item += 1
+            y += 18
+    doc.save(str(path))
+    doc.close()
+
+
+def time_run(pdf_path: Path, backend: str, workers: int, repeat: int) -> tuple:
+    best = None
+    text = ""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = pdf_text.extract_text(str(pdf_path), backend=backend, workers=workers)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 0],
+                        help="worker counts to compare (0 = all cores)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "bench.pdf"
+        generate_pdf(pdf_path, args.pages)
+        print(f"Generated {args.pages} pages ({pdf_path.stat().st_size // 1024} KB)")
+        print(f"{'backend':<8} {'workers':>7} {'seconds':>9} {'pages/s':>9} {'chars':>10}")
+
+        for backend in pdf_text.BACKENDS:
+            reference = None
+            for workers in args.workers:
+                try:
+                    elapsed, text = time_run(pdf_path, backend, workers, args.repeat)
+                except pdf_text.ExtractionError as e:
+                    print(f"{backend:<8} skipped: {e}")
+                    break
+                if reference is None:
+                    reference = text
+                elif text != reference:
+                    print(f"  ⚠️ {backend}: output with {workers} workers differs from the first run")
+                resolved = pdf_text.resolve_workers(workers)
+                print(f"{backend:<8} {resolved:>7} {elapsed:>9.3f} {args.pages / elapsed:>9.0f} {len(text):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Loader benchmark: questions-566-full.json vs the compiled questions-566-full.bin.
+
+Usage:
+    python3 docs/archive/scripts/bench-question-bank.py [--repeat 50]
+
+Each loader is timed in-process (best of --repeat) and run once more in a
+fresh interpreter to measure how much resident memory loading adds.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from psytools.paths import SMIL_DIR
+from psytools.question_bank import QuestionBank, compile_bank, compiled_path
+
+JSON_PATH = SMIL_DIR / "questions-566-full.json"
+BIN_PATH = compiled_path(JSON_PATH)
+
+
+def load_json_bank():
+    with open(JSON_PATH, encoding="utf-8") as f:
+        return json.load(f)["questions"]
+
+
+def json_texts():
+    return [q["text_female"] for q in load_json_bank()]
+
+
+def bin_open():
+    return QuestionBank(BIN_PATH)
+
+
+def bin_texts():
+    bank = QuestionBank(BIN_PATH)
+    return [bank.text(i, "female") for i in range(len(bank))]
+
+
+def bin_questions():
+    return QuestionBank(BIN_PATH).questions_for_gender("female")
+
+
+LOADERS = {
+    "json: parse": load_json_bank,
+    "json: parse + female texts": json_texts,
+    "bin: open (mmap)": bin_open,
+    "bin: open + female texts": bin_texts,
+    "bin: questions_for_gender": bin_questions,
+}
+
+
+def rss_kb() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4
+
+
+def child(name: str):
+    before = rss_kb()
+    result = LOADERS[name]()
+    print(rss_kb() - before)
+    del result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question bank loader benchmark")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    if not BIN_PATH.exists() or BIN_PATH.stat().st_mtime < JSON_PATH.stat().st_mtime:
+        compile_bank(JSON_PATH)
+    print(f"{JSON_PATH.name}: {JSON_PATH.stat().st_size / 1024:.0f} KB, {BIN_PATH.name}: {BIN_PATH.stat().st_size / 1024:.0f} KB")
+
+    for name, loader in LOADERS.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            loader()
+            best = min(best, time.perf_counter() - started)
+        rss = subprocess.run([sys.executable, __file__, "--child", name], capture_output=True, text=True, check=True)
+        print(f"{name:<28} {best * 1000:>8.3f} ms {int(rss.stdout):>7} KB resident")
+
+
+if __name__ == "__main__":
+    main()
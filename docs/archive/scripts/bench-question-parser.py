@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: streaming QuestionParser vs the two legacy question parsers.
+
+Usage:
+    python3 docs/archive/scripts/bench-question-parser.py [--copies 50]
+
+The document is synthetic: male and female variants of 566 items, a third of
+them wrapped over two lines, repeated --copies times.
+"""
+import argparse
+import re
+import time
+import tracemalloc
+
+from psytools.question_parser import FEMALE_MARKER, MALE_MARKER, QuestionParser
+
+
+def iter_document_lines(copies: int):
+    for _ in range(copies):
+        for variant in ("Мужской вариант.", "Женский вариант."):
+            yield variant
+            for qid in range(1, 567):
+                if qid % 3 == 0:
+                    yield f"{qid}. Иногда мне кажется, что окружающие"
+                    yield f"   относятся ко мне несправедливо ({qid})"
+                else:
+                    yield f"{qid}. У меня хороший аппетит и крепкий сон ({qid})"
+
+
+def build_document(copies: int) -> str:
+    return "\n".join(iter_document_lines(copies)) + "\n"
+
+
+def legacy_pdf(text: str) -> tuple:
+    """extract_questions_section() + parse_questions_from_section() before the streaming parser."""
+    def section(variant):
+        start = re.search(f"{variant} в ?ариант", text, re.IGNORECASE)
+        if not start:
+            return ""
+        end_pattern = r"Женский в ?ариант" if variant == "Мужской" else r"(Ключи|Обработка|Интерпретация)"
+        end = re.search(end_pattern, text[start.end():], re.IGNORECASE)
+        return text[start.end():start.end() + end.start()] if end else text[start.end():]
+
+    def parse(sec):
+        questions = {}
+        for match in re.finditer(r'(\d{1,3})\.\s+([^\n]+(?:\n(?!\d{1,3}\.\s)[^\n]+)*)', sec):
+            q_num = int(match.group(1))
+            q_text = re.sub(r'\s+', ' ', match.group(2)).strip()
+            if 1 <= q_num <= 566 and len(q_text) > 10:
+                questions[q_num] = q_text
+        return questions
+
+    return parse(section("Мужской")), parse(section("Женский"))
+
+
+def legacy_txt(text: str) -> tuple:
+    """parse_txt_file() + parse_questions() of convert-txt-to-json.py before the streaming parser."""
+    def parse(sec):
+        questions = {}
+        current_id, current_text = None, []
+        for line in sec.split('\n'):
+            line = line.strip()
+            if not line or line.startswith('"') or line.startswith('Джордж'):
+                continue
+            match = re.match(r'^(\d{1,3})\.\s+(.+)$', line)
+            if match:
+                if current_id is not None and current_text:
+                    questions[current_id] = ' '.join(current_text).strip()
+                current_id, current_text = int(match.group(1)), [match.group(2)]
+            elif current_id is not None:
+                current_text.append(line)
+        if current_id is not None and current_text:
+            questions[current_id] = ' '.join(current_text).strip()
+        return questions
+
+    parts = re.split(r'Женский вариант\.', text, flags=re.IGNORECASE)
+    male_match = re.search(r'Мужской вариант\.', parts[0], re.IGNORECASE)
+    male = parts[0][male_match.end():] if male_match else parts[0]
+    return parse(male), parse(parts[1] if len(parts) > 1 else "")
+
+
+def streaming(lines) -> tuple:
+    parser = QuestionParser(markers=[("male", MALE_MARKER), ("female", FEMALE_MARKER)], initial=None,
+                            max_id=566, min_length=11)
+    sections = {"male": {}, "female": {}}
+    for section, qid, text in parser.parse(lines):
+        sections[section][qid] = text
+    return sections["male"], sections["female"]
+
+
+def measure(label, func, make_input):
+    """Time one run, then repeat it under tracemalloc (which slows it down) for peak memory."""
+    data = make_input()
+    started = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - started
+
+    data = make_input()
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms {peak / 1024 / 1024:>9.2f} MB peak")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question parser microbenchmark")
+    parser.add_argument("--copies", type=int, default=50)
+    args = parser.parse_args()
+
+    document = build_document(args.copies)
+    print(f"Document: {len(document) / 1024 / 1024:.1f} MB, {document.count(chr(10))} lines")
+
+    reference_pdf = measure("legacy PDF (multi-line re)", legacy_pdf, lambda: document)
+    reference_txt = measure("legacy TXT (re per line)", legacy_txt, lambda: document)
+    result = measure("streaming (list of lines)", streaming, document.splitlines)
+    # From a lazy line source only one line and one item are alive at a time,
+    # which is how the scripts feed files and page lists.
+    result_iter = measure("streaming (line iterator)", streaming, lambda: iter_document_lines(args.copies))
+
+    print(f"matches legacy TXT output: {result == reference_txt == result_iter}")
+    print(f"items vs legacy PDF: {sum(map(len, result))} / {sum(map(len, reference_pdf))}")
+
+
+if __name__ == "__main__":
+    main()
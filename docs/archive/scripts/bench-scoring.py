@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the Python batch scorer against the PHP SMIL calculators (see psytools/scoring_bench.py).
+
+Usage:
+    python3 docs/archive/scripts/bench-scoring.py [--sheets 2000] [--seed 17] [--php /usr/bin/php]
+                                                  [--threshold 0.2] [--no-php] [--no-record]
+
+Scores a fixed synthetic corpus in Python and, through bin/score-smil-sheets.php,
+with RawScoreCalculator, TScoreCalculator, ValidityAssessor and
+AdditionalScalesCalculator. Prints p50/p95 per-sheet latency and sheets/s,
+appends them to storage/benchmarks/scoring-history.json and exits with 1 when
+the results differ or a metric is worse than the median of the previous runs
+by more than the threshold. PHP needs `composer install` (vendor/autoload.php).
+"""
+import argparse
+import sys
+
+from psytools.scoring_bench import (
+    CORPUS_SEED,
+    CORPUS_SIZE,
+    HISTORY_PATH,
+    LATENCY_SAMPLE,
+    THRESHOLD,
+    PythonScorer,
+    build_corpus,
+    compare,
+    find_php,
+    history_entry,
+    load_history,
+    regressions,
+    run_php,
+    save_history,
+    time_python,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python vs PHP SMIL scoring benchmark")
+    parser.add_argument("--sheets", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--seed", type=int, default=CORPUS_SEED)
+    parser.add_argument("--php", help="PHP CLI binary (default: $PHP_BINARY or php on PATH)")
+    parser.add_argument("--no-php", action="store_true", help="time the Python scorer only")
+    parser.add_argument("--latency-sample", type=int, default=LATENCY_SAMPLE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="relative slowdown to flag")
+    parser.add_argument("--history", default=str(HISTORY_PATH))
+    parser.add_argument("--no-record", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.sheets, args.seed)
+    scorer = PythonScorer()
+    timings = {"python": time_python(scorer, corpus, args.latency_sample)}
+    match = None
+    failed = False
+
+    php = None if args.no_php else find_php(args.php)
+    if php is None and not args.no_php:
+        print("⚠️  php не найден — только Python (--php PATH или PHP_BINARY)")
+    if php is not None:
+        php_results, timings["php"] = run_php(corpus, php)
+        problems = compare(scorer.results(corpus.answers, corpus.genders), php_results)
+        match = not problems
+        for problem in problems:
+            print(f"❌ {problem}")
+        failed |= bool(problems)
+
+    print(f"{corpus.size} sheets (seed {corpus.seed})")
+    results = {}
+    for side, timing in timings.items():
+        results[side] = timing.summary()
+        summary = results[side]
+        print(f"{side:<8} p50 {summary['p50_ms']:>8.3f} ms   p95 {summary['p95_ms']:>8.3f} ms   "
+              f"{summary['sheets_per_sec']:>12,.0f} sheets/s")
+    if "php" in timings:
+        print(f"php process: {timings['php'].wall_seconds:.2f}s; results {'match' if match else 'DIFFER'}")
+
+    history = load_history(args.history)
+    entry = history_entry(corpus, results, match)
+    found = regressions(history, entry, args.threshold)
+    for regression in found:
+        print(f"⚠️  regression: {regression}")
+    failed |= bool(found)
+    if not args.no_record:
+        save_history(history + [entry], args.history)
+
+    print(("❌" if failed else "✅") + f" {len(history) + (not args.no_record)} runs in {args.history}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
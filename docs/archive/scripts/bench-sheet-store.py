@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: packed sheet store (psytools/sheet_store.py) against the answers JSON.
+
+Usage:
+    python3 docs/archive/scripts/bench-sheet-store.py [--sheets 1000000] [--json-sample 20000]
+                                                      [--seed 1] [-o FILE]
+
+Generates SMIL sheets (generate-sessions.py model), appends them to a sheet
+store and times unpacking them all back into an answer matrix. The JSON side
+is the answers column as the web path stores it: its size is measured on
+every sheet, json.loads plus encode_sheets on --json-sample sheets and
+extrapolated. The store goes to FILE (storage/benchmarks/sheets.bin), which
+is replaced.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from psytools.answers import encode_sheets
+from psytools.paths import PROJECT_ROOT
+from psytools.sheet_store import SheetStore, packed_size
+from psytools.synthetic import Renderer, generate, uuid_rows
+
+OUTPUT_PATH = PROJECT_ROOT / "storage" / "benchmarks" / "sheets.bin"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packed answer sheets vs JSON: size and decode speed")
+    parser.add_argument("--sheets", type=int, default=1_000_000)
+    parser.add_argument("--json-sample", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", default=str(OUTPUT_PATH))
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.unlink(missing_ok=True)
+    store = SheetStore(output)
+    rng = np.random.default_rng(args.seed)
+    renderer = None
+    json_bytes, sample, appending = 0, [], 0.0
+    for batch in generate("smil", args.sheets, seed=args.seed):
+        if renderer is None:
+            renderer = Renderer(batch.keys, 2, smil=True)
+        rows = np.hstack(renderer.answers_json(batch))
+        json_bytes += rows.size
+        if len(sample) < args.json_sample:
+            sample.extend(bytes(row) for row in rows[:args.json_sample - len(sample)])
+        ids = [bytes(row) for row in uuid_rows(rng, len(batch.genders))]
+        started = time.perf_counter()
+        store.append(ids, batch.genders, batch.answers, batch.created)
+        appending += time.perf_counter() - started
+    n = len(store)
+
+    started = time.perf_counter()
+    checksum = 0
+    for _, answers in store.batches():
+        checksum += int(answers.sum(dtype=np.int64))
+    unpacking = time.perf_counter() - started
+
+    started = time.perf_counter()
+    encode_sheets([json.loads(row) for row in sample])
+    per_sheet = (time.perf_counter() - started) / len(sample)
+
+    store_bytes = output.stat().st_size
+    print(f"{n} sheets, {packed_size()} answer bytes per sheet")
+    print(f"{'answers JSON':<24} {json_bytes / 2**20:>9.1f} MiB {json_bytes / n:>8.0f} B/sheet  "
+          f"decode {per_sheet * n:>8.2f} s ({1 / per_sheet:>11,.0f} sheets/s, from {len(sample)} sheets)")
+    print(f"{'sheet store':<24} {store_bytes / 2**20:>9.1f} MiB {store_bytes / n:>8.0f} B/sheet  "
+          f"decode {unpacking:>8.2f} s ({n / unpacking:>11,.0f} sheets/s)")
+    print(f"append {appending:.2f} s, {json_bytes / store_bytes:.0f}x smaller, "
+          f"{per_sheet * n / unpacking:.0f}x faster to decode (checksum {checksum})")
+
+
+if __name__ == "__main__":
+    main()
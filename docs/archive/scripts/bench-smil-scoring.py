@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: T-scores, K-correction and validity codes for simulated profiles.
+
+Usage:
+    python3 docs/archive/scripts/bench-smil-scoring.py [--profiles 1000000] [--seed 1]
+
+Raw scores are drawn per scale between 0 and the scale's maxRaw (a raw score
+matrix, not answer sheets, so the answer encoding is not part of the timing);
+unknown counts and control scores are drawn alongside.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from psytools.smil_scoring import NORMS_PATH, SCALES, TScorer, is_valid, validity_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorised SMIL T-score/validity benchmark")
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(NORMS_PATH, encoding="utf-8") as f:
+        norms = json.load(f)["scales"]
+    max_raw = np.array([norms[s]["male"]["maxRaw"] for s in SCALES])
+    rng = np.random.default_rng(args.seed)
+    n = args.profiles
+    raw = (rng.random((n, len(SCALES))) * max_raw * 0.6).astype(np.int32)
+    genders = rng.integers(0, 2, n, dtype=np.uint8)
+    unknown = rng.poisson(15, n)
+    control = rng.binomial(27, 0.9, n)
+
+    scorer = TScorer(norms)
+    timings = {}
+    started = time.perf_counter()
+    corrected = scorer.corrected(raw)
+    timings["K-correction"] = time.perf_counter() - started
+    started = time.perf_counter()
+    t = scorer.score(raw, genders)
+    timings["T-scores (incl. K-correction)"] = time.perf_counter() - started
+    started = time.perf_counter()
+    codes = validity_codes(t, unknown, control)
+    timings["validity codes"] = time.perf_counter() - started
+
+    print(f"{n} profiles x {len(SCALES)} scales")
+    for label, seconds in timings.items():
+        print(f"{label:<32} {seconds * 1000:>9.1f} ms {n / seconds / 1e6:>7.1f} M profiles/s")
+    print(f"valid: {is_valid(codes).mean():.1%}, mean corrected scale 8: {corrected[:, SCALES.index('8')].mean():.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Build the word-form frequency index used by clean-questions-text.py.
+
+Usage:
+    python3 docs/archive/scripts/build-lexicon.py [--words freq.tsv] [--output storage/cache/lexicon.idx]
+
+The index always covers the question banks the SMIL pipeline does not write
+(modules/*/questions*.json except questions-566-gender.json, being cleaned,
+and questions-566-full.json, built from it) and source/qw.txt when present.
+A rebuilt index makes the pipeline's clean step run again.
+--words adds an external frequency list, one "word<TAB>frequency" per line
+(e.g. a frequency dictionary of Russian word forms); word pairs separated by a
+space are accepted too and steer ambiguous joins such as "не трудно".
+"""
+import argparse
+import time
+from pathlib import Path
+
+from psytools import lexicon
+from psytools.lexicon import build_bank_index, read_word_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the question text frequency index")
+    parser.add_argument("--words", action="append", default=[], help="word<TAB>frequency list (repeatable)")
+    parser.add_argument("--output", default=str(lexicon.DEFAULT_PATH))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    extra = None
+    for path in args.words:
+        counts = read_word_list(path)
+        print(f"{path}: {len(counts)} entries")
+        extra = counts if extra is None else extra + counts
+
+    count = build_bank_index(args.output, extra)
+    size = Path(args.output).stat().st_size
+    print(f"✅ {args.output}: {count} keys, {size / 1024:.0f} KB, {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
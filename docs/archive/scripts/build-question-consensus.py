@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Консенсус текста вопросов СМИЛ по source/qw.txt и sob-01.pdf (PyPDF2 и PyMuPDF)
+
+Использование:
+    python3 docs/archive/scripts/build-question-consensus.py [--sources txt,pypdf2,fitz] [--workers N]
+                                                           [--threshold 0.95] [--report FILE] [--write]
+
+Каждый вариант каждого вопроса сравнивается во всех прочтениях ленточным
+расстоянием Левенштейна (psytools/consensus.py); побеждает прочтение,
+ближе всего к остальным, но текст PDF (после нормализации) заменяет
+выправленный вручную qw.txt только с большим перевесом. Вопросы с низким
+согласием и все вопросы, взятые не из txt, выводятся для ручной проверки
+(--report — в JSON). --write записывает победившие тексты в
+questions-566-gender.json. Недоступный источник (нет файла или библиотеки)
+пропускается с предупреждением.
+"""
+
+import argparse
+import time
+
+from psytools import consensus, pdf_text
+from psytools.json_writer import write_json
+from psytools.page_cache import PageCache
+from psytools.paths import SMIL_DIR, SOB_PDF, SOURCE_DIR
+from psytools.smil_records import GENDER_DESCRIPTION
+
+
+def load_readings(sources, txt_path, pdf_path, workers, use_cache):
+    readings = {}
+    cache = PageCache() if use_cache else None
+    try:
+        for source in sources:
+            try:
+                if source == "txt":
+                    readings[source] = consensus.txt_reading(txt_path)
+                else:
+                    readings[source] = consensus.pdf_reading(pdf_path, source, workers, cache)
+            except (OSError, pdf_text.ExtractionError) as e:
+                print(f"  ⚠️ {source}: {e}")
+                continue
+            male, female = readings[source]
+            print(f"  ✅ {source}: {len(male)} муж., {len(female)} жен.")
+    finally:
+        if cache is not None:
+            cache.close()
+    return readings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Консенсус текста вопросов СМИЛ по нескольким источникам")
+    parser.add_argument("--sources", default=",".join(consensus.SOURCES),
+                        help="источники через запятую: txt, pypdf2, fitz")
+    parser.add_argument("--txt", default=str(SOURCE_DIR / "qw.txt"))
+    parser.add_argument("--pdf", default=str(SOB_PDF))
+    parser.add_argument("--workers", type=int, default=0, help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--band", type=int, default=consensus.BAND, help="ширина ленты (макс. правок)")
+    parser.add_argument("--threshold", type=float, default=consensus.REVIEW_THRESHOLD)
+    parser.add_argument("--report", help="записать вопросы для проверки в JSON")
+    parser.add_argument("--write", action="store_true", help="записать консенсус в questions-566-gender.json")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш текста страниц")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Консенсус текста вопросов СМИЛ")
+    print("=" * 80)
+
+    readings = load_readings(args.sources.split(","), args.txt, args.pdf, args.workers, not args.no_cache)
+    if not readings:
+        print("❌ Ошибка: нет ни одного источника")
+        return
+
+    started = time.perf_counter()
+    items = consensus.build_consensus(readings, band=args.band, workers=args.workers)
+    seconds = time.perf_counter() - started
+    review = consensus.needs_review(items, args.threshold)
+
+    wins = {source: sum(1 for item in items if item.source == source) for source in readings}
+    print(f"\n{len(items)} вариантов вопросов за {seconds:.2f}s; выбрано: "
+          + ", ".join(f"{source} {count}" for source, count in wins.items()))
+
+    if review:
+        print(f"\n⚠️ На проверку (согласие < {args.threshold} или текст не из txt): {len(review)}")
+        for item in review:
+            distances = ", ".join(f"{s}={'>' + str(args.band) if d is None else d}"
+                                  for s, d in item.distances.items() if s != item.source)
+            print(f"  №{item.id} {item.variant}: {item.agreement:.2f} [{item.source}; {distances or 'нет других'}]")
+            print(f"    {item.text[:70]}")
+    if args.report:
+        write_json(args.report, [item.to_dict() for item in review])
+        print(f"\nОтчёт: {args.report}")
+
+    if args.write:
+        output_path = SMIL_DIR / "questions-566-gender.json"
+        questions = consensus.to_questions(items)
+        written = write_json(output_path, {**GENDER_DESCRIPTION, "questions": questions}, indent=4)
+        print(f"\n✅ {'Сохранено' if written else 'Без изменений'}: {output_path.name} ({len(questions)} вопросов)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Cross-check every SMIL key source (see psytools/key_sets.py).
+
+Usage:
+    python3 docs/archive/scripts/check-smil-keys.py [-v] [--strict] [--json]
+
+Compares mmpi-key-solomin.json (scale and item views), the scales in
+questions-566-full.json, additional-scales.json, additional-scales-norms.json
+and the maxRaw values of the norms. Exits with status 1 when an error is
+found (with --strict, also on warnings), so it can run after every key edit.
+"""
+import argparse
+import json
+import sys
+import time
+
+from psytools.key_sets import ERROR, INFO, WARNING, analyse, load_sources, summary
+
+ICONS = {ERROR: "❌", WARNING: "⚠️ ", INFO: "  "}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMIL key consistency check")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also list overlaps and unscored questions")
+    parser.add_argument("--strict", action="store_true", help="fail on warnings too")
+    parser.add_argument("--json", action="store_true", help="print findings as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    findings = analyse(load_sources())
+    elapsed = time.perf_counter() - started
+    counts = summary(findings)
+
+    if args.json:
+        print(json.dumps([vars(f) for f in findings], ensure_ascii=False, indent=2))
+    else:
+        for severity in (ERROR, WARNING, INFO):
+            if severity == INFO and not args.verbose:
+                continue
+            for finding in findings:
+                if finding.severity == severity:
+                    print(f"{ICONS[severity]} [{finding.kind}] {finding}")
+        print(f"\n{counts[ERROR]} errors, {counts[WARNING]} warnings, {counts[INFO]} notes in {elapsed * 1000:.1f} ms")
+
+    failed = counts[ERROR] or (args.strict and counts[WARNING])
+    if not args.json:
+        print("❌ key check failed" if failed else "✅ key of record is consistent")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,46 +3,39 @@
 Очистка текста вопросов от артефактов PDF (лишние пробелы)
 
 Использование:
-    python3 bin/clean-questions-text.py
+    python3 docs/archive/scripts/clean-questions-text.py [--compact]
 """
 
+import argparse
 import json
-import re
-from pathlib import Path
+
+from psytools.json_writer import write_json
+from psytools.paths import SMIL_DIR
+from psytools.text_normalizer import bank_lexicon, normalize
 
 
 def clean_text(text: str) -> str:
     """
-    Очищает текст от артефактов PDF
+    Очищает текст от артефактов PDF за один проход (см. psytools.text_normalizer)
+    
+    Склейка решается по частотному словарю (psytools.lexicon), который
+    строится из банков вопросов при первом запуске и переиспользуется.
     
     Примеры:
         "люб лю чит ать" -> "люблю читать"
         "в стаю св ежим" -> "встаю свежим"
+        "кому- нибудь" -> "кому-нибудь"
     """
-    # Убираем лишние пробелы между буквами
-    # Паттерн: буква + пробел + 1-2 буквы + пробел
-    text = re.sub(r'([а-яА-ЯёЁ])\s+([а-яА-ЯёЁ]{1,2})\s+', r'\1\2 ', text)
-    
-    # Повторяем несколько раз для сложных случаев
-    for _ in range(3):
-        text = re.sub(r'([а-яА-ЯёЁ])\s+([а-яА-ЯёЁ]{1,2})\s+', r'\1\2 ', text)
-    
-    # Убираем множественные пробелы
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Убираем пробелы перед знаками препинания
-    text = re.sub(r'\s+([,.:;!?»)])', r'\1', text)
-    
-    # Убираем пробелы после открывающих кавычек/скобок
-    text = re.sub(r'([«(])\s+', r'\1', text)
-    
-    return text.strip()
+    return normalize(text, bank_lexicon())
 
 
 def main():
-    project_root = Path(__file__).parent.parent
-    input_path = project_root / "modules" / "smil" / "questions-566-gender.json"
-    output_path = input_path  # Перезаписываем тот же файл
+    parser = argparse.ArgumentParser(description="Очистка текста вопросов от артефактов PDF")
+    parser.add_argument("--compact", action="store_true", help="писать JSON без пробелов")
+    args = parser.parse_args()
+
+    input_path = SMIL_DIR / "questions-566-gender.json"
+    output_path = input_path  # Перезаписываем тот же файл (атомарно, см. psytools.json_writer)
     
     print("=" * 80)
     print("Очистка текста вопросов от артефактов PDF")
@@ -74,10 +67,10 @@ def main():
     
     # Сохраняем
     print(f"\nСохраняю в: {output_path}")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    
-    print("  ✅ Готово!")
+    if write_json(output_path, data, indent=4, compact=args.compact):
+        print("  ✅ Готово!")
+    else:
+        print("  ✅ Без изменений, файл не перезаписан")
     
     # Показываем примеры
     print("\nПримеры очищенных вопросов:")
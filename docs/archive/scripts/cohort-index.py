@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Bitmap index of completed sessions and cohort queries on it (see psytools/cohort_index.py).
+
+Usage:
+    python3 docs/archive/scripts/cohort-index.py [--sqlite FILE] [--rebuild | --no-update]
+                                                 [-q "gender=female valid=true code=2-7 t8>=70" ...]
+                                                 [--ids] [--include-synthetic] [--index FILE]
+
+Adds the sessions completed since the last run to the index
+(storage/cache/cohort-index.npz), re-indexes those whose demographics or
+results changed (rescore-sessions.py, flag-careless-sessions.py) and drops
+those no longer completed; saving compacts the rows those leave behind,
+and --rebuild starts over. Each --query prints the number of matching sessions (--ids: their ids) and the
+time the bitmap operations took. Terms: dimension=value[,value] (any of),
+dimension!=value, t<scale>>=N or t<scale><N with N one of 40, 50, 60, 70,
+80. Without a query the indexed dimensions and values are listed.
+Connects to MySQL with the DB_* settings of .env, or to an SQLite copy
+with --sqlite.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from psytools.cohort_index import DEFAULT_PATH, PAGE_SIZE, CohortIndex, update
+from psytools.session_scan import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort queries over a bitmap index of completed sessions")
+    parser.add_argument("--sqlite", help="use this SQLite database instead of MySQL")
+    refresh = parser.add_mutually_exclusive_group()
+    refresh.add_argument("--rebuild", action="store_true", help="index every completed session afresh")
+    refresh.add_argument("--no-update", action="store_true", help="query the index as it is")
+    parser.add_argument("-q", "--query", action="append", default=[])
+    parser.add_argument("--ids", action="store_true", help="print the session ids of each cohort")
+    parser.add_argument("--include-synthetic", action="store_true", help="keep generate-sessions.py rows")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--index", default=str(DEFAULT_PATH))
+    args = parser.parse_args()
+
+    path = Path(args.index)
+    index = CohortIndex.load(path) if path.exists() and not args.rebuild else CohortIndex()
+    if not args.no_update:
+        started = time.perf_counter()
+        connection = Database(args.sqlite).connect()
+        try:
+            added, reindexed, removed = update(index, connection, args.page_size)
+        finally:
+            connection.close()
+        index.save(path)
+        print(f"✅ {added} sessions added, {reindexed} re-indexed, {removed} removed, {len(index)} indexed "
+              f"in {len(index.bitmaps)} bitmaps ({index.nbytes() / 2**20:.1f} MiB), {time.perf_counter() - started:.2f}s → {path}")
+
+    if not args.query:
+        for dimension, values in index.dimensions().items():
+            print(f"   {dimension}: {', '.join(values)}")
+    for text in args.query:
+        started = time.perf_counter()
+        try:
+            rows = index.query(text, args.include_synthetic)
+            count = len(rows)
+        except ValueError as e:
+            print(f"❌ {e}")
+            continue
+        print(f"   {text}: {count} sessions ({(time.perf_counter() - started) * 1000:.2f} ms)")
+        if args.ids:
+            for session_id in index.session_ids(rows):
+                print(f"      {session_id}")
+
+
+if __name__ == "__main__":
+    main()
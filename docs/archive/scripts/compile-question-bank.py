@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Compile questions-566-full.json into the binary questions-566-full.bin.
+
+Usage:
+    python3 docs/archive/scripts/compile-question-bank.py [--json path] [--output path]
+
+The compiled file is written only after it decodes back to the JSON source
+byte for byte (see psytools/question_bank.py). run-pipeline.py does the same
+as its last step.
+"""
+import argparse
+
+from psytools.paths import SMIL_DIR
+from psytools.question_bank import QuestionBank, compile_bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the SMIL question bank")
+    parser.add_argument("--json", default=str(SMIL_DIR / "questions-566-full.json"))
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    output = compile_bank(args.json, args.output)
+    with QuestionBank(output) as bank:
+        entries, strings = len(bank.scale), len(bank.string_offsets) - 1
+        print(f"✅ {output}: {len(bank)} questions, {entries} scale entries, {strings} strings, "
+              f"{output.stat().st_size / 1024:.0f} KB (verified against {args.json})")
+
+
+if __name__ == "__main__":
+    main()
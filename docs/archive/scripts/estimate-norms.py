@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Estimate SMIL norms from completed sessions (see psytools/norms.py).
+
+Usage:
+    python3 docs/archive/scripts/estimate-norms.py [--parquet DIR | --sqlite FILE] [--workers 4]
+                                                   [--min-count 100] [-o DIR] [--include-synthetic]
+
+Streams the completed SMIL sessions from MySQL (DB_* settings of .env), an
+SQLite copy or a Parquet export (export-sessions.py), scores them and keeps
+mean, standard deviation and a score histogram per scale, gender and age
+band. Writes basic_scales_norms.json and additional-scales-norms.json in the
+schema of modules/smil, plus norms-diff.json against the shipped norms, to
+DIR (storage/exports/norms). The shipped files are not touched.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from psytools.additional_scales import NORMS_PATH as ADDITIONAL_NORMS_PATH
+from psytools.json_writer import write_json
+from psytools.norms import (
+    MIN_COUNT,
+    OUTPUT_DIR,
+    PAGE_SIZE,
+    Estimator,
+    estimate_from_database,
+    estimate_from_parquet,
+    norms_diff,
+    norms_documents,
+)
+from psytools.session_scan import Database
+from psytools.smil_scoring import NORMS_PATH
+
+SHOWN_CHANGES = 15
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate SMIL norms from collected sessions")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--parquet", help="read an export-sessions.py Parquet tree instead of the database")
+    source.add_argument("--sqlite", help="use this SQLite database instead of MySQL")
+    parser.add_argument("--workers", type=int, default=1, help="processes (id ranges or groups of files)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT, help="smaller strata keep the shipped norms")
+    parser.add_argument("--include-synthetic", action="store_true", help="also use generate-sessions.py rows")
+    parser.add_argument("-o", "--output", default=str(OUTPUT_DIR))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.parquet:
+        state = estimate_from_parquet(Path(args.parquet), args.workers, args.page_size, args.include_synthetic)
+    else:
+        state = estimate_from_database(Database(args.sqlite), args.workers, args.page_size, args.include_synthetic)
+    seconds = time.perf_counter() - started
+    print(f"{state.scanned} sessions scanned in {seconds:.2f}s: {state.used} used, {state.invalid} invalid, "
+          f"{state.synthetic} synthetic, {state.unreadable} unreadable")
+    if not state.used:
+        print("❌ no valid protocols, nothing written")
+        return
+
+    basic, additional = norms_documents(state, Estimator().additional_codes, args.min_count)
+    shipped = {}
+    for family, path in (("basic", NORMS_PATH), ("additional", ADDITIONAL_NORMS_PATH)):
+        with open(path, encoding="utf-8") as f:
+            shipped[family] = json.load(f)
+    changes = norms_diff(shipped, {"basic": basic, "additional": additional})
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    write_json(output / NORMS_PATH.name, basic)
+    write_json(output / ADDITIONAL_NORMS_PATH.name, additional)
+    write_json(output / "norms-diff.json", changes)
+
+    if changes:
+        print(f"Largest shifts of the average respondent under the shipped norms (of {len(changes)} changes):")
+    for change in sorted(changes, key=lambda c: -abs(c["t_shift"] or 0))[:SHOWN_CHANGES]:
+        (old_m, new_m), (old_d, new_d) = change["M"], change["delta"]
+        print(f"   {change['family']:<10} {change['scale']:<5} {change['gender']:<6} n={change['n']:<7} "
+              f"M {old_m} -> {new_m}  delta {old_d} -> {new_d}  T {50 + (change['t_shift'] or 0):.1f}")
+    print(f"✅ norms written to {output}")
+
+
+if __name__ == "__main__":
+    main()
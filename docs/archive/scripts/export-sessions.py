@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Export test_sessions to partitioned Parquet/Arrow files (see psytools/session_export.py).
+
+Usage:
+    python3 docs/archive/scripts/export-sessions.py [-o DIR] [--test smil] [--status completed]
+                                                    [--format parquet|arrow] [--sqlite FILE]
+
+Connects to MySQL with the DB_* settings of .env (PyMySQL required), or reads
+an SQLite copy with --sqlite. Files go to DIR/<test slug>/<YYYY-MM>/part-NNNN.*;
+SMIL answers become uint8 columns q1..q566.
+"""
+import argparse
+import sqlite3
+
+from psytools.db import connect
+from psytools.session_export import BATCH_SIZE, EXPORT_DIR, FORMATS, ROWS_PER_FILE, export_sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export test sessions to Parquet/Arrow")
+    parser.add_argument("-o", "--output", default=str(EXPORT_DIR))
+    parser.add_argument("--test", action="append", help="test slug (repeatable; default: all tests)")
+    parser.add_argument("--status", action="append", help="session status (repeatable; default: completed)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rows-per-file", type=int, default=ROWS_PER_FILE)
+    parser.add_argument("--sqlite", help="read from this SQLite database instead of MySQL")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.sqlite) if args.sqlite else connect()
+    try:
+        stats = export_sessions(
+            connection,
+            args.output,
+            statuses=args.status or ["completed"],
+            tests=args.test,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            rows_per_file=args.rows_per_file,
+        )
+    finally:
+        connection.close()
+
+    for partition, rows in sorted(stats.partitions.items()):
+        print(f"   {partition}: {rows}")
+    print(f"✅ {stats.rows} sessions in {len(stats.files)} files, {stats.batches} batches, {stats.seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
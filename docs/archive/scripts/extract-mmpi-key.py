@@ -1,47 +1,88 @@
 #!/usr/bin/env python3
-"""Extract MMPI key from Solomin PDF pages 63-68."""
-import fitz, json, re, sys
+"""Extract MMPI key from the key pages of the Solomin PDF (pages 63-68).
 
-PDF = sys.argv[1] if len(sys.argv) > 1 else "/Users/dmitrijturin/Библиотека книг/Обучение клинический психолог/Практикум по патопсихологической и нейропсихологической диагностике/Тесты/И.Л. Соломин - Личностный опросник MMPI.pdf"
+Usage:
+    python3 docs/archive/scripts/extract-mmpi-key.py [PDF] [--layout] [--workers N]
 
-doc = fitz.open(PDF)
-full_text = ""
-for p in range(62, 68):  # pages 63-68 (0-indexed)
-    full_text += doc[p].get_text()
-doc.close()
+--layout rebuilds the key tables from word positions (psytools/key_tables.py)
+instead of reading the key pages line by line; it also prints a confidence
+score per scale.
 
-# Parse key blocks
-scales = {}
-current_scale = None
-for line in full_text.split('\n'):
-    line = line.strip()
-    # Stop collecting after Т-баллы section begins
-    if 'Т-баллы' in line:
-        current_scale = None
-        continue
-    # Detect scale header (handles "Шкала 5 для мужчин:", "Шкала K:" etc.)
-    m = re.match(r'Шкала\s+([\w]+).*:', line)
-    if m:
-        current_scale = m.group(1)
-        if current_scale == 'К':
-            current_scale = 'K'
-        if current_scale == '5' and 'для мужчин' in line:
-            current_scale = '5M'
-        elif current_scale == '5' and 'для женщин' in line:
-            current_scale = '5F'
-        scales[current_scale] = {}
-        continue
-    # Detect direction header
-    m = re.match(r'(Верно|Неверно)\s*\((\d+)\):', line)
-    if m and current_scale:
-        direction = 1 if m.group(1) == 'Верно' else -1
-        continue
-    # Collect question numbers
-    if current_scale and re.match(r'^[\d\s]+$', line):
-        nums = [int(n) for n in line.split() if n.isdigit()]
-        if nums:
-            direction_key = 'true' if direction == 1 else 'false'
-            scales[current_scale][direction_key] = scales[current_scale].get(direction_key, []) + nums
+Both modes take the key pages from the page index (psytools/page_index.py),
+built on the first run, and fall back to pages 63-68 (plain mode) or a scan
+of the whole document (--layout) when the index finds no key tables.
+"""
+import argparse
+import json
+import re
+
+from psytools import pdf_text
+from psytools.key_tables import extract_key
+from psytools.page_cache import PageCache
+from psytools.page_index import load_index
+
+DEFAULT_PDF = "/Users/dmitrijturin/Библиотека книг/Обучение клинический психолог/Практикум по патопсихологической и нейропсихологической диагностике/Тесты/И.Л. Соломин - Личностный опросник MMPI.pdf"
+
+parser = argparse.ArgumentParser(description="Extract the MMPI key from the Solomin PDF")
+parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF)
+parser.add_argument("--layout", action="store_true", help="layout-aware extraction with automatic page detection")
+parser.add_argument("--workers", type=int, default=None, help="processes for the page scan (default: all cores)")
+args = parser.parse_args()
+PDF = args.pdf
+
+
+def parse_lines(full_text):
+    """Line-based parse of the key pages' plain text."""
+    scales = {}
+    current_scale = None
+    for line in full_text.split('\n'):
+        line = line.strip()
+        # Stop collecting after Т-баллы section begins
+        if 'Т-баллы' in line:
+            current_scale = None
+            continue
+        # Detect scale header (handles "Шкала 5 для мужчин:", "Шкала K:" etc.)
+        m = re.match(r'Шкала\s+([\w]+).*:', line)
+        if m:
+            current_scale = m.group(1)
+            if current_scale == 'К':
+                current_scale = 'K'
+            if current_scale == '5' and 'для мужчин' in line:
+                current_scale = '5M'
+            elif current_scale == '5' and 'для женщин' in line:
+                current_scale = '5F'
+            scales[current_scale] = {}
+            continue
+        # Detect direction header
+        m = re.match(r'(Верно|Неверно)\s*\((\d+)\):', line)
+        if m and current_scale:
+            direction = 1 if m.group(1) == 'Верно' else -1
+            continue
+        # Collect question numbers
+        if current_scale and re.match(r'^[\d\s]+$', line):
+            nums = [int(n) for n in line.split() if n.isdigit()]
+            if nums:
+                direction_key = 'true' if direction == 1 else 'false'
+                scales[current_scale][direction_key] = scales[current_scale].get(direction_key, []) + nums
+    return scales
+
+
+confidence = {}
+with PageCache() as cache:
+    key_pages = load_index(PDF, backend="fitz", workers=args.workers, cache=cache).key_pages()
+    if args.layout:
+        # word positions are read straight from the PDF; only the index uses the cache
+        extraction = extract_key(PDF, workers=args.workers, pages=key_pages or None)
+        scales = extraction.scales
+        confidence = {s: extraction.confidence(s) for s in scales}
+        mode = f"layout mode, key pages {', '.join(str(p + 1) for p in extraction.pages)}; "
+    else:
+        # pages 63-68 (0-indexed) unless the index located the tables
+        pages = key_pages or range(62, 68)
+        full_text = "".join(pdf_text.extract_pages(PDF, backend="fitz", workers=1, pages=pages, cache=cache))
+        scales = parse_lines(full_text)
+        mode = ""
+    cache_stats = f"{mode}page cache: {cache.hits} hits, {cache.misses} misses"
 
 # Build items map: question_id -> [{scale, direction}, ...]
 items_map = {}
@@ -76,8 +117,9 @@ with open('modules/smil/Scoring/keys/mmpi-key-solomin.json', 'w') as f:
         'items': items_map
     }, f, ensure_ascii=False, indent=2)
 
-print(f"Extracted key: {unique_ids} unique questions, {total_items} total scale entries across {len(scales)} scales")
+print(f"Extracted key: {unique_ids} unique questions, {total_items} total scale entries across {len(scales)} scales ({cache_stats})")
 for s in sorted(scales.keys()):
     t = len(scales[s].get('true', []))
     f = len(scales[s].get('false', []))
-    print(f"  {s}: {t+f} items ({t} True, {f} False)")
+    note = f", confidence {confidence[s]:.2f}" if s in confidence else ""
+    print(f"  {s}: {t+f} items ({t} True, {f} False){note}")
@@ -4,116 +4,59 @@
 с гендерными вариантами (мужской и женский)
 
 Использование:
-    python3 bin/extract-questions-from-pdf.py
+    python3 docs/archive/scripts/extract-questions-from-pdf.py [--workers N] [--backend pypdf2|fitz]
 
 Требования:
-    pip install PyPDF2
+    pip install PyPDF2      (или pip install pymupdf для --backend fitz)
 """
 
-import json
-import re
+import argparse
 from pathlib import Path
 
-try:
-    import PyPDF2
-except ImportError:
-    print("Ошибка: Требуется установить PyPDF2")
-    print("Выполните: pip install PyPDF2")
-    exit(1)
+from psytools import pdf_text
+from psytools.json_writer import write_json
+from psytools.page_cache import PageCache
+from psytools.page_index import load_index, page_ranges
+from psytools.paths import SMIL_DIR, SOB_PDF
+from psytools.smil_records import CONTROL_QUESTIONS, parse_pdf_pages
 
 
-# Контрольные вопросы (27 штук)
-CONTROL_QUESTIONS = [
-    14, 33, 48, 63, 66, 69, 121, 123, 133, 151, 168, 182, 184, 197, 200, 205,
-    266, 275, 293, 334, 349, 350, 462, 464, 474, 542, 551
-]
+def extract_pages_from_pdf(pdf_path: str, backend: str = pdf_text.DEFAULT_BACKEND, workers: int = None,
+                           cache: PageCache = None) -> list:
+    """Извлекает текст страниц вопросника (по индексу страниц, параллельно, с кэшем)
 
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Извлекает текст из PDF файла"""
-    print(f"Читаю PDF: {pdf_path}")
-    
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page_num, page in enumerate(reader.pages, 1):
-            text += page.extract_text() + "\n"
-    
-    print(f"  ✅ Извлечено {len(text)} символов")
-    return text
-
-
-def extract_questions_section(text: str, variant: str) -> str:
-    """
-    Извлекает секцию с вопросами для указанного варианта
-    
-    Args:
-        text: Полный текст PDF
-        variant: 'Мужской' или 'Женский'
-    
-    Returns:
-        str: Текст секции с вопросами
+    Индекс (psytools/page_index.py) строится при первом запуске; дальше
+    читаются только страницы от маркера варианта до последнего вопроса.
+    Если индекс вопросов не нашёл, читается весь документ.
     """
-    print(f"\nИщу секцию: {variant} вариант")
-    
-    # Ищем начало секции
-    start_pattern = f"{variant} в ?ариант"
-    start_match = re.search(start_pattern, text, re.IGNORECASE)
-    
-    if not start_match:
-        print(f"  ⚠️ Не найден маркер '{variant} вариант'")
-        return ""
-    
-    start_idx = start_match.end()
+    workers = pdf_text.resolve_workers(workers)
+    print(f"Читаю PDF: {pdf_path} (backend: {backend}, процессов: {workers})")
     
-    # Ищем конец секции (начало следующей секции или ключи)
-    if variant == "Мужской":
-        end_pattern = r"Женский в ?ариант"
-    else:
-        end_pattern = r"(Ключи|Обработка|Интерпретация)"
-    
-    end_match = re.search(end_pattern, text[start_idx:], re.IGNORECASE)
-    
-    if end_match:
-        end_idx = start_idx + end_match.start()
-    else:
-        # Если не нашли конец, берём до конца текста
-        end_idx = len(text)
+    span = load_index(pdf_path, backend, workers, cache).questionnaire_span() or None
+    if span:
+        print(f"  Страницы вопросника по индексу: {page_ranges(span)}")
+    pages = pdf_text.extract_pages(pdf_path, backend=backend, workers=workers, pages=span, cache=cache)
     
-    section = text[start_idx:end_idx]
-    print(f"  ✅ Найдена секция ({len(section)} символов)")
-    
-    return section
+    print(f"  ✅ Извлечено {len(pages)} страниц, {sum(len(p) for p in pages)} символов")
+    return pages
 
 
-def parse_questions_from_section(section: str) -> dict:
+def parse_questions_from_pages(pages: list) -> tuple:
     """
-    Парсит вопросы из секции текста
+    Потоково парсит вопросы обоих вариантов, страница за страницей
     
     Returns:
-        dict: {question_id: question_text}
+        tuple: (male_questions, female_questions) — {question_id: question_text}
     """
-    questions = {}
-    
-    # Паттерн: номер вопроса (1-566) + точка + текст до следующего номера
-    # Учитываем, что текст может быть разбит на строки
-    pattern = r'(\d{1,3})\.\s+([^\n]+(?:\n(?!\d{1,3}\.\s)[^\n]+)*)'
+    # Фильтруем: только вопросы 1-566, длина > 10 символов
+    male, female = parse_pdf_pages(pages)
+    sections = {"male": male, "female": female}
     
-    matches = re.finditer(pattern, section)
-    
-    for match in matches:
-        q_num = int(match.group(1))
-        q_text = match.group(2)
-        
-        # Очистка текста
-        q_text = re.sub(r'\s+', ' ', q_text)  # Убираем лишние пробелы и переносы
-        q_text = q_text.strip()
-        
-        # Фильтруем: только вопросы 1-566, длина > 10 символов
-        if 1 <= q_num <= 566 and len(q_text) > 10:
-            questions[q_num] = q_text
+    for variant, name in (("male", "Мужской"), ("female", "Женский")):
+        if not sections[variant]:
+            print(f"  ⚠️ Не найдены вопросы секции '{name} вариант'")
     
-    return questions
+    return sections["male"], sections["female"]
 
 
 def merge_questions(male_questions: dict, female_questions: dict) -> list:
@@ -179,10 +122,10 @@ def save_to_json(questions: list, output_path: str):
         "questions": questions
     }
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    
-    print(f"  ✅ Сохранено {len(questions)} вопросов")
+    if write_json(output_path, data, indent=4):
+        print(f"  ✅ Сохранено {len(questions)} вопросов")
+    else:
+        print("  ✅ Без изменений, файл не перезаписан")
     
     # Статистика по гендерным различиям
     different_count = sum(1 for q in questions if q['text_male'] != q['text_female'])
@@ -194,16 +137,29 @@ def save_to_json(questions: list, output_path: str):
     print(f"  - Контрольных вопросов: {control_count}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Извлечение вопросов СМИЛ из sob-01.pdf")
+    parser.add_argument("--pdf", default=str(SOB_PDF), help="путь к PDF (по умолчанию source/metod/sob-01.pdf)")
+    parser.add_argument("--backend", choices=pdf_text.BACKENDS, default=pdf_text.DEFAULT_BACKEND,
+                        help="библиотека извлечения текста")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="число процессов извлечения (0 — по числу ядер)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="не использовать кэш текста страниц (storage/cache/pdf-pages.sqlite)")
+    return parser.parse_args()
+
+
 def main():
     """Основная функция"""
+    args = parse_args()
+    
     print("=" * 80)
     print("Извлечение вопросов СМИЛ из sob-01.pdf")
     print("=" * 80)
     
     # Пути к файлам
-    project_root = Path(__file__).parent.parent
-    pdf_path = project_root / "source" / "metod" / "sob-01.pdf"
-    output_path = project_root / "modules" / "smil" / "questions-566-gender.json"
+    pdf_path = Path(args.pdf)
+    output_path = SMIL_DIR / "questions-566-gender.json"
     
     # Проверка существования PDF
     if not pdf_path.exists():
@@ -211,25 +167,22 @@ def main():
         return
     
     # Извлечение текста из PDF
-    text = extract_text_from_pdf(str(pdf_path))
-    
-    # Извлечение секций с вопросами
-    male_section = extract_questions_section(text, "Мужской")
-    female_section = extract_questions_section(text, "Женский")
-    
-    if not male_section and not female_section:
-        print("\n❌ Ошибка: Не удалось найти секции с вопросами")
-        print("Проверьте структуру PDF файла")
+    cache = None if args.no_cache else PageCache()
+    try:
+        pages = extract_pages_from_pdf(str(pdf_path), args.backend, args.workers, cache)
+    except pdf_text.ExtractionError as e:
+        print(f"❌ Ошибка: {e}")
         return
-    
-    # Парсинг вопросов
-    print("\nПарсинг мужских вопросов...")
-    male_questions = parse_questions_from_section(male_section)
-    print(f"  ✅ Извлечено {len(male_questions)} вопросов")
-    
-    print("\nПарсинг женских вопросов...")
-    female_questions = parse_questions_from_section(female_section)
-    print(f"  ✅ Извлечено {len(female_questions)} вопросов")
+    finally:
+        if cache is not None:
+            print(f"  Кэш страниц: {cache.hits} попаданий, {cache.misses} промахов")
+            cache.close()
+    
+    # Парсинг вопросов обоих вариантов за один проход
+    print("\nПарсинг вопросов...")
+    male_questions, female_questions = parse_questions_from_pages(pages)
+    print(f"  ✅ Мужской вариант: {len(male_questions)} вопросов")
+    print(f"  ✅ Женский вариант: {len(female_questions)} вопросов")
     
     # Объединение и сохранение
     if male_questions or female_questions:
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Flag careless or random SMIL protocols (see psytools/careless.py).
+
+Usage:
+    python3 docs/archive/scripts/flag-careless-sessions.py [--dry-run] [--workers 4] [--page-size 2000]
+                                                           [--sqlite FILE] [-o FILE]
+
+Streams the completed sessions by id and scores longstring runs, the share
+of "Не знаю" answers, control-question mismatches and inconsistent
+repeated/opposite item pairs. Each session gets a "careless" section in
+calculated_results (written only when it changed, one transaction per
+page), and the ids of the suspect sessions go to FILE
+(storage/exports/careless-sessions.json) for review on the owner
+dashboard. Connects to MySQL with the DB_* settings of .env, or to an
+SQLite copy with --sqlite.
+"""
+import argparse
+from pathlib import Path
+
+from psytools.careless import PAGE_SIZE, Job, flag_sessions
+from psytools.json_writer import write_json
+from psytools.paths import PROJECT_ROOT
+from psytools.session_scan import Database
+
+OUTPUT_PATH = PROJECT_ROOT / "storage" / "exports" / "careless-sessions.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag careless SMIL protocols")
+    parser.add_argument("--sqlite", help="use this SQLite database instead of MySQL")
+    parser.add_argument("--dry-run", action="store_true", help="report only, leave calculated_results alone")
+    parser.add_argument("--workers", type=int, default=1, help="processes, one id range each (max 16)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--include-synthetic", action="store_true", help="keep generate-sessions.py rows")
+    parser.add_argument("-o", "--output", default=str(OUTPUT_PATH))
+    args = parser.parse_args()
+
+    job = Job(Database(args.sqlite), dry_run=args.dry_run, page_size=args.page_size,
+              include_synthetic=args.include_synthetic)
+    report = flag_sessions(job, args.workers)
+    for name, count in sorted(report.flags.items()):
+        print(f"   {name}: {count}")
+    if report.unreadable:
+        print(f"⚠️  {report.unreadable} sessions with unreadable answers or results skipped")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_json(output, {"scanned": report.scanned, "synthetic": report.synthetic, "flags": report.flags,
+                        "suspects": sorted(report.suspects)})
+    verb = "dry run, nothing written" if args.dry_run else f"{report.written} written"
+    rate = report.scanned / report.seconds if report.seconds else 0
+    print(f"✅ {report.scanned} sessions scanned, {len(report.suspects)} suspect ({verb}), "
+          f"{report.seconds:.2f}s ({rate:,.0f}/s) → {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic answer sheets for load and scoring benchmarks (see psytools/synthetic.py).
+
+Usage:
+    python3 docs/archive/scripts/generate-sessions.py [smil hads ...] [-n 1000000] [--seed 0]
+                                                      [--female-share 0.5] [--fail random=0.02 ...]
+                                                      [--format jsonl|csv|parquet] [-o PATH]
+
+Modules default to all of them (smil, beck-anxiety, beck-depression, hads,
+lazarus). --fail sets the share of SMIL sheets that fail one validity rule:
+random, unknown ("Не знаю" > 70), control (ignored control items) or
+fake_good (L >= 65). The label of each sheet is kept in demographics.synthetic.
+
+--format csv writes test_sessions rows plus a .sql file with the LOAD DATA
+statement; parquet writes <slug>/<YYYY-MM>/part-NNNN.parquet like
+export-sessions.py.
+"""
+import argparse
+import time
+
+from psytools.synthetic import CHUNK_SIZE, FAILURES, FORMATS, INSTRUMENTS, OUTPUT_DIR, generate, open_writer
+
+
+def failure_rate(text: str):
+    mode, _, rate = text.partition("=")
+    if mode not in FAILURES or not rate:
+        raise argparse.ArgumentTypeError(f"expected MODE=RATE with MODE one of {', '.join(FAILURES)}")
+    return mode, float(rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic answer sheets")
+    parser.add_argument("modules", nargs="*", help=f"module directories (default: {' '.join(INSTRUMENTS)})")
+    parser.add_argument("-n", "--count", type=int, default=100_000, help="sheets per module")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--female-share", type=float, default=0.5)
+    parser.add_argument("--fail", type=failure_rate, action="append", default=[], metavar="MODE=RATE")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("-o", "--output", help="output file (directory for parquet)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    unknown = [m for m in args.modules if m not in INSTRUMENTS]
+    if unknown:
+        parser.error(f"unknown modules {', '.join(unknown)}; expected {', '.join(INSTRUMENTS)}")
+    modules = args.modules or list(INSTRUMENTS)
+    output = args.output or (OUTPUT_DIR if args.format == "parquet" else OUTPUT_DIR / f"sessions.{args.format}")
+
+    writer = open_writer(args.format, output, args.seed)
+    started = time.perf_counter()
+    try:
+        for number, module in enumerate(modules):
+            module_started = time.perf_counter()
+            rows = writer.rows
+            for batch in generate(module, args.count, seed=args.seed + number, female_share=args.female_share,
+                                  failures=dict(args.fail), chunk_size=args.chunk_size):
+                writer.write(batch)
+            seconds = time.perf_counter() - module_started
+            print(f"   {module}: {writer.rows - rows} sheets, {seconds:.2f}s "
+                  f"({(writer.rows - rows) / max(seconds, 1e-9):,.0f}/s)")
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    print(f"✅ {writer.rows} sheets → {output}, {seconds:.2f}s ({writer.rows / max(seconds, 1e-9):,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
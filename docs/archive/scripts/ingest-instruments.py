@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Пересборка questions.json модулей из исходных текстов (см. psytools/ingest.py)
+
+Использование:
+    python3 docs/archive/scripts/ingest-instruments.py [МОДУЛЬ ...] [--workers N] [--check] [--force]
+    python3 docs/archive/scripts/ingest-instruments.py --export-source [МОДУЛЬ ...]
+
+Модули обрабатываются параллельно, по процессу на модуль. Профили (диапазон
+номеров, варианты, ключи, контрольные вопросы) описаны в psytools/instruments.py.
+Исходные тексты лежат в source/instruments/<модуль>.txt (СМИЛ: source/qw.txt
+или sob-01.pdf); модуль без исходника пропускается.
+
+--export-source записывает исходный текст по текущему questions.json, чтобы
+созданный вручную банк вопросов собирался тем же путём.
+"""
+
+import argparse
+import time
+
+from psytools.ingest import INSTRUMENT_SOURCES, rebuild, render_source
+from psytools.instruments import PROFILES
+from psytools.pipeline import load_json
+
+
+def export_sources(modules):
+    INSTRUMENT_SOURCES.mkdir(parents=True, exist_ok=True)
+    for module in modules:
+        profile = PROFILES[module]
+        if profile.variants:
+            print(f"   {module}: пропущен (исходник с вариантами не генерируется)")
+            continue
+        path = INSTRUMENT_SOURCES / f"{module}.txt"
+        path.write_text(render_source(profile, load_json(profile.output)), encoding="utf-8")
+        print(f"✅ {module}: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересборка банков вопросов модулей")
+    parser.add_argument("modules", nargs="*", metavar="МОДУЛЬ",
+                        help=f"модули ({', '.join(sorted(PROFILES))}; по умолчанию все)")
+    parser.add_argument("--workers", type=int, default=0, help="число процессов (0 — по числу ядер)")
+    parser.add_argument("--check", action="store_true", help="только разобрать и проверить, не записывать")
+    parser.add_argument("--force", action="store_true", help="записывать и при найденных проблемах")
+    parser.add_argument("--export-source", action="store_true", help="записать исходники по questions.json")
+    args = parser.parse_args()
+    modules = args.modules or sorted(PROFILES)
+    unknown = [m for m in modules if m not in PROFILES]
+    if unknown:
+        parser.error(f"неизвестные модули: {', '.join(unknown)}")
+
+    if args.export_source:
+        export_sources(modules)
+        return
+
+    started = time.perf_counter()
+    reports = rebuild([PROFILES[m] for m in modules], args.workers, write=not args.check, force=args.force)
+    failed = False
+    for module, report in zip(modules, reports):
+        if report.skipped:
+            print(f"   {module}: пропущен ({report.skipped})")
+            continue
+        status = "записан" if report.written else "без изменений" if not args.check else "проверен"
+        mark = "⚠️" if report.problems else "✅"
+        print(f"{mark} {module}: {report.questions} вопросов, {status}")
+        for problem in report.problems:
+            print(f"     {problem}")
+        failed = failed or bool(report.problems)
+    print(f"Всего: {(time.perf_counter() - started) * 1000:.0f} мс")
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
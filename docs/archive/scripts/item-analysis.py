@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Item analysis of the SMIL keys over stored answer sheets (see psytools/item_analysis.py).
+
+Usage:
+    python3 docs/archive/scripts/item-analysis.py [--parquet DIR | --sqlite FILE | --synthetic N]
+                                                  [--keys key.scales,additional-scales] [-o FILE]
+
+Reads the completed SMIL sessions once (MySQL with the DB_* settings of .env,
+an SQLite copy, an export-sessions.py Parquet tree, or N generated sheets)
+and reports per scale Cronbach's alpha and per keyed item the endorsement
+rate, corrected item-total correlation and alpha if deleted. The full
+report goes to FILE (storage/exports/item-analysis.json).
+"""
+import argparse
+import time
+from pathlib import Path
+
+from psytools.item_analysis import DEFAULT_SOURCES, KEY_SOURCES, ItemAnalysis, key_scales, summary
+from psytools.json_writer import write_json
+from psytools.paths import PROJECT_ROOT
+from psytools.session_scan import (
+    PAGE_SIZE,
+    Database,
+    ScanCounts,
+    database_batches,
+    parquet_batches,
+    parquet_files,
+    partitions,
+)
+from psytools.synthetic import generate
+
+OUTPUT_PATH = PROJECT_ROOT / "storage" / "exports" / "item-analysis.json"
+
+
+def batches(args, counts):
+    if args.synthetic:
+        for batch in generate("smil", args.synthetic, seed=args.seed):
+            counts.scanned += len(batch.genders)
+            yield batch.answers, batch.genders
+        return
+    if args.parquet:
+        source = parquet_batches(parquet_files(Path(args.parquet)), counts, args.page_size, args.include_synthetic)
+    else:
+        [everything] = partitions(1)
+        source = database_batches(Database(args.sqlite), everything, counts, args.page_size, args.include_synthetic)
+    for batch in source:
+        yield batch.answers, batch.genders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Item analysis of the SMIL keys")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--parquet", help="read an export-sessions.py Parquet tree instead of the database")
+    source.add_argument("--sqlite", help="use this SQLite database instead of MySQL")
+    source.add_argument("--synthetic", type=int, help="analyse N generated sheets (generate-sessions.py model)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keys", default=",".join(DEFAULT_SOURCES), help=f"key sources: {', '.join(KEY_SOURCES)}")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--include-synthetic", action="store_true", help="keep generate-sessions.py rows")
+    parser.add_argument("-o", "--output", default=str(OUTPUT_PATH))
+    args = parser.parse_args()
+
+    scales = key_scales(args.keys.split(","))
+    analysis = ItemAnalysis(scales)
+    counts = ScanCounts()
+    started = time.perf_counter()
+    for answers, genders in batches(args, counts):
+        analysis.add(answers, genders)
+    seconds = time.perf_counter() - started
+    sheets = int(analysis.count.sum())
+    print(f"{sheets} sheets ({counts.scanned} scanned, {counts.synthetic} synthetic, {counts.unreadable} unreadable), "
+          f"{len(scales)} scales in one pass, {seconds:.2f}s")
+    if not sheets:
+        print("❌ no answer sheets")
+        return
+
+    results = analysis.results()
+    for result in results:
+        alpha = "  —  " if result.alpha is None else f"{result.alpha:5.2f}"
+        flagged = sum(1 for item in result.items if item.flags)
+        improving = ", ".join(f"{item.question}{'+' if item.direction == 'true' else '-'}"
+                              for item in result.improving()[:8])
+        print(f"   {result.scale.name:<26} items {len(result.items):>3}  alpha {alpha}  flagged {flagged:>3}"
+              + (f"  drop to raise alpha: {improving}" if improving else ""))
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_json(output, {"sheets": sheets, "keys": args.keys.split(","), "summary": summary(results),
+                        "scales": [result.to_dict() for result in results]})
+    print("✅ " + ", ".join(f"{flag} {count}" for flag, count in summary(results).items()) + f" → {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,28 @@
 - text_male, text_female (из gender)
 - scale, direction (из correct)
 - is_control (из gender)
+
+Использование:
+    python3 docs/archive/scripts/merge-question-data.py [--compact]
 """
 
+import argparse
 import json
-from pathlib import Path
+
+from psytools.json_writer import write_json
+from psytools.paths import SMIL_DIR
+from psytools.smil_records import MERGED_DESCRIPTION, merge_record
 
 
 def main():
-    project_root = Path(__file__).parent.parent
-    
+    parser = argparse.ArgumentParser(description="Объединение данных вопросов СМИЛ")
+    parser.add_argument("--compact", action="store_true", help="писать JSON без пробелов")
+    args = parser.parse_args()
+
     # Загрузка файлов
-    gender_path = project_root / "modules" / "smil" / "questions-566-gender.json"
-    correct_path = project_root / "modules" / "smil" / "questions-566-correct.json"
-    output_path = project_root / "modules" / "smil" / "questions-566-full.json"
+    gender_path = SMIL_DIR / "questions-566-gender.json"
+    correct_path = SMIL_DIR / "questions-566-correct.json"
+    output_path = SMIL_DIR / "questions-566-full.json"
     
     print("=" * 80)
     print("Объединение данных вопросов СМИЛ")
@@ -50,31 +59,21 @@ def main():
             print(f"⚠️ Несовпадение ID: {gender_q['id']} != {correct_q.get('id')}")
         
         # Объединение полей
-        merged = {
-            'id': gender_q['id'],
-            'text_male': gender_q['text_male'],
-            'text_female': gender_q['text_female'],
-            'scale': correct_q.get('scale'),
-            'direction': correct_q.get('direction', 1),
-            'is_control': gender_q.get('is_control', False)
-        }
+        merged = merge_record(gender_q, correct_q)
         
         merged_questions.append(merged)
     
     # Создание результата
     result = {
-        'description': "566 вопросов СМИЛ (MMPI) - полная версия",
-        'source': "Объединение questions-566-gender.json и questions-566-correct.json",
-        'note': "Содержит: text_male, text_female, scale, direction, is_control",
+        **MERGED_DESCRIPTION,
         'control_questions': gender_data.get('control_questions', []),
         'questions': merged_questions
     }
     
     # Сохранение
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=4)
+    written = write_json(output_path, result, indent=4, compact=args.compact)
     
-    print(f"\n✅ Создан файл: {output_path.name}")
+    print(f"\n✅ {'Создан файл' if written else 'Без изменений'}: {output_path.name}")
     print(f"   Вопросов: {len(merged_questions)}")
     print(f"   Контрольных: {len([q for q in merged_questions if q['is_control']])}")
     print(f"   С ключами шкал: {len([q for q in merged_questions if q['scale']])}")
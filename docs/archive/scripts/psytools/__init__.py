@@ -0,0 +1,7 @@
+"""Shared helpers for the question-bank ingestion scripts in docs/archive/scripts.
+
+The hyphenated scripts next to this package stay thin command-line entry
+points; reusable parsing, extraction and scoring code lives here so that the
+scripts can import it without packaging (the scripts directory is on sys.path
+when a script is run directly).
+"""
@@ -0,0 +1,201 @@
+"""Batch scoring of the additional SMIL scales (AdditionalScalesCalculator).
+
+additional-scales-norms.json defines each scale by ``key.true`` and
+``key.false`` question lists plus per-gender norms. The PHP calculator walks
+every list of every scale for each session; here the definitions are
+compiled once into an inverted index, a CSR matrix with one row per
+(direction, question) pair::
+
+    row r = d * questions + (question - 1)     d = 0 for "true", 1 for "false"
+    indices[indptr[r]:indptr[r + 1]]           scales keyed on that answer
+    data[indptr[r]:indptr[r + 1]]              how often (a repeated id counts twice)
+
+For scoring, the entries are regrouped by scale once (the CSR transposed,
+a repeated id stored twice): a batch of sheets is then scored by gathering,
+for every entry, whether the sheet gave the keyed answer, and summing each
+scale's run of entries with ``np.add.reduceat``, so the work is one
+comparison per stored entry and unkeyed questions are never looked at. The
+T-scores are computed per gender with broadcasting (PHP rounding, clamped
+to 20..120). Missing norms fall back like PHP's ``??``: only an absent or
+null value does, not a zero or an empty object.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from .answers import FEMALE, NO, QUESTION_COUNT, YES, encode_sheets, strict_answer_code
+from .paths import SMIL_DIR
+from .smil_scoring import php_round
+
+NORMS_PATH = SMIL_DIR / "additional-scales-norms.json"
+T_MIN = 20
+T_MAX = 120
+DIRECTIONS = ("true", "false")
+CHUNK_ROWS = 4096  # sheets per gather, bounding the (sheets, entries) temporary
+
+
+def _coalesce(*values):
+    """PHP's ``a ?? b ?? c``: the first value that is not None."""
+    return next((value for value in values if value is not None), None)
+
+
+class AdditionalScales:
+    """Compiled additional-scale definitions.
+
+    Args:
+        scales: the "scales" object of additional-scales-norms.json,
+            ``{category: {code: {"name", "key", "norms"}}}``. Scales without a
+            key or norms are left out, as in PHP.
+    """
+
+    def __init__(self, scales: Mapping, question_count: int = QUESTION_COUNT):
+        self.question_count = question_count
+        definitions: Dict[str, Mapping] = {}
+        self.categories: Dict[str, str] = {}
+        for category, entries in scales.items():
+            for code, info in entries.items():
+                if info.get("key") is not None and info.get("norms") is not None:
+                    definitions[code] = info
+                    self.categories[code] = category
+        self.codes: List[str] = list(definitions)
+        self.names = [_coalesce(info.get("name"), code) for code, info in definitions.items()]
+
+        shape = (2, len(self.codes))
+        self.mean = np.zeros(shape)
+        self.delta = np.ones(shape)
+        postings: Dict[int, Dict[int, int]] = {}
+        for column, info in enumerate(definitions.values()):
+            for gender, key in ((0, "male"), (FEMALE, "female")):
+                norms = _coalesce(info["norms"].get(key), info["norms"].get("male"), {})
+                self.mean[gender, column] = float(_coalesce(norms.get("M"), 0))
+                self.delta[gender, column] = float(_coalesce(norms.get("delta"), 1))
+            for direction, name in enumerate(DIRECTIONS):
+                for qid in info["key"].get(name) or []:
+                    if 1 <= int(qid) <= question_count:
+                        row = postings.setdefault(direction * question_count + int(qid) - 1, {})
+                        row[column] = row.get(column, 0) + 1
+
+        rows = 2 * question_count
+        self.indptr = np.zeros(rows + 1, dtype=np.int32)
+        indices, data = [], []
+        for row in range(rows):
+            entries = postings.get(row, {})
+            indices.extend(entries)
+            data.extend(entries.values())
+            self.indptr[row + 1] = len(indices)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.data = np.array(data, dtype=np.float32)
+
+        # The entries by scale: the answer column and keyed answer of each,
+        # and where each scale's run starts (scales without entries score 0).
+        order = np.argsort(self.indices, kind="stable")
+        repeats = self.data[order].astype(np.int64)
+        entry_rows = np.repeat(np.repeat(np.arange(rows), np.diff(self.indptr))[order], repeats)
+        counts = np.bincount(np.repeat(self.indices[order], repeats), minlength=len(self.codes))
+        self._columns = entry_rows % question_count
+        self._keyed = np.where(entry_rows < question_count, YES, NO).astype(np.uint8)
+        self._scored = np.flatnonzero(counts)
+        self._starts = (np.cumsum(counts) - counts)[self._scored]
+
+    @classmethod
+    def from_norms_file(cls, path: Path = NORMS_PATH) -> "AdditionalScales":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["scales"])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def postings(self, question: int, direction: str = "true") -> List[str]:
+        """Codes of the scales that count ``question`` answered ``direction``."""
+        row = DIRECTIONS.index(direction) * self.question_count + question - 1
+        columns = self.indices[self.indptr[row]:self.indptr[row + 1]]
+        counts = self.data[self.indptr[row]:self.indptr[row + 1]]
+        return [self.codes[c] for c, n in zip(columns, counts) for _ in range(int(n))]
+
+    def dense(self) -> np.ndarray:
+        """The CSR as a ``(2 * questions, scales)`` float32 matrix."""
+        matrix = np.zeros((2 * self.question_count, len(self.codes)), dtype=np.float32)
+        rows = np.repeat(np.arange(2 * self.question_count), np.diff(self.indptr))
+        matrix[rows, self.indices] = self.data
+        return matrix
+
+    def raw(self, answers: np.ndarray) -> np.ndarray:
+        """``(n, scales)`` int32 raw scores of a uint8 answer matrix, from the CSR entries."""
+        raw = np.zeros((answers.shape[0], len(self.codes)), dtype=np.int32)
+        if not len(self._scored):
+            return raw
+        for start in range(0, answers.shape[0], CHUNK_ROWS):
+            hits = answers[start:start + CHUNK_ROWS, self._columns] == self._keyed
+            raw[start:start + CHUNK_ROWS, self._scored] = np.add.reduceat(hits, self._starts, axis=1, dtype=np.int32)
+        return raw
+
+    def t_scores(self, raw: np.ndarray, genders: np.ndarray) -> np.ndarray:
+        """``(n, scales)`` T-scores, as integers stored in float64."""
+        mean, delta = self.mean[genders], self.delta[genders]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(php_round(50.0 + 10.0 * (raw - mean) / delta), T_MIN, T_MAX)
+        return np.where(delta == 0, 50.0, t)
+
+    def score(self, answers: np.ndarray, genders: np.ndarray):
+        """``(raw, t)`` for a batch of sheets."""
+        raw = self.raw(answers)
+        return raw, self.t_scores(raw, genders)
+
+    def as_dicts(self, raw: np.ndarray, t: np.ndarray, genders: np.ndarray) -> List[dict]:
+        """AdditionalScalesCalculator::calculate() result arrays for each sheet."""
+        results = []
+        for row, gender in enumerate(map(int, genders)):
+            results.append({
+                code: {
+                    "name": self.names[column],
+                    "raw": int(raw[row, column]),
+                    "t": int(t[row, column]),
+                    "M": _php_number(self.mean[gender, column]),
+                    "delta": _php_number(self.delta[gender, column]),
+                    "interpretation": "Интерпретация отсутствует",
+                }
+                for column, code in enumerate(self.codes)
+            })
+        return results
+
+
+def _php_number(value: float):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def naive_scores(scales: Mapping, answers: Mapping, gender: str) -> Dict[str, Dict[str, int]]:
+    """Per-scale loop over one answer mapping, the way the PHP calculator does it."""
+    by_id = {}
+    for key, value in answers.items():
+        if value is not None:
+            by_id[str(key)] = value
+    results = {}
+    for entries in scales.values():
+        for code, info in entries.items():
+            if info.get("key") is None or info.get("norms") is None:
+                continue
+            raw = 0
+            for qid in info["key"].get("true") or []:
+                value = by_id.get(str(qid))
+                if value is True or value == "true" or value == "1" or (type(value) is int and value == 1):
+                    raw += 1
+            for qid in info["key"].get("false") or []:
+                value = by_id.get(str(qid))
+                if value is False or value == "false" or value == "0" or (type(value) is int and value == 0):
+                    raw += 1
+            norms = _coalesce(info["norms"].get(gender), info["norms"].get("male"), {})
+            mean, delta = _coalesce(norms.get("M"), 0), _coalesce(norms.get("delta"), 1)
+            t = 50 if delta == 0 else int(php_round(np.float64(50 + 10 * (raw - mean) / delta)))
+            results[code] = {"raw": raw, "t": max(T_MIN, min(T_MAX, t))}
+    return results
+
+
+def score_sheets(compiled: AdditionalScales, sheets: Sequence[Mapping], genders: Sequence) -> List[dict]:
+    """Raw and T-scores for answer mappings, with PHP's strict answer comparisons."""
+    matrix, gender_codes = encode_sheets(sheets, genders, compiled.question_count, strict_answer_code)
+    raw, t = compiled.score(matrix, gender_codes)
+    return compiled.as_dicts(raw, t, gender_codes)
@@ -0,0 +1,131 @@
+"""SMIL answer sheets as dense arrays.
+
+A session stores answers as ``{"<question id>": answer, ..., "gender": ...}``
+(SmilModule::calculateResults). For batch work a set of sheets becomes one
+``uint8`` matrix with a row per sheet and a column per question, using the
+codes of RawScoreCalculator plus one for questions without an answer.
+Answers are coerced the way PHP's ``(int)`` cast does, so "1", " 1", "1abc",
+"1e0", true and 1 are all YES, "2.5" is UNKNOWN and any other value counts
+as NO.
+:func:`strict_answer_code` instead follows the ``===`` comparisons of
+AdditionalScalesCalculator.
+"""
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Mapping, Sequence, Tuple
+
+import numpy as np
+
+NO = 0
+YES = 1
+UNKNOWN = 2
+MISSING = 3
+
+QUESTION_COUNT = 566
+MALE = 0
+FEMALE = 1
+
+# The leading numeric part PHP's is_numeric_string() accepts: ASCII
+# whitespace, a sign, digits with an optional fraction and exponent.
+_PHP_NUMBER_RE = re.compile(r"[ \t\n\r\v\f]*([+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+))([eE][+-]?[0-9]+)?")
+
+
+def php_int(value) -> int:
+    """``(int) $value`` for the JSON scalar types answers arrive as."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if math.isfinite(value) else 0
+    if isinstance(value, str):
+        number = _PHP_NUMBER_RE.match(value)
+        if number is None:
+            return 0
+        mantissa, exponent = number.groups()
+        if exponent is None and "." not in mantissa:
+            return int(mantissa)
+        return php_int(float(mantissa + (exponent or "")))
+    return 0
+
+
+def answer_code(value) -> int:
+    number = value if type(value) is int else php_int(value)
+    if number == YES:
+        return YES
+    if number == UNKNOWN:
+        return UNKNOWN
+    return NO
+
+
+_STRICT_INTS = {0: NO, 1: YES, 2: UNKNOWN}
+_STRICT_STRINGS = {"0": NO, "false": NO, "1": YES, "true": YES}
+
+
+def strict_answer_code(value) -> int:
+    """YES for 1, "1", true or "true"; NO for 0, "0", false or "false"; UNKNOWN for 2 and MISSING otherwise."""
+    kind = type(value)
+    if kind is int:
+        return _STRICT_INTS.get(value, MISSING)
+    if kind is bool:
+        return YES if value else NO
+    if kind is str:
+        return _STRICT_STRINGS.get(value, MISSING)
+    return MISSING
+
+
+def gender_code(gender) -> int:
+    """RawScoreCalculator treats anything but "female" as male."""
+    return FEMALE if gender == "female" else MALE
+
+
+@lru_cache(maxsize=None)
+def _positions(width: int) -> dict:
+    """Row position of each canonical "1".."width" key."""
+    return {str(qid): qid - 1 for qid in range(1, width + 1)}
+
+
+def _position(key, width: int):
+    qid = php_int(key) if isinstance(key, str) and key.strip().lstrip("+-").isdigit() else key
+    if isinstance(qid, int) and not isinstance(qid, bool) and 1 <= qid <= width:
+        return qid - 1
+    return None
+
+
+def encode_sheet(answers: Mapping, out: np.ndarray, code: Callable = answer_code) -> None:
+    """Fill one matrix row from a ``question id => answer`` mapping; other keys are ignored."""
+    width = out.shape[0]
+    positions = _positions(width)
+    # Item assignment into a bytearray is far cheaper than into a numpy row.
+    row = bytearray([MISSING]) * width
+    for key, value in answers.items():
+        position = positions.get(key) if type(key) is str else None
+        if position is None:
+            position = _position(key, width)
+            if position is None:
+                continue
+        row[position] = code(value)
+    out[:] = np.frombuffer(row, dtype=np.uint8)
+
+
+def encode_sheets(
+    sheets: Iterable[Mapping],
+    genders: Sequence = None,
+    question_count: int = QUESTION_COUNT,
+    code: Callable = answer_code,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``(answers, genders)`` arrays for answer mappings.
+
+    The gender of a sheet comes from ``genders`` if given, else from the
+    sheet's own "gender" key.
+    """
+    sheets = list(sheets)
+    matrix = np.empty((len(sheets), question_count), dtype=np.uint8)
+    gender_codes = np.empty(len(sheets), dtype=np.uint8)
+    for row, sheet in enumerate(sheets):
+        encode_sheet(sheet, matrix[row], code)
+        gender_codes[row] = gender_code(genders[row] if genders is not None else sheet.get("gender"))
+    return matrix, gender_codes
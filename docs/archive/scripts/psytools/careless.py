@@ -0,0 +1,228 @@
+"""Careless and random responding on SMIL answer sheets, a batch at a time.
+
+ValidityAssessor judges a protocol by L, F, K, the "Не знаю" count and the
+control questions. This detector adds response-pattern indices that do not
+depend on the scale keys, all computed on the ``(sheets, 566)`` answer
+matrix of :mod:`psytools.answers` without a loop over the sheets:
+
+* longstring: the longest run of one answer code in question order;
+* the share of "Не знаю" answers;
+* control mismatches: :data:`~psytools.smil_records.CONTROL_QUESTIONS`
+  not answered YES;
+* inconsistency: :data:`REPEATED_PAIRS` (the same statement printed twice)
+  answered differently plus :data:`OPPOSITE_PAIRS` (contradicting
+  statements) answered the same, counted over the pairs with both answers
+  YES or NO.
+
+:func:`careless_codes` turns the indices into uint8 warning bits, like
+:func:`psytools.smil_scoring.validity_codes`; :func:`flag_sessions` stores
+them with the indices as the ``careless`` section of ``calculated_results``
+for every completed session, reusing the keyset pages and partition
+runner of :mod:`psytools.session_scan`.
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+import numpy as np
+
+from .answers import QUESTION_COUNT, UNKNOWN, YES
+from .db import placeholder
+from .session_scan import UPDATE, Database, Partition, ScanCounts, decode_json, decode_rows, pages, run_partitions
+from .smil_records import CONTROL_QUESTIONS
+from .smil_scoring import control_score
+
+PAGE_SIZE = 2000
+
+# Statements the SMIL booklet prints twice (the 16 repeated items of the MMPI).
+REPEATED_PAIRS = (
+    (8, 318), (13, 290), (15, 314), (16, 315), (20, 310), (21, 308), (22, 326), (23, 288),
+    (24, 333), (32, 328), (33, 323), (35, 331), (37, 302), (38, 311), (305, 366), (317, 362),
+)
+# Statements that contradict each other: abolish laws / laws matter, depressed / happy most
+# of the time, headaches most of the time / rarely, lack / full of self-confidence,
+# not more nervous than others / nervous and excitable.
+OPPOSITE_PAIRS = ((49, 113), (76, 107), (44, 190), (86, 264), (242, 506))
+
+LONGSTRING_LIMIT = 30  # honest sheets rarely exceed a run of 15
+UNKNOWN_SHARE_LIMIT = 70 / QUESTION_COUNT  # ValidityAssessor's "Не знаю" cut-off
+CONTROL_MISMATCH_LIMIT = len(CONTROL_QUESTIONS) - 20  # QC below 20
+INCONSISTENCY_LIMIT = 0.35  # share of answered pairs; random answering gives 0.5
+MIN_PAIRS = 10  # fewer answered pairs do not rate consistency
+
+# Careless-responding warning bits.
+LONGSTRING = 1 << 0
+UNKNOWN_SHARE = 1 << 1
+CONTROL_MISMATCH = 1 << 2
+INCONSISTENT = 1 << 3
+
+FLAGS = {LONGSTRING: "longstring", UNKNOWN_SHARE: "unknown", CONTROL_MISMATCH: "control",
+         INCONSISTENT: "inconsistent"}
+
+_PAIRS = np.array(REPEATED_PAIRS + OPPOSITE_PAIRS) - 1
+_OPPOSITE = np.arange(len(_PAIRS)) >= len(REPEATED_PAIRS)
+
+
+@dataclass
+class CarelessScores:
+    longstring: np.ndarray  # longest run of one answer code
+    unknown_share: np.ndarray
+    control_mismatch: np.ndarray
+    inconsistent: np.ndarray  # inconsistent pairs
+    pairs: np.ndarray  # pairs with both answers YES or NO
+
+    @property
+    def inconsistency(self) -> np.ndarray:
+        """Share of the answered pairs that are inconsistent (0 without any)."""
+        return self.inconsistent / np.maximum(self.pairs, 1)
+
+    def __len__(self) -> int:
+        return len(self.longstring)
+
+
+def longest_runs(answers: np.ndarray) -> np.ndarray:
+    """Per-row length of the longest run of equal codes.
+
+    A run ends where a code differs from its predecessor; a running maximum
+    of those break positions gives every column the start of its run.
+    """
+    n, q = answers.shape
+    if not q:
+        return np.zeros(n, dtype=np.int64)
+    positions = np.arange(q, dtype=np.int32)
+    breaks = np.zeros(answers.shape, dtype=bool)
+    breaks[:, 1:] = answers[:, 1:] != answers[:, :-1]
+    starts = np.maximum.accumulate(np.where(breaks, positions, 0), axis=1)
+    return (positions - starts).max(axis=1).astype(np.int64) + 1
+
+
+def careless_scores(answers: np.ndarray) -> CarelessScores:
+    """Response-pattern indices of a ``(sheets, 566)`` answer matrix."""
+    first, second = answers[:, _PAIRS[:, 0]], answers[:, _PAIRS[:, 1]]
+    answered = (first <= YES) & (second <= YES)  # NO and YES are the codes below UNKNOWN
+    inconsistent = answered & ((first == second) == _OPPOSITE)
+    return CarelessScores(
+        longstring=longest_runs(answers),
+        unknown_share=np.count_nonzero(answers == UNKNOWN, axis=1) / answers.shape[1],
+        control_mismatch=len(CONTROL_QUESTIONS) - control_score(answers),
+        inconsistent=np.count_nonzero(inconsistent, axis=1),
+        pairs=np.count_nonzero(answered, axis=1),
+    )
+
+
+def careless_codes(scores: CarelessScores) -> np.ndarray:
+    """uint8 warning bits per sheet; a sheet is suspect when any is set."""
+    codes = np.zeros(len(scores), dtype=np.uint8)
+    for flag, condition in (
+        (LONGSTRING, scores.longstring > LONGSTRING_LIMIT),
+        (UNKNOWN_SHARE, scores.unknown_share > UNKNOWN_SHARE_LIMIT),
+        (CONTROL_MISMATCH, scores.control_mismatch > CONTROL_MISMATCH_LIMIT),
+        (INCONSISTENT, (scores.pairs >= MIN_PAIRS) & (scores.inconsistency > INCONSISTENCY_LIMIT)),
+    ):
+        codes[condition] |= flag
+    return codes
+
+
+def careless_dicts(scores: CarelessScores, codes: np.ndarray) -> List[dict]:
+    """``calculated_results["careless"]`` of each sheet."""
+    return [{
+        "suspect": bool(code),
+        "flags": [name for flag, name in FLAGS.items() if code & flag],
+        "longstring": int(scores.longstring[row]),
+        "unknown_share": round(float(scores.unknown_share[row]), 4),
+        "control_mismatch": int(scores.control_mismatch[row]),
+        "inconsistent_pairs": int(scores.inconsistent[row]),
+        "answered_pairs": int(scores.pairs[row]),
+    } for row, code in enumerate(map(int, codes))]
+
+
+@dataclass
+class Report(ScanCounts):
+    written: int = 0
+    pages: int = 0
+    flags: dict = field(default_factory=dict)
+    suspects: List[str] = field(default_factory=list)  # session ids
+    seconds: float = 0.0
+
+    def add(self, other: "Report"):
+        self.add_counts(other)
+        self.written += other.written
+        self.pages += other.pages
+        for name, count in other.flags.items():
+            self.flags[name] = self.flags.get(name, 0) + count
+        self.suspects.extend(other.suspects)
+
+
+@dataclass
+class Job:
+    database: Database
+    dry_run: bool = False
+    page_size: int = PAGE_SIZE
+    include_synthetic: bool = False
+
+
+def flag_partition(job: Job, partition: Partition) -> Report:
+    """Score one id range page by page and store the sections that changed."""
+    started = time.perf_counter()
+    report = Report()
+    connection = job.database.connect()
+    try:
+        for rows in pages(connection, "smil", partition, page_size=job.page_size):
+            updates = _flag_page(rows, report, job.include_synthetic)
+            if updates and not job.dry_run:
+                cursor = connection.cursor()
+                try:
+                    cursor.executemany(UPDATE.format(mark=placeholder(connection)), updates)
+                finally:
+                    cursor.close()
+                connection.commit()
+                report.written += len(updates)
+            report.pages += 1
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _flag_page(rows: Sequence[tuple], report: Report, include_synthetic: bool) -> List[tuple]:
+    batch = decode_rows(((answers, demographics) for _, answers, demographics, _ in rows), report,
+                        include_synthetic)
+    if batch is None:
+        return []
+    scores = careless_scores(batch.answers)
+    codes = careless_codes(scores)
+    updates = []
+    for row, code, section in zip(batch.rows, codes, careless_dicts(scores, codes)):
+        session_id, stored = rows[row][0], rows[row][3]
+        for name in section["flags"]:
+            report.flags[name] = report.flags.get(name, 0) + 1
+        if code:
+            report.suspects.append(session_id)
+        try:
+            stored = decode_json(stored) or {}
+        except json.JSONDecodeError:
+            stored = None
+        if not isinstance(stored, dict):
+            report.unreadable += 1
+            continue
+        if stored.get("careless") != section:
+            updates.append((json.dumps({**stored, "careless": section}, ensure_ascii=False), session_id))
+    return updates
+
+
+def flag_sessions(job: Job, workers: int = 1) -> Report:
+    """Flag every partition (one process each when ``workers`` > 1) and add up the reports."""
+    started = time.perf_counter()
+    reports = run_partitions(flag_partition, job, workers)
+    total = Report()
+    for report in reports:
+        total.add(report)
+    total.seconds = time.perf_counter() - started
+    return total
+
@@ -0,0 +1,415 @@
+"""Bitmap index of completed sessions for cohort queries.
+
+Every completed session gets a row number, in the order it was indexed,
+and every indexed property value a :class:`~psytools.bitmap.Bitmap` of the
+rows that have it:
+
+* ``test`` (slug), ``gender``, ``age`` (the bands of
+  :func:`psytools.norms.age_band`), ``synthetic`` (generate-sessions.py
+  rows) for every test;
+* for SMIL, from ``calculated_results``: ``valid`` (ValidityAssessor's
+  ``is_valid``), ``profile`` and ``code`` (the ``profile_type`` and
+  ``code_type`` of SmilModule::buildProfile, derived from the T-scores the
+  same way when the stored results lack them), ``careless`` (the flag of
+  flag-careless-sessions.py) and per scale ``t<scale>`` in the bands of
+  :data:`T_BANDS`.
+
+A cohort such as "valid female profiles with code type 2-7 and scale 8 ≥
+70" is then a handful of bitmap ANDs and ORs (:meth:`CohortIndex.query`),
+independent of the JSON of the sessions. :func:`update` reads the full
+rows only of the sessions completed since the last run (a ``completed_at``
+watermark kept with the index). The other completed sessions it walks as
+id and MD5 pairs, computed by the database from the stored demographics
+and results, so their JSON is not fetched or decoded again. A session
+whose digest differs from the indexed one (re-scored, flagged careless) is
+fetched by id and moves to a fresh row, and the rows of sessions that are
+no longer completed are dropped. :meth:`CohortIndex.save` compacts the
+rows those moves and removals leave behind.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bitmap import Bitmap, union
+from .db import placeholder
+from .norms import age_band
+from .paths import CACHE_DIR
+from .session_scan import decode_json
+from .smil_scoring import SCALES
+
+DEFAULT_PATH = CACHE_DIR / "cohort-index.npz"
+PAGE_SIZE = 1000
+T_BANDS = (40, 50, 60, 70, 80)  # lower edges; the first band is everything below 40
+CLINICAL = tuple(s for s in SCALES if s not in ("L", "F", "K"))
+ELEVATED_T = 60
+
+WATERMARK_START = "1970-01-01 00:00:00"
+
+# Sessions completed at or after the watermark (rows without completed_at count from created_at).
+NEW_QUERY = """
+    SELECT s.id, t.slug, s.demographics, s.calculated_results, COALESCE(s.completed_at, s.created_at)
+    FROM test_sessions s
+    JOIN tests t ON t.id = s.test_id
+    WHERE s.status = 'completed' AND COALESCE(s.completed_at, s.created_at) >= {mark} AND s.id > {mark}
+    ORDER BY s.id
+    LIMIT {limit}
+"""
+DIGEST_QUERY = """
+    SELECT s.id, MD5({stored})
+    FROM test_sessions s
+    WHERE s.status = 'completed' AND s.id > {mark}
+    ORDER BY s.id
+    LIMIT {limit}
+"""
+ROWS_QUERY = """
+    SELECT s.id, t.slug, s.demographics, s.calculated_results
+    FROM test_sessions s
+    JOIN tests t ON t.id = s.test_id
+    WHERE s.status = 'completed' AND s.id IN ({marks})
+"""
+# The text _digest hashes, as MySQL and SQLite (with the md5 function update() adds) build it.
+MYSQL_STORED = "CONCAT(COALESCE(s.demographics, ''), '|', s.calculated_results)"
+SQLITE_STORED = "COALESCE(s.demographics, '') || '|' || s.calculated_results"
+
+_TERM_RE = re.compile(r"^(\w+)(!=|>=|<=|=|<|>)(.+)$")
+
+
+def t_band_labels() -> List[str]:
+    edges = list(T_BANDS)
+    return ([f"<{edges[0]}"] + [f"{low}-{high - 1}" for low, high in zip(edges, edges[1:])]
+            + [f"{edges[-1]}+"])
+
+
+def _band_ranges() -> List[Tuple[float, float]]:
+    edges = [-np.inf] + list(T_BANDS) + [np.inf]
+    return list(zip(edges, edges[1:]))
+
+
+def profile_types(t: np.ndarray) -> np.ndarray:
+    """SmilModule::determineProfileType of ``(sheets, 10)`` clinical T-scores (scales 1..9, 0)."""
+    elevated = t >= ELEVATED_T
+
+    def count(scales: str) -> np.ndarray:
+        return elevated[:, [CLINICAL.index(scale) for scale in scales]].sum(axis=1)
+
+    return np.select(
+        [~elevated.any(axis=1), count("123") >= 2, count("6789") >= 2, count("45") >= 1],
+        ["normosthenic", "neurotic", "psychotic", "personal_deviation"], "mixed")
+
+
+def code_types(t: np.ndarray) -> np.ndarray:
+    """SmilModule::getCodeType: the two highest clinical scales, ties in profile order."""
+    order = np.argsort(-t, axis=1, kind="stable")[:, :2]
+    names = np.array(CLINICAL)
+    return np.char.add(np.char.add(names[order[:, 0]], "-"), names[order[:, 1]])
+
+
+def _t_matrix(results: Sequence[Mapping]) -> np.ndarray:
+    """``(sessions, scales)`` float T-scores, NaN where a session lacks one."""
+    t = np.full((len(results), len(SCALES)), np.nan)
+    for row, result in enumerate(results):
+        scores = result.get("t_scores") if isinstance(result, dict) else None
+        if isinstance(scores, dict):
+            for column, scale in enumerate(SCALES):
+                value = scores.get(scale)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    t[row, column] = value
+    return t
+
+
+def session_values(slug: str, demographics, results) -> Dict[str, str]:
+    """Indexed ``dimension: value`` pairs of one session except the SMIL T-score dimensions."""
+    demographics = demographics if isinstance(demographics, dict) else {}
+    results = results if isinstance(results, dict) else {}
+    gender = results.get("gender") or demographics.get("gender")
+    values = {
+        "test": slug,
+        "gender": gender if gender in ("male", "female") else "unknown",
+        "age": age_band(demographics.get("age")),
+        "synthetic": "true" if demographics.get("synthetic") else "false",
+    }
+    validity = results.get("validity")
+    if isinstance(validity, dict) and "is_valid" in validity:
+        values["valid"] = "true" if validity["is_valid"] else "false"
+    profile = results.get("profile")
+    if isinstance(profile, dict):
+        for dimension, key in (("profile", "profile_type"), ("code", "code_type")):
+            if profile.get(key):
+                values[dimension] = str(profile[key])
+    careless = results.get("careless")
+    if isinstance(careless, dict) and "suspect" in careless:
+        values["careless"] = "true" if careless["suspect"] else "false"
+    return values
+
+
+def _md5(text) -> Optional[str]:
+    return None if text is None else hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+def _digest_value(md5: Optional[str]) -> int:
+    """The first 64 bits of an MD5 hex digest."""
+    return int(md5[:16], 16) if md5 else 0
+
+
+def _digest(demographics, results) -> int:
+    """64-bit digest of a session's stored demographics and results JSON, as DIGEST_QUERY computes it."""
+    parts = []
+    for value in (demographics, results):
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("utf-8")
+        elif value is None:
+            value = ""
+        elif not isinstance(value, str):
+            value = json.dumps(value)
+        parts.append(value)
+    return _digest_value(_md5("|".join(parts)))
+
+
+class CohortIndex:
+    """Row-numbered sessions and one bitmap per ``dimension:value``.
+
+    ``ids`` and ``digests`` are per row; a re-indexed session keeps its old
+    row outside :attr:`live` until :meth:`compact`, so ``ids`` may repeat
+    an id (the last row is the current one). ``watermark`` is the latest
+    completion time :func:`update` has read.
+    """
+
+    def __init__(self, ids: Optional[List[str]] = None, bitmaps: Optional[Dict[str, Bitmap]] = None,
+                 live: Optional[Bitmap] = None, digests: Optional[np.ndarray] = None,
+                 watermark: str = WATERMARK_START):
+        self.ids = list(ids or [])
+        self.bitmaps = dict(bitmaps or {})
+        self.live = live if live is not None else Bitmap.full(len(self.ids))
+        self.digests = (np.asarray(digests, dtype=np.uint64) if digests is not None
+                        else np.zeros(len(self.ids), dtype=np.uint64))
+        self.watermark = watermark
+        self._rows = {session_id: row for row, session_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._rows
+
+    def digest(self, session_id: str) -> int:
+        """Digest of the session's indexed JSON; 0 when it is not indexed (or was removed)."""
+        row = self._rows.get(session_id)
+        return 0 if row is None else int(self.digests[row])
+
+    def add(self, sessions: Sequence[Tuple[str, str, object, object]]) -> int:
+        """Index ``(id, slug, demographics, calculated_results)`` rows; returns how many were indexed.
+
+        Sessions indexed with the same stored JSON are skipped; a session
+        whose JSON changed loses its old row and gets a new one.
+        """
+        digests = [_digest(s[2], s[3]) for s in sessions]
+        fresh = [i for i, (s, digest) in enumerate(zip(sessions, digests))
+                 if s[0] not in self._rows or int(self.digests[self._rows[s[0]]]) != digest]
+        if not fresh:
+            return 0
+        sessions = [sessions[i] for i in fresh]
+        self.remove(s[0] for s in sessions)
+        first = len(self.ids)
+        rows = np.arange(first, first + len(sessions), dtype=np.uint32)
+        results = [_decoded(s[3]) for s in sessions]
+        groups: Dict[str, List[int]] = {}
+        values = [session_values(slug, _decoded(demographics), result)
+                  for (_, slug, demographics, _), result in zip(sessions, results)]
+
+        smil = np.array([v["test"] == "smil" for v in values])
+        if smil.any():
+            t = _t_matrix([results[i] for i in np.flatnonzero(smil)])
+            smil_rows = rows[smil]
+            labels = t_band_labels()
+            for column, scale in enumerate(SCALES):
+                for label, (low, high) in zip(labels, _band_ranges()):
+                    hit = (t[:, column] >= low) & (t[:, column] < high)
+                    if hit.any():
+                        groups.setdefault(f"t{scale}:{label}", []).extend(smil_rows[hit].tolist())
+            clinical = t[:, [SCALES.index(s) for s in CLINICAL]]
+            complete = ~np.isnan(clinical).any(axis=1)
+            derived = {"profile": profile_types(clinical[complete]), "code": code_types(clinical[complete])}
+            for dimension, labels in derived.items():
+                for i, label in zip(np.flatnonzero(smil)[complete], labels.tolist()):
+                    values[i].setdefault(dimension, label)
+
+        for row, properties in zip(rows.tolist(), values):
+            for dimension, value in properties.items():
+                groups.setdefault(f"{dimension}:{value}", []).append(row)
+        for name, members in groups.items():
+            self.bitmaps[name] = self.bitmaps.get(name, Bitmap()) | Bitmap.from_rows(members)
+        self.live = self.live | Bitmap.from_rows(rows)
+        self.digests = np.concatenate([self.digests, np.array([digests[i] for i in fresh], dtype=np.uint64)])
+        for session_id, row in zip((s[0] for s in sessions), rows.tolist()):
+            self.ids.append(session_id)
+            self._rows[session_id] = row
+        return len(sessions)
+
+    def remove(self, session_ids: Iterable[str]):
+        """Drop the current rows of ``session_ids``; a session completed again is re-indexed."""
+        rows = [self._rows[s] for s in session_ids if s in self._rows]
+        if rows:
+            self.live = self.live - Bitmap.from_rows(rows)
+            self.digests[rows] = 0
+
+    def compact(self):
+        """Drop the rows outside :attr:`live` and renumber the others; earlier query results go stale."""
+        live = self.live.rows()
+        if len(live) == len(self.ids):
+            return
+        bitmaps = {}
+        for name, bitmap in self.bitmaps.items():
+            rows = (bitmap & self.live).rows()
+            if len(rows):
+                bitmaps[name] = Bitmap.from_rows(np.searchsorted(live, rows))
+        self.bitmaps = bitmaps
+        self.ids = [self.ids[row] for row in live.tolist()]
+        self.digests = self.digests[live]
+        self.live = Bitmap.full(len(self.ids))
+        self._rows = {session_id: row for row, session_id in enumerate(self.ids)}
+
+    def dimensions(self) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        for name in sorted(self.bitmaps):
+            dimension, _, value = name.partition(":")
+            found.setdefault(dimension, []).append(value)
+        return found
+
+    def bitmap(self, dimension: str, values: Iterable[str]) -> Bitmap:
+        return union(self.bitmaps.get(f"{dimension}:{value}", Bitmap()) for value in values)
+
+    def t_range(self, scale: str, low: Optional[int] = None, high: Optional[int] = None) -> Bitmap:
+        """Rows with ``low <= T < high`` on ``scale``; the bounds must be band edges."""
+        for bound in (low, high):
+            if bound is not None and bound not in T_BANDS:
+                raise ValueError(f"T bound {bound} is not a band edge ({', '.join(map(str, T_BANDS))})")
+        labels = [label for label, (lower, upper) in zip(t_band_labels(), _band_ranges())
+                  if (low is None or lower >= low) and (high is None or upper <= high)]
+        return self.bitmap(f"t{scale}", labels)
+
+    def query(self, text: str, include_synthetic: bool = False) -> Bitmap:
+        """Rows matching every term of ``text``.
+
+        Terms are separated by spaces: ``dimension=value[,value...]``
+        (any of the values), ``dimension!=value[,...]``, and
+        ``t<scale>>=N`` / ``t<scale><N`` with N a T band edge, e.g.
+        ``gender=female valid=true code=2-7,7-2 t8>=70``.
+        """
+        result = self.live
+        if not include_synthetic:
+            result = result - self.bitmap("synthetic", ["true"])
+        for term in text.split():
+            match = _TERM_RE.match(term)
+            if not match:
+                raise ValueError(f"cannot parse {term!r}, expected dimension=value or t<scale>>=N")
+            dimension, operator, value = match.groups()
+            if operator in ("=", "!="):
+                selected = self.bitmap(dimension, value.split(","))
+                result = result & selected if operator == "=" else result - selected
+                continue
+            scale = dimension[1:] if dimension.startswith("t") else None
+            if scale not in SCALES or not value.isdigit():
+                raise ValueError(f"{term!r}: comparisons need t<scale> and a number")
+            bound = int(value) + (1 if operator in (">", "<=") else 0)
+            selected = self.t_range(scale, low=bound) if operator in (">=", ">") else self.t_range(scale, high=bound)
+            result = result & selected
+        return result
+
+    def session_ids(self, rows: Bitmap) -> List[str]:
+        return [self.ids[row] for row in rows.rows().tolist()]
+
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes() for bitmap in self.bitmaps.values()) + self.live.nbytes()
+
+    def save(self, path: Path = DEFAULT_PATH):
+        self.compact()
+        names = sorted(self.bitmaps)
+        blobs = [self.bitmaps[name].to_bytes() for name in names] + [self.live.to_bytes()]
+        offsets = np.cumsum([0] + [len(blob) for blob in blobs])
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=np.array(self.ids, dtype="S36"), digests=self.digests, watermark=np.array(self.watermark),
+                     names=np.array(json.dumps(names)), offsets=offsets,
+                     blob=np.frombuffer(b"".join(blobs), dtype=np.uint8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_PATH) -> "CohortIndex":
+        with np.load(path) as data:
+            ids = [i.decode("ascii") for i in data["ids"].tolist()]
+            names = json.loads(str(data["names"]))
+            offsets, blob = data["offsets"], data["blob"].tobytes()
+            # Older files: every row is re-indexed once.
+            digests = data["digests"] if "digests" in data.files else None
+            watermark = str(data["watermark"]) if "watermark" in data.files else WATERMARK_START
+        bitmaps = [Bitmap.from_bytes(blob[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+        return cls(ids, dict(zip(names, bitmaps[:-1])), bitmaps[-1], digests, watermark)
+
+
+def _decoded(value):
+    try:
+        return decode_json(value)
+    except json.JSONDecodeError:
+        return None
+
+
+def _index_rows(index: CohortIndex, rows: Sequence[tuple]) -> Tuple[int, int]:
+    """Add ``rows`` to ``index``; returns how many were new and how many re-indexed."""
+    new = sum(1 for row in rows if row[0] not in index)
+    return new, index.add(rows) - new
+
+
+def update(index: CohortIndex, connection, page_size: int = PAGE_SIZE) -> Tuple[int, int, int]:
+    """Bring ``index`` in line with the completed sessions; returns ``(added, reindexed, removed)``."""
+    mark = placeholder(connection)
+    if isinstance(connection, sqlite3.Connection):
+        connection.create_function("md5", 1, _md5, deterministic=True)
+        stored = SQLITE_STORED
+    else:
+        stored = MYSQL_STORED
+    cursor = connection.cursor()
+    added = reindexed = 0
+    watermark = index.watermark
+    seen = set()
+    stale: List[str] = []
+    try:
+        after = ""
+        while True:
+            cursor.execute(NEW_QUERY.format(mark=mark, limit=int(page_size)), (index.watermark, after))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after = rows[-1][0]
+            watermark = max([watermark] + [str(row[4]) for row in rows])
+            new, moved = _index_rows(index, [row[:4] for row in rows])
+            added, reindexed = added + new, reindexed + moved
+        after = ""
+        while True:
+            cursor.execute(DIGEST_QUERY.format(stored=stored, mark=mark, limit=int(page_size)), (after,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after = rows[-1][0]
+            seen.update(row[0] for row in rows)
+            stale.extend(session_id for session_id, md5 in rows if index.digest(session_id) != _digest_value(md5))
+        for start in range(0, len(stale), page_size):
+            ids = stale[start:start + page_size]
+            cursor.execute(ROWS_QUERY.format(marks=", ".join([mark] * len(ids))), ids)
+            new, moved = _index_rows(index, cursor.fetchall())
+            added, reindexed = added + new, reindexed + moved
+    finally:
+        cursor.close()
+    index.watermark = watermark
+    before = len(index)
+    index.remove([session_id for session_id in index.ids if session_id not in seen])
+    return added, reindexed, before - len(index)
@@ -0,0 +1,227 @@
+"""Per-question consensus over independent readings of the SMIL questions.
+
+The same 566 items (male and female variants) are read three ways:
+
+- ``txt`` — the hand-fixed source/qw.txt (convert-txt-to-json.py);
+- ``pypdf2`` and ``fitz`` — sob-01.pdf through either PDF backend
+  (extract-questions-from-pdf.py ``--backend``), repaired with
+  :func:`~psytools.text_normalizer.normalize` as clean-questions-text.py
+  repairs the extracted bank.
+
+For every question and variant all readings are compared pairwise with a
+banded edit distance: only cells within ``band`` of the diagonal are
+computed, and a pair further apart than ``band`` edits is simply "different".
+Readings agree almost everywhere and differ by a few stray spaces or
+letters, so after stripping the common prefix and suffix most comparisons
+touch a handful of cells.
+
+Each reading scores its own weight plus the weights of the other readings
+times their similarity to it (1 - distance / length); the best-scoring one
+wins, ties going to the earlier source of :data:`SOURCES`. The two PDF
+readings share the text layer and its artifacts, so their agreement with
+each other is weak evidence against the hand-fixed text: another reading
+only replaces the ``txt`` one when it scores :data:`TXT_MARGIN` more (in
+practice, when the txt item is a different text altogether). The agreement
+of an item is the weighted mean similarity of all sources to the winner, a
+missing reading counting as 0; items below :data:`REVIEW_THRESHOLD` and
+every item not taken from ``txt`` are listed for review.
+
+Items are scored in chunks across a process pool.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from . import pdf_text
+from .page_index import load_index
+from .smil_records import gender_record, parse_pdf_pages, parse_txt
+from .text_normalizer import Lexicon, bank_lexicon, normalize
+
+SOURCES = ("txt", "pypdf2", "fitz")
+VARIANTS = ("male", "female")
+
+# The hand-fixed text wins when the two PDF readings disagree with it and each other.
+DEFAULT_WEIGHTS = {"txt": 1.25, "pypdf2": 1.0, "fitz": 1.0}
+
+BAND = 12
+REVIEW_THRESHOLD = 0.95
+PREFERRED = "txt"
+TXT_MARGIN = 0.5
+CHUNKS_PER_WORKER = 4
+
+# source -> (male, female) {question id: text}
+Readings = Mapping[str, Tuple[Mapping[int, str], Mapping[int, str]]]
+
+
+def banded_distance(a: str, b: str, band: int = BAND) -> Optional[int]:
+    """Levenshtein distance of ``a`` and ``b``, or None when it exceeds ``band``."""
+    if a == b:
+        return 0
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end = 0
+    limit -= start
+    while end < limit and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    n, m = len(a), len(b)
+    if abs(n - m) > band:
+        return None
+    if not n or not m:
+        return n or m
+
+    over = band + 1
+    previous = [j if j <= band else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        low = max(1, i - band)
+        high = min(m, i + band)
+        current = [over] * (m + 1)
+        if i <= band:
+            current[0] = i
+        char = a[i - 1]
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > band:
+            return None
+        previous = current
+    return previous[m] if previous[m] <= band else None
+
+
+def similarity(a: str, b: str, band: int = BAND) -> float:
+    distance = banded_distance(a, b, band)
+    if distance is None:
+        return 0.0
+    return 1.0 - distance / max(len(a), len(b), 1)
+
+
+@dataclass
+class Item:
+    """Consensus text of one question variant."""
+
+    id: int
+    variant: str
+    text: str
+    source: str
+    agreement: float
+    distances: Dict[str, Optional[int]]  # edits from the chosen text per source; None = over the band
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "variant": self.variant, "text": self.text, "source": self.source,
+                "agreement": round(self.agreement, 4), "distances": self.distances}
+
+
+def _key(text: str) -> str:
+    return " ".join(text.split())
+
+
+def vote(q_id: int, variant: str, texts: Mapping[str, str], weights: Mapping[str, float],
+         band: int = BAND, margin: float = TXT_MARGIN) -> Optional[Item]:
+    """Pick the consensus reading of one question variant (None when no source has it)."""
+    readings = [(source, texts[source], _key(texts[source])) for source in weights if texts.get(source)]
+    if not readings:
+        return None
+    total = sum(weights.values())
+    scores = []
+    similar = {}
+    for i, (source, _, key) in enumerate(readings):
+        score = weights[source]
+        for other, _, other_key in readings:
+            if other == source:
+                continue
+            pair = (min(source, other), max(source, other))
+            if pair not in similar:
+                similar[pair] = similarity(key, other_key, band)
+            score += weights[other] * similar[pair]
+        scores.append((-score, i))
+    best, winner = min(scores)
+    preferred = next((score for score, i in scores if readings[i][0] == PREFERRED), None)
+    if preferred is not None and preferred - best < margin:
+        winner = next(i for _, i in scores if readings[i][0] == PREFERRED)
+    source, text, key = readings[winner]
+    distances = {other: banded_distance(key, other_key, band) for other, _, other_key in readings}
+    agreement = sum(weights[other] * (similar[(min(source, other), max(source, other))] if other != source else 1.0)
+                    for other, _, _ in readings) / total
+    return Item(q_id, variant, text, source, agreement, distances)
+
+
+def _vote_chunk(args) -> List[Item]:
+    tasks, weights, band = args
+    return [item for item in (vote(*task, weights, band) for task in tasks) if item]
+
+
+def _tasks(readings: Readings, ids: Iterable[int]) -> List[tuple]:
+    tasks = []
+    for q_id in ids:
+        for index, variant in enumerate(VARIANTS):
+            tasks.append((q_id, variant, {source: sections[index].get(q_id, "")
+                                          for source, sections in readings.items()}))
+    return tasks
+
+
+def build_consensus(readings: Readings, weights: Optional[Mapping[str, float]] = None, band: int = BAND,
+                    workers: Optional[int] = 1, ids: Iterable[int] = range(1, 567)) -> List[Item]:
+    """Consensus items ordered by id and variant.
+
+    ``readings`` maps a source name to its ``(male, female)`` ``{id: text}``
+    pair; ``weights`` default to :data:`DEFAULT_WEIGHTS` for the sources
+    present (1.0 for unknown ones).
+    """
+    order = sorted(readings, key=lambda source: SOURCES.index(source) if source in SOURCES else len(SOURCES))
+    weights = {source: (weights or DEFAULT_WEIGHTS).get(source, 1.0) for source in order}
+    tasks = _tasks(readings, ids)
+    workers = pdf_text.resolve_workers(workers)
+    if workers == 1:
+        return _vote_chunk((tasks, weights, band))
+
+    size = max(1, -(-len(tasks) // (workers * CHUNKS_PER_WORKER)))
+    chunks = [(tasks[i:i + size], weights, band) for i in range(0, len(tasks), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [item for chunk in pool.map(_vote_chunk, chunks) for item in chunk]
+
+
+def needs_review(items: Iterable[Item], threshold: float = REVIEW_THRESHOLD) -> List[Item]:
+    """Items with low agreement, and those whose text does not come from ``txt``."""
+    return [item for item in items if item.agreement < threshold or item.source != PREFERRED]
+
+
+def to_questions(items: Iterable[Item]) -> List[dict]:
+    """questions-566-gender.json records of the consensus texts."""
+    texts: Dict[int, Dict[str, str]] = {}
+    for item in items:
+        texts.setdefault(item.id, {})[item.variant] = item.text
+    records = (gender_record(q_id, variants.get("male", ""), variants.get("female", ""))
+               for q_id, variants in sorted(texts.items()))
+    return [record for record in records if record]
+
+
+def txt_reading(txt_path) -> Tuple[dict, dict]:
+    with open(txt_path, encoding="utf-8") as f:
+        return parse_txt(f)
+
+
+def pdf_reading(pdf_path, backend: str, workers: Optional[int] = None, cache=None,
+                lexicon: Optional[Lexicon] = None) -> Tuple[dict, dict]:
+    """Normalised questions of sob-01.pdf through ``backend``; raises :class:`pdf_text.ExtractionError`.
+
+    ``lexicon`` defaults to :func:`~psytools.text_normalizer.bank_lexicon`.
+    """
+    workers = pdf_text.resolve_workers(workers)
+    span = load_index(str(pdf_path), backend, workers, cache).questionnaire_span() or None
+    pages = pdf_text.extract_pages(str(pdf_path), backend=backend, workers=workers, pages=span, cache=cache)
+    lexicon = lexicon if lexicon is not None else bank_lexicon()
+    return tuple({q_id: normalize(text, lexicon) for q_id, text in section.items()}
+                 for section in parse_pdf_pages(pages))
+
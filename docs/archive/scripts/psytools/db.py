@@ -0,0 +1,124 @@
+"""Database connections for the offline tools.
+
+:func:`connect` opens the platform's MySQL database with the settings
+config.php uses (DB_* environment variables, filled in from the project
+.env file), through a server-side cursor so large result sets are
+streamed instead of buffered in the client. PyMySQL is only needed when
+a MySQL connection is actually made.
+
+:func:`sqlite_from_schema` builds an SQLite stand-in with the tables and
+seed rows of database/schema.sql, for tests and local runs without MySQL.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence
+
+from .paths import PROJECT_ROOT
+
+SCHEMA_PATH = PROJECT_ROOT / "database" / "schema.sql"
+ENV_PATH = PROJECT_ROOT / ".env"
+DEFAULTS = {
+    "DB_HOST": "localhost",
+    "DB_NAME": "psytest",
+    "DB_USER": "root",
+    "DB_PASS": "",
+    "DB_CHARSET": "utf8mb4",
+}
+
+
+def read_env(path: Path = ENV_PATH) -> Dict[str, str]:
+    """KEY=VALUE pairs of a .env file, parsed like config.php does."""
+    values = {}
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return values
+    for line in lines:
+        if not line.strip() or line.strip().startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        values[key.strip()] = value.strip()
+    return values
+
+
+def db_config(environ: Optional[Mapping[str, str]] = None, env_path: Path = ENV_PATH) -> Dict[str, str]:
+    """DB_* settings: the environment wins over .env, .env over the defaults."""
+    environ = os.environ if environ is None else environ
+    file_values = read_env(env_path)
+    return {key: environ.get(key, file_values.get(key, default)) for key, default in DEFAULTS.items()}
+
+
+def connect(config: Optional[Mapping[str, str]] = None):
+    """PyMySQL connection whose cursors stream rows from the server (SSCursor)."""
+    try:
+        import pymysql
+        import pymysql.cursors
+    except ImportError as e:
+        raise RuntimeError("PyMySQL is required for MySQL access: pip install pymysql") from e
+    config = db_config() if config is None else config
+    host, _, port = config["DB_HOST"].partition(":")
+    return pymysql.connect(
+        host=host,
+        port=int(port or 3306),
+        user=config["DB_USER"],
+        password=config["DB_PASS"],
+        database=config["DB_NAME"],
+        charset=config["DB_CHARSET"],
+        cursorclass=pymysql.cursors.SSCursor,
+    )
+
+
+def placeholder(connection) -> str:
+    """Parameter marker of the connection's driver."""
+    return "?" if isinstance(connection, sqlite3.Connection) else "%s"
+
+
+_CREATE_RE = re.compile(r"CREATE TABLE IF NOT EXISTS `(\w+)` \((.*?)\n\)", re.S)
+_COLUMN_RE = re.compile(r"^\s*`(\w+)` (\w+)(.*?),?$")
+_INSERT_RE = re.compile(r"INSERT INTO `(\w+)`.*?\);", re.S)
+
+
+def _sqlite_column(name: str, sql_type: str, rest: str) -> str:
+    # The column affinity and keys matter here; MySQL-only clauses are dropped.
+    affinity = "INTEGER" if sql_type.upper().endswith("INT") else "TEXT"
+    if "AUTO_INCREMENT" in rest:
+        return f"{name} INTEGER PRIMARY KEY AUTOINCREMENT"
+    column = f"{name} {affinity}"
+    if "PRIMARY KEY" in rest:
+        column += " PRIMARY KEY"
+    if "DEFAULT CURRENT_TIMESTAMP" in rest:
+        column += " DEFAULT CURRENT_TIMESTAMP"
+    else:
+        default = re.search(r"DEFAULT ('[^']*'|\d+)", rest)
+        if default:
+            column += f" DEFAULT {default.group(1)}"
+    return column
+
+
+def sqlite_from_schema(
+    path: str = ":memory:",
+    tables: Sequence[str] = ("tests", "test_sessions"),
+    schema_path: Path = SCHEMA_PATH,
+) -> sqlite3.Connection:
+    """SQLite database with ``tables`` of schema.sql (columns, defaults, seed rows)."""
+    schema = Path(schema_path).read_text(encoding="utf-8")
+    connection = sqlite3.connect(path)
+    for table, body in _CREATE_RE.findall(schema):
+        if table not in tables:
+            continue
+        columns = [
+            _sqlite_column(*match.groups())
+            for match in map(_COLUMN_RE.match, body.splitlines())
+            if match
+        ]
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})")
+    for statement in _INSERT_RE.finditer(schema):
+        if statement.group(1) in tables:
+            # MySQL string literals escape backslashes; SQLite ones do not.
+            connection.execute(statement.group(0).replace("\\\\", "\\"))
+    connection.commit()
+    return connection
@@ -0,0 +1,266 @@
+"""Shared parse/clean/validate core for rebuilding question banks from source text.
+
+An instrument is described by a :class:`Profile` (see :mod:`psytools.instruments`
+for the shipped ones): its id range, text variants, answer options, scale
+keys and control items. :func:`build` turns the lines of a source text or
+PDF into the records of the module's question bank:
+
+1. **parse**: :class:`~psytools.question_parser.QuestionParser` collects
+   numbered items per section; answer options written after an item as
+   ``0) текст`` lines are split off the item text;
+2. **clean**: text taken from a PDF goes through
+   :func:`~psytools.text_normalizer.normalize`;
+3. **record**: id, text (``text_<variant>`` per variant, a missing variant
+   falling back to the other), the key fields and constants of the profile,
+   ``is_control`` when the profile has control items, then the options;
+4. **validate**: missing ids, malformed options, keys and control items
+   outside the bank, ``question_count`` of metadata.json.
+
+:func:`rebuild` runs independent instruments in a process pool.
+:func:`render_source` writes the source text of an existing bank, so a
+hand-made questions.json can be brought under the same build.
+"""
+from __future__ import annotations
+
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from . import pdf_text
+from .json_writer import write_json
+from .page_index import load_index
+from .paths import MODULES_DIR, SOURCE_DIR
+from .pipeline import load_json
+from .question_parser import QuestionParser, iter_lines
+from .text_normalizer import bank_lexicon, normalize
+
+INSTRUMENT_SOURCES = SOURCE_DIR / "instruments"
+# "0) Совсем не беспокоило": an answer option following an item.
+OPTION_RE = re.compile(r"(?:^|\s)(\d{1,2})\)\s+")
+
+
+@dataclass
+class Profile:
+    """How one instrument's question bank is laid out and where its source lives.
+
+    ``keys`` maps a record field to ``{value: item ids}`` (e.g. ``{"scale":
+    {"HADS-A": [1, 3, ...]}}``); ``constants`` are fields every record
+    carries. ``options`` is the answer scale shared by all items; with
+    ``item_options`` each item brings its own options in the source.
+    ``header`` wraps the records as ``{**header, "questions": [...]}``
+    instead of writing a bare list. ``parser`` holds the
+    :class:`~psytools.question_parser.QuestionParser` options for the text
+    source, ``pdf_parser`` those for the PDF (default: the same).
+    """
+
+    slug: str
+    question_count: int
+    output: Path
+    source: Optional[Path] = None
+    pdf: Optional[Path] = None
+    parser: Mapping[str, Any] = field(default_factory=dict)
+    pdf_parser: Optional[Mapping[str, Any]] = None
+    variants: Sequence[str] = ()
+    control_items: Sequence[int] = ()
+    keys: Mapping[str, Mapping[Any, Sequence[int]]] = field(default_factory=dict)
+    constants: Mapping[str, Any] = field(default_factory=dict)
+    options: Sequence[Tuple[int, str]] = ()
+    item_options: bool = False
+    header: Optional[Mapping[str, Any]] = None
+    indent: int = 2
+
+    @property
+    def metadata_path(self) -> Path:
+        return Path(self.output).parent / "metadata.json"
+
+
+@dataclass
+class Report:
+    slug: str
+    questions: int = 0
+    problems: List[str] = field(default_factory=list)
+    written: bool = False
+    skipped: Optional[str] = None
+
+
+def split_options(text: str) -> Tuple[str, List[dict]]:
+    """Item text without its trailing ``n) option`` parts, and those options."""
+    parts = OPTION_RE.split(text)
+    options = [{"value": int(parts[i]), "text": parts[i + 1].strip()} for i in range(1, len(parts) - 1, 2)]
+    return parts[0].strip(), options
+
+
+def parse(profile: Profile, lines: Iterable[str], from_pdf: bool = False) -> Dict[Optional[str], Dict[int, str]]:
+    """``{section: {id: text}}`` of the source lines."""
+    options = profile.pdf_parser if from_pdf and profile.pdf_parser is not None else profile.parser
+    parser = QuestionParser(**{"blank_line_ends_item": from_pdf, **options, "max_id": profile.question_count})
+    sections: Dict[Optional[str], Dict[int, str]] = {}
+    for section, qid, text in parser.parse(lines):
+        sections.setdefault(section, {})[qid] = text
+    return sections
+
+
+def _key_fields(profile: Profile) -> Dict[int, Dict[str, Any]]:
+    fields: Dict[int, Dict[str, Any]] = {}
+    for name, values in profile.keys.items():
+        for value, items in values.items():
+            for qid in items:
+                fields.setdefault(qid, {})[name] = value
+    return fields
+
+
+def records(profile: Profile, sections: Mapping[Optional[str], Mapping[int, str]],
+            lexicon=None, clean: bool = False) -> Iterator[dict]:
+    """Question records in id order; ids without text in any section are left out."""
+    key_fields = _key_fields(profile)
+    variants = list(profile.variants) or [profile.parser.get("initial", "")]
+    shared = [{"value": value, "text": text} for value, text in profile.options]
+    control = set(profile.control_items)
+    for qid in range(1, profile.question_count + 1):
+        texts, options = {}, []
+        for variant in variants:
+            text = sections.get(variant, {}).get(qid, "")
+            if profile.item_options:
+                text, found = split_options(text)
+                options = options or found
+            if clean and text:
+                text = normalize(text, lexicon)
+            texts[variant] = text
+        if not any(texts.values()):
+            continue
+        record: Dict[str, Any] = {"id": qid}
+        if profile.variants:
+            for variant in variants:
+                fallback = next(t for t in texts.values() if t)
+                record[f"text_{variant}"] = texts[variant] or fallback
+        else:
+            record["text"] = texts[variants[0]]
+        for name in profile.keys:
+            if name in key_fields.get(qid, {}):
+                record[name] = key_fields[qid][name]
+        record.update(profile.constants)
+        if control:
+            record["is_control"] = qid in control
+        if profile.item_options:
+            record["options"] = options
+        elif shared:
+            record["options"] = shared
+        yield record
+
+
+def validate(profile: Profile, questions: Sequence[dict]) -> List[str]:
+    problems = []
+    present = {q["id"] for q in questions}
+    missing = [qid for qid in range(1, profile.question_count + 1) if qid not in present]
+    if missing:
+        problems.append(f"нет вопросов: {_ids(missing)}")
+    for q in questions:
+        values = [option["value"] for option in q.get("options", ())]
+        if (profile.item_options or profile.options) and values != list(range(len(values))):
+            problems.append(f"вопрос {q['id']}: варианты ответа {values or 'не найдены'}")
+        if any(not q[name] for name in q if name.startswith("text")):
+            problems.append(f"вопрос {q['id']}: пустой текст")
+    outside = sorted(qid for qid in profile.control_items if qid not in present)
+    if outside:
+        problems.append(f"контрольные вопросы вне банка: {_ids(outside)}")
+    for name, values in profile.keys.items():
+        for value, items in values.items():
+            outside = sorted(qid for qid in items if qid not in present)
+            if outside:
+                problems.append(f"ключ {name}={value}: вопросы вне банка {_ids(outside)}")
+    try:
+        declared = load_json(profile.metadata_path).get("question_count")
+    except FileNotFoundError:
+        declared = None
+    if declared is not None and declared != profile.question_count:
+        problems.append(f"metadata.json: question_count {declared}, профиль {profile.question_count}")
+    return problems
+
+
+def _ids(values: Sequence[int]) -> str:
+    return ", ".join(map(str, values[:12])) + (" …" if len(values) > 12 else "")
+
+
+def source_lines(profile: Profile, cache=None) -> Tuple[Optional[Iterable[str]], bool]:
+    """Lines of the text source, else of the PDF; the flag says they came from a PDF.
+
+    Only the questionnaire pages of the PDF are read, as located by the page
+    index. The instrument already has its own process, so pages are read in it.
+    """
+    if profile.source is not None and Path(profile.source).exists():
+        with open(profile.source, encoding="utf-8") as f:
+            return f.read().splitlines(), False
+    if profile.pdf is not None and Path(profile.pdf).exists():
+        span = load_index(profile.pdf, workers=1, cache=cache).questionnaire_span(1, profile.question_count)
+        pages = pdf_text.extract_pages(profile.pdf, workers=1, pages=span or None, cache=cache)
+        return iter_lines(pages), True
+    return None, False
+
+
+def bank_data(profile: Profile, questions: List[dict]):
+    return {**profile.header, "questions": questions} if profile.header is not None else questions
+
+
+def write_bank(profile: Profile, questions: List[dict]) -> bool:
+    """Write the bank unless the file already holds the same data (in any formatting)."""
+    data = bank_data(profile, questions)
+    try:
+        if load_json(profile.output) == data:
+            return False
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return write_json(profile.output, data, profile.indent)
+
+
+def build(profile: Profile, lines: Optional[Iterable[str]] = None, from_pdf: bool = False,
+          write: bool = True, force: bool = False, lexicon=None) -> Report:
+    """Parse, clean, validate and (unless there are problems, or ``force``) write one instrument's bank."""
+    report = Report(profile.slug)
+    if lines is None:
+        lines, from_pdf = source_lines(profile)
+        if lines is None:
+            report.skipped = "нет исходного текста"
+            return report
+    if from_pdf and lexicon is None:
+        lexicon = bank_lexicon()
+    questions = list(records(profile, parse(profile, lines, from_pdf), lexicon, clean=from_pdf))
+    report.questions = len(questions)
+    report.problems = validate(profile, questions)
+    if write and (force or not report.problems):
+        report.written = write_bank(profile, questions)
+    return report
+
+
+def _build_task(task: tuple) -> Report:
+    profile, write, force = task
+    return build(profile, write=write, force=force)
+
+
+def rebuild(profiles: Sequence[Profile], workers: Optional[int] = None, write: bool = True,
+            force: bool = False) -> List[Report]:
+    """Build the given instruments, one process each (reports in input order)."""
+    workers = min(pdf_text.resolve_workers(workers), max(1, len(profiles)))
+    tasks = [(profile, write, force) for profile in profiles]
+    if workers <= 1:
+        return [_build_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_build_task, tasks))
+
+
+def render_source(profile: Profile, questions: Sequence[dict]) -> str:
+    """Source text of a bank without text variants, as :func:`parse` reads it back."""
+    if profile.variants:
+        raise ValueError(f"{profile.slug}: source text of variant banks is not generated")
+    lines = []
+    for q in questions:
+        lines.append(f"{q['id']}. {q['text']}")
+        if profile.item_options:
+            lines += [f"{option['value']}) {option['text']}" for option in q.get("options", ())]
+    return "\n".join(lines) + "\n"
+
+
+def module_output(slug: str, name: str = "questions.json") -> Path:
+    return MODULES_DIR / slug / name
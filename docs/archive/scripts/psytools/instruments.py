@@ -0,0 +1,98 @@
+"""Ingestion profiles of the shipped instruments (see :mod:`psytools.ingest`).
+
+Profiles are keyed by module directory; the source texts live under
+source/instruments/<module>.txt (SMIL: source/qw.txt, else sob-01.pdf) and,
+like the other raw sources, are not kept in the repository.
+"""
+from __future__ import annotations
+
+from typing import Dict
+
+from .ingest import INSTRUMENT_SOURCES, Profile, module_output
+from .paths import SOB_PDF, SOURCE_DIR
+from .smil_records import (
+    CONTROL_QUESTIONS,
+    GENDER_DESCRIPTION,
+    PDF_MARKERS,
+    TXT_MARKERS,
+    TXT_SKIP_PREFIXES,
+)
+
+# Шкала ответов BAI, общая для всех 21 пунктов
+BAI_OPTIONS = (
+    (0, "Совсем не беспокоило"),
+    (1, "Слегка беспокоило, но не сильно"),
+    (2, "Умеренно беспокоило, было неприятно"),
+    (3, "Сильно беспокоило, было очень неприятно"),
+)
+
+LAZARUS_DOMAINS = {
+    "Общение": [1, 2],
+    "Интимная сфера": [3],
+    "Финансы": [4],
+    "Время вместе": [5],
+    "Социальная сфера": [6],
+    "Родительство": [7],
+    "Союзничество": [8],
+    "Досуг": [9],
+    "Ценности": [10],
+    "Эмоциональная близость": [11],
+    "Доверие": [12],
+    "Привычки партнёра": [13],
+    "Семья партнёра": [14],
+    "Своя семья": [15],
+    "Внешность": [16],
+}
+
+
+def _source(module: str):
+    return INSTRUMENT_SOURCES / f"{module}.txt"
+
+
+PROFILES: Dict[str, Profile] = {
+    "beck-anxiety": Profile(
+        slug="beck-anxiety",
+        question_count=21,
+        output=module_output("beck-anxiety"),
+        source=_source("beck-anxiety"),
+        options=BAI_OPTIONS,
+    ),
+    "beck-depression": Profile(
+        slug="bdi",
+        question_count=21,
+        output=module_output("beck-depression"),
+        source=_source("beck-depression"),
+        keys={"scale": {"BDI": range(1, 22)}},
+        item_options=True,
+    ),
+    "hads": Profile(
+        slug="hads",
+        question_count=14,
+        output=module_output("hads"),
+        source=_source("hads"),
+        # Нечётные пункты — тревога, чётные — депрессия
+        keys={"scale": {"HADS-A": range(1, 15, 2), "HADS-D": range(2, 15, 2)}},
+        item_options=True,
+    ),
+    "lazarus": Profile(
+        slug="lazarus",
+        question_count=16,
+        output=module_output("lazarus"),
+        source=_source("lazarus"),
+        keys={"domain": LAZARUS_DOMAINS},
+        constants={"dual": True},
+    ),
+    "smil": Profile(
+        slug="smil",
+        question_count=566,
+        output=module_output("smil", "questions-566-gender.json"),
+        source=SOURCE_DIR / "qw.txt",
+        pdf=SOB_PDF,
+        parser={"markers": TXT_MARKERS, "initial": "male", "skip_prefixes": TXT_SKIP_PREFIXES},
+        pdf_parser={"markers": PDF_MARKERS, "initial": None, "min_length": 11},
+        variants=("male", "female"),
+        control_items=CONTROL_QUESTIONS,
+        header=GENDER_DESCRIPTION,
+        indent=4,
+    ),
+}
@@ -0,0 +1,254 @@
+"""Classical item analysis of the SMIL keys over stored answer sheets.
+
+For every scale of the analysed keys (see :func:`key_scales`) and every
+keyed item: the endorsement rate (share of sheets answering in the keyed
+direction), the corrected item-total correlation (the item against the sum
+of the other items), Cronbach's alpha of the scale and alpha if the item
+is deleted.
+
+All of these follow from a few running sums, accumulated in one pass over
+the data for all scales at once:
+
+* ``x``: the YES/NO indicator columns some scale is keyed on, and
+  ``T = x @ W`` the raw scores of every scale (``W`` the key weights);
+* per gender: the sheet count, the column sums of ``x``, the sums of
+  ``T`` and ``T²`` and the cross-products ``xᵀT``.
+
+Every item-level statistic is then a closed form of these, e.g.
+``cov(x_i, T) = Σx_iT / n - p_i·mean(T)`` and ``var(T - x_i) = var(T) -
+2·cov(x_i, T) + var(x_i)``. The sheets are processed in chunks of
+:data:`CHUNK_SIZE`, so memory holds one chunk's indicator matrix whatever
+the number of sheets. Within a chunk the products run in float32, which
+is exact for these integer sums; the running totals are float64.
+
+Scales keyed for one gender only (5M, 5F) are computed over that gender's
+sheets, all others over both.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .answers import FEMALE, MALE, NO, QUESTION_COUNT, YES
+from .key_sets import ADDITIONAL_PATH, KEY_PATH, ids, load_additional, load_additional_norms, load_key
+
+CHUNK_SIZE = 8192
+GENDER_SCALES = {"5M": (MALE,), "5F": (FEMALE,)}
+KEY_SOURCES = ("key.scales", "additional-scales", "additional-norms")
+DEFAULT_SOURCES = ("key.scales", "additional-scales")
+WEAK_CORRELATION = 0.1
+RARE_ENDORSEMENT = 0.02
+
+
+@dataclass
+class Scale:
+    source: str
+    code: str
+    true: List[int]
+    false: List[int]
+
+    @property
+    def name(self) -> str:
+        return f"{self.source}:{self.code}"
+
+
+def key_scales(sources: Sequence[str] = DEFAULT_SOURCES) -> List[Scale]:
+    """Scales of the named :mod:`psytools.key_sets` sources (:data:`KEY_SOURCES`)."""
+    loaders = {}
+    if "key.scales" in sources or "key.items" in sources:
+        loaders.update((loader.source, loader) for loader in load_key(KEY_PATH))
+    if "additional-scales" in sources:
+        loaders["additional-scales"] = load_additional(ADDITIONAL_PATH)
+    if "additional-norms" in sources:
+        loaders["additional-norms"] = load_additional_norms()
+    scales = []
+    for source in sources:
+        if source not in loaders:
+            raise ValueError(f"unknown key source {source!r}, expected one of {KEY_SOURCES}")
+        for code, key in loaders[source].keys.items():
+            if key.count:
+                scales.append(Scale(source, code, ids(key.true), ids(key.false)))
+    return scales
+
+
+@dataclass
+class ItemStats:
+    question: int
+    direction: str  # "true": scored on YES, "false": on NO
+    endorsement: float
+    yes_rate: float
+    no_rate: float
+    item_total: Optional[float]  # corrected item-total correlation; None without variance
+    alpha_if_deleted: Optional[float]
+
+    @property
+    def flags(self) -> List[str]:
+        flags = []
+        if self.item_total is None or self.item_total < WEAK_CORRELATION:
+            flags.append("weak" if self.item_total is None or self.item_total >= 0 else "negative")
+        if not RARE_ENDORSEMENT <= self.endorsement <= 1 - RARE_ENDORSEMENT:
+            flags.append("rare" if self.endorsement < 0.5 else "common")
+        return flags
+
+
+@dataclass
+class ScaleStats:
+    scale: Scale
+    sheets: int
+    mean: float
+    sd: float
+    alpha: Optional[float]
+    items: List[ItemStats] = field(default_factory=list)
+
+    def improving(self) -> List[ItemStats]:
+        """Items whose removal raises alpha."""
+        if self.alpha is None:
+            return []
+        return [item for item in self.items if item.alpha_if_deleted is not None and item.alpha_if_deleted > self.alpha]
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.scale.source, "scale": self.scale.code, "items": len(self.items), "sheets": self.sheets,
+            "mean": _round(self.mean), "sd": _round(self.sd), "alpha": _round(self.alpha),
+            "item_stats": [{
+                "question": item.question, "direction": item.direction, "endorsement": _round(item.endorsement),
+                "yes_rate": _round(item.yes_rate), "no_rate": _round(item.no_rate),
+                "item_total": _round(item.item_total), "alpha_if_deleted": _round(item.alpha_if_deleted),
+                "flags": item.flags,
+            } for item in self.items],
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 4)
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator if denominator > 1e-12 else None
+
+
+class ItemAnalysis:
+    """Running sufficient statistics of all scales; :meth:`add` chunks, :meth:`results` at the end."""
+
+    def __init__(self, scales: Sequence[Scale], question_count: int = QUESTION_COUNT):
+        self.scales = list(scales)
+        self.question_count = question_count
+        # Indicator column of a (question, direction): YES columns first, then NO.
+        entries = [(s, self._column(q, direction))
+                   for s, scale in enumerate(self.scales)
+                   for direction, questions in (("true", scale.true), ("false", scale.false))
+                   for q in questions if 1 <= q <= question_count]
+        self.active = np.array(sorted({column for _, column in entries}), dtype=np.int64)
+        position = {int(column): i for i, column in enumerate(self.active)}
+        self.weights = np.zeros((len(self.active), len(self.scales)), dtype=np.float32)
+        for s, column in entries:
+            self.weights[position[column], s] += 1
+        self.position = position
+
+        scale_count = len(self.scales)
+        self.count = np.zeros(2, dtype=np.int64)
+        self.answered = np.zeros((2, 2, question_count), dtype=np.int64)  # gender, YES/NO, question
+        self.sums = np.zeros((2, len(self.active)))
+        self.totals = np.zeros((2, scale_count))
+        self.squares = np.zeros((2, scale_count))
+        self.cross = np.zeros((2, len(self.active), scale_count))
+
+    def _column(self, question: int, direction: str) -> int:
+        return question - 1 if direction == "true" else self.question_count + question - 1
+
+    def add(self, answers: np.ndarray, genders: np.ndarray):
+        """Fold in a ``(sheets, questions)`` uint8 answer matrix and its gender codes."""
+        for start in range(0, len(answers), CHUNK_SIZE):
+            chunk, chunk_genders = answers[start:start + CHUNK_SIZE], genders[start:start + CHUNK_SIZE]
+            for gender in (MALE, FEMALE):
+                rows = chunk[chunk_genders == gender]
+                if len(rows):
+                    self._add(gender, rows)
+
+    def _add(self, gender: int, answers: np.ndarray):
+        q = self.question_count
+        yes, no = answers == YES, answers == NO
+        self.count[gender] += len(answers)
+        self.answered[gender, 0] += yes.sum(axis=0)
+        self.answered[gender, 1] += no.sum(axis=0)
+        columns = self.active
+        x = np.empty((len(answers), len(columns)), dtype=np.float32)
+        on_yes = columns < q
+        x[:, on_yes] = yes[:, columns[on_yes]]
+        x[:, ~on_yes] = no[:, columns[~on_yes] - q]
+        t = x @ self.weights
+        self.sums[gender] += x.sum(axis=0, dtype=np.float64)
+        t64 = t.astype(np.float64)
+        self.totals[gender] += t64.sum(axis=0)
+        self.squares[gender] += (t64 * t64).sum(axis=0)
+        self.cross[gender] += x.T @ t
+
+    def merge(self, other: "ItemAnalysis"):
+        for name in ("count", "answered", "sums", "totals", "squares", "cross"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def results(self) -> List[ScaleStats]:
+        return [self._scale(s, scale) for s, scale in enumerate(self.scales)]
+
+    def _scale(self, s: int, scale: Scale) -> ScaleStats:
+        genders = list(GENDER_SCALES.get(scale.code, (MALE, FEMALE)))
+        n = int(self.count[genders].sum())
+        items = [(question, direction, self.position[self._column(question, direction)])
+                 for direction, questions in (("true", scale.true), ("false", scale.false))
+                 for question in questions if 1 <= question <= self.question_count]
+        if not n:
+            return ScaleStats(scale, 0, 0.0, 0.0, None)
+        sums = self.sums[genders].sum(axis=0)
+        mean_t = self.totals[genders, s].sum() / n
+        var_t = max(self.squares[genders, s].sum() / n - mean_t * mean_t, 0.0)
+        cross = self.cross[genders, :, s].sum(axis=0)
+        answered = self.answered[genders].sum(axis=0)
+
+        k = len(items)
+        variances = {}
+        for _, _, column in items:
+            weight = float(self.weights[column, s])
+            p = sums[column] / n
+            variances[column] = weight * weight * p * (1 - p)
+        item_variance_sum = sum(variances.values())
+        alpha = None
+        if k > 1 and var_t > 1e-12:
+            alpha = k / (k - 1) * (1 - item_variance_sum / var_t)
+
+        stats = []
+        for question, direction, column in items:
+            weight = float(self.weights[column, s])
+            p = sums[column] / n
+            var_y = variances[column]
+            cov_y = weight * (cross[column] / n - p * mean_t)
+            rest = var_t - 2 * cov_y + var_y
+            item_total = _ratio(cov_y - var_y, math.sqrt(max(var_y * rest, 0.0)))
+            deleted = None
+            if k > 2 and rest > 1e-12:
+                deleted = (k - 1) / (k - 2) * (1 - (item_variance_sum - var_y) / rest)
+            stats.append(ItemStats(question, direction, p, answered[0, question - 1] / n,
+                                   answered[1, question - 1] / n, item_total, deleted))
+        return ScaleStats(scale, n, mean_t, math.sqrt(var_t), alpha, stats)
+
+
+def analyse(batches: Iterable[Tuple[np.ndarray, np.ndarray]], scales: Sequence[Scale]) -> ItemAnalysis:
+    """One pass of :class:`ItemAnalysis` over ``(answers, genders)`` batches."""
+    analysis = ItemAnalysis(scales)
+    for answers, genders in batches:
+        analysis.add(answers, genders)
+    return analysis
+
+
+def summary(results: Sequence[ScaleStats]) -> Dict[str, int]:
+    """Counts of flagged items and of items that raise their scale's alpha when dropped."""
+    counts: Dict[str, int] = {}
+    for result in results:
+        for item in result.items:
+            for flag in item.flags:
+                counts[flag] = counts.get(flag, 0) + 1
+        if result.improving():
+            counts["improving"] = counts.get("improving", 0) + len(result.improving())
+    return counts
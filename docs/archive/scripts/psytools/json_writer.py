@@ -0,0 +1,118 @@
+"""Crash-safe JSON output for files the running site reads.
+
+:func:`write_json` never touches the live file until the new content is
+complete: the document is streamed to a temporary file next to it, flushed
+and fsynced, and renamed over the target with :func:`os.replace`, so a
+reader sees either the old file or the new one, never a partial write.
+
+Lists (and generators) at the top level or as values of the top-level
+object are written item by item, so a bank built by a generator of records
+is never held in memory as one string; each item is serialised by the C
+encoder of :mod:`json`. The indented output is byte-for-byte what
+``json.dumps(data, ensure_ascii=False, indent=indent)`` gives; ``compact``
+writes it without whitespace, for production artifacts.
+
+While the file is written a hash of its bytes is computed. When it equals
+the hash of the current file, the temporary file is dropped and the target
+is left untouched (its mtime included, which the PHP side keys its caches
+on). The same content in another format (``compact`` or another indent) is
+written, so a formatting switch always takes effect.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator, Optional
+
+COMPACT = (",", ":")
+CHUNK = 1 << 16
+
+
+def _dumps(value, indent: Optional[int]) -> str:
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=COMPACT)
+    return json.dumps(value, ensure_ascii=False, indent=indent)
+
+
+def _is_sequence(value) -> bool:
+    return isinstance(value, (list, tuple)) or (hasattr(value, "__next__") and not isinstance(value, (str, dict)))
+
+
+def _pieces(value, indent: Optional[int], level: int = 0) -> Iterator[str]:
+    """Text chunks of ``value`` as ``json.dumps`` would render it."""
+    pad = "" if indent is None else "\n" + " " * (indent * (level + 1))
+    end = "" if indent is None else "\n" + " " * (indent * level)
+    if isinstance(value, dict) and level == 0:
+        if not value:
+            yield "{}"
+            return
+        yield "{"
+        for i, (key, item) in enumerate(value.items()):
+            yield ("," if i else "") + pad + json.dumps(str(key), ensure_ascii=False) + (":" if indent is None else ": ")
+            yield from _pieces(item, indent, level + 1)
+        yield end + "}"
+    elif _is_sequence(value) and level <= 1:
+        first = True
+        for item in value:
+            text = _dumps(item, indent)
+            if indent is not None:
+                text = text.replace("\n", pad)
+            yield ("[" if first else ",") + pad + text
+            first = False
+        yield "[]" if first else end + "]"
+    else:
+        text = _dumps(value, indent)
+        if indent is not None and level:
+            text = text.replace("\n", "\n" + " " * (indent * level))
+        yield text
+
+
+def file_hash(path: Path) -> Optional[str]:
+    """Hash of a file's bytes (the digest :func:`write_json` computes); None when it is missing."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _fsync_directory(directory: Path):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # not supported (Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_json(path: Path, data, indent: Optional[int] = 2, compact: bool = False) -> bool:
+    """Atomically write ``data`` to ``path`` unless the file already holds this output; True if written."""
+    path = Path(path)
+    indent = None if compact else indent
+    digest = hashlib.blake2b(digest_size=16)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="\n", buffering=CHUNK) as f:
+            for text in _pieces(data, indent):
+                f.write(text)
+                digest.update(text.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        if digest.hexdigest() == file_hash(path):
+            return False
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+        _fsync_directory(path.parent)
+        return True
+    finally:
+        if tmp.exists():
+            tmp.unlink()
@@ -0,0 +1,298 @@
+"""Cross-checks between every SMIL scoring key in the repository.
+
+Each key source is loaded into :class:`ScaleKey` records whose ``true`` and
+``false`` item sets are Python ints used as bitsets, bit ``q - 1`` standing
+for question ``q``. Comparisons are then single bitwise operations:
+``a.true & b.false`` are conflicting directions, ``a.items ^ b.items`` the
+items two keys disagree on, ``int.bit_count`` the sizes.
+
+Sources (see :func:`load_sources`):
+
+* ``key.scales`` and ``key.items``: both views of mmpi-key-solomin.json,
+  the key of record written by extract-mmpi-key.py;
+* ``bank``: the scales apply-mmpi-key.py pushed into questions-566-full.json;
+* ``additional-scales``: the "questions" maps of additional-scales.json;
+* ``additional-norms``: the key lists scored by AdditionalScalesCalculator.
+
+:func:`analyse` returns :class:`Finding` records. Disagreements within the
+key of record (the two key views and the bank) are errors; disagreements
+with the supplementary files, max-raw mismatches and duplicated scales are
+warnings; overlaps and unscored questions are informational.
+"""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .answers import QUESTION_COUNT
+from .paths import SMIL_DIR
+
+KEY_PATH = SMIL_DIR / "Scoring" / "keys" / "mmpi-key-solomin.json"
+BANK_PATH = SMIL_DIR / "questions-566-full.json"
+NORMS_PATH = SMIL_DIR / "basic_scales_norms.json"
+ADDITIONAL_PATH = SMIL_DIR / "additional-scales.json"
+ADDITIONAL_NORMS_PATH = SMIL_DIR / "additional-scales-norms.json"
+RECORD_SOURCES = ("key.scales", "key.items", "bank")
+OVERLAP_THRESHOLD = 0.5
+
+ERROR = "error"
+WARNING = "warning"
+INFO = "info"
+
+
+def bits(ids: Iterable[int]) -> int:
+    value = 0
+    for qid in ids:
+        value |= 1 << (qid - 1)
+    return value
+
+
+def ids(value: int) -> List[int]:
+    """Question ids of a bitset, ascending."""
+    result = []
+    while value:
+        low = value & -value
+        result.append(low.bit_length())
+        value ^= low
+    return result
+
+
+@dataclass
+class ScaleKey:
+    source: str
+    scale: str
+    true: int = 0
+    false: int = 0
+    max_raw: Dict[str, int] = field(default_factory=dict)  # stated maximum, by label
+
+    @property
+    def items(self) -> int:
+        return self.true | self.false
+
+    @property
+    def count(self) -> int:
+        return self.true.bit_count() + self.false.bit_count()
+
+
+@dataclass
+class Finding:
+    severity: str
+    kind: str
+    message: str
+    items: Tuple[int, ...] = ()
+
+    def __str__(self) -> str:
+        shown = ", ".join(map(str, self.items[:12])) + (" …" if len(self.items) > 12 else "")
+        return f"{self.message}: {shown}" if self.items else self.message
+
+
+class KeyLoader:
+    """Collects the keys of one source, noting ids outside the question range and repeats."""
+
+    def __init__(self, source: str, question_count: int = QUESTION_COUNT):
+        self.source = source
+        self.question_count = question_count
+        self.keys: Dict[str, ScaleKey] = {}
+        self.findings: List[Finding] = []
+
+    def add(self, scale: str, direction: str, question_ids: Iterable) -> ScaleKey:
+        key = self.keys.setdefault(scale, ScaleKey(self.source, scale))
+        seen = getattr(key, direction)
+        outside, repeated = [], []
+        for qid in map(int, question_ids):
+            if not 1 <= qid <= self.question_count:
+                outside.append(qid)
+            elif seen >> (qid - 1) & 1:
+                repeated.append(qid)
+            else:
+                seen |= 1 << (qid - 1)
+        setattr(key, direction, seen)
+        where = f"{self.source} {scale} ({direction})"
+        if outside:
+            self.findings.append(Finding(ERROR, "orphan", f"{where} keys questions outside 1..{self.question_count}",
+                                         tuple(outside)))
+        if repeated:
+            self.findings.append(Finding(WARNING, "repeated", f"{where} lists questions twice", tuple(repeated)))
+        return key
+
+
+def _load(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_key(path: Path = KEY_PATH) -> List[KeyLoader]:
+    data = _load(path)
+    by_scale = KeyLoader("key.scales")
+    for scale, directions in data["scales"].items():
+        for direction in ("true", "false"):
+            by_scale.add(scale, direction, directions.get(direction) or [])
+    by_item = KeyLoader("key.items")
+    for qid, entries in data["items"].items():
+        for entry in entries:
+            by_item.add(entry["scale"], "true" if entry["direction"] == 1 else "false", [qid])
+    return [by_scale, by_item]
+
+
+def load_bank(path: Path = BANK_PATH) -> Tuple[KeyLoader, List[int]]:
+    data = _load(path)
+    loader = KeyLoader("bank")
+    for q in data["questions"]:
+        for entry in q.get("scales") or []:
+            loader.add(entry["scale"], "true" if entry["direction"] == 1 else "false", [q["id"]])
+    return loader, [q["id"] for q in data["questions"]]
+
+
+def load_additional(path: Path = ADDITIONAL_PATH) -> KeyLoader:
+    loader = KeyLoader("additional-scales")
+    for scales in _load(path)["scales"].values():
+        for code, info in scales.items():
+            questions = info.get("questions") or {}
+            loader.add(code, "true", [q for q, d in questions.items() if d == 1])
+            key = loader.add(code, "false", [q for q, d in questions.items() if d != 1])
+            if "max" in info:
+                key.max_raw["max"] = int(info["max"])
+    return loader
+
+
+def load_additional_norms(path: Path = ADDITIONAL_NORMS_PATH) -> KeyLoader:
+    loader = KeyLoader("additional-norms")
+    for scales in _load(path)["scales"].values():
+        for code, info in scales.items():
+            if "key" not in info:
+                continue
+            loader.add(code, "true", info["key"].get("true") or [])
+            key = loader.add(code, "false", info["key"].get("false") or [])
+            for gender, norms in (info.get("norms") or {}).items():
+                if "maxRaw" in norms:
+                    key.max_raw[gender] = int(norms["maxRaw"])
+    return loader
+
+
+@dataclass
+class Sources:
+    loaders: List[KeyLoader]
+    question_ids: List[int]
+    norms: dict
+
+    def keys(self, source: str) -> Dict[str, ScaleKey]:
+        return next(loader.keys for loader in self.loaders if loader.source == source)
+
+
+def load_sources(
+    key_path: Path = KEY_PATH,
+    bank_path: Path = BANK_PATH,
+    norms_path: Path = NORMS_PATH,
+    additional_path: Path = ADDITIONAL_PATH,
+    additional_norms_path: Path = ADDITIONAL_NORMS_PATH,
+) -> Sources:
+    key_loaders = load_key(key_path)
+    bank, question_ids = load_bank(bank_path)
+    loaders = key_loaders + [bank, load_additional(additional_path), load_additional_norms(additional_norms_path)]
+    return Sources(loaders, question_ids, _load(norms_path)["scales"])
+
+
+def _php_round(value: float) -> int:
+    # Scalar twin of smil_scoring.php_round, kept here so the analyser needs no numpy.
+    return int(math.copysign(math.floor(abs(value) + 0.5 + 1e-9), value))
+
+
+def _basic_max_raw(keys: Dict[str, ScaleKey], norms: dict) -> List[Finding]:
+    """maxRaw of basic_scales_norms.json against item count plus the K-correction."""
+    findings = []
+    k_count = keys["K"].count if "K" in keys else 0
+    for scale, info in norms.items():
+        for gender, variant in (("male", "5M"), ("female", "5F")):
+            key = keys.get(variant if scale == "5" else scale)
+            stated = (info.get(gender) or {}).get("maxRaw")
+            if key is None or stated is None:
+                continue
+            factor = float(info.get("kCorrectionFactor") or 0)
+            expected = key.count + _php_round(k_count * factor)
+            if expected != stated:
+                findings.append(Finding(WARNING, "max-raw",
+                                        f"basic_scales_norms {scale} ({gender}): maxRaw {stated}, "
+                                        f"key gives {key.count} items + {expected - key.count} from K = {expected}"))
+    return findings
+
+
+def analyse(sources: Sources, overlap_threshold: float = OVERLAP_THRESHOLD) -> List[Finding]:
+    findings = [finding for loader in sources.loaders for finding in loader.findings]
+    all_keys = [key for loader in sources.loaders for key in loader.keys.values()]
+
+    for key in all_keys:
+        both = key.true & key.false
+        if both:
+            findings.append(Finding(ERROR, "both-directions",
+                                    f"{key.source} {key.scale} keys questions both True and False", tuple(ids(both))))
+        for label, stated in key.max_raw.items():
+            if stated != key.count:
+                findings.append(Finding(WARNING, "max-raw",
+                                        f"{key.source} {key.scale}: stated {label} {stated}, key has {key.count} items"))
+
+    by_scale: Dict[str, List[ScaleKey]] = {}
+    for key in all_keys:
+        by_scale.setdefault(key.scale, []).append(key)
+    for scale, keys in by_scale.items():
+        # The record sources are checked against each other; every other
+        # source only against the first record key, not once per view.
+        record = [key for key in keys if key.source in RECORD_SOURCES]
+        others = [key for key in keys if key.source not in RECORD_SOURCES]
+        pairs = list(combinations(record, 2)) + list(combinations(record[:1] + others, 2))
+        for a, b in pairs:
+            severity = ERROR if a.source in RECORD_SOURCES and b.source in RECORD_SOURCES else WARNING
+            where = f"{scale}: {a.source} vs {b.source}"
+            conflict = (a.true & b.false) | (a.false & b.true)
+            if conflict:
+                findings.append(Finding(severity, "direction-conflict", f"{where} opposite directions",
+                                        tuple(ids(conflict))))
+            only_a, only_b = a.items & ~b.items, b.items & ~a.items
+            if only_a:
+                findings.append(Finding(severity, "membership", f"{where} only in {a.source}", tuple(ids(only_a))))
+            if only_b:
+                findings.append(Finding(severity, "membership", f"{where} only in {b.source}", tuple(ids(only_b))))
+
+    # Overlaps between different scales, one key per code (earliest source wins).
+    representatives = [keys[0] for keys in by_scale.values()]
+    for a, b in combinations(representatives, 2):
+        shared = a.items & b.items
+        if not shared:
+            continue
+        union = (a.items | b.items).bit_count()
+        name = f"{a.scale} ({a.source}) and {b.scale} ({b.source})"
+        if a.items == b.items and a.true == b.true:
+            findings.append(Finding(WARNING, "duplicate", f"{name} are the same key on {union} items"))
+        elif a.items == b.items:
+            findings.append(Finding(INFO, "overlap", f"{name} key the same {union} items in different directions"))
+        elif shared.bit_count() / union >= overlap_threshold:
+            findings.append(Finding(INFO, "overlap", f"{name} share {shared.bit_count()} of {union} items"))
+
+    if "K" in sources.keys("key.scales"):
+        findings.extend(_basic_max_raw(sources.keys("key.scales"), sources.norms))
+
+    bank_ids = bits(qid for qid in sources.question_ids if 1 <= qid <= QUESTION_COUNT)
+    keyed = 0
+    for key in all_keys:
+        keyed |= key.items
+    missing = keyed & ~bank_ids
+    if missing:
+        findings.append(Finding(ERROR, "orphan", "keyed questions missing from the question bank", tuple(ids(missing))))
+    scored = 0
+    for key in sources.keys("key.scales").values():
+        scored |= key.items
+    unscored = bank_ids & ~scored
+    if unscored:
+        findings.append(Finding(INFO, "unscored",
+                                f"{unscored.bit_count()} questions are on no basic scale", tuple(ids(unscored))))
+    return findings
+
+
+def summary(findings: Sequence[Finding]) -> Dict[str, int]:
+    counts = {ERROR: 0, WARNING: 0, INFO: 0}
+    for finding in findings:
+        counts[finding.severity] += 1
+    return counts
@@ -0,0 +1,223 @@
+"""Layout-aware extraction of the MMPI key tables (extract-mmpi-key.py --layout).
+
+``page.get_text()`` flattens a page in content-stream order, so a key table
+set in two text columns, or a list of item numbers wrapped next to another
+scale's list, comes out interleaved and the line-based parser loses items.
+This module works on PyMuPDF word boxes (``page.get_text("words")``) instead:
+
+1. Pages are scanned in a process pool (see :mod:`psytools.pdf_text`); each
+   worker keeps the words of pages that carry key headers ("Шкала",
+   "Верно", "Неверно") or are mostly numbers, so the key pages are found
+   without fixed page numbers.
+2. Each kept page is split into text columns at gutters of its horizontal
+   word coverage. A gutter only counts when a header word starts to the
+   right of it, so the gaps inside a grid of item numbers do not split it.
+3. Within a column, words are grouped into lines by vertical position and
+   read left to right; the columns are read left to right.
+4. :class:`KeyTableParser` reads those lines with the patterns of the
+   line-based parser and records, per scale and direction, the items found
+   and the count announced in the "Верно (n):" header.
+
+Every word goes through one histogram update, one column lookup and one
+sort within its column. :meth:`KeyExtraction.confidence` scores each scale
+from the announced counts, the item order and the item range.
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import pdf_text
+from .answers import QUESTION_COUNT
+
+HEADER_WORDS = ("Шкала", "Верно", "Неверно")
+SCALE_RE = re.compile(r"Шкала\s+([\w]+).*:")
+DIRECTION_RE = re.compile(r"(Верно|Неверно)\s*\((\d+)\):")
+STOP_WORD = "Т-баллы"
+NUMERIC_PAGE_RATIO = 0.5
+MIN_GUTTER = 12.0  # points
+PUNCTUATION = ",.;"
+UNANNOUNCED = 0.75  # confidence factor for a direction without an "(n)" count
+
+Word = Tuple[float, float, float, float, str]  # x0, y0, x1, y1, text
+
+
+def _is_number(text: str) -> bool:
+    return text.strip(PUNCTUATION).isdigit()
+
+
+def _page_words(task: tuple) -> List[Tuple[int, float, List[Word], bool]]:
+    """Words of the pages in a chunk that may belong to the key tables."""
+    pdf_path, pages = task
+    fitz = pdf_text.load_backend("fitz")
+    kept = []
+    with fitz.open(pdf_path) as doc:
+        for index in pages:
+            page = doc[index]
+            words = [w[:5] for w in page.get_text("words")]
+            headers = any(w[4].startswith(HEADER_WORDS) for w in words)
+            numbers = sum(1 for w in words if _is_number(w[4]))
+            if headers or (words and numbers / len(words) >= NUMERIC_PAGE_RATIO):
+                kept.append((index, page.rect.width, words, headers))
+    return kept
+
+
+def scan_pages(pdf_path: str, workers: Optional[int] = None,
+               pages: Optional[Sequence[int]] = None) -> Dict[int, Tuple[float, List[Word]]]:
+    """``{page: (width, words)}`` of the key pages, located by their headers.
+
+    A page with headers is a key page; a page of numbers only counts when it
+    directly follows a key page (a table continued over the page break).
+    """
+    pdf_path = str(pdf_path)
+    if pages is None:
+        pages = range(pdf_text.page_count(pdf_path, "fitz"))
+    pages = list(pages)
+    workers = min(pdf_text.resolve_workers(workers), max(1, len(pages)))
+    chunks = pdf_text._split(pages, workers * pdf_text.CHUNKS_PER_WORKER)
+    tasks = [(pdf_path, chunk) for chunk in chunks]
+    if workers <= 1:
+        results = map(_page_words, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_page_words, tasks))
+    found = {}
+    for index, width, words, headers in sorted(entry for chunk in results for entry in chunk):
+        if headers or index - 1 in found:
+            found[index] = (width, words)
+    return found
+
+
+def column_bounds(words: Sequence[Word], width: float, min_gutter: float = MIN_GUTTER) -> List[float]:
+    """x positions separating the text columns of a page."""
+    size = int(width) + 2
+    delta = [0] * (size + 1)
+    header_starts = []
+    for x0, _, x1, _, text in words:
+        delta[max(0, int(x0))] += 1
+        delta[min(size, int(x1) + 1)] -= 1
+        if text.startswith(HEADER_WORDS):
+            header_starts.append(x0)
+    # A lone full-width line (a running title) must not close a gutter.
+    tolerance = len(words) // 100
+    bounds, coverage, run_start, seen_text = [], 0, None, False
+    for x in range(size):
+        coverage += delta[x]
+        if coverage > tolerance:
+            if run_start is not None and seen_text and x - run_start >= min_gutter:
+                middle = (run_start + x) / 2
+                if any(start > middle and start < x + min_gutter for start in header_starts):
+                    bounds.append(middle)
+            seen_text, run_start = True, None
+        elif run_start is None:
+            run_start = x
+    return bounds
+
+
+def layout_lines(words: Sequence[Word], width: float) -> List[str]:
+    """Text lines of a page in reading order: column by column, top to bottom."""
+    bounds = column_bounds(words, width)
+    columns: List[List[Word]] = [[] for _ in range(len(bounds) + 1)]
+    for word in words:
+        columns[bisect_right(bounds, (word[0] + word[2]) / 2)].append(word)
+    lines = []
+    for column in columns:
+        column.sort(key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+        current: List[Word] = []
+        for word in column:
+            middle = (word[1] + word[3]) / 2
+            if current and abs(middle - (current[0][1] + current[0][3]) / 2) > (current[0][3] - current[0][1]) / 2:
+                lines.append(" ".join(w[4] for w in sorted(current)))
+                current = []
+            current.append(word)
+        if current:
+            lines.append(" ".join(w[4] for w in sorted(current)))
+    return lines
+
+
+def scale_code(match: re.Match, line: str) -> str:
+    code = match.group(1)
+    if code == "К":
+        code = "K"
+    if code == "5" and "для мужчин" in line:
+        code = "5M"
+    elif code == "5" and "для женщин" in line:
+        code = "5F"
+    return code
+
+
+@dataclass
+class KeyExtraction:
+    scales: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+    announced: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    pages: List[int] = field(default_factory=list)
+
+    def confidence(self, scale: str, question_count: int = QUESTION_COUNT) -> float:
+        """0..1: announced counts met, items ascending, in range and unique."""
+        score = 1.0
+        items = []
+        for direction in ("true", "false"):
+            found = self.scales[scale].get(direction, [])
+            items += found
+            expected = self.announced.get((scale, direction))
+            if expected is None:
+                score *= UNANNOUNCED if found else 1.0
+            elif found or expected:
+                score *= min(len(found), expected) / max(len(found), expected)
+            ascending = sum(a < b for a, b in zip(found, found[1:]))
+            score *= (ascending + 1) / len(found) if found else 1.0
+        if items:
+            valid = len({i for i in items if 1 <= i <= question_count})
+            score *= valid / len(items)
+        return round(score, 3)
+
+
+class KeyTableParser:
+    """Reads key lines ("Шкала 1:", "Верно (11):", item numbers) into a :class:`KeyExtraction`."""
+
+    def __init__(self):
+        self.result = KeyExtraction()
+        self.scale: Optional[str] = None
+        self.direction: Optional[str] = None
+
+    def feed(self, line: str):
+        line = line.strip()
+        if STOP_WORD in line:
+            self.scale = None
+            return
+        match = SCALE_RE.match(line)
+        if match:
+            # A scale is only opened by its first direction line: headers also
+            # recur in running text and on continuation pages, where the
+            # numbers go on under the current direction.
+            code = scale_code(match, line)
+            if code != self.scale:
+                self.scale, self.direction = code, None
+            return
+        rest = line
+        match = DIRECTION_RE.match(line)
+        if match and self.scale:
+            self.direction = "true" if match.group(1) == "Верно" else "false"
+            self.result.announced[(self.scale, self.direction)] = int(match.group(2))
+            self.result.scales.setdefault(self.scale, {}).setdefault(self.direction, [])
+            rest = line[match.end():]
+        if not self.scale or not self.direction:
+            return
+        tokens = rest.split()
+        if tokens and all(_is_number(t) for t in tokens):
+            self.result.scales[self.scale][self.direction] += [int(t.strip(PUNCTUATION)) for t in tokens]
+
+
+def extract_key(pdf_path: str, workers: Optional[int] = None,
+                pages: Optional[Sequence[int]] = None) -> KeyExtraction:
+    """Key tables of ``pdf_path``; ``pages`` limits the scan (default: whole document)."""
+    parser = KeyTableParser()
+    found = scan_pages(pdf_path, workers, pages)
+    for index, (width, words) in found.items():
+        for line in layout_lines(words, width):
+            parser.feed(line)
+    parser.result.pages = list(found)
+    return parser.result
@@ -0,0 +1,238 @@
+"""Memory-mapped frequency index of Russian word forms.
+
+The index is a single file of sorted UTF-8 keys with a frequency each: word
+forms ("читаю") and adjacent word pairs ("своим и"). Opening the index
+costs one ``mmap`` call and only the touched pages are ever read. Exact
+lookups hash the key with CRC-32 into an open-addressing slot table, so a
+check costs O(word length); prefix queries binary-search the sorted keys.
+Layout (little-endian header, arrays in native byte order: the file is a
+machine-local cache)::
+
+    header   8s magic, uint32 count, uint32 blob size, uint32 slot count,
+             32s source digest
+    offsets  uint32[count + 1]   key i is blob[offsets[i]:offsets[i + 1]]
+    freqs    uint32[count]
+    slots    uint32[slot count]  key index + 1 (0 = empty), linear probing
+    blob     concatenated keys, sorted bytewise
+
+By default the index is built on first use, and rebuilt when they change,
+from the question banks that the SMIL pipeline does not write
+(modules/*/questions*.json without questions-566-gender*.json, whose text is
+still being repaired, and questions-566-full*.json, rebuilt from it) plus the
+hand-fixed source text those are built from (source/qw.txt, when present).
+Indexing the pipeline's outputs would change the index with every build.
+build-lexicon.py can add an external ``word<TAB>frequency`` list.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional
+
+from .paths import CACHE_DIR, MODULES_DIR, SOURCE_DIR
+
+MAGIC = b"PSYLEX02"
+HEADER = struct.Struct("<8sIII32s")
+DEFAULT_PATH = CACHE_DIR / "lexicon.idx"
+# Banks written by the SMIL pipeline (smil_pipeline.py) from source/qw.txt.
+PIPELINE_OUTPUTS = ("questions-566-gender*.json", "questions-566-full*.json")
+TEXT_SOURCES = ("qw.txt",)  # under source/
+
+WORD_RE = re.compile(r"[а-яА-ЯёЁ]+(?:-[а-яА-ЯёЁ]+)*")
+# Abbreviations such as "т.д." must not make single letters look like words.
+SINGLE_LETTER_WORDS = frozenset("авикосуя")
+
+
+def is_word(word: str) -> bool:
+    return len(word) > 1 or word in SINGLE_LETTER_WORDS
+
+
+def iter_bank_texts(value) -> Iterator[str]:
+    """Every string stored under a ``text*`` key anywhere in a question bank document."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, str) and key.startswith("text"):
+                yield item
+            else:
+                yield from iter_bank_texts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_bank_texts(item)
+
+
+def bank_paths() -> list:
+    """Banks the SMIL pipeline does not write: split words of its intermediate would vote against their repair."""
+    return sorted(path for path in MODULES_DIR.glob("*/questions*.json")
+                  if not any(path.match(pattern) for pattern in PIPELINE_OUTPUTS))
+
+
+def source_paths() -> list:
+    """Everything the index is built from: :func:`bank_paths` and the present text sources."""
+    texts = [SOURCE_DIR / name for name in TEXT_SOURCES]
+    return bank_paths() + [path for path in texts if path.exists()]
+
+
+def iter_source_texts(path: Path) -> Iterator[str]:
+    """Texts of a bank (see :func:`iter_bank_texts`) or the lines of a plain text source."""
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".json":
+            yield from iter_bank_texts(json.load(f))
+        else:
+            yield from f
+
+
+def sources_digest(paths: Iterable[Path]) -> bytes:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.digest()
+
+
+def count_forms(texts: Iterable[str]) -> Counter:
+    """Frequencies of word forms and of adjacent word pairs in ``texts``."""
+    counts: Counter = Counter()
+    for text in texts:
+        words = [word.lower() for word in WORD_RE.findall(text)]
+        counts.update(word for word in words if is_word(word))
+        counts.update(f"{left} {right}" for left, right in zip(words, words[1:]))
+    return counts
+
+
+def read_word_list(path: Path) -> Counter:
+    """``word<TAB>frequency`` lines (frequency optional, defaults to 1)."""
+    counts: Counter = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            word, _, freq = line.rstrip("\n").partition("\t")
+            word = " ".join(word.lower().split())
+            if word and is_word(word):
+                counts[word] += int(freq) if freq.strip() else 1
+    return counts
+
+
+def write_index(path: Path, counts: Mapping[str, int], digest: bytes = b"") -> int:
+    """Write ``counts`` as an index file atomically; returns the number of keys."""
+    keys = sorted(key.encode("utf-8") for key in counts)
+    offsets = array("I", [0])
+    freqs = array("I")
+    for key in keys:
+        offsets.append(offsets[-1] + len(key))
+        freqs.append(min(counts[key.decode("utf-8")], 0xFFFFFFFF))
+    blob = b"".join(keys)
+
+    slot_count = 1 << max(3, (2 * len(keys)).bit_length())
+    slots = array("I", bytes(4 * slot_count))
+    mask = slot_count - 1
+    for index, key in enumerate(keys):
+        slot = zlib.crc32(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), len(blob), slot_count, digest.ljust(32, b"\0")))
+        offsets.tofile(f)
+        freqs.tofile(f)
+        slots.tofile(f)
+        f.write(blob)
+    os.replace(tmp, path)
+    return len(keys)
+
+
+class FrequencyLexicon:
+    """Read-only view of an index file; supports ``in``, ``len``, prefix and frequency lookups."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{self.path} is not a lexicon index")
+        magic, self._count, blob_size, slot_count, self.digest = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a lexicon index")
+        view = memoryview(self._mm)
+        start = HEADER.size
+        self._offsets = view[start:start + 4 * (self._count + 1)].cast("I")
+        start += 4 * (self._count + 1)
+        self._freqs = view[start:start + 4 * self._count].cast("I")
+        start += 4 * self._count
+        self._slots = view[start:start + 4 * slot_count].cast("I")
+        self._mask = slot_count - 1
+        self._blob_start = start + 4 * slot_count
+        if self._blob_start + blob_size != len(self._mm):
+            raise ValueError(f"{self.path} is truncated")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        # Lets bisect treat the index as a sorted sequence of keys.
+        base = self._blob_start
+        return self._mm[base + self._offsets[index]:base + self._offsets[index + 1]]
+
+    def frequency(self, word: str) -> int:
+        key = word.encode("utf-8")
+        slots, mask = self._slots, self._mask
+        slot = zlib.crc32(key) & mask
+        while True:
+            entry = slots[slot]
+            if not entry:
+                return 0
+            if self[entry - 1] == key:
+                return self._freqs[entry - 1]
+            slot = (slot + 1) & mask
+
+    def __contains__(self, word: str) -> bool:
+        return self.frequency(word) > 0
+
+    def has_prefix(self, prefix: str) -> bool:
+        key = prefix.encode("utf-8")
+        index = bisect_left(self, key)
+        return index < self._count and self[index].startswith(key)
+
+
+def build_bank_index(path: Path = DEFAULT_PATH, extra: Optional[Mapping[str, int]] = None) -> int:
+    """(Re)build the index from the sources plus optional extra counts."""
+    sources = source_paths()
+    counts = count_forms(text for source in sources for text in iter_source_texts(source))
+    if extra:
+        counts.update(extra)
+    return write_index(path, counts, sources_digest(sources))
+
+
+def _open_current(path: Path, digest: bytes) -> Optional[FrequencyLexicon]:
+    try:
+        lexicon = FrequencyLexicon(path)
+    except (OSError, ValueError):
+        return None
+    return lexicon if lexicon.digest == digest else None
+
+
+@lru_cache(maxsize=None)
+def shared_lexicon(path: Path = DEFAULT_PATH) -> FrequencyLexicon:
+    """Open the process-wide index, (re)building it first if it is missing or stale.
+
+    An index built from older sources is rebuilt from the sources alone; external
+    words are dropped until build-lexicon.py is run again.
+    """
+    path = Path(path)
+    lexicon = _open_current(path, sources_digest(source_paths()))
+    if lexicon is None:
+        build_bank_index(path)
+        lexicon = FrequencyLexicon(path)
+    return lexicon
@@ -0,0 +1,333 @@
+"""Population norms estimated from completed SMIL sessions.
+
+basic_scales_norms.json and additional-scales-norms.json ship the 2003
+Sobchik values (M, delta per gender). This module recomputes them from the
+collected protocols in one streaming pass, without holding the scores:
+
+* answer sheets are scored in batches with the vectorised scorers of
+  :class:`~psytools.scoring_bench.PythonScorer`; basic scales are taken
+  K-corrected, as :class:`~psytools.smil_scoring.TScorer` applies the norms
+  to corrected scores. Invalid protocols (:data:`INVALID_FLAGS` under the
+  shipped norms) and synthetic sessions (generate-sessions.py marks their
+  demographics) are left out;
+* every stratum (family, gender, age band, plus all ages) keeps a
+  :class:`Stratum`: count, mean and sum of squared deviations updated with
+  Welford's method per batch (Chan et al.'s pairwise formula), and a count
+  per raw score. Raw scores are small integers, so the histogram is an
+  exact, mergeable quantile sketch;
+* states of disjoint parts of the data merge with the same formulas, so
+  every worker process scans its own id range (MySQL, SQLite) or its own
+  files (a Parquet export of export-sessions.py) and the parent adds the
+  states up.
+
+:func:`norms_documents` writes the result in the schema of the shipped
+files (strata smaller than ``min_count`` keep the shipped values), with the
+sample size, median and age bands as extra keys the scorers ignore;
+:func:`norms_diff` compares them with the shipped norms.
+"""
+from __future__ import annotations
+
+import copy
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .additional_scales import NORMS_PATH as ADDITIONAL_NORMS_PATH
+from .answers import FEMALE, MALE
+from .paths import PROJECT_ROOT
+from .scoring_bench import PythonScorer
+from .session_scan import (
+    PAGE_SIZE,
+    Database,
+    ScanCounts,
+    SheetBatch,
+    database_batches,
+    parquet_batches,
+    parquet_files,
+    partitions,
+    run_tasks,
+)
+from .smil_scoring import NORMS_PATH, SCALES, is_valid
+
+OUTPUT_DIR = PROJECT_ROOT / "storage" / "exports" / "norms"
+FAMILIES = ("basic", "additional")
+GENDERS = {MALE: "male", FEMALE: "female"}
+ALL_AGES = "all"
+UNKNOWN_AGE = "unknown"
+# (lowest age, band label); a band runs up to the next one's lowest age.
+AGE_BANDS = ((0, "<18"), (18, "18-29"), (30, "30-44"), (45, "45-59"), (60, "60+"))
+MIN_COUNT = 100
+
+
+def age_band(age) -> str:
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return UNKNOWN_AGE
+    if not 0 < age < 120:
+        return UNKNOWN_AGE
+    label = AGE_BANDS[0][1]
+    for low, name in AGE_BANDS:
+        if age >= low:
+            label = name
+    return label
+
+
+@dataclass
+class Stratum:
+    """Streaming moments and an exact score histogram of one group of sheets, per scale."""
+
+    count: int
+    mean: np.ndarray
+    m2: np.ndarray  # sum of squared deviations from the mean
+    histogram: np.ndarray  # (scales, highest score + 1) int64
+
+    @classmethod
+    def empty(cls, scales: int) -> "Stratum":
+        return cls(0, np.zeros(scales), np.zeros(scales), np.zeros((scales, 1), dtype=np.int64))
+
+    def _grow(self, width: int):
+        if width > self.histogram.shape[1]:
+            grown = np.zeros((self.histogram.shape[0], width), dtype=np.int64)
+            grown[:, :self.histogram.shape[1]] = self.histogram
+            self.histogram = grown
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.count * count / total)
+        self.count = total
+
+    def add(self, scores: np.ndarray):
+        """Fold in a ``(sheets, scales)`` matrix of non-negative integer scores."""
+        if not len(scores):
+            return
+        mean = scores.mean(axis=0)
+        self._combine(len(scores), mean, ((scores - mean) ** 2).sum(axis=0))
+        width = int(scores.max()) + 1
+        self._grow(width)
+        scales = scores.shape[1]
+        flat = (scores + np.arange(scales)[None, :] * width).ravel()
+        self.histogram[:, :width] += np.bincount(flat, minlength=scales * width).reshape(scales, width)
+
+    def merge(self, other: "Stratum"):
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean.copy(), other.m2.copy()
+        else:
+            self._combine(other.count, other.mean, other.m2)
+        self._grow(other.histogram.shape[1])
+        self.histogram[:, :other.histogram.shape[1]] += other.histogram
+
+    @property
+    def std(self) -> np.ndarray:
+        """Sample standard deviation (n - 1)."""
+        if self.count < 2:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Lowest score whose cumulative share reaches ``q``, per scale."""
+        cumulative = np.cumsum(self.histogram, axis=1)
+        return (cumulative < q * cumulative[:, -1:]).sum(axis=1)
+
+
+@dataclass
+class NormState(ScanCounts):
+    """Strata of a part of the sessions; states of disjoint parts :meth:`merge`."""
+
+    strata: Dict[Tuple[str, str, str], Stratum] = field(default_factory=dict)
+    used: int = 0
+    invalid: int = 0
+
+    def add(self, family: str, genders: np.ndarray, bands: np.ndarray, scores: np.ndarray):
+        for code, gender in GENDERS.items():
+            of_gender = genders == code
+            if not of_gender.any():
+                continue
+            self._stratum(family, gender, ALL_AGES, scores.shape[1]).add(scores[of_gender])
+            for band in np.unique(bands[of_gender]):
+                rows = of_gender & (bands == band)
+                self._stratum(family, gender, str(band), scores.shape[1]).add(scores[rows])
+
+    def _stratum(self, family: str, gender: str, band: str, scales: int) -> Stratum:
+        key = (family, gender, band)
+        if key not in self.strata:
+            self.strata[key] = Stratum.empty(scales)
+        return self.strata[key]
+
+    def merge(self, other: "NormState"):
+        for key, stratum in other.strata.items():
+            self._stratum(*key, len(stratum.mean)).merge(stratum)
+        self.add_counts(other)
+        self.used += other.used
+        self.invalid += other.invalid
+
+
+class Estimator:
+    """Scores batches of sheets and folds the valid ones into a :class:`NormState`."""
+
+    def __init__(self, scorer: Optional[PythonScorer] = None):
+        self.scorer = scorer or PythonScorer()
+
+    @property
+    def additional_codes(self) -> List[str]:
+        return self.scorer.additional.codes
+
+    def add_matrix(self, state: NormState, answers: np.ndarray, genders: np.ndarray, bands: np.ndarray,
+                   strict: Optional[np.ndarray] = None):
+        raw, t, codes, _, _, extra_raw, _ = self.scorer.score(answers, genders, strict)
+        valid = is_valid(codes)
+        state.invalid += int(np.count_nonzero(~valid))
+        state.used += int(np.count_nonzero(valid))
+        corrected = self.scorer.t.corrected(raw)
+        state.add("basic", genders[valid], bands[valid], corrected[valid])
+        state.add("additional", genders[valid], bands[valid], extra_raw[valid])
+
+    def add_batch(self, state: NormState, batch: SheetBatch):
+        self.add_matrix(state, batch.answers, batch.genders, np.array([age_band(a) for a in batch.ages]),
+                        batch.strict)
+
+
+def scan_partition(task: tuple) -> NormState:
+    """Norm state of the completed sessions of one id range of a database."""
+    database, partition, page_size, include_synthetic = task
+    state = NormState()
+    estimator = Estimator()
+    for batch in database_batches(database, partition, state, page_size, include_synthetic):
+        estimator.add_batch(state, batch)
+    return state
+
+
+def scan_files(task: tuple) -> NormState:
+    """Norm state of the completed sessions in some Parquet part files."""
+    files, page_size, include_synthetic = task
+    state = NormState()
+    estimator = Estimator()
+    for batch in parquet_batches(files, state, page_size, include_synthetic):
+        estimator.add_batch(state, batch)
+    return state
+
+
+def estimate_from_database(database: Database, workers: int = 1, page_size: int = PAGE_SIZE,
+                           include_synthetic: bool = False) -> NormState:
+    return _reduce(scan_partition, [(database, p, page_size, include_synthetic) for p in partitions(workers)])
+
+
+def estimate_from_parquet(directory: Path, workers: int = 1, page_size: int = PAGE_SIZE,
+                          include_synthetic: bool = False) -> NormState:
+    files = parquet_files(directory)
+    groups = [files[i::max(1, workers)] for i in range(max(1, min(workers, len(files))))]
+    return _reduce(scan_files, [(group, page_size, include_synthetic) for group in groups])
+
+
+def _reduce(scan, tasks: Sequence[tuple]) -> NormState:
+    total = NormState()
+    for state in run_tasks(scan, tasks):
+        total.merge(state)
+    return total
+
+
+def _load(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _entry(stratum: Stratum, column: int) -> dict:
+    return {"M": round(float(stratum.mean[column]), 2), "delta": round(float(stratum.std[column]), 2)}
+
+
+def _estimated(norms: dict, state: NormState, family: str, gender: str, column: int, min_count: int):
+    """Update the ``{"M", "delta", "maxRaw"}`` entry of one scale and gender in place."""
+    overall = state.strata.get((family, gender, ALL_AGES))
+    if overall is None or overall.count < min_count or overall.std[column] == 0:
+        return
+    norms.update(_entry(overall, column))
+    norms["n"] = overall.count
+    norms["median"] = int(overall.quantile(0.5)[column])
+    bands = {}
+    for label in [name for _, name in AGE_BANDS] + [UNKNOWN_AGE]:
+        stratum = state.strata.get((family, gender, label))
+        if stratum is not None and stratum.count >= min_count:
+            bands[label] = {**_entry(stratum, column), "n": stratum.count,
+                            "median": int(stratum.quantile(0.5)[column])}
+    if bands:
+        norms["ageBands"] = bands
+
+
+def norms_documents(state: NormState, additional_codes: Sequence[str], min_count: int = MIN_COUNT,
+                    basic_path: Path = NORMS_PATH, additional_path: Path = ADDITIONAL_NORMS_PATH
+                    ) -> Tuple[dict, dict]:
+    """Copies of the shipped norm files with the estimated M and delta."""
+    stamp = f"test_sessions, {state.used} валидных протоколов, {date.today().isoformat()}"
+    basic = copy.deepcopy(_load(basic_path))
+    for column, scale in enumerate(SCALES):
+        if scale not in basic["scales"]:
+            continue
+        entry = basic["scales"][scale]
+        for gender in GENDERS.values():
+            entry[gender] = dict(entry.get(gender) or entry["male"])
+            _estimated(entry[gender], state, "basic", gender, column, min_count)
+
+    additional = copy.deepcopy(_load(additional_path))
+    column_of = {code: i for i, code in enumerate(additional_codes)}
+    for entries in additional["scales"].values():
+        for code, info in entries.items():
+            if code not in column_of or "norms" not in info:
+                continue
+            for gender in GENDERS.values():
+                info["norms"][gender] = dict(info["norms"].get(gender) or info["norms"].get("male") or {})
+                _estimated(info["norms"][gender], state, "additional", gender, column_of[code], min_count)
+
+    for document in (basic, additional):
+        document["description"] = document["description"].split(" по методике")[0] + " — собственные нормы"
+        document["source"] = stamp
+        document["note"] = ("M - среднее, delta - стандартное отклонение (σ), n - объём выборки, median - медиана; "
+                            f"страты меньше {min_count} протоколов сохраняют нормы Собчик (2003)")
+    return basic, additional
+
+
+def _scales(document: dict, family: str) -> Iterator[Tuple[str, dict]]:
+    if family == "basic":
+        for code, entry in document["scales"].items():
+            yield code, entry
+    else:
+        for entries in document["scales"].values():
+            for code, info in entries.items():
+                if "norms" in info:
+                    yield code, info["norms"]
+
+
+def norms_diff(shipped: Mapping[str, dict], estimated: Mapping[str, dict]) -> List[dict]:
+    """Changed ``M``/``delta`` per family, scale and gender.
+
+    ``t_shift`` is the T-score the new population mean gets under the
+    shipped norms, minus 50: how far the old norms misplace the average
+    respondent.
+    """
+    changes = []
+    for family in FAMILIES:
+        new_scales = dict(_scales(estimated[family], family))
+        for code, old in _scales(shipped[family], family):
+            new = new_scales.get(code)
+            if new is None:
+                continue
+            for gender in GENDERS.values():
+                before = old.get(gender) or old.get("male") or {}
+                after = new.get(gender) or {}
+                if "n" not in after or (before.get("M"), before.get("delta")) == (after["M"], after["delta"]):
+                    continue
+                old_m, old_delta = float(before.get("M", 0)), float(before.get("delta", 0))
+                shift = 10 * (after["M"] - old_m) / old_delta if old_delta else None
+                changes.append({
+                    "family": family, "scale": code, "gender": gender, "n": after["n"],
+                    "M": [before.get("M"), after["M"]], "delta": [before.get("delta"), after["delta"]],
+                    "t_shift": None if shift is None else round(shift, 1),
+                })
+    return changes
@@ -0,0 +1,153 @@
+"""Content-addressed on-disk cache of extracted PDF page text.
+
+Every entry is keyed by the content hash of the PDF bytes, the 0-based page index
+and the extractor version (backend library version plus
+``pdf_text.EXTRACTOR_VERSION``). Editing the PDF, upgrading the backend or
+changing the extraction code therefore simply stops matching old entries;
+those age out through size-bounded LRU eviction.
+
+The cache is a single SQLite file, so it needs no extra dependencies and is
+safe to share between the ingestion scripts. Only the parent process writes to
+it; pool workers never see the cache.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .json_writer import file_hash
+from .paths import CACHE_DIR
+
+DEFAULT_PATH = CACHE_DIR / "pdf-pages.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    pdf_hash  TEXT    NOT NULL,
+    extractor TEXT    NOT NULL,
+    page      INTEGER NOT NULL,
+    text      TEXT    NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL    NOT NULL,
+    PRIMARY KEY (pdf_hash, extractor, page)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages (last_used);
+CREATE TABLE IF NOT EXISTS documents (
+    pdf_hash   TEXT    NOT NULL,
+    extractor  TEXT    NOT NULL,
+    page_count INTEGER NOT NULL,
+    PRIMARY KEY (pdf_hash, extractor)
+);
+"""
+
+
+def hash_pdf(pdf_path) -> str:
+    """:func:`psytools.json_writer.file_hash` of a PDF that has to exist."""
+    digest = file_hash(pdf_path)
+    if digest is None:
+        raise FileNotFoundError(f"No such file: {pdf_path}")
+    return digest
+
+
+class PageCache:
+    """SQLite-backed page text cache with hit/miss counters and LRU eviction."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript(_SCHEMA)
+        self._hashes: Dict[str, str] = {}
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "PageCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def pdf_hash(self, pdf_path) -> str:
+        """Content hash of ``pdf_path``, memoised for the lifetime of the cache object."""
+        key = str(Path(pdf_path).resolve())
+        if key not in self._hashes:
+            self._hashes[key] = hash_pdf(pdf_path)
+        return self._hashes[key]
+
+    def page_count(self, pdf_hash: str, extractor: str) -> Optional[int]:
+        row = self._db.execute(
+            "SELECT page_count FROM documents WHERE pdf_hash = ? AND extractor = ?",
+            (pdf_hash, extractor),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, pdf_hash: str, extractor: str, count: int) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (pdf_hash, extractor, page_count) VALUES (?, ?, ?)",
+                (pdf_hash, extractor, count),
+            )
+
+    def get_many(self, pdf_hash: str, extractor: str, pages: Iterable[int]) -> Dict[int, str]:
+        """Return cached texts for ``pages``; counts one hit or miss per requested page."""
+        pages = list(pages)
+        found: Dict[int, str] = {}
+        for start in range(0, len(pages), 500):
+            batch = pages[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT page, text FROM pages WHERE pdf_hash = ? AND extractor = ? AND page IN ({marks})",
+                (pdf_hash, extractor, *batch),
+            )
+            found.update(rows)
+        if found:
+            with self._db:
+                self._db.executemany(
+                    "UPDATE pages SET last_used = ? WHERE pdf_hash = ? AND extractor = ? AND page = ?",
+                    [(time.time(), pdf_hash, extractor, page) for page in found],
+                )
+        self.hits += len(found)
+        self.misses += len(pages) - len(found)
+        return found
+
+    def put_many(self, pdf_hash: str, extractor: str, texts: Dict[int, str]) -> None:
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pages (pdf_hash, extractor, page, text, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (pdf_hash, extractor, page, text, len(text.encode("utf-8")), now)
+                    for page, text in texts.items()
+                ],
+            )
+        self.evict()
+
+    def total_bytes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop least recently used pages until the cache fits ``max_bytes``."""
+        excess = self.total_bytes() - self.max_bytes
+        if excess <= 0:
+            return 0
+        victims = []
+        for rowid, size in self._db.execute("SELECT rowid, size FROM pages ORDER BY last_used, rowid"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        with self._db:
+            self._db.executemany("DELETE FROM pages WHERE rowid = ?", victims)
+            self._db.execute(
+                "DELETE FROM documents WHERE NOT EXISTS ("
+                " SELECT 1 FROM pages p WHERE p.pdf_hash = documents.pdf_hash"
+                " AND p.extractor = documents.extractor)"
+            )
+        return len(victims)
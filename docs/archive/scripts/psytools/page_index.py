@@ -0,0 +1,171 @@
+"""Per-page structure index of a PDF: where the questions and key tables are.
+
+One extraction pass (page-parallel and served from the page cache, see
+:mod:`psytools.pdf_text`) yields the text of every page, from which small
+per-page features are computed:
+
+- ``ids``: count, first and last of the numbered items ("12. Текст"),
+  and the longest run of consecutive ids in page order;
+- ``density``: numbered items per non-empty line;
+- ``cyrillic``: share of Cyrillic among the letters;
+- ``numbers``: share of purely numeric tokens (key and norm tables);
+- ``markers``: which :data:`MARKERS` occur on the page.
+
+The features are stored as JSON under storage/cache/page-index, one file
+per PDF content hash and extractor version, checked against
+:data:`FEATURES_VERSION`,
+so later runs answer :meth:`PageIndex.question_pages` or
+:meth:`PageIndex.key_pages` without touching the PDF.
+"""
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from . import pdf_text
+from .page_cache import PageCache, hash_pdf
+from .paths import CACHE_DIR
+from .question_parser import FEMALE_MARKER, ITEM_RE, MALE_MARKER
+
+DEFAULT_DIR = CACHE_DIR / "page-index"
+# Bump when a change here alters the stored features.
+FEATURES_VERSION = "1"
+MARKERS = {
+    "male": MALE_MARKER,
+    "female": FEMALE_MARKER,
+    "keys": r"Ключи",
+    "scale": r"Шкала",
+    "true": r"Верно",
+    "false": r"Неверно",
+    "t-scores": r"Т-баллы",
+}
+_MARKER_RES = {name: re.compile(regex) for name, regex in MARKERS.items()}
+_CYRILLIC_RE = re.compile(r"[а-яА-ЯёЁ]")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+_UNSAFE_NAME_RE = re.compile(r"[^\w.-]+")
+KEY_NUMBERS = 0.5  # share of numeric tokens that makes a page a table continuation
+MIN_RUN = 3
+
+
+def page_features(text: str, max_id: int = 566) -> dict:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    ids = []
+    for line in lines:
+        match = ITEM_RE.match(line)
+        if match and 1 <= int(match.group(1)) <= max_id:
+            ids.append(int(match.group(1)))
+    best = (0, 0, 0)  # length, first, last
+    start = 0
+    for i in range(1, len(ids) + 1):
+        if i == len(ids) or ids[i] != ids[i - 1] + 1:
+            if ids and i - start > best[0]:
+                best = (i - start, ids[start], ids[i - 1])
+            start = i
+    tokens = text.split()
+    letters = len(_LETTER_RE.findall(text))
+    return {
+        "ids": {"count": len(ids), "first": ids[0] if ids else None, "last": ids[-1] if ids else None,
+                "run": list(best)},
+        "density": round(len(ids) / len(lines), 3) if lines else 0.0,
+        "cyrillic": round(len(_CYRILLIC_RE.findall(text)) / letters, 3) if letters else 0.0,
+        "numbers": round(sum(t.strip(",.;").isdigit() for t in tokens) / len(tokens), 3) if tokens else 0.0,
+        "markers": [name for name, regex in _MARKER_RES.items() if regex.search(text)],
+    }
+
+
+class PageIndex:
+    """Features of every page of one document (0-based page numbers)."""
+
+    def __init__(self, pages: List[dict], pdf_hash: str = "", extractor: str = ""):
+        self.pages = pages
+        self.pdf_hash = pdf_hash
+        self.extractor = extractor
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def to_dict(self) -> dict:
+        return {"pdf_hash": self.pdf_hash, "extractor": self.extractor, "version": FEATURES_VERSION,
+                "pages": self.pages}
+
+    def with_marker(self, marker: str) -> List[int]:
+        return [n for n, page in enumerate(self.pages) if marker in page["markers"]]
+
+    def question_pages(self, first: int = 1, last: int = 566, min_run: int = MIN_RUN) -> List[int]:
+        """Pages holding a run of at least ``min_run`` consecutive items inside ``first..last``."""
+        found = []
+        for n, page in enumerate(self.pages):
+            length, run_first, run_last = page["ids"]["run"]
+            if length >= min_run and run_first <= last and run_last >= first:
+                found.append(n)
+        return found
+
+    def questionnaire_span(self, first: int = 1, last: int = 566) -> List[int]:
+        """Pages from the section marker heading the first question page to the last question page.
+
+        The marker counted is the nearest one at or before the first question
+        page, so a table of contents naming the variants does not widen the span.
+        """
+        pages = self.question_pages(first, last)
+        if not pages:
+            return []
+        starts = [n for n in self.with_marker("male") + self.with_marker("female") if n <= pages[0]]
+        return list(range(max(starts, default=pages[0]), pages[-1] + 1))
+
+    def key_pages(self) -> List[int]:
+        """Pages with "Шкала" and "Верно"/"Неверно" headers, plus numeric pages continuing them."""
+        found = []
+        for n, page in enumerate(self.pages):
+            markers = page["markers"]
+            if "scale" in markers and ("true" in markers or "false" in markers):
+                found.append(n)
+            elif found and found[-1] == n - 1 and page["numbers"] >= KEY_NUMBERS:
+                found.append(n)
+        return found
+
+
+def index_path(pdf_hash: str, extractor: str, directory: Path = DEFAULT_DIR) -> Path:
+    """One file per PDF and extractor, so indexes of different backends do not evict each other."""
+    return Path(directory) / f"{pdf_hash}-{_UNSAFE_NAME_RE.sub('_', extractor)}.json"
+
+
+def build_index(pdf_path, backend: str = pdf_text.DEFAULT_BACKEND, workers: Optional[int] = None,
+                cache: Optional[PageCache] = None) -> PageIndex:
+    pages = pdf_text.extract_pages(pdf_path, backend=backend, workers=workers, cache=cache)
+    pdf_hash = cache.pdf_hash(pdf_path) if cache is not None else hash_pdf(pdf_path)
+    return PageIndex([page_features(text) for text in pages], pdf_hash, pdf_text.backend_version(backend))
+
+
+def load_index(pdf_path, backend: str = pdf_text.DEFAULT_BACKEND, workers: Optional[int] = None,
+               cache: Optional[PageCache] = None, directory: Path = DEFAULT_DIR,
+               rebuild: bool = False) -> PageIndex:
+    """Stored index of ``pdf_path``, built (and stored) if missing or out of date."""
+    pdf_hash = cache.pdf_hash(pdf_path) if cache is not None else hash_pdf(pdf_path)
+    extractor = pdf_text.backend_version(backend)
+    path = index_path(pdf_hash, extractor, directory)
+    if not rebuild:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = None
+        if data and data.get("extractor") == extractor and data.get("version") == FEATURES_VERSION:
+            return PageIndex(data["pages"], pdf_hash, extractor)
+    index = build_index(pdf_path, backend, workers, cache)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(index.to_dict(), ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+    return index
+
+
+def page_ranges(pages: Sequence[int]) -> str:
+    """"3-5, 9" style summary of 0-based pages, printed 1-based."""
+    runs: List[List[int]] = []
+    for page in sorted(pages):
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return ", ".join(f"{a + 1}" if a == b else f"{a + 1}-{b + 1}" for a, b in runs)
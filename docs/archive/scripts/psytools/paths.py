@@ -0,0 +1,9 @@
+"""Well-known locations inside the project tree."""
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+MODULES_DIR = PROJECT_ROOT / "modules"
+SMIL_DIR = MODULES_DIR / "smil"
+SOURCE_DIR = PROJECT_ROOT / "source"
+SOB_PDF = SOURCE_DIR / "metod" / "sob-01.pdf"
+CACHE_DIR = PROJECT_ROOT / "storage" / "cache"
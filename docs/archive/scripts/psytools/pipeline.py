@@ -0,0 +1,174 @@
+"""Incremental runner for chains of file-to-file build steps.
+
+Steps declare the files they read and write; a step that reads another
+step's output runs after it, so the steps form a DAG ordered by their file
+dependencies. Steps may rewrite one of their own inputs in place.
+
+The content hash of every input is recorded after a step runs (for an
+in-place file that is the rewritten content). On the next run a step whose
+inputs still have the recorded hashes and whose outputs exist is skipped.
+A step may also depend on something that is not one of its files (the
+clean step on the word index): its ``stamp`` is recorded and compared the
+same way.
+A step whose input is missing is skipped as well, leaving its outputs as
+they are: the raw sources of the SMIL bank are not kept in the repository.
+
+Within a step, :meth:`StepContext.map_records` memoises per-record work by
+the hash of each record's inputs, so only changed records are rebuilt.
+State lives in one JSON file under storage/cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from .json_writer import file_hash
+from .paths import CACHE_DIR
+
+DEFAULT_STATE = CACHE_DIR / "pipeline-state.json"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def record_hash(*parts) -> str:
+    return content_hash(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def load_json(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@dataclass
+class Step:
+    name: str
+    inputs: Sequence[Path]
+    outputs: Sequence[Path]
+    run: Callable[["StepContext"], None]
+    stamp: Optional[Callable[[], str]] = None  # version of the non-file inputs
+
+
+@dataclass
+class StepContext:
+    """What a running step sees: its declaration, its record memo and counters."""
+
+    step: Step
+    memo: Dict[str, object]
+    rebuilt: int = 0
+    reused: int = 0
+    used: set = field(default_factory=set)
+
+    def map_records(self, records: Iterable, key: Callable, transform: Callable) -> list:
+        """``[transform(r) for r in records]``, reusing results for records whose ``key(r)`` was seen."""
+        results = []
+        for record in records:
+            digest = record_hash(key(record))
+            self.used.add(digest)
+            if digest in self.memo:
+                self.reused += 1
+            else:
+                self.memo[digest] = transform(record)
+                self.rebuilt += 1
+            results.append(self.memo[digest])
+        return results
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str  # "ran", "would run", "up to date" or "skipped"
+    detail: str = ""
+    seconds: float = 0.0
+
+
+class Pipeline:
+    def __init__(self, steps: Sequence[Step], state_path: Path = DEFAULT_STATE):
+        self.steps = self._order(steps)
+        self.state_path = Path(state_path)
+
+    @staticmethod
+    def _order(steps: Sequence[Step]) -> List[Step]:
+        """Topological order by file dependencies; declaration order breaks ties."""
+        producers: Dict[Path, List[str]] = {}
+        for step in steps:
+            for path in step.outputs:
+                producers.setdefault(Path(path), []).append(step.name)
+        after = {
+            step.name: {name for path in step.inputs for name in producers.get(Path(path), []) if name != step.name}
+            for step in steps
+        }
+        ordered: List[Step] = []
+        done: set = set()
+        pending = list(steps)
+        while pending:
+            ready = next((s for s in pending if after[s.name] <= done), None)
+            if ready is None:
+                raise ValueError(f"dependency cycle between steps: {', '.join(s.name for s in pending)}")
+            ordered.append(ready)
+            done.add(ready.name)
+            pending.remove(ready)
+        return ordered
+
+    def _load_state(self) -> dict:
+        try:
+            return load_json(self.state_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state: dict):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+    def status(self, step: Step, state: dict) -> Optional[str]:
+        """Why ``step`` would be skipped, or None if it has to run."""
+        missing = [str(path) for path in step.inputs if not Path(path).exists()]
+        if missing:
+            return f"missing input {', '.join(missing)}"
+        entry = state.get(step.name, {})
+        recorded = entry.get("inputs", {})
+        if all(recorded.get(str(path)) == file_hash(path) for path in step.inputs) and \
+                all(Path(path).exists() for path in step.outputs) and \
+                entry.get("stamp") == (step.stamp() if step.stamp else None):
+            return "up to date"
+        return None
+
+    def run(self, force: bool = False, only: Optional[Sequence[str]] = None, dry_run: bool = False) -> List[StepResult]:
+        state = self._load_state()
+        results = []
+        for step in self.steps:
+            if only and step.name not in only:
+                continue
+            reason = self.status(step, state)
+            if reason == "up to date" and not force:
+                results.append(StepResult(step.name, reason))
+                continue
+            if reason and reason != "up to date":
+                results.append(StepResult(step.name, "skipped", reason))
+                continue
+            if dry_run:
+                results.append(StepResult(step.name, "would run"))
+                continue
+
+            entry = state.get(step.name, {})
+            context = StepContext(step, dict(entry.get("records", {})))
+            started = time.perf_counter()
+            step.run(context)
+            elapsed = time.perf_counter() - started
+
+            state[step.name] = {
+                "inputs": {str(path): file_hash(path) for path in step.inputs},
+                "stamp": step.stamp() if step.stamp else None,
+                # Only memo entries of the current records are kept, so the
+                # state does not grow with every edit.
+                "records": {digest: context.memo[digest] for digest in context.used},
+            }
+            self._save_state(state)
+            detail = f"{context.rebuilt} rebuilt, {context.reused} reused" if context.used else ""
+            results.append(StepResult(step.name, "ran", detail, elapsed))
+        return results
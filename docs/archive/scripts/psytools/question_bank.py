@@ -0,0 +1,244 @@
+"""Compiled binary form of questions-566-full.json.
+
+The JSON bank is re-parsed in full whenever the scoring code needs it. The
+compiled file holds the same content as fixed-width arrays plus one interned
+string table (a text shared by the male and female variant, or by several
+questions, is stored once). :class:`QuestionBank` maps the file and exposes
+the arrays as zero-copy ``memoryview`` casts; texts are decoded on access.
+
+Layout (native byte order, every section 8-byte aligned)::
+
+    header     8s magic, uint32 question count,
+               then (uint32 offset, uint32 length) for each of SECTIONS
+    ids        uint16[n]
+    is_control uint8[n]
+    male       uint32[n]          string index of text_male
+    female     uint32[n]          string index of text_female
+    scale_start uint32[n + 1]     question i owns entries [start[i], start[i + 1])
+    scale      uint8[entries]     index into scale_names
+    direction  int8[entries]
+    scale_names uint32[k]         string indices of scale codes
+    control_questions uint16[c]
+    meta       uint32[3]          string indices of description, source, note
+    string_offsets uint32[s + 1]
+    strings    uint8[blob]        UTF-8
+
+:func:`compile_bank` refuses to write a file unless decoding it reproduces
+the JSON source byte for byte.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+MAGIC = b"SMILQB01"
+SECTIONS = (
+    ("ids", "H"),
+    ("is_control", "B"),
+    ("male", "I"),
+    ("female", "I"),
+    ("scale_start", "I"),
+    ("scale", "B"),
+    ("direction", "b"),
+    ("scale_names", "I"),
+    ("control_questions", "H"),
+    ("meta", "I"),
+    ("string_offsets", "I"),
+    ("strings", "B"),
+)
+HEADER = struct.Struct("<8sI" + "II" * len(SECTIONS))
+ALIGN = 8
+TOP_KEYS = ["description", "source", "note", "control_questions", "questions"]
+QUESTION_KEYS = ["id", "text_male", "text_female", "is_control", "scales"]
+JSON_INDENT = 2
+
+
+class BankFormatError(ValueError):
+    """The JSON bank does not fit the compiled layout, or a compiled file is damaged."""
+
+
+def dump_json(data, compact: bool = False) -> bytes:
+    """questions-566-full.json serialisation as written by apply-mmpi-key.py (``--compact``: no whitespace)."""
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=JSON_INDENT).encode("utf-8")
+
+
+class _Strings:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.offsets = array("I", [0])
+        self.chunks: List[bytes] = []
+
+    def add(self, text: str) -> int:
+        if text not in self.index:
+            data = text.encode("utf-8")
+            self.index[text] = len(self.chunks)
+            self.chunks.append(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        return self.index[text]
+
+
+def encode(data: dict) -> bytes:
+    """Compiled bytes for a parsed bank document."""
+    if list(data) != TOP_KEYS:
+        raise BankFormatError(f"unexpected top-level keys {list(data)}")
+    strings = _Strings()
+    scale_index: Dict[str, int] = {}
+    scale_names = array("I")
+    arrays = {name: array(code) for name, code in SECTIONS}
+    arrays["scale_start"].append(0)
+
+    for q in data["questions"]:
+        if list(q) != QUESTION_KEYS or not isinstance(q["is_control"], bool):
+            raise BankFormatError(f"question {q.get('id')}: unexpected fields {q}")
+        if arrays["ids"] and q["id"] <= arrays["ids"][-1]:
+            raise BankFormatError(f"question ids must be ascending, {q['id']} follows {arrays['ids'][-1]}")
+        arrays["ids"].append(q["id"])
+        arrays["is_control"].append(q["is_control"])
+        arrays["male"].append(strings.add(q["text_male"]))
+        arrays["female"].append(strings.add(q["text_female"]))
+        for entry in q["scales"]:
+            if list(entry) != ["scale", "direction"]:
+                raise BankFormatError(f"question {q['id']}: unexpected scale entry {entry}")
+            if entry["scale"] not in scale_index:
+                scale_index[entry["scale"]] = len(scale_names)
+                scale_names.append(strings.add(entry["scale"]))
+            arrays["scale"].append(scale_index[entry["scale"]])
+            arrays["direction"].append(entry["direction"])
+        arrays["scale_start"].append(len(arrays["scale"]))
+
+    arrays["scale_names"] = scale_names
+    arrays["control_questions"].extend(data["control_questions"])
+    arrays["meta"].extend(strings.add(data[key]) for key in ("description", "source", "note"))
+    arrays["string_offsets"] = strings.offsets
+    arrays["strings"] = array("B", b"".join(strings.chunks))
+
+    body = bytearray()
+    directory = []
+    offset = HEADER.size
+    for name, _ in SECTIONS:
+        offset += -offset % ALIGN
+        chunk = arrays[name].tobytes()
+        body += bytes(offset - HEADER.size - len(body)) + chunk
+        directory += [offset, len(arrays[name])]
+        offset += len(chunk)
+    return HEADER.pack(MAGIC, len(data["questions"]), *directory) + bytes(body)
+
+
+class QuestionBank:
+    """Read-only, memory-mapped view of a compiled bank."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        if len(self._mm) < HEADER.size:
+            raise BankFormatError(f"{self.path} is not a compiled question bank")
+        magic, self.count, *directory = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise BankFormatError(f"{self.path} is not a compiled question bank")
+        for i, (name, code) in enumerate(SECTIONS):
+            offset, length = directory[2 * i], directory[2 * i + 1]
+            size = struct.calcsize(code)
+            if offset + length * size > len(self._mm):
+                raise BankFormatError(f"{self.path}: section {name} is truncated")
+            setattr(self, name, self._view[offset:offset + length * size].cast(code))
+
+    def close(self):
+        for name, _ in SECTIONS:
+            getattr(self, name).release()
+        self._view.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def string(self, index: int) -> str:
+        return bytes(self.strings[self.string_offsets[index]:self.string_offsets[index + 1]]).decode("utf-8")
+
+    def text(self, index: int, gender: str = "male") -> str:
+        return self.string((self.female if gender == "female" else self.male)[index])
+
+    def scales(self, index: int) -> List[dict]:
+        return [
+            {"scale": self.string(self.scale_names[self.scale[e]]), "direction": self.direction[e]}
+            for e in range(self.scale_start[index], self.scale_start[index + 1])
+        ]
+
+    def position(self, question_id: int) -> Optional[int]:
+        """Index of question ``question_id`` (ids are stored in ascending order)."""
+        index = bisect_left(self.ids, question_id)
+        return index if index < self.count and self.ids[index] == question_id else None
+
+    def question(self, index: int) -> dict:
+        return {
+            "id": self.ids[index],
+            "text_male": self.text(index, "male"),
+            "text_female": self.text(index, "female"),
+            "is_control": bool(self.is_control[index]),
+            "scales": self.scales(index),
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self.question(i) for i in range(self.count))
+
+    def questions_for_gender(self, gender: Optional[str] = None) -> List[dict]:
+        """Questions with a ``text`` field in the respondent's variant (SmilModule::getQuestionsForGender)."""
+        questions = list(self)
+        if gender is not None:
+            for q in questions:
+                q["text"] = q["text_male"] if gender == "male" else q["text_female"]
+        return questions
+
+    def to_dict(self) -> dict:
+        description, source, note = (self.string(i) for i in self.meta)
+        return {
+            "description": description,
+            "source": source,
+            "note": note,
+            "control_questions": list(self.control_questions),
+            "questions": list(self),
+        }
+
+
+def compiled_path(json_path: Path) -> Path:
+    return Path(json_path).with_suffix(".bin")
+
+
+def compile_bank(json_path: Path, output: Optional[Path] = None) -> Path:
+    """Compile ``json_path`` and verify the result decodes to the same bytes before installing it."""
+    json_path = Path(json_path)
+    output = Path(output) if output else compiled_path(json_path)
+    source = json_path.read_bytes()
+    data = json.loads(source)
+    compact = not source.startswith(b"{\n")
+    if dump_json(data, compact) != source:
+        raise BankFormatError(f"{json_path} is not in canonical form (json.dumps indent={JSON_INDENT} or compact)")
+
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.write_bytes(encode(data))
+    try:
+        with QuestionBank(tmp) as bank:
+            decoded = dump_json(bank.to_dict(), compact)
+        if decoded != source:
+            at = next((i for i, (a, b) in enumerate(zip(decoded, source)) if a != b), min(len(decoded), len(source)))
+            raise BankFormatError(f"compiled bank differs from {json_path.name} at byte {at}")
+        os.replace(tmp, output)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return output
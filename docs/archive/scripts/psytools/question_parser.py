@@ -0,0 +1,175 @@
+"""Streaming parser for numbered questionnaire items.
+
+Both the PDF path (extract-questions-from-pdf.py) and the text path
+(convert-txt-to-json.py) feed lines into :class:`QuestionParser`, which yields
+``(section, id, text)`` records as soon as an item is complete. Nothing but the
+current item is buffered, so memory stays flat for any document size.
+
+An item starts on a line beginning with ``<number>. `` and continues on the
+following lines until the next item, a section marker or (optionally) a blank
+line. Section markers such as "Мужской вариант" may appear anywhere in a line;
+the remainder of the line after the marker is parsed as usual. A marker can
+be limited to the section it closes, so an end marker of the female variant
+does not cut the male one short.
+
+Markers are compiled one pattern each. A literal pattern lets ``re`` use its
+fast prefix scan, while an IGNORECASE pattern is several times slower per
+line, so a marker written with ``(?i)`` is only searched in lines whose
+lowercased text contains its longest literal word (the line is lowercased
+once, and only when such a marker is configured).
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+ITEM_RE = re.compile(r"(\d{1,3})\.\s+(\S.*)")
+
+MALE_MARKER = r"(?i)Мужской в ?ариант"
+FEMALE_MARKER = r"(?i)Женский в ?ариант"
+
+Record = Tuple[Optional[str], int, str]
+_SWITCH = object()
+_ANY = object()  # a marker without a ``within`` section
+
+
+def _hint(pattern: re.Pattern) -> Optional[str]:
+    """Lowercased longest word of a case-insensitive pattern, ``None`` for case-sensitive ones."""
+    if not pattern.flags & re.IGNORECASE:
+        return None
+    words = re.findall(r"\w+", re.sub(r"\\.|\(\?\w+\)", " ", pattern.pattern))
+    return max(words, key=len).lower() if words else ""
+
+
+class QuestionParser:
+    """Line-driven item parser with precompiled item and section patterns.
+
+    Args:
+        markers: ``(section, regex)`` pairs or ``(section, regex, within)``
+            triples; a match switches the current section. A ``None`` section
+            stops collecting until the next marker. A triple's marker is only
+            looked for while ``within`` is the current section. Patterns are
+            case-sensitive unless they start with ``(?i)``.
+        initial: section for lines before the first marker (``None`` = skip).
+            If a marker for this section follows, those lines were a preamble
+            and are dropped instead; until then their items are held back.
+        max_id: drop items numbered above this (items below 1 are always dropped).
+        min_length: drop items whose text is shorter than this.
+        skip_prefixes: ignore stripped lines starting with any of these.
+        blank_line_ends_item: a blank line closes the current item.
+        collapse_whitespace: squeeze runs of whitespace inside the text to one
+            space; otherwise the stripped lines are only joined with a space.
+    """
+
+    def __init__(
+        self,
+        markers: Sequence[tuple] = (),
+        initial: Optional[str] = "",
+        max_id: Optional[int] = None,
+        min_length: int = 1,
+        skip_prefixes: Sequence[str] = (),
+        blank_line_ends_item: bool = False,
+        collapse_whitespace: bool = True,
+    ):
+        self.markers = []
+        for section, regex, *within in markers:
+            pattern = re.compile(regex)
+            self.markers.append((section, pattern, _hint(pattern), within[0] if within else _ANY))
+        self.initial = initial
+        self.max_id = max_id
+        self.min_length = min_length
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.blank_line_ends_item = blank_line_ends_item
+        self.collapse_whitespace = collapse_whitespace
+
+    def _finish(self, section, qid, parts) -> Optional[Record]:
+        if qid is None or section is None:
+            return None
+        text = " ".join(parts)
+        text = " ".join(text.split()) if self.collapse_whitespace else text.strip()
+        if qid < 1 or (self.max_id is not None and qid > self.max_id) or len(text) < self.min_length:
+            return None
+        return section, qid, text
+
+    def parse(self, lines: Iterable[str]) -> Iterator[Record]:
+        if self.initial is None or all(section != self.initial for section, _, _, _ in self.markers):
+            yield from self._parse(lines, False)
+            return
+        held: Optional[list] = []
+        for record in self._parse(lines, True):
+            if record[0] is _SWITCH:
+                if held is not None and record[1] != self.initial:
+                    yield from held
+                held = None
+            elif held is None:
+                yield record
+            else:
+                held.append(record)
+        if held:
+            yield from held
+
+    def _parse(self, lines: Iterable[str], announce: bool) -> Iterator[Record]:
+        section = self.initial
+        qid = None
+        parts: list = []
+        markers = self.markers
+        fold = any(hint is not None for _, _, hint, _ in markers)
+        skip_prefixes = self.skip_prefixes
+
+        for raw in lines:
+            while True:
+                switch_to = None
+                rest = None
+                first = None
+                lowered = raw.lower() if fold else raw
+                for marker_section, marker_re, hint, within in markers:
+                    if (within is not _ANY and within != section) or (hint is not None and hint not in lowered):
+                        continue
+                    found = marker_re.search(raw)
+                    if found is not None and (first is None or found.start() < first.start()):
+                        first, switch_to = found, marker_section
+                if first is not None:
+                    raw, rest = raw[:first.start()], raw[first.end():]
+
+                line = raw.strip()
+                if not line:
+                    if self.blank_line_ends_item and rest is None:
+                        record = self._finish(section, qid, parts)
+                        if record:
+                            yield record
+                        qid, parts = None, []
+                elif not (skip_prefixes and line.startswith(skip_prefixes)):
+                    item = ITEM_RE.match(line)
+                    if item:
+                        record = self._finish(section, qid, parts)
+                        if record:
+                            yield record
+                        qid, parts = int(item.group(1)), [item.group(2)]
+                    elif qid is not None:
+                        parts.append(line)
+
+                if rest is None:
+                    break
+                record = self._finish(section, qid, parts)
+                if record:
+                    yield record
+                if announce:
+                    yield _SWITCH, switch_to, ""
+                section, qid, parts = switch_to, None, []
+                raw = rest
+
+        record = self._finish(section, qid, parts)
+        if record:
+            yield record
+
+
+def iter_questions(lines: Iterable[str], **options) -> Iterator[Tuple[int, str]]:
+    """Yield ``(id, text)`` for every item in ``lines`` (no section markers)."""
+    for _, qid, text in QuestionParser(**options).parse(lines):
+        yield qid, text
+
+
+def iter_lines(pages: Iterable[str]) -> Iterator[str]:
+    """Lines of page texts, one page at a time."""
+    for page in pages:
+        yield from page.splitlines()
@@ -0,0 +1,251 @@
+"""Offline re-scoring of completed SMIL sessions after key or norm changes.
+
+The stored ``calculated_results`` of a session keep the scores of the key
+and norms in force when it was completed. This job recomputes the sections
+the scoring classes produce (:data:`SECTIONS`: raw, T and corrected
+scores, validity, additional scales and the indices) with the batch scorers
+of :class:`~psytools.scoring_bench.PythonScorer`, diffs them with the
+stored ones and writes the changed sessions back. A written session also
+gets the ``profile`` and ``interpretation`` SmilModule builds from those
+sections, rebuilt by :mod:`psytools.smil_profile`, so no stored result
+mixes new scores with an old profile; the other keys of the stored results
+(gender, answered count, ...) are kept.
+
+* **Streaming**: sessions are read by the keyset pages of
+  :func:`psytools.session_scan.pages`, so no cursor stays open across
+  writes.
+* **Batched writes**: the updates of a page are one ``executemany`` in one
+  transaction; ``dry_run`` only diffs.
+* **Checkpoints**: after each committed page the last id of the partition is
+  stored (with a fingerprint of the key and norm files) under
+  storage/cache/rescore, and a rerun continues from there.
+* **Workers**: each id range of :func:`psytools.session_scan.partitions`
+  is re-scored by its own process and connection.
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .additional_scales import NORMS_PATH as ADDITIONAL_NORMS_PATH
+from .answers import encode_sheets, strict_answer_code
+from .db import placeholder
+from .json_writer import file_hash
+from .paths import CACHE_DIR
+from .scoring_bench import QUESTIONS_PATH, PythonScorer
+from .session_scan import UPDATE, Database, Partition, decode_json, pages, plain_sheet, run_partitions
+from .smil_profile import build_profiles, interpretation
+from .smil_scoring import NORMS_PATH, SCALES, php_round
+
+CHECKPOINT_DIR = CACHE_DIR / "rescore"
+PAGE_SIZE = 2000
+SECTIONS = ("raw_scores", "t_scores", "corrected_scores", "validity", "additional_scores", "indices")
+
+
+@dataclass
+class Report:
+    scanned: int = 0
+    changed: int = 0
+    written: int = 0
+    unreadable: int = 0
+    pages: int = 0
+    sections: Dict[str, int] = field(default_factory=dict)
+    last_id: Optional[str] = None
+    done: bool = False
+    seconds: float = 0.0
+
+    def add(self, other: "Report"):
+        for name in ("scanned", "changed", "written", "unreadable", "pages"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for section, count in other.sections.items():
+            self.sections[section] = self.sections.get(section, 0) + count
+
+
+def fingerprint(paths: Sequence[Path] = (QUESTIONS_PATH, NORMS_PATH, ADDITIONAL_NORMS_PATH)) -> str:
+    return "-".join(file_hash(path) or "missing" for path in paths)
+
+
+class Rescorer:
+    """New score sections for pages of stored sessions."""
+
+    def __init__(self, scorer: Optional[PythonScorer] = None):
+        self.scorer = scorer or PythonScorer()
+
+    def sections(self, sheets: Sequence[Mapping], genders: Sequence) -> List[dict]:
+        answers, gender_codes = encode_sheets(sheets, genders)
+        # Sheets of plain 0/1/2 answers encode the same under PHP's strict
+        # comparisons; only the others are encoded a second time.
+        strict = answers.copy()
+        other = [row for row, sheet in enumerate(sheets) if not plain_sheet(sheet)]
+        if other:
+            strict[other] = encode_sheets([sheets[row] for row in other], [genders[row] for row in other],
+                                          code=strict_answer_code)[0]
+        scores = self.scorer.score(answers, gender_codes, strict)
+        results = self.scorer.as_dicts(scores, gender_codes)
+        profiles = build_profiles([result["t_scores"] for result in results])
+        for result, indices, profile in zip(results, indices_dicts(scores[0], scores[1]), profiles):
+            result["corrected_scores"] = result["t_scores"]
+            result["indices"] = indices
+            result["profile"] = profile
+            result["interpretation"] = interpretation(result["validity"], profile, indices)
+        return results
+
+
+def indices_dicts(raw: np.ndarray, t: np.ndarray) -> List[dict]:
+    """SmilModule::calculateIndices() arrays for raw and T-score matrices."""
+    column = {s: i for i, s in enumerate(SCALES)}
+    f, k = (raw[:, column[s]].astype(np.float64) for s in ("F", "K"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(k > 0, php_round(100 * f / k) / 100, 0)
+    anxiety = php_round(10 * (t[:, column["7"]] + t[:, column["2"]]) / 2) / 10
+    depression = php_round(10 * (t[:, column["2"]] + t[:, column["1"]]) / 2) / 10
+    fk = t[:, column["F"]] - t[:, column["K"]]
+    return [
+        {"FK_index": int(fk[i]), "FK_ratio": float(ratio[i]) if ratio[i] else 0,
+         "anxiety_index": float(anxiety[i]), "depression_index": float(depression[i])}
+        for i in range(len(t))
+    ]
+
+
+def changed_sections(old: Mapping, new: Mapping) -> List[str]:
+    return [section for section in SECTIONS if old.get(section) != new[section]]
+
+
+def section_diff(old, new):
+    """Differing keys of two score maps as ``{key: [old, new]}`` (other values: ``[old, new]``)."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        return {key: [old.get(key), new.get(key)] for key in new.keys() | old.keys() if old.get(key) != new.get(key)}
+    return [old, new]
+
+
+def checkpoint_path(directory: Path, slug: str, partition: Partition) -> Path:
+    return Path(directory) / f"{slug}-{partition.index + 1}-of-{partition.count}.json"
+
+
+def load_checkpoint(path: Path, stamp: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return state if state.get("fingerprint") == stamp else None
+
+
+def save_checkpoint(path: Path, state: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+@dataclass
+class Job:
+    database: Database
+    slug: str = "smil"
+    dry_run: bool = False
+    page_size: int = PAGE_SIZE
+    checkpoint_dir: Optional[Path] = CHECKPOINT_DIR
+    diff_dir: Optional[Path] = None
+    max_pages: Optional[int] = None  # stop a partition after this many pages (resumed by the next run)
+
+
+def rescore_partition(job: Job, partition: Partition) -> Report:
+    """Re-score one id range; resumes from and advances its checkpoint unless it is a dry run."""
+    started = time.perf_counter()
+    report = Report()
+    stamp = fingerprint()
+    checkpoint = None
+    if job.checkpoint_dir is not None and not job.dry_run:
+        checkpoint = checkpoint_path(job.checkpoint_dir, job.slug, partition)
+        state = load_checkpoint(checkpoint, stamp)
+        if state is not None:
+            known = {f.name for f in fields(Report)}
+            report = Report(**{**{k: v for k, v in state["report"].items() if k in known}, "seconds": 0.0})
+            if report.done:
+                return report
+    rescorer = Rescorer()
+    connection = job.database.connect()
+    diff = None
+    if job.diff_dir is not None:
+        Path(job.diff_dir).mkdir(parents=True, exist_ok=True)
+        diff = open(Path(job.diff_dir) / f"{job.slug}-{partition.index + 1}-of-{partition.count}.jsonl", "a",
+                    encoding="utf-8")
+    try:
+        for page_number, rows in enumerate(pages(connection, job.slug, partition, report.last_id, job.page_size)):
+            if job.max_pages is not None and page_number >= job.max_pages:
+                break
+            updates = _rescore_page(rescorer, rows, report, diff)
+            if updates and not job.dry_run:
+                cursor = connection.cursor()
+                try:
+                    cursor.executemany(UPDATE.format(mark=placeholder(connection)), updates)
+                finally:
+                    cursor.close()
+                connection.commit()
+                report.written += len(updates)
+            report.pages += 1
+            report.last_id = rows[-1][0]
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, {"fingerprint": stamp, "report": asdict(report)})
+        else:
+            report.done = True
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, {"fingerprint": stamp, "report": asdict(report)})
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+        if diff is not None:
+            diff.close()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def _rescore_page(rescorer: Rescorer, rows: Sequence[tuple], report: Report, diff) -> List[Tuple[str, str]]:
+    sessions = []
+    for session_id, answers, demographics, stored in rows:
+        try:
+            answers, demographics, stored = decode_json(answers), decode_json(demographics) or {}, decode_json(stored) or {}
+        except json.JSONDecodeError:
+            report.unreadable += 1
+            continue
+        if not isinstance(answers, dict) or not isinstance(stored, dict):
+            report.unreadable += 1
+            continue
+        # The web path merges the demographics into the answers before scoring.
+        gender = answers.get("gender") or (demographics.get("gender") if isinstance(demographics, dict) else None)
+        sessions.append((session_id, answers, gender, stored))
+    report.scanned += len(rows)
+    if not sessions:
+        return []
+    fresh = rescorer.sections([s[1] for s in sessions], [s[2] or "male" for s in sessions])
+    updates = []
+    for (session_id, _, _, stored), new in zip(sessions, fresh):
+        changed = changed_sections(stored, new)
+        if not changed:
+            continue
+        report.changed += 1
+        for section in changed:
+            report.sections[section] = report.sections.get(section, 0) + 1
+        if diff is not None:
+            record = {"id": session_id, **{s: section_diff(stored.get(s), new[s]) for s in changed}}
+            diff.write(json.dumps(record, ensure_ascii=False) + "\n")
+        updates.append((json.dumps({**stored, **new}, ensure_ascii=False), session_id))
+    return updates
+
+
+def rescore(job: Job, workers: int = 1) -> Report:
+    """Re-score every partition (one process each when ``workers`` > 1) and add up the reports."""
+    started = time.perf_counter()
+    reports = run_partitions(rescore_partition, job, workers)
+    total = Report(done=all(r.done for r in reports))
+    for report in reports:
+        total.add(report)
+    total.seconds = time.perf_counter() - started
+    return total
@@ -0,0 +1,243 @@
+"""Scoring benchmark: the Python batch scorer against the PHP calculators.
+
+A fixed corpus of SMIL sheets (:mod:`psytools.synthetic`, seeded, with a
+few sheets of every validity failure) is scored twice:
+
+* in Python by :class:`PythonScorer` (RawScorer over questions-566-full.json,
+  TScorer, ValidityAssessor codes and AdditionalScales), once as a whole
+  batch for throughput and sheet by sheet for latency;
+* in PHP by bin/score-smil-sheets.php through the local ``php`` CLI, which
+  runs RawScoreCalculator, TScoreCalculator, ValidityAssessor and
+  AdditionalScalesCalculator per sheet and reports each sheet's time.
+
+Latency covers scoring only (the sheet is already decoded on both sides).
+Both sides must produce the same result arrays; :func:`compare` lists the
+differences. Each run is appended to a JSON history and
+:func:`regressions` compares it with the median of the previous runs on the
+same corpus and host.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .additional_scales import AdditionalScales
+from .paths import CACHE_DIR, PROJECT_ROOT, SMIL_DIR
+from .smil_scoring import (
+    RawScorer,
+    TScorer,
+    as_dicts,
+    control_score,
+    count_unknown,
+    validity_codes,
+    validity_dicts,
+)
+from .synthetic import JsonlWriter, generate
+
+CORPUS_SIZE = 2000
+CORPUS_SEED = 17
+CORPUS_FAILURES = {"random": 0.02, "unknown": 0.02, "control": 0.02, "fake_good": 0.02}
+CORPUS_DIR = CACHE_DIR / "scoring-bench"
+HISTORY_PATH = PROJECT_ROOT / "storage" / "benchmarks" / "scoring-history.json"
+PHP_SHIM = PROJECT_ROOT / "bin" / "score-smil-sheets.php"
+QUESTIONS_PATH = SMIL_DIR / "questions-566-full.json"
+THRESHOLD = 0.2  # relative slowdown that counts as a regression
+BASELINE_RUNS = 5
+LATENCY_SAMPLE = 500
+
+
+@dataclass
+class Corpus:
+    seed: int
+    answers: np.ndarray  # (n, 566) uint8
+    genders: np.ndarray  # (n,) MALE/FEMALE
+    path: Path  # the sheets as JSONL, for the PHP side
+
+    @property
+    def size(self) -> int:
+        return len(self.genders)
+
+
+def build_corpus(size: int = CORPUS_SIZE, seed: int = CORPUS_SEED, directory: Path = CORPUS_DIR) -> Corpus:
+    """The seeded corpus.
+
+    Its JSONL is rewritten (atomically) on every call: a file left by an
+    older generator or key would otherwise be scored by PHP against the
+    arrays of the current one.
+    """
+    batches = list(generate("smil", size, seed=seed, failures=CORPUS_FAILURES))
+    path = Path(directory) / f"smil-{size}-{seed}.jsonl"
+    writer = JsonlWriter(path.with_name(path.name + ".tmp"))
+    for batch in batches:
+        writer.write(batch)
+    writer.close()
+    writer.path.replace(path)
+    return Corpus(seed, np.vstack([b.answers for b in batches]), np.concatenate([b.genders for b in batches]), path)
+
+
+class PythonScorer:
+    """The four PHP result arrays of :meth:`SmilModule::calculateResults` for a batch."""
+
+    def __init__(self, questions_path: Path = QUESTIONS_PATH):
+        with open(questions_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.raw = RawScorer.from_questions(data["questions"] if isinstance(data, dict) else data)
+        self.t = TScorer.from_norms_file()
+        self.additional = AdditionalScales.from_norms_file()
+
+    def score(self, answers: np.ndarray, genders: np.ndarray, strict: Optional[np.ndarray] = None):
+        """``(raw, t, codes, unknown, control, additional raw, additional t)`` matrices.
+
+        ``strict`` is the batch encoded with PHP's strict comparisons
+        (:func:`~psytools.answers.strict_answer_code`) for the additional
+        scales; sheets of plain integers encode the same either way.
+        """
+        raw = self.raw.score(answers, genders)
+        t = self.t.score(raw, genders)
+        unknown, control = count_unknown(answers), control_score(answers)
+        codes = validity_codes(t, unknown, control)
+        extra = self.additional.score(answers if strict is None else strict, genders)
+        return (raw, t, codes, unknown, control) + extra
+
+    def results(self, answers: np.ndarray, genders: np.ndarray, strict: Optional[np.ndarray] = None) -> List[dict]:
+        return self.as_dicts(self.score(answers, genders, strict), genders)
+
+    def as_dicts(self, scores: tuple, genders: np.ndarray) -> List[dict]:
+        """Result arrays of :meth:`score` matrices, one dict per sheet."""
+        raw, t, codes, unknown, control, extra_raw, extra_t = scores
+        return [
+            {"raw_scores": r, "t_scores": s, "validity": v, "additional_scores": a}
+            for r, s, v, a in zip(as_dicts(raw), as_dicts(t), validity_dicts(t, codes, unknown, control),
+                                  self.additional.as_dicts(extra_raw, extra_t, genders))
+        ]
+
+
+@dataclass
+class Timing:
+    sheets: int
+    seconds: float
+    latencies_ns: np.ndarray = field(repr=False)
+    wall_seconds: Optional[float] = None  # whole PHP process, startup and JSON included
+
+    def summary(self) -> Dict[str, float]:
+        p50, p95 = np.percentile(self.latencies_ns, [50, 95]) / 1e6
+        return {"p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4),
+                "sheets_per_sec": round(self.sheets / self.seconds, 1)}
+
+
+def time_python(scorer: PythonScorer, corpus: Corpus, latency_sample: int = LATENCY_SAMPLE) -> Timing:
+    """Batch throughput over the corpus, latency from one-sheet batches."""
+    scorer.score(corpus.answers[:1], corpus.genders[:1])  # warm-up
+    started = time.perf_counter()
+    scorer.score(corpus.answers, corpus.genders)
+    seconds = time.perf_counter() - started
+    latencies = []
+    for row in range(min(latency_sample, corpus.size)):
+        began = time.perf_counter_ns()
+        scorer.score(corpus.answers[row:row + 1], corpus.genders[row:row + 1])
+        latencies.append(time.perf_counter_ns() - began)
+    return Timing(corpus.size, seconds, np.array(latencies))
+
+
+def find_php(php: Optional[str] = None) -> Optional[str]:
+    return shutil.which(php or os.environ.get("PHP_BINARY", "php"))
+
+
+def run_php(corpus: Corpus, php: str, shim: Path = PHP_SHIM) -> tuple:
+    """``(results, timing)`` of the PHP calculators over the corpus JSONL."""
+    started = time.perf_counter()
+    completed = subprocess.run([php, str(shim), str(corpus.path)], capture_output=True, text=True,
+                               encoding="utf-8", check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{shim.name} exited with {completed.returncode}: {completed.stderr.strip()}")
+    results, latencies = [], []
+    for line in completed.stdout.splitlines():
+        if line.strip():
+            record = json.loads(line)
+            latencies.append(record.pop("ns"))
+            results.append(record)
+    latencies = np.array(latencies, dtype=np.int64)
+    # Throughput counts the calculators only, like the Python side.
+    seconds = max(latencies.sum() / 1e9, 1e-9)
+    return results, Timing(len(results), seconds, latencies, time.perf_counter() - started)
+
+
+def compare(expected: Sequence[Mapping], actual: Sequence[Mapping], limit: int = 5) -> List[str]:
+    """Differences between two lists of result arrays (at most ``limit`` sheets)."""
+    problems = []
+    if len(expected) != len(actual):
+        problems.append(f"{len(expected)} results vs {len(actual)}")
+    for row, (left, right) in enumerate(zip(expected, actual)):
+        fields = [name for name in left.keys() | right.keys() if left.get(name) != right.get(name)]
+        if fields:
+            problems.append(f"sheet {row + 1}: {', '.join(sorted(fields))}")
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def load_history(path: Path = HISTORY_PATH) -> List[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def save_history(history: List[dict], path: Path = HISTORY_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(history, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def history_entry(corpus: Corpus, results: Mapping[str, Dict[str, float]], match: Optional[bool]) -> dict:
+    return {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "host": platform.node(),
+        "corpus": {"size": corpus.size, "seed": corpus.seed},
+        "results": dict(results),
+        "match": match,
+    }
+
+
+def regressions(history: Sequence[Mapping], entry: Mapping, threshold: float = THRESHOLD,
+                runs: int = BASELINE_RUNS) -> List[str]:
+    """Metrics of ``entry`` worse than the median of the last ``runs`` comparable runs by more than ``threshold``."""
+    previous = [h for h in history if h is not entry and h.get("corpus") == entry["corpus"]
+                and h.get("host") == entry["host"]][-runs:]
+    found = []
+    for side, metrics in entry["results"].items():
+        baseline = [h["results"][side] for h in previous if side in h.get("results", {})]
+        if not baseline:
+            continue
+        for name, value in metrics.items():
+            reference = float(np.median([b[name] for b in baseline if name in b] or [np.nan]))
+            if not np.isfinite(reference) or reference <= 0:
+                continue
+            # Latencies regress upwards, throughput downwards.
+            change = value / reference - 1 if name.endswith("_ms") else 1 - value / reference
+            if change > threshold:
+                found.append(f"{side} {name}: {value:g} vs {reference:g} ({change:+.0%})")
+    return found
+
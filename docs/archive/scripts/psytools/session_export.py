@@ -0,0 +1,272 @@
+"""Streaming export of test_sessions into partitioned Parquet or Arrow files.
+
+Rows are read through one server-side cursor (see :func:`psytools.db.connect`)
+in ``batch_size`` chunks, ordered by test and creation time, and written to
+
+    <output>/<test slug>/<YYYY-MM>/part-0000.parquet
+
+one row group per chunk, starting a new part every ``rows_per_file`` rows.
+As the rows arrive grouped by partition only one file is open at a time,
+and memory holds a single chunk whatever the size of the table.
+
+Answer maps of tests listed in :data:`ANSWER_WIDTHS` are decoded into one
+uint8 column per question (``q1`` ... ``q566`` for SMIL) with the codes of
+:mod:`psytools.answers`; for other tests the answers stay a JSON string
+column. Demographics and calculated_results are kept as JSON strings.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from .answers import FEMALE, QUESTION_COUNT, encode_sheets
+from .db import placeholder
+from .paths import PROJECT_ROOT
+
+EXPORT_DIR = PROJECT_ROOT / "storage" / "exports" / "sessions"
+ANSWER_WIDTHS = {"smil": QUESTION_COUNT}
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+BATCH_SIZE = 5000
+ROWS_PER_FILE = 500_000
+
+QUERY = """
+    SELECT s.id, t.slug, s.status, s.retention_class, s.created_at, s.completed_at,
+           s.demographics, s.answers, s.calculated_results
+    FROM test_sessions s
+    JOIN tests t ON t.id = s.test_id
+    WHERE s.status IN ({statuses}){tests}
+    ORDER BY s.test_id, s.created_at, s.id
+"""
+
+COMMON_FIELDS = [
+    pa.field("id", pa.string()),
+    pa.field("status", pa.string()),
+    pa.field("retention_class", pa.string()),
+    pa.field("created_at", pa.timestamp("s")),
+    pa.field("completed_at", pa.timestamp("s")),
+    pa.field("demographics", pa.string()),
+    pa.field("calculated_results", pa.string()),
+]
+
+
+def answer_schema(slug: str) -> pa.Schema:
+    width = ANSWER_WIDTHS.get(slug)
+    if width is None:
+        return pa.schema(COMMON_FIELDS + [pa.field("answers", pa.string())])
+    questions = [pa.field(f"q{i}", pa.uint8()) for i in range(1, width + 1)]
+    return pa.schema(COMMON_FIELDS + [pa.field("gender", pa.string())] + questions)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    # PyMySQL returns datetimes, SQLite the "YYYY-MM-DD HH:MM:SS" text.
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _json_text(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8")
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _object(value) -> dict:
+    """Decoded JSON object column; NULL, JSON ``null`` and non-objects give ``{}``."""
+    if isinstance(value, (str, bytes, bytearray)):
+        value = json.loads(value)
+    return value if isinstance(value, dict) else {}
+
+
+def _month(created_at: Optional[datetime]) -> str:
+    return created_at.strftime("%Y-%m") if created_at else "unknown"
+
+
+def to_table(slug: str, rows: Sequence[tuple]) -> pa.Table:
+    """Arrow table of query rows that all belong to test ``slug``."""
+    ids, _, statuses, retention, created, completed, demographics, answers, results = zip(*rows)
+    columns = [
+        pa.array(ids, pa.string()),
+        pa.array(statuses, pa.string()),
+        pa.array(retention, pa.string()),
+        pa.array([_timestamp(v) for v in created], pa.timestamp("s")),
+        pa.array([_timestamp(v) for v in completed], pa.timestamp("s")),
+        pa.array([_json_text(v) for v in demographics], pa.string()),
+        pa.array([_json_text(v) for v in results], pa.string()),
+    ]
+    width = ANSWER_WIDTHS.get(slug)
+    if width is None:
+        columns.append(pa.array([_json_text(v) for v in answers], pa.string()))
+    else:
+        sheets = [_object(v) for v in answers]
+        genders = [s.get("gender") or _object(d).get("gender") for s, d in zip(sheets, demographics)]
+        matrix, gender_codes = encode_sheets(sheets, genders, width)
+        columns.append(pa.array(np.where(gender_codes == FEMALE, "female", "male"), pa.string()))
+        # Column-major copy so every question column is a contiguous slice.
+        matrix = np.asfortranarray(matrix)
+        columns.extend(pa.array(matrix[:, i]) for i in range(width))
+    return pa.Table.from_arrays(columns, schema=answer_schema(slug))
+
+
+@dataclass
+class ExportStats:
+    rows: int = 0
+    batches: int = 0
+    files: List[Path] = field(default_factory=list)
+    partitions: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+class PartitionWriter:
+    """Writes tables to ``<slug>/<month>/part-NNNN``, one open file at a time.
+
+    A partition is written to ``.staging/<slug>/<month>`` and only swapped
+    in for the previous export's directory once all its rows are written,
+    so an interrupted export leaves that partition as it was. Partitions
+    that receive no rows this time (e.g. a month whose sessions were all
+    deleted) keep their old parts.
+    """
+
+    def __init__(self, output_dir: Path, fmt: str = "parquet", rows_per_file: int = ROWS_PER_FILE):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.rows_per_file = rows_per_file
+        self.stats = ExportStats()
+        self._key = None
+        self._writer = None
+        self._names: List[str] = []
+        self._rows_in_file = 0
+
+    def _staging(self, key) -> Path:
+        return self.output_dir.joinpath(".staging", *key)
+
+    def _open(self, schema: pa.Schema):
+        name = f"part-{len(self._names):04d}{FORMATS[self.fmt]}"
+        path = self._staging(self._key) / name
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(path, schema)
+        self._names.append(name)
+        self._rows_in_file = 0
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _commit(self):
+        """Swap the finished partition in for the old one."""
+        self._close()
+        if self._key is None:
+            return
+        staged, final = self._staging(self._key), self.output_dir.joinpath(*self._key)
+        old = staged.with_name(staged.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        final.parent.mkdir(parents=True, exist_ok=True)
+        if final.exists():
+            os.replace(final, old)
+        os.replace(staged, final)
+        shutil.rmtree(old, ignore_errors=True)
+        self.stats.files.extend(final / name for name in self._names)
+        self._key = None
+
+    def write(self, slug: str, month: str, table: pa.Table):
+        key = (slug, month)
+        if key != self._key:
+            self._commit()
+            self._key, self._names = key, []
+            staged = self._staging(key)
+            shutil.rmtree(staged, ignore_errors=True)  # left by an interrupted run
+            staged.mkdir(parents=True)
+        offset = 0
+        while offset < table.num_rows:
+            if self._writer is not None and self._rows_in_file >= self.rows_per_file:
+                self._close()
+            if self._writer is None:
+                self._open(table.schema)
+            chunk = table.slice(offset, self.rows_per_file - self._rows_in_file)
+            self._writer.write_table(chunk)
+            self._rows_in_file += chunk.num_rows
+            offset += chunk.num_rows
+        label = f"{slug}/{month}"
+        self.stats.partitions[label] = self.stats.partitions.get(label, 0) + table.num_rows
+        self.stats.rows += table.num_rows
+
+    def close(self) -> ExportStats:
+        self._commit()
+        shutil.rmtree(self.output_dir / ".staging", ignore_errors=True)
+        return self.stats
+
+    def abort(self):
+        """Drop the partition being written, keeping its old parts and the partitions already swapped in."""
+        self._close()
+        self._key = None
+        shutil.rmtree(self.output_dir / ".staging", ignore_errors=True)
+
+
+def fetch_batches(connection, query: str, params: Sequence, batch_size: int) -> Iterator[List[tuple]]:
+    """Rows of ``query`` in lists of at most ``batch_size``, from one cursor."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, tuple(params))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def session_query(connection, statuses: Sequence[str], tests: Optional[Sequence[str]] = None):
+    mark = placeholder(connection)
+    test_filter = f" AND t.slug IN ({', '.join([mark] * len(tests))})" if tests else ""
+    query = QUERY.format(statuses=", ".join([mark] * len(statuses)), tests=test_filter)
+    return query, list(statuses) + list(tests or [])
+
+
+def export_sessions(
+    connection,
+    output_dir: Path = EXPORT_DIR,
+    statuses: Sequence[str] = ("completed",),
+    tests: Optional[Sequence[str]] = None,
+    fmt: str = "parquet",
+    batch_size: int = BATCH_SIZE,
+    rows_per_file: int = ROWS_PER_FILE,
+) -> ExportStats:
+    """Export the sessions with the given statuses (of the given test slugs) to ``output_dir``."""
+    started = time.perf_counter()
+    writer = PartitionWriter(output_dir, fmt, rows_per_file)
+    query, params = session_query(connection, statuses, tests)
+    try:
+        for rows in fetch_batches(connection, query, params, batch_size):
+            writer.stats.batches += 1
+            start = 0
+            # Split the chunk where the (slug, month) partition changes.
+            keys = [(row[1], _month(_timestamp(row[4]))) for row in rows]
+            for end in range(1, len(rows) + 1):
+                if end == len(rows) or keys[end] != keys[start]:
+                    slug, month = keys[start]
+                    writer.write(slug, month, to_table(slug, rows[start:end]))
+                    start = end
+    except BaseException:
+        writer.abort()
+        raise
+    stats = writer.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,241 @@
+"""Completed SMIL answer sheets, batch by batch, for the offline jobs.
+
+Two sources yield the same :class:`SheetBatch` records:
+
+* a database (MySQL, or an SQLite copy), read by id range with the keyset
+  pages of :func:`pages`; the answers JSON is encoded like the web path
+  scores it (gender from the answers, else the demographics);
+* a Parquet tree written by export-sessions.py or generate-sessions.py,
+  whose q1..q566 columns already hold the answer codes.
+
+Sessions generate-sessions.py marked as synthetic are skipped unless asked
+for; :class:`ScanCounts` tallies what was read and dropped.
+
+The database side is shared by every job that walks test_sessions
+(rescore, norms, careless flags):
+
+* **Keyset pages**: :func:`pages` reads ``id > last ORDER BY id LIMIT n``,
+  so a page costs the same wherever it is in the table and no cursor stays
+  open across writes.
+* **Partitions**: UUID ids are spread evenly over their first hex digit, so
+  :func:`partitions` cuts the id space there; :func:`run_partitions` runs a
+  job on each range in its own process (with its own connection, see
+  :class:`Database`) and returns the per-range results to add up.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional, Sequence, TypeVar
+
+import numpy as np
+
+from .answers import FEMALE, MALE, QUESTION_COUNT, encode_sheets, strict_answer_code
+from .db import connect, placeholder
+
+PAGE_SIZE = 5000
+HEX_DIGITS = "0123456789abcdef"
+
+PAGE_QUERY = """
+    SELECT s.id, s.answers, s.demographics, s.calculated_results
+    FROM test_sessions s
+    JOIN tests t ON t.id = s.test_id
+    WHERE t.slug = {mark} AND s.status = 'completed' AND s.id > {mark}{upper}
+    ORDER BY s.id
+    LIMIT {limit}
+"""
+# The write-back of the jobs that re-score or flag the scanned sessions.
+UPDATE = "UPDATE test_sessions SET calculated_results = {mark} WHERE id = {mark}"
+
+T = TypeVar("T")
+
+
+@dataclass
+class Database:
+    """How a worker opens its own connection: an SQLite file, else MySQL from .env."""
+
+    sqlite: Optional[str] = None
+
+    def connect(self):
+        if self.sqlite is not None:
+            import sqlite3
+
+            return sqlite3.connect(self.sqlite, timeout=60)
+        return connect()
+
+
+@dataclass
+class Partition:
+    index: int
+    count: int
+    low: str = ""  # ids > low
+    high: Optional[str] = None  # ids < high
+
+
+def partitions(count: int) -> List[Partition]:
+    """``count`` (at most 16) contiguous id ranges cut at first hex digits.
+
+    A range holds the ids above its lower digit and below the next cut, so
+    "4…" ids (all longer than "4") fall into the range starting at "4".
+    """
+    count = max(1, min(count, len(HEX_DIGITS)))
+    cuts = [HEX_DIGITS[len(HEX_DIGITS) * i // count] for i in range(1, count)]
+    bounds = [""] + cuts + [None]
+    return [Partition(i, count, bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+def run_tasks(function: Callable[[tuple], T], tasks: Sequence[tuple]) -> List[T]:
+    """``function`` over ``tasks``, one process per task when there are several."""
+    if len(tasks) <= 1:
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+        return list(pool.map(function, tasks))
+
+
+def _call(task: tuple):
+    function, *args = task
+    return function(*args)
+
+
+def run_partitions(function: Callable[..., T], job, workers: int = 1) -> List[T]:
+    """``function(job, partition)`` for each of ``workers`` id ranges; ``function`` must be module-level."""
+    return run_tasks(_call, [(function, job, partition) for partition in partitions(workers)])
+
+
+def fetch_page(connection, slug: str, after: str, high: Optional[str], limit: int) -> List[tuple]:
+    mark = placeholder(connection)
+    upper = f" AND s.id < {mark}" if high is not None else ""
+    params = [slug, after] + ([high] if high is not None else [])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(PAGE_QUERY.format(mark=mark, upper=upper, limit=int(limit)), params)
+        return list(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def pages(connection, slug: str, partition: Partition, after: Optional[str] = None,
+          page_size: int = PAGE_SIZE) -> Iterator[List[tuple]]:
+    """``(id, answers, demographics, calculated_results)`` rows of one id range, a page at a time."""
+    last = partition.low if after is None else after
+    while True:
+        rows = fetch_page(connection, slug, last, partition.high, page_size)
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def decode_json(value):
+    """A JSON column as read by PyMySQL (str or bytes) or SQLite, decoded; NULL gives None."""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def plain_sheet(sheet: Mapping) -> bool:
+    """Only 0/1/2 integer answers, which encode the same under PHP's strict comparisons."""
+    return all(type(value) is int and 0 <= value <= 2 for key, value in sheet.items() if key != "gender")
+
+
+@dataclass
+class ScanCounts:
+    scanned: int = 0
+    synthetic: int = 0
+    unreadable: int = 0
+
+    def add_counts(self, other: "ScanCounts"):
+        for name in ("scanned", "synthetic", "unreadable"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+@dataclass
+class SheetBatch:
+    answers: np.ndarray  # (sheets, 566) uint8 codes
+    genders: np.ndarray  # uint8 MALE / FEMALE
+    ages: List  # demographics "age" as stored (None when absent)
+    strict: Optional[np.ndarray] = None  # PHP strict-comparison encoding, when it differs
+    rows: Optional[List[int]] = None  # positions of the sheets among the decoded rows
+
+
+def decode_rows(rows: Iterable[tuple], counts: ScanCounts, include_synthetic: bool = False) -> Optional[SheetBatch]:
+    """Sheets of ``(answers, demographics)`` JSON pairs as stored in test_sessions."""
+    sheets, genders, ages, kept = [], [], [], []
+    for row, (answers, demographics) in enumerate(rows):
+        counts.scanned += 1
+        try:
+            answers, demographics = decode_json(answers), decode_json(demographics)
+        except json.JSONDecodeError:
+            counts.unreadable += 1
+            continue
+        if not isinstance(answers, dict):
+            counts.unreadable += 1
+            continue
+        demographics = demographics if isinstance(demographics, dict) else {}
+        if demographics.get("synthetic") and not include_synthetic:
+            counts.synthetic += 1
+            continue
+        sheets.append(answers)
+        genders.append(answers.get("gender") or demographics.get("gender") or "male")
+        ages.append(demographics.get("age", answers.get("age")))
+        kept.append(row)
+    if not sheets:
+        return None
+    answers, gender_codes = encode_sheets(sheets, genders)
+    strict = None
+    other = [row for row, sheet in enumerate(sheets) if not plain_sheet(sheet)]
+    if other:
+        strict = answers.copy()
+        strict[other] = encode_sheets([sheets[row] for row in other], [genders[row] for row in other],
+                                      code=strict_answer_code)[0]
+    return SheetBatch(answers, gender_codes, ages, strict, kept)
+
+
+def database_batches(database: Database, partition: Partition, counts: ScanCounts, page_size: int = PAGE_SIZE,
+                     include_synthetic: bool = False) -> Iterator[SheetBatch]:
+    """Completed SMIL sessions of one id range, a page at a time."""
+    connection = database.connect()
+    try:
+        for rows in pages(connection, "smil", partition, page_size=page_size):
+            batch = decode_rows(((answers, demographics) for _, answers, demographics, _ in rows),
+                                counts, include_synthetic)
+            if batch is not None:
+                yield batch
+    finally:
+        connection.close()
+
+
+def parquet_files(directory: Path) -> List[Path]:
+    """SMIL part files of an export-sessions.py (or generate-sessions.py) Parquet tree."""
+    return sorted(Path(directory).glob("smil/*/*.parquet"))
+
+
+def parquet_batches(files: Iterable[Path], counts: ScanCounts, page_size: int = PAGE_SIZE,
+                    include_synthetic: bool = False) -> Iterator[SheetBatch]:
+    """Completed sessions of some Parquet part files, a row batch at a time."""
+    import pyarrow.parquet as pq
+
+    questions = [f"q{i}" for i in range(1, QUESTION_COUNT + 1)]
+    for path in files:
+        batches = pq.ParquetFile(path).iter_batches(batch_size=page_size,
+                                                    columns=["status", "gender", "demographics"] + questions)
+        for batch in batches:
+            completed = batch.column("status").to_numpy(zero_copy_only=False) == "completed"
+            demographics = [decode_json(d) or {} for d in batch.column("demographics").to_pylist()]
+            demographics = [d if isinstance(d, dict) else {} for d in demographics]
+            synthetic = np.array([bool(d.get("synthetic")) for d in demographics])
+            counts.scanned += batch.num_rows
+            keep = completed & (include_synthetic | ~synthetic)
+            counts.synthetic += int(np.count_nonzero(completed & synthetic & ~keep))
+            if not keep.any():
+                continue
+            answers = np.column_stack([batch.column(q).to_numpy(zero_copy_only=False)
+                                       for q in questions]).astype(np.uint8)[keep]
+            female = batch.column("gender").to_numpy(zero_copy_only=False) == "female"
+            genders = np.where(female, FEMALE, MALE).astype(np.uint8)[keep]
+            ages = [d.get("age") for d, kept in zip(demographics, keep) if kept]
+            yield SheetBatch(answers, genders, ages)
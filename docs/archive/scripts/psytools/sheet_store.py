@@ -0,0 +1,129 @@
+"""Packed SMIL answer sheets in an append-only, memory-mapped file.
+
+An answer code (NO, YES, UNKNOWN or MISSING, see :mod:`psytools.answers`)
+fits in two bits, so a 566-answer sheet packs into 142 bytes against the
+4–10 KB of its ``test_sessions.answers`` JSON. Four answers share a byte,
+the first in the low bits; :func:`unpack` expands whole matrices through a
+256-entry table of the four codes of every byte value as one uint32, with
+no per-sheet work in Python.
+
+The store is a single file (little-endian)::
+
+    header   8s magic, uint32 question count, uint32 record size
+    records  36s session id, uint8 gender, int64 created_at (Unix seconds,
+             0 when unknown), packed answers
+
+Records are only ever appended. A reader maps the complete records with
+``numpy.memmap``, so opening costs nothing and a scan reads only the pages
+it touches; a record torn by an interrupted append is ignored and
+overwritten by the next one.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .answers import QUESTION_COUNT
+
+MAGIC = b"PSYSHT01"
+HEADER = struct.Struct("<8sII")
+ID_SIZE = 36  # CHAR(36) UUID of test_sessions.id
+
+
+def packed_size(question_count: int = QUESTION_COUNT) -> int:
+    return (question_count + 3) // 4
+
+
+def record_dtype(question_count: int = QUESTION_COUNT) -> np.dtype:
+    return np.dtype([("id", f"S{ID_SIZE}"), ("gender", "u1"), ("created", "<i8"),
+                     ("answers", "u1", (packed_size(question_count),))])
+
+
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+# Entry b holds the four codes packed into byte b, in memory order.
+_UNPACK = ((np.arange(256, dtype=np.uint8)[:, None] >> _SHIFTS) & 3).astype(np.uint8).view("<u4").ravel()
+
+
+def pack(answers: np.ndarray) -> np.ndarray:
+    """``(sheets, questions)`` answer codes to ``(sheets, packed_size)`` bytes."""
+    n, q = answers.shape
+    padded = np.zeros((n, packed_size(q) * 4), dtype=np.uint8)
+    padded[:, :q] = answers
+    quads = padded.reshape(n, -1, 4) << _SHIFTS
+    return np.bitwise_or.reduce(quads, axis=2)
+
+
+def unpack(packed: np.ndarray, question_count: int = QUESTION_COUNT) -> np.ndarray:
+    """Inverse of :func:`pack`: a ``(sheets, question_count)`` uint8 matrix."""
+    quads = _UNPACK.take(np.ascontiguousarray(packed))
+    return quads.view(np.uint8).reshape(len(packed), -1)[:, :question_count]
+
+
+class SheetStore:
+    """An append-only file of packed sheets; created with its header on first use."""
+
+    def __init__(self, path: Path, question_count: int = QUESTION_COUNT):
+        self.path = Path(path)
+        self.question_count = question_count
+        self.dtype = record_dtype(question_count)
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, question_count, self.dtype.itemsize))
+            return
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a sheet store")
+        _, stored_count, record_size = HEADER.unpack(header)
+        if (stored_count, record_size) != (question_count, self.dtype.itemsize):
+            raise ValueError(f"{self.path} holds {stored_count}-answer sheets, expected {question_count}")
+
+    def __len__(self) -> int:
+        return (self.path.stat().st_size - HEADER.size) // self.dtype.itemsize
+
+    def append(self, ids: Sequence[str], genders: np.ndarray, answers: np.ndarray,
+               created: Optional[np.ndarray] = None) -> int:
+        """Append sheets (``created`` as datetime64 or Unix seconds); returns the new record count."""
+        n = len(answers)
+        if answers.shape[1:] != (self.question_count,) or len(ids) != n or len(genders) != n:
+            raise ValueError(f"expected {n} ids, genders and {self.question_count}-answer sheets")
+        records = np.zeros(n, dtype=self.dtype)
+        records["id"] = [i.encode("ascii") if isinstance(i, str) else i for i in ids]
+        records["gender"] = genders
+        if created is not None:
+            created = np.asarray(created)
+            if np.issubdtype(created.dtype, np.datetime64):
+                created = created.astype("datetime64[s]").astype(np.int64)
+            records["created"] = created
+        records["answers"] = pack(answers)
+        count = len(self)
+        with open(self.path, "r+b") as f:
+            # Drops the torn tail of an interrupted append, if any.
+            f.seek(HEADER.size + count * self.dtype.itemsize)
+            f.write(records.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        return count + n
+
+    def records(self) -> np.ndarray:
+        """Read-only memory map of the complete records (a structured array)."""
+        count = len(self)
+        if not count:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+    def answers(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        return unpack(self.records()["answers"][start:stop], self.question_count)
+
+    def batches(self, size: int = 65536) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """``(records, answers)`` of consecutive slices: the raw records and their unpacked sheets."""
+        records = self.records()
+        for start in range(0, len(records), size):
+            chunk = records[start:start + size]
+            yield chunk, unpack(chunk["answers"], self.question_count)
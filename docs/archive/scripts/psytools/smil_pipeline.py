@@ -0,0 +1,100 @@
+"""The SMIL question bank build as a :class:`~psytools.pipeline.Pipeline`.
+
+    source/qw.txt ─ convert ─> questions-566-gender.json ─ clean (in place, also reruns on a new lexicon)
+    questions-566-gender.json + questions-566-correct.json ─ merge ─> questions-566-full.json
+    mmpi-key-solomin.json + questions-566-full.json ─ apply-key (in place)
+    questions-566-full.json ─ compile ─> questions-566-full.bin
+
+The same steps as convert-txt-to-json.py, clean-questions-text.py,
+merge-question-data.py and apply-mmpi-key.py, writing the same files, but
+each question is rebuilt only when its own inputs (texts, key entries)
+changed and a file is rewritten only when its content changed.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from .json_writer import file_hash, write_json
+from .lexicon import shared_lexicon
+from .paths import SMIL_DIR, SOURCE_DIR
+from .pipeline import DEFAULT_STATE, Pipeline, Step, StepContext, load_json
+from .question_bank import compile_bank, compiled_path
+from .smil_records import (
+    GENDER_DESCRIPTION,
+    KEYED_DESCRIPTION,
+    MERGED_DESCRIPTION,
+    apply_key_record,
+    clean_record,
+    gender_record,
+    merge_record,
+    parse_txt,
+)
+
+QUESTION_COUNT = 566
+
+
+def lexicon_version(lexicon) -> str:
+    """Hash of the lexicon's index file, so added word lists count too (source digest for in-memory ones)."""
+    path = getattr(lexicon, "path", None)
+    return file_hash(path) if path is not None else getattr(lexicon, "digest", b"").hex()
+
+
+def smil_steps(smil_dir: Path = SMIL_DIR, source_dir: Path = SOURCE_DIR, lexicon_loader=shared_lexicon) -> List[Step]:
+    txt_path = Path(source_dir) / "qw.txt"
+    gender_path = Path(smil_dir) / "questions-566-gender.json"
+    correct_path = Path(smil_dir) / "questions-566-correct.json"
+    full_path = Path(smil_dir) / "questions-566-full.json"
+    key_path = Path(smil_dir) / "Scoring" / "keys" / "mmpi-key-solomin.json"
+
+    def convert(ctx: StepContext):
+        with open(txt_path, encoding="utf-8") as f:
+            male, female = parse_txt(f)
+        records = (gender_record(q_id, male.get(q_id, ""), female.get(q_id, "")) for q_id in range(1, QUESTION_COUNT + 1))
+        write_json(gender_path, {**GENDER_DESCRIPTION, "questions": [r for r in records if r]}, indent=4)
+
+    def clean(ctx: StepContext):
+        data = load_json(gender_path)
+        lexicon = lexicon_loader()
+        # Cleaned texts depend on the lexicon, so its version is part of each record's key.
+        version = lexicon_version(lexicon)
+        data["questions"] = ctx.map_records(
+            data["questions"],
+            key=lambda q: (q, version),
+            transform=lambda q: clean_record(q, lexicon),
+        )
+        write_json(gender_path, data, indent=4)
+
+    def merge(ctx: StepContext):
+        gender = load_json(gender_path)
+        correct = load_json(correct_path)["questions"]
+        pairs = [(q, correct[i] if i < len(correct) else {}) for i, q in enumerate(gender["questions"])]
+        questions = ctx.map_records(pairs, key=lambda pair: pair, transform=lambda pair: merge_record(*pair))
+        write_json(full_path, {
+            **MERGED_DESCRIPTION,
+            "control_questions": gender.get("control_questions", []),
+            "questions": questions,
+        }, indent=4)
+
+    def apply_key(ctx: StepContext):
+        key_items = load_json(key_path)["items"]
+        data = load_json(full_path)
+        data["questions"] = ctx.map_records(
+            data["questions"],
+            key=lambda q: (q, key_items.get(str(q["id"]))),
+            transform=lambda q: apply_key_record(q, key_items),
+        )
+        data.update(KEYED_DESCRIPTION)
+        write_json(full_path, data, indent=2)
+
+    return [
+        Step("convert", [txt_path], [gender_path], convert),
+        Step("clean", [gender_path], [gender_path], clean, stamp=lambda: lexicon_version(lexicon_loader())),
+        Step("merge", [gender_path, correct_path], [full_path], merge),
+        Step("apply-key", [key_path, full_path], [full_path], apply_key),
+        Step("compile", [full_path], [compiled_path(full_path)], lambda ctx: compile_bank(full_path)),
+    ]
+
+
+def smil_pipeline(state_path: Path = DEFAULT_STATE, **options) -> Pipeline:
+    return Pipeline(smil_steps(**options), state_path)
@@ -0,0 +1,221 @@
+"""SmilModule's profile and interpretation arrays, for results scored offline.
+
+A session's ``calculated_results`` carry, next to the scores, the
+``profile`` of SmilModule::buildProfile() and the ``interpretation`` that
+TestController stores from SmilModule::generateInterpretation(). Both are
+functions of the T-scores, the validity and the indices, so a job that
+re-scores sessions rebuilds them here instead of leaving stale texts next
+to new scores. The texts are SmilModule's constants (SCALE_NAMES,
+THRESHOLDS, INTERPRETATIONS, PROFILE_TYPES); test_rescore.py checks them
+against SmilModule.php. Profile and code types come from the vectorised
+ports in :mod:`psytools.cohort_index`.
+"""
+from __future__ import annotations
+
+from typing import List, Mapping, Sequence
+
+import numpy as np
+
+from .cohort_index import CLINICAL, code_types, profile_types
+
+SCALE_NAMES = {
+    "L": "Шкала лжи",
+    "F": "Шкала достоверности",
+    "K": "Коррекционная шкала",
+    "1": "Ипохондрия (Hs)",
+    "2": "Депрессия (D)",
+    "3": "Истерия (Hy)",
+    "4": "Психопатия (Pd)",
+    "5": "Маскулинность-фемининность (Mf)",
+    "6": "Паранойя (Pa)",
+    "7": "Психастения (Pt)",
+    "8": "Шизофрения (Sc)",
+    "9": "Гипомания (Ma)",
+    "0": "Интроверсия (Si)",
+}
+
+# (level, min, max) in SmilModule::THRESHOLDS order
+THRESHOLDS = (
+    ("low", 0, 44),
+    ("normal", 45, 54),
+    ("elevated", 55, 64),
+    ("high", 65, 74),
+    ("very_high", 75, 100),
+)
+
+INTERPRETATIONS = {
+    "L": {
+        "low": "Низкая социальная желательность, искренность",
+        "normal": "Умеренная социальная желательность",
+        "elevated": "Стремление представить себя в лучшем свете",
+        "high": "Высокая социальная желательность, возможная неискренность",
+        "very_high": "Очень высокая социальная желательность, результаты недостоверны",
+    },
+    "F": {
+        "low": "Осторожные ответы, возможная скрытность",
+        "normal": "Достоверные ответы",
+        "elevated": "Возможное преувеличение проблем",
+        "high": "Выраженное преувеличение проблем или непонимание вопросов",
+        "very_high": "Результаты недостоверны, случайные ответы",
+    },
+    "K": {
+        "low": "Открытость, самокритичность",
+        "normal": "Умеренная защитная позиция",
+        "elevated": "Защитная позиция, стремление скрыть проблемы",
+        "high": "Высокая психологическая защита",
+        "very_high": "Очень высокая защита, результаты могут быть занижены",
+    },
+    "1": {
+        "low": "Оптимизм, отсутствие ипохондрических тенденций",
+        "normal": "Нормальный уровень заботы о здоровье",
+        "elevated": "Повышенное внимание к здоровью, возможны соматические жалобы",
+        "high": "Выраженные ипохондрические тенденции",
+        "very_high": "Сильная фиксация на здоровье, множественные жалобы",
+    },
+    "2": {
+        "low": "Приподнятое настроение, оптимизм",
+        "normal": "Нормальное эмоциональное состояние",
+        "elevated": "Сниженное настроение, пессимизм",
+        "high": "Выраженная депрессия, чувство вины",
+        "very_high": "Глубокая депрессия, возможна суицидальная опасность",
+    },
+    "3": {
+        "low": "Критичность к себе, реализм",
+        "normal": "Умеренная эмоциональность",
+        "elevated": "Демонстративность, стремление к вниманию",
+        "high": "Выраженная истероидность, конверсионные реакции",
+        "very_high": "Сильная истероидная акцентуация",
+    },
+    "4": {
+        "low": "Высокий самоконтроль, конформность",
+        "normal": "Умеренная импульсивность",
+        "elevated": "Импульсивность, склонность к риску",
+        "high": "Выраженная антисоциальность, конфликтность",
+        "very_high": "Сильная тенденция к нарушению норм",
+    },
+    "5": {
+        "low": "Традиционные гендерные роли",
+        "normal": "Умеренные интересы",
+        "elevated": "Нетрадиционные интересы для пола",
+        "high": "Выраженная фемининность (у мужчин) / маскулинность (у женщин)",
+        "very_high": "Очень выраженные противоположные полу черты",
+    },
+    "6": {
+        "low": "Доверчивость, наивность",
+        "normal": "Умеренная критичность",
+        "elevated": "Подозрительность, чувствительность к критике",
+        "high": "Выраженная паранойяльность, ригидность",
+        "very_high": "Сильная подозрительность, возможны бредовые идеи",
+    },
+    "7": {
+        "low": "Спокойствие, уверенность",
+        "normal": "Умеренная тревожность",
+        "elevated": "Повышенная тревожность, неуверенность",
+        "high": "Выраженная тревога, навязчивости",
+        "very_high": "Сильная тревожность, возможны фобии",
+    },
+    "8": {
+        "low": "Конкретность мышления, практичность",
+        "normal": "Умеренная рефлексия",
+        "elevated": "Своеобразие мышления, богатое воображение",
+        "high": "Выраженные шизоидные черты, аутизация",
+        "very_high": "Сильное своеобразие мышления, возможна дезорганизация",
+    },
+    "9": {
+        "low": "Спокойствие, низкая активность",
+        "normal": "Умеренная энергичность",
+        "elevated": "Повышенная активность, импульсивность",
+        "high": "Выраженная гипомания, расторможенность",
+        "very_high": "Сильное возбуждение, возможна агрессия",
+    },
+    "0": {
+        "low": "Экстраверсия, общительность",
+        "normal": "Умеренная интроверсия/экстраверсия",
+        "elevated": "Выраженная интроверсия, замкнутость",
+        "high": "Сильная интроверсия, социальная изоляция",
+        "very_high": "Очень сильная интроверсия, аутизация",
+    },
+}
+
+PROFILE_TYPES = {
+    "normosthenic": "Профиль находится в пределах нормы. Выраженных акцентуаций не выявлено.",
+    "neurotic": "Выявлены черты невротического стиля реагирования. Характерны эмоциональная неустойчивость, "
+                "повышенная тревожность.",
+    "psychotic": "Обнаружены особенности, характерные для шизоидного спектра. Может наблюдаться своеобразие "
+                 "мышления, склонность к интроверсии.",
+    "personal_deviation": "Выявлены черты личностной девиации. Возможны трудности социальной адаптации, "
+                          "импульсивность.",
+    "mixed": "Профиль смешанного типа. Сочетание различных акцентуированных черт.",
+}
+
+TYPE_RECOMMENDATIONS = {
+    "neurotic": ["Рекомендуется консультация психолога для работы с тревожностью",
+                 "Полезны техники релаксации и стресс-менеджмента"],
+    "psychotic": ["Рекомендуется углубленная диагностика у специалиста",
+                  "Важно учитывать особенности мышления и коммуникации"],
+    "personal_deviation": ["Полезна работа над социальной адаптацией",
+                           "Рекомендуется развитие навыков самоконтроля"],
+}
+
+
+def score_level(score: float) -> str:
+    """SmilModule::getScoreLevel()."""
+    if score >= 75:
+        return "very_high"
+    for level, low, high in THRESHOLDS:
+        if low <= score <= high:
+            return level
+    return "low"
+
+
+def build_profiles(t_scores: Sequence[Mapping]) -> List[dict]:
+    """SmilModule::buildProfile() of T-score maps in the scorers' scale order."""
+    if not t_scores:
+        return []
+    t = np.array([[scores[s] for s in CLINICAL] for scores in t_scores], dtype=np.float64)
+    profiles = []
+    for scores, profile_type, code_type in zip(t_scores, profile_types(t), code_types(t)):
+        scales = {}
+        for scale in CLINICAL:
+            level = score_level(scores[scale])
+            scales[scale] = {"score": scores[scale], "level": level,
+                             "interpretation": INTERPRETATIONS[scale][level], "name": SCALE_NAMES[scale]}
+        dominant = sorted(scales.values(), key=lambda entry: -entry["score"])[:3]
+        profiles.append({"scales": scales, "dominant": dominant,
+                         "profile_type": str(profile_type), "code_type": str(code_type)})
+    return profiles
+
+
+def interpretation(validity: Mapping, profile: Mapping, indices: Mapping) -> dict:
+    """SmilModule::generateInterpretation() of one session's sections."""
+    if not validity.get("is_valid"):
+        return {
+            "summary": "Результаты недостоверны",
+            "warning": "Внимание: результаты тестирования могут быть недостоверны. "
+                       + "; ".join(validity.get("warnings") or []),
+            "scales": [],
+            "recommendations": [
+                "Пройти тестирование повторно, отвечая более искренне",
+                "Обратиться к специалисту для очной диагностики",
+            ],
+        }
+    profile_type = profile.get("profile_type", "unknown")
+    code_type = profile.get("code_type", "")
+    description = PROFILE_TYPES.get(profile_type, "Требуется профессиональная интерпретация.")
+    scales = {scale: {"name": data["name"], "score": data["score"], "level": data["level"],
+                      "description": data["interpretation"]}
+              for scale, data in profile.get("scales", {}).items()}
+    recommendations = ["Результаты тестирования носят ознакомительный характер"]
+    recommendations += TYPE_RECOMMENDATIONS.get(profile_type, [])
+    if any(data["level"] in ("high", "very_high") for data in profile.get("scales", {}).values()):
+        recommendations.append("При наличии жалоб рекомендуется очная консультация специалиста")
+    return {
+        "summary": f"Код профиля: {code_type}. {description}",
+        "validity": validity,
+        "profile_type": profile_type,
+        "code_type": code_type,
+        "scales": scales,
+        "recommendations": recommendations,
+        "dominant_scales": profile.get("dominant", []),
+        "indices": indices,
+    }
@@ -0,0 +1,128 @@
+"""Per-question transformations of the SMIL question bank build.
+
+Each ingestion script applies one of these to every question; the pipeline
+(see :mod:`psytools.smil_pipeline`) applies them only to questions whose
+inputs changed.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Mapping, Optional, Tuple
+
+from .question_parser import FEMALE_MARKER, MALE_MARKER, QuestionParser, iter_lines
+from .text_normalizer import Lexicon, normalize
+
+# Контрольные вопросы (27 штук)
+CONTROL_QUESTIONS = [
+    14, 33, 48, 63, 66, 69, 121, 123, 133, 151, 168, 182, 184, 197, 200, 205,
+    266, 275, 293, 334, 349, 350, 462, 464, 474, 542, 551
+]
+
+# Маркеры вариантов и строки-цитаты source/qw.txt, которые не относятся к вопросам
+TXT_MARKERS = [("male", r"(?i)Мужской вариант\."), ("female", r"(?i)Женский вариант\.")]
+TXT_SKIP_PREFIXES = ('"', 'Джордж')
+
+# Маркеры секций sob-01.pdf: мужской и женский варианты, затем конец вопросника.
+# Маркеры вариантов не различают регистр, маркеры конца различают, поэтому
+# слово в тексте утверждения ("обработка", "включиться") не обрывает разбор.
+# Как и раньше, маркеры конца закрывают только женский вариант.
+PDF_MARKERS = [
+    ("male", MALE_MARKER),
+    ("female", FEMALE_MARKER),
+    (None, "Ключи", "female"),
+    (None, "Обработка", "female"),
+    (None, "Интерпретация", "female"),
+]
+
+GENDER_DESCRIPTION = {
+    "description": "566 вопросов СМИЛ (MMPI) с гендерными вариантами - адаптация Л.Н. Собчик",
+    "source": "source/metod/sob-01.pdf -> source/qw.txt",
+    "note": "Каждый вопрос имеет: id, text_male, text_female, is_control. Для большинства вопросов текст идентичен, но есть гендерные различия.",
+    "control_questions_info": "27 контрольных вопросов - при инструкции 'Обведите номер данного утверждения кружочком' респондент должен ответить 'Да'",
+    "control_questions": CONTROL_QUESTIONS,
+}
+
+MERGED_DESCRIPTION = {
+    "description": "566 вопросов СМИЛ (MMPI) - полная версия",
+    "source": "Объединение questions-566-gender.json и questions-566-correct.json",
+    "note": "Содержит: text_male, text_female, scale, direction, is_control",
+}
+
+KEYED_DESCRIPTION = {
+    "description": "566 вопросов СМИЛ (MMPI) — multi-scale ключи по Соломину",
+    "source": "Ключ: И.Л. Соломин, Личностный опросник MMPI, стр. 63-68",
+    "note": "Формат scales (массив scale/direction). Тексты вопросов без изменений.",
+}
+
+
+def parse_txt(lines: Iterable[str]) -> Tuple[dict, dict]:
+    """Male and female ``{id: text}`` of source/qw.txt.
+
+    Text before the "Мужской вариант." marker is skipped; without that marker
+    everything before "Женский вариант." counts as the male section. Lines are
+    stripped and joined with a space, inner whitespace is kept as in the file.
+    """
+    parser = QuestionParser(markers=TXT_MARKERS, initial="male", skip_prefixes=TXT_SKIP_PREFIXES,
+                            collapse_whitespace=False)
+    sections: dict = {"male": {}, "female": {}}
+    for section, q_id, text in parser.parse(lines):
+        sections[section][q_id] = text
+    return sections["male"], sections["female"]
+
+
+def parse_pdf_pages(pages: Iterable[str]) -> Tuple[dict, dict]:
+    """Male and female ``{id: text}`` of the questionnaire pages of sob-01.pdf.
+
+    Only items 1-566 longer than 10 characters are kept.
+    """
+    parser = QuestionParser(markers=PDF_MARKERS, initial=None, max_id=566, min_length=11,
+                            blank_line_ends_item=True)
+    sections: dict = {"male": {}, "female": {}}
+    for section, q_id, text in parser.parse(iter_lines(pages)):
+        sections[section][q_id] = text
+    return sections["male"], sections["female"]
+
+
+def gender_record(q_id: int, male_text: str, female_text: str) -> Optional[dict]:
+    """Question of questions-566-gender.json; a missing variant falls back to the other one."""
+    male_text = male_text or female_text
+    female_text = female_text or male_text
+    if not male_text:
+        return None
+    return {
+        "id": q_id,
+        "text_male": male_text,
+        "text_female": female_text,
+        "is_control": q_id in CONTROL_QUESTIONS,
+    }
+
+
+def clean_record(question: dict, lexicon: Optional[Lexicon]) -> dict:
+    """Question with both text variants passed through the PDF artifact normaliser."""
+    return {
+        **question,
+        "text_male": normalize(question["text_male"], lexicon),
+        "text_female": normalize(question["text_female"], lexicon),
+    }
+
+
+def merge_record(gender_q: dict, correct_q: Mapping) -> dict:
+    """Question of questions-566-full.json before the multi-scale key is applied."""
+    return {
+        "id": gender_q["id"],
+        "text_male": gender_q["text_male"],
+        "text_female": gender_q["text_female"],
+        "scale": correct_q.get("scale"),
+        "direction": correct_q.get("direction", 1),
+        "is_control": gender_q.get("is_control", False),
+    }
+
+
+def apply_key_record(question: dict, key_items: Mapping[str, list]) -> dict:
+    """Question with the legacy scale/direction replaced by its multi-scale key entries.
+
+    An existing ``scales`` entry keeps its position, so re-applying a key
+    leaves the field order of the bank unchanged.
+    """
+    keyed = {k: v for k, v in question.items() if k not in ("scale", "direction")}
+    keyed["scales"] = key_items.get(str(question["id"]), [])
+    return keyed
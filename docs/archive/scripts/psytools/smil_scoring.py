@@ -0,0 +1,255 @@
+"""Vectorised SMIL scoring: batch counterparts of the PHP Scoring classes.
+
+Raw scores (RawScoreCalculator): the key becomes one dense weight matrix
+with a row per (question, answer) pair, YES rows first and NO rows second,
+and a column per scale, plus separate columns for the gender-specific 5M
+and 5F items. A batch of sheets is turned into the matching 0/1 indicator
+matrix, ``[answers == YES | answers == NO]``, so UNKNOWN and MISSING answers
+drop out, and a single matrix product scores every sheet on every column.
+Scale 5 is then its own column (entries keyed plain "5" count for both
+genders, as in PHP) plus the 5M or 5F column by each sheet's gender.
+
+T-scores (TScoreCalculator): the K-correction depends only on K and the
+T-score only on (gender, scale, corrected raw score), so both are computed
+once per distinct value into small tables (PHP rounding, 20..100 clamp
+included) and the batch is scored with two gathers.
+
+Validity (ValidityAssessor): each warning is a bit in a uint16 code per
+sheet; :data:`INVALID_FLAGS` are the ones that make a protocol invalid, and
+:func:`validity_dicts` expands codes into the PHP result arrays.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+from .answers import FEMALE, NO, QUESTION_COUNT, UNKNOWN, YES
+from .paths import SMIL_DIR
+from .smil_records import CONTROL_QUESTIONS
+
+SCALES = ("L", "F", "K", "1", "2", "3", "4", "5", "6", "7", "8", "9", "0")
+KEY_PATH = SMIL_DIR / "Scoring" / "keys" / "mmpi-key-solomin.json"
+NORMS_PATH = SMIL_DIR / "basic_scales_norms.json"
+T_MIN = 20
+T_MAX = 100
+
+# Matrix columns: every scale, then the two gender variants of 5.
+COLUMNS = SCALES + ("5M", "5F")
+_COLUMN = {code: i for i, code in enumerate(COLUMNS)}
+_FIVE = SCALES.index("5")
+
+
+class RawScorer:
+    """Raw scores for many answer sheets at once.
+
+    Args:
+        items: ``{question id: [{"scale", "direction"}, ...]}`` as in the
+            "items" of mmpi-key-solomin.json or the "scales" of
+            questions-566-full.json.
+    """
+
+    def __init__(self, items: Mapping, question_count: int = QUESTION_COUNT):
+        self.question_count = question_count
+        weights = np.zeros((2 * question_count, len(COLUMNS)), dtype=np.float32)
+        for qid, entries in items.items():
+            qid = int(qid)
+            if not 1 <= qid <= question_count:
+                continue
+            for entry in entries:
+                column = _COLUMN.get(str(entry["scale"]))
+                if column is None:
+                    continue
+                # direction 1 scores on YES; anything else scores on a NO.
+                row = qid - 1 if int(entry["direction"]) == 1 else question_count + qid - 1
+                weights[row, column] += 1
+        self.weights = weights
+
+    @classmethod
+    def from_key_file(cls, path: Path = KEY_PATH) -> "RawScorer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["items"])
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[Mapping]) -> "RawScorer":
+        return cls({q["id"]: q.get("scales") or [] for q in questions})
+
+    def indicators(self, answers: np.ndarray) -> np.ndarray:
+        """``(n, 2 * questions)`` float32 matrix of YES and NO answers."""
+        out = np.empty((answers.shape[0], 2 * self.question_count), dtype=np.float32)
+        np.equal(answers, YES, out=out[:, :self.question_count])
+        np.equal(answers, NO, out=out[:, self.question_count:])
+        return out
+
+    def score(self, answers: np.ndarray, genders: np.ndarray) -> np.ndarray:
+        """``(n, 13)`` int32 raw scores in :data:`SCALES` order."""
+        by_column = self.indicators(answers) @ self.weights
+        raw = by_column[:, :len(SCALES)].astype(np.int32)
+        five = np.where(genders == FEMALE, by_column[:, _COLUMN["5F"]], by_column[:, _COLUMN["5M"]])
+        raw[:, _FIVE] += five.astype(np.int32)
+        return raw
+
+
+def count_unknown(answers: np.ndarray) -> np.ndarray:
+    """Per-sheet number of UNKNOWN answers (RawScoreCalculator::countUnknown)."""
+    return np.count_nonzero(answers == UNKNOWN, axis=1)
+
+
+def as_dicts(raw: np.ndarray, scales: Sequence[str] = SCALES) -> List[Dict[str, int]]:
+    """Rows of a score matrix as ``{scale: score}`` like the PHP arrays."""
+    return [dict(zip(scales, map(int, row))) for row in raw]
+
+
+# PHP pre-rounds away representation error before rounding half away from
+# zero, so 25 * 0.3 = 7.4999999999999991 still rounds to 8.
+ROUND_EPSILON = 1e-9
+
+
+def php_round(values: np.ndarray) -> np.ndarray:
+    """PHP ``round()`` to an integer, elementwise."""
+    return np.copysign(np.floor(np.abs(values) + (0.5 + ROUND_EPSILON)), values)
+
+
+class TScorer:
+    """K-corrected raw scores and T-scores for a raw score matrix.
+
+    Args:
+        norms: the "scales" object of basic_scales_norms.json.
+    """
+
+    def __init__(self, norms: Mapping):
+        shape = (2, len(SCALES))
+        self.mean = np.zeros(shape)
+        self.delta = np.zeros(shape)
+        self.k_factor = np.zeros(len(SCALES))
+        self.has_norms = np.zeros(len(SCALES), dtype=bool)
+        for column, scale in enumerate(SCALES):
+            if scale not in norms:
+                continue
+            self.has_norms[column] = True
+            for gender, key in ((0, "male"), (FEMALE, "female")):
+                scale_norms = norms[scale].get(key) or norms[scale]["male"]
+                self.mean[gender, column] = float(scale_norms["M"])
+                self.delta[gender, column] = float(scale_norms["delta"])
+            self.k_factor[column] = float(norms[scale].get("kCorrectionFactor") or 0.0)
+
+    @classmethod
+    def from_norms_file(cls, path: Path = NORMS_PATH) -> "TScorer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["scales"])
+
+    def corrected(self, raw: np.ndarray) -> np.ndarray:
+        """``X + round(K * factor)`` per scale (scales without a factor unchanged).
+
+        The correction depends on K alone, so it is tabulated for every K in
+        the batch and applied with one row gather.
+        """
+        if raw.size and raw.min() < 0:
+            raise ValueError("raw scores must be non-negative")
+        k = raw[:, SCALES.index("K")]
+        k_values = np.arange(int(k.max(initial=0)) + 1)
+        corrections = php_round(np.outer(k_values, self.k_factor)).astype(raw.dtype)
+        return raw + corrections[k]
+
+    def table(self, max_raw: int) -> np.ndarray:
+        """``(2, 13, max_raw + 1)`` T-score for every gender, scale and corrected raw score."""
+        x = np.arange(max_raw + 1, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = 50.0 + 10.0 * (x - self.mean[:, :, None]) / self.delta[:, :, None]
+        t = np.clip(php_round(t), T_MIN, T_MAX)
+        t[(self.delta == 0) | ~self.has_norms] = 50.0
+        return t
+
+    def score(self, raw: np.ndarray, genders: np.ndarray, corrected: np.ndarray = None) -> np.ndarray:
+        """``(n, 13)`` T-scores, as integers stored in float64 like the PHP floats.
+
+        T depends only on (gender, scale, corrected raw score), so the batch
+        is scored by indexing into :meth:`table`.
+        """
+        if corrected is None:
+            corrected = self.corrected(raw)
+        width = int(corrected.max(initial=0)) + 1
+        # Flat table offset of each (gender, scale) row.
+        offsets = (np.arange(2 * len(SCALES)).reshape(2, len(SCALES)) * width).astype(np.int64)
+        return self.table(width - 1).ravel().take(corrected + offsets[genders])
+
+
+# Validity warning bits, in the order ValidityAssessor emits its warnings.
+CONTROL_LOW = 1 << 0
+UNKNOWN_INVALID = 1 << 1
+UNKNOWN_DOUBTFUL = 1 << 2
+UNKNOWN_ELEVATED = 1 << 3
+L_HIGH = 1 << 4
+F_INVALID = 1 << 5
+F_ELEVATED = 1 << 6
+K_HIGH = 1 << 7
+K_LOW = 1 << 8
+FK_HIGH = 1 << 9
+FK_LOW = 1 << 10
+INVALID_FLAGS = CONTROL_LOW | UNKNOWN_INVALID | L_HIGH | F_INVALID
+
+WARNINGS = {
+    CONTROL_LOW: "Протокол недостоверен: низкая внимательность (QC = {control} < 20)",
+    UNKNOWN_INVALID: "Протокол недостоверен: слишком много ответов \"Не знаю\" ({unknown} > 70)",
+    UNKNOWN_DOUBTFUL: "Сомнительная достоверность: много ответов \"Не знаю\" ({unknown})",
+    UNKNOWN_ELEVATED: "Настороженность: повышенное количество ответов \"Не знаю\" ({unknown})",
+    L_HIGH: "Высокая социальная желательность — результаты могут быть недостоверны",
+    F_INVALID: "Высокий показатель F — возможны случайные ответы или преувеличение проблем",
+    F_ELEVATED: "Повышенный показатель F — возможна тенденция к преувеличению",
+    K_HIGH: "Высокая защитная позиция — клинические шкалы могут быть занижены",
+    K_LOW: "Низкая защитная позиция — возможна излишняя откровенность",
+    FK_HIGH: "Индекс F-K повышен — возможна симуляция",
+    FK_LOW: "Индекс F-K понижен — возможна диссимуляция",
+}
+
+_CONTROL_COLUMNS = np.array(CONTROL_QUESTIONS) - 1
+
+
+def control_score(answers: np.ndarray) -> np.ndarray:
+    """Per-sheet number of control questions answered YES."""
+    return np.count_nonzero(answers[:, _CONTROL_COLUMNS] == YES, axis=1)
+
+
+def validity_codes(t: np.ndarray, unknown: np.ndarray, control: np.ndarray) -> np.ndarray:
+    """uint16 warning bits per sheet; a sheet is valid when ``codes & INVALID_FLAGS == 0``."""
+    l_t, f_t, k_t = (t[:, SCALES.index(s)].astype(np.int64) for s in ("L", "F", "K"))
+    fk = f_t - k_t
+    codes = np.zeros(t.shape[0], dtype=np.uint16)
+    for flag, condition in (
+        (CONTROL_LOW, control < 20),
+        (UNKNOWN_INVALID, unknown > 70),
+        (UNKNOWN_DOUBTFUL, (unknown > 60) & (unknown <= 70)),
+        (UNKNOWN_ELEVATED, (unknown > 40) & (unknown <= 60)),
+        (L_HIGH, l_t >= 65),
+        (F_INVALID, f_t >= 70),
+        (F_ELEVATED, (f_t >= 65) & (f_t < 70)),
+        (K_HIGH, k_t >= 65),
+        (K_LOW, k_t <= 35),
+        (FK_HIGH, fk > 20),
+        (FK_LOW, fk < -15),
+    ):
+        codes[condition] |= flag
+    return codes
+
+
+def is_valid(codes: np.ndarray) -> np.ndarray:
+    return (codes & INVALID_FLAGS) == 0
+
+
+def validity_dicts(t: np.ndarray, codes: np.ndarray, unknown: np.ndarray, control: np.ndarray) -> List[dict]:
+    """ValidityAssessor::assess() result arrays for each sheet."""
+    results = []
+    for row, code in enumerate(map(int, codes)):
+        l_t, f_t, k_t = (int(t[row, SCALES.index(s)]) for s in ("L", "F", "K"))
+        counts = {"unknown": int(unknown[row]), "control": int(control[row])}
+        results.append({
+            "is_valid": not (code & INVALID_FLAGS),
+            "warnings": [message.format(**counts) for flag, message in WARNINGS.items() if code & flag],
+            "L_score": l_t, "F_score": f_t, "K_score": k_t,
+            "FK_index": f_t - k_t,
+            "unknown_count": counts["unknown"],
+            "control_score": counts["control"],
+        })
+    return results
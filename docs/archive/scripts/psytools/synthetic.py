@@ -0,0 +1,670 @@
+"""Synthetic answer sheets for load and scoring benchmarks.
+
+Sheets are drawn in chunks as ``uint8`` matrices (one row per sheet, one
+column per answer key) with a seeded ``numpy`` generator, so a run is
+reproducible and a million sheets take seconds:
+
+* SMIL (:class:`SmilModel`): each sheet gets a latent z-score per basic
+  scale (a shared general factor plus noise). An item's YES probability is
+  the logistic of the summed pulls of the scales keyed on it (5M or 5F by
+  gender), each a shift plus a gain times z; items on no basic scale
+  follow the sheet's acquiescence. Shifts and gains are fitted when the
+  model is built, so the K-corrected scores of normal sheets have the mean
+  M and spread delta of basic_scales_norms.json. Control items are
+  answered YES and a few answers are "Не знаю". A configurable share of
+  sheets fails one validity rule (:data:`FAILURES`): random answering, too
+  many "Не знаю", ignored control items or a faked-good L profile. L and F
+  of the other sheets stay below the invalid range, so the failure rates
+  are the invalid rates; QC >= 20 keeps F of a valid sheet at T 59 or
+  more. The additional scales are not modelled: several of their norms are
+  beyond what their keys can score (Es has 6 items and M 27.14).
+* BDI, BAI, HADS and Lazarus (:class:`RatedModel`): per sheet and item
+  group a level is drawn from the score_ranges of the module's
+  metadata.json, a target total uniformly within it, and the item ratings
+  binomially around the mean that total implies.
+
+Writers emit the sheets as JSONL, as Parquet partitions in the layout of
+:mod:`psytools.session_export`, or as CSV for MySQL ``LOAD DATA``
+(:data:`LOAD_DATA_SQL`). Text rows are assembled as fixed-width byte
+matrices: numbers and labels are padded with JSON whitespace, so a whole
+chunk is rendered with a few array assignments instead of per-row
+``json.dumps``.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .answers import FEMALE, MALE, NO, QUESTION_COUNT, UNKNOWN, YES
+from .paths import MODULES_DIR, PROJECT_ROOT
+from .smil_records import CONTROL_QUESTIONS
+from .smil_scoring import KEY_PATH, NORMS_PATH
+
+OUTPUT_DIR = PROJECT_ROOT / "storage" / "exports" / "synthetic"
+CHUNK_SIZE = 50_000
+SESSION_TTL_DAYS = 30  # SESSION_TTL_DAYS default of config.php
+
+# Sheet labels; every label but "normal" is a validity failure mode.
+LABELS = ("normal", "random", "unknown", "control", "fake_good")
+FAILURES = LABELS[1:]
+GENERAL_FACTOR = 0.35  # share of latent variance common to all scales
+# Latent z caps of L and F on sheets that must stay valid (T 65 and 70 are invalid).
+VALID_Z_CAP = {"L": 0.8, "F": 1.0}
+VALIDITY_SCALES = ("L", "F", "K")
+CONTROL_YES = 0.99
+MIN_CONTROL = 20  # QC below this invalidates the protocol
+UNKNOWN_MEAN = 4.0  # "Не знаю" answers per ordinary sheet (Poisson mean)
+P_MIN, P_MAX = 0.02, 0.98
+CALIBRATION_ROUNDS = 15
+CALIBRATION_SHEETS = 2000  # normal sheets per gender and round
+CALIBRATION_SEED = 0
+SHIFT_RANGE = (-5.0, 5.0)  # logit pull of a scale at z = 0
+GAIN_RANGE = (0.0, 4.0)  # logit change per unit of a scale's latent z
+
+
+def _load(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class SmilModel:
+    """Samples SMIL sheets from the key and the norm files."""
+
+    def __init__(self, items: Mapping, norms: Mapping, question_count: int = QUESTION_COUNT):
+        self.question_count = question_count
+        scales: Dict[str, Dict[str, List[int]]] = {}
+        for qid, entries in items.items():
+            for entry in entries:
+                direction = "true" if int(entry["direction"]) == 1 else "false"
+                scales.setdefault(str(entry["scale"]), {"true": [], "false": []})[direction].append(int(qid))
+        # (code, key, {gender: (M, delta)}, k correction factor) per latent scale
+        latent = []
+        for code, info in norms.items():
+            key_code = {"5": ("5M", "5F")}.get(code, (code, code))
+            for gender, name in ((MALE, "male"), (FEMALE, "female")):
+                if key_code[gender] not in scales:
+                    continue
+                stated = info.get(name) or info["male"]
+                latent.append((code, gender, scales[key_code[gender]], stated,
+                               float(info.get("kCorrectionFactor") or 0.0)))
+        self.codes = list(dict.fromkeys(entry[0] for entry in latent))
+        index = {code: i for i, code in enumerate(self.codes)}
+        count = len(self.codes)
+        shape = (2, count)
+        self.mean, self.delta = np.zeros(shape), np.ones(shape)
+        self.size = np.ones(shape)
+        self.k_factor = np.zeros(count)
+        # Per gender: pull of each scale on each item, +1 on its True items and -1 on its False ones.
+        self.pull = np.zeros((2, count, question_count), dtype=np.float32)
+        for code, gender, key, stated, factor in latent:
+            s = index[code]
+            self.mean[gender, s], self.delta[gender, s] = float(stated["M"]), float(stated["delta"]) or 1.0
+            self.k_factor[s] = factor
+            true = [q - 1 for q in key.get("true") or [] if 1 <= q <= question_count]
+            false = [q - 1 for q in key.get("false") or [] if 1 <= q <= question_count]
+            self.size[gender, s] = max(1, len(true) + len(false))
+            np.add.at(self.pull[gender, s], true, 1.0)
+            np.add.at(self.pull[gender, s], false, -1.0)
+        self._key = self.pull.copy()
+        self.keyed = (self.pull != 0).any(axis=1)
+        # Items of the validity scales follow that scale alone (the first of
+        # L, F, K keying them), so the protocol validity stays controlled.
+        owned = np.zeros(question_count, dtype=bool)
+        for code in VALIDITY_SCALES:
+            if code not in index:
+                continue
+            s = index[code]
+            for gender in (MALE, FEMALE):
+                mine = (self.pull[gender, s] != 0) & ~owned
+                others = np.arange(count) != s
+                self.pull[gender][np.ix_(others, mine)] = 0.0
+            owned |= self.pull[MALE, s] != 0
+        self.control = np.array(CONTROL_QUESTIONS) - 1
+        f_true = self.pull[MALE, index["F"]] > 0 if "F" in index else np.zeros(question_count, dtype=bool)
+        self.control_f = self.control[f_true[self.control]]
+        self.control_other = self.control[~f_true[self.control]]
+        # Other scales keyed on each F control item; the least shared are answered YES first.
+        shared = (self._key != 0).any(axis=0) & (np.arange(count) != index.get("F", -1))[:, None]
+        self.control_f_rank = shared.sum(axis=0)[self.control_f]
+        f_items = np.flatnonzero(self.pull[MALE, index["F"]]) if "F" in index else np.array([], dtype=np.int64)
+        self.f_rest = np.setdiff1d(f_items, self.control_f)
+        self.l_items = np.array(scales.get("L", {}).get("false", []), dtype=np.int64) - 1
+        self.caps = np.full(count, np.inf)
+        for code, cap in VALID_Z_CAP.items():
+            if code in index:
+                self.caps[index[code]] = cap
+        # Items whose answers _settle_validity sets; the pulls do not move them.
+        self.settled = np.zeros(question_count, dtype=bool)
+        for items in (self.control, f_items, self.l_items):
+            self.settled[items] = True
+        # Start from the logit of the share of keyed answers at the norm mean.
+        share = np.clip(self.targets(np.zeros((2, count)), np.array([MALE, FEMALE])) / self.size, 0.05, 0.95)
+        self.shift = np.log(share / (1 - share))
+        self.gain = np.clip(self.delta / (self.size * share * (1 - share)), *GAIN_RANGE)
+        self._calibrate()
+
+    def _calibrate(self, rounds: int = CALIBRATION_ROUNDS):
+        """Fit each scale's shift and spread so normal sheets score the norms.
+
+        An item's logit sums the pulls of all scales keyed on it, and the
+        control, L and F answers are settled afterwards, so no closed form
+        gives the scores :meth:`sample` produces. Each round samples the same
+        normal sheets (a fixed seed), scores them with the original key and
+        the K correction, and takes a damped Newton step of the shifts
+        towards the norm means M (the Jacobian couples the scales that share
+        items) and scales each gain towards the norm delta, net of the
+        binomial noise of the answers. L and F are settled to their targets
+        directly and are not fitted.
+        """
+        fitted = np.array([code not in ("L", "F") for code in self.codes])
+        genders = np.repeat(np.array([MALE, FEMALE], dtype=np.uint8), CALIBRATION_SHEETS)
+        labels = np.zeros(len(genders), dtype=np.uint8)
+        for _ in range(rounds):
+            answers = self.sample(np.random.default_rng(CALIBRATION_SEED), genders, labels)
+            for gender in (MALE, FEMALE):
+                sheets = answers[genders == gender]
+                scores = self.scores(sheets, gender)
+                yes = (sheets == YES).mean(axis=0)
+                noise = np.abs(self._key[gender]) @ (yes * (1 - yes))
+                # d score_s / d shift_t over the items the logits move
+                moved = yes * (1 - yes) * ~self.settled
+                jacobian = ((self._key[gender] * moved) @ self.pull[gender].T)[np.ix_(fitted, fitted)]
+                missing = (self.mean[gender] - scores.mean(axis=0))[fitted]
+                step = np.clip(np.linalg.solve(jacobian + np.eye(len(jacobian)), missing), -1.0, 1.0)
+                self.shift[gender, fitted] = np.clip(self.shift[gender, fitted] + step, *SHIFT_RANGE)
+                wanted = np.maximum(self.delta[gender] ** 2 - noise, 0.25)
+                found = np.maximum(scores.var(axis=0) - noise, 0.25)
+                ratio = np.clip((wanted / found) ** 0.25, 0.8, 1.25)
+                self.gain[gender, fitted] = np.clip(self.gain[gender] * ratio, *GAIN_RANGE)[fitted]
+
+    def scores(self, answers: np.ndarray, gender: int) -> np.ndarray:
+        """K-corrected raw score per scale of one gender's sheets, by the original key."""
+        raw = (answers == YES).astype(np.float32) @ (self._key[gender] > 0).T
+        raw += (answers == NO).astype(np.float32) @ (self._key[gender] < 0).T
+        if "K" in self.codes:
+            raw += np.rint(np.outer(raw[:, self.codes.index("K")], self.k_factor))
+        return raw
+
+    @classmethod
+    def from_files(cls, key_path: Path = KEY_PATH, norms_path: Path = NORMS_PATH) -> "SmilModel":
+        return cls(_load(key_path)["items"], _load(norms_path)["scales"])
+
+    def latent(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        general = rng.standard_normal((n, 1))
+        specific = rng.standard_normal((n, len(self.codes)))
+        return np.sqrt(GENERAL_FACTOR) * general + np.sqrt(1 - GENERAL_FACTOR) * specific
+
+    def targets(self, z: np.ndarray, genders: np.ndarray) -> np.ndarray:
+        """Raw score per scale that the answers should reach."""
+        target = self.mean[genders] + z * self.delta[genders]
+        if "K" in self.codes:
+            # Norms are of K-corrected scores; the answers carry the uncorrected part.
+            k = target[:, self.codes.index("K")]
+            target = target - np.round(np.outer(np.maximum(k, 0), self.k_factor))
+        return target
+
+    def logits(self, z: np.ndarray, genders: np.ndarray) -> np.ndarray:
+        """Pull of each scale towards its keyed answers: the fitted shift plus the gain times z.
+
+        The norms are of K-corrected scores, so the part of z that the K
+        correction already carries is taken out of the answers.
+        """
+        if "K" in self.codes:
+            k = self.codes.index("K")
+            z = z - np.outer(z[:, k], self.k_factor) * self.delta[genders, k, None] / self.delta[genders]
+        return (self.shift[genders] + self.gain[genders] * z).astype(np.float32)
+
+    def yes_probabilities(self, logits: np.ndarray, genders: np.ndarray,
+                          acquiescence: np.ndarray) -> np.ndarray:
+        """YES probability per item: the logistic of the summed pulls, or the acquiescence if unkeyed."""
+        p = np.empty((len(genders), self.question_count), dtype=np.float32)
+        for gender in (MALE, FEMALE):
+            rows = np.flatnonzero(genders == gender)
+            if not len(rows):
+                continue
+            pulled = 1 / (1 + np.exp(-(logits[rows] @ self.pull[gender])))
+            p[rows] = np.where(self.keyed[gender], np.clip(pulled, P_MIN, P_MAX), acquiescence[rows, None])
+        return p
+
+    def sample(self, rng: np.random.Generator, genders: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        n = len(genders)
+        z = np.minimum(self.latent(rng, n), self.caps)
+        p = self.yes_probabilities(self.logits(z, genders), genders, rng.beta(4, 6, n).astype(np.float32))
+        p[:, self.control] = CONTROL_YES
+
+        random = labels == LABELS.index("random")
+        p[random] = 0.5
+        careless = labels == LABELS.index("control")
+        p[np.ix_(careless, self.control)] = 0.3
+
+        # One uniform draw per answer: "Не знаю" above 1 - r, YES below p * (1 - r).
+        unknown = rng.poisson(UNKNOWN_MEAN, n).astype(np.float32)
+        failing = labels == LABELS.index("unknown")
+        unknown[failing] = rng.integers(90, 160, int(failing.sum()))
+        keep = (1 - unknown / self.question_count)[:, None]
+        u = rng.random(p.shape, dtype=np.float32)
+        answers = np.full(p.shape, NO, dtype=np.uint8)
+        answers[u < p * keep] = YES
+        answers[u >= keep] = UNKNOWN
+
+        self._settle_validity(rng, answers, u, keep, self.targets(z, genders), genders, labels)
+        return answers
+
+    def _settle_validity(self, rng, answers, u, keep, targets, genders, labels):
+        """Exact L and control answers on the sheets that are not random or careless.
+
+        L has 15 items, so its binomial spread alone would push one sheet in
+        ten into L >= 65; these sheets answer exactly ``round(target)`` L
+        items in the keyed direction instead (fake-good sheets all of them).
+
+        Half of the control items are also True items of F, so answering all
+        of them YES puts F in the invalid range. A sheet answers as many of
+        them YES as its other control answers leave missing for QC >= 20,
+        plus at most one, taking the ones keyed on no other scale first (so
+        6 and 8 are not lifted), and its other F items share what is left of
+        the F target. QC >= 20 needs at least 7 of them, so F of a valid
+        sheet cannot score below T 59 whatever its norms say.
+        """
+        rows = np.flatnonzero((labels != LABELS.index("random")) & (labels != LABELS.index("control")))
+        if not len(rows):
+            return
+        sub = answers[rows]
+        if "L" in self.codes and len(self.l_items):
+            l = self.codes.index("L")
+            wanted = np.clip(np.rint(targets[rows, l]), 0, len(self.l_items)).astype(np.int64)
+            wanted[labels[rows] == LABELS.index("fake_good")] = len(self.l_items)
+            # L items are False items: NO scores.
+            sub[:, self.l_items] = np.where(_first(rng, wanted, len(self.l_items)), NO, YES)
+        if len(self.control_f):
+            have = np.count_nonzero(sub[:, self.control_other] == YES, axis=1)
+            wanted = np.clip(MIN_CONTROL - have + rng.integers(0, 2, len(rows)), 0, len(self.control_f))
+            chosen = _first(rng, wanted, len(self.control_f), self.control_f_rank)
+            sub[:, self.control_f] = np.where(chosen, YES, NO)
+            f = self.codes.index("F")
+            target = targets[rows, f]
+            rest = np.clip((target - wanted) / max(1, len(self.f_rest)), 0.0, P_MAX)
+            # YES scores on a True item of F, NO on a False one.
+            p = np.where(self.pull[MALE, f, self.f_rest] > 0, rest[:, None], 1 - rest[:, None])
+            redrawn = np.where(u[np.ix_(rows, self.f_rest)] < p * keep[rows], YES, NO)
+            sub[:, self.f_rest] = np.where(sub[:, self.f_rest] == UNKNOWN, UNKNOWN, redrawn)
+        answers[rows] = sub
+
+
+@lru_cache(maxsize=None)
+def smil_model() -> SmilModel:
+    """The model of the shipped key and norms, fitted once per process."""
+    return SmilModel.from_files()
+
+
+def _first(rng: np.random.Generator, counts: np.ndarray, width: int, rank: Optional[np.ndarray] = None) -> np.ndarray:
+    """``(len(counts), width)`` mask with ``counts[i]`` True cells at random positions in row i.
+
+    With ``rank``, lower-ranked positions are taken first and ties are broken at random.
+    """
+    keys = rng.random((len(counts), width))
+    order = np.argsort(keys if rank is None else keys + rank, axis=1)
+    mask = np.zeros(order.shape, dtype=bool)
+    np.put_along_axis(mask, order, np.arange(width) < counts[:, None], axis=1)
+    return mask
+
+
+@dataclass
+class RatedSpec:
+    module: str
+    groups: Mapping[str, Sequence[int]]
+    low: int = 0
+    high: int = 3
+    suffixes: Sequence[str] = ("",)
+
+
+RATED = {
+    "beck-anxiety": RatedSpec("beck-anxiety", {"BAI": range(1, 22)}),
+    "beck-depression": RatedSpec("beck-depression", {"BDI": range(1, 22)}),
+    "hads": RatedSpec("hads", {"HADS-A": range(1, 15, 2), "HADS-D": range(2, 15, 2)}),
+    "lazarus": RatedSpec("lazarus", {"total": range(1, 17)}, low=1, high=10, suffixes=("_self", "_partner")),
+}
+
+
+class RatedModel:
+    """Samples rating-scale sheets (BDI, BAI, HADS, Lazarus) from the module's score ranges."""
+
+    def __init__(self, spec: RatedSpec, metadata: Mapping):
+        self.spec = spec
+        self.ranges = np.array([(r["min"], r["max"]) for r in metadata["score_ranges"]], dtype=np.float64)
+        self.items = max(q for group in spec.groups.values() for q in group)
+        self.keys = [f"{q}{suffix}" for q in range(1, self.items + 1) for suffix in spec.suffixes]
+
+    @classmethod
+    def for_module(cls, module: str) -> "RatedModel":
+        return cls(RATED[module], _load(MODULES_DIR / module / "metadata.json"))
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        spec = self.spec
+        answers = np.empty((n, len(self.keys)), dtype=np.uint8)
+        steps = spec.high - spec.low
+        for column_offset, _ in enumerate(spec.suffixes):
+            for items in spec.groups.values():
+                columns = (np.asarray(items) - 1) * len(spec.suffixes) + column_offset
+                level = rng.integers(0, len(self.ranges), n)
+                low, high = self.ranges[level, 0], self.ranges[level, 1]
+                total = low + rng.random(n) * (high - low)
+                mean = np.clip((total / len(columns) - spec.low) / steps, 0.0, 1.0)
+                ratings = rng.binomial(steps, mean[:, None], (n, len(columns)))
+                answers[:, columns] = ratings + spec.low
+        return answers
+
+
+@dataclass
+class Batch:
+    module: str
+    slug: str
+    keys: List[str]
+    answers: np.ndarray  # (n, len(keys)) uint8
+    genders: np.ndarray  # (n,) MALE/FEMALE
+    labels: np.ndarray  # (n,) index into LABELS
+    created: np.ndarray  # (n,) datetime64[s]
+
+
+INSTRUMENTS = ("smil",) + tuple(RATED)
+
+
+def module_slug(module: str) -> str:
+    return _load(MODULES_DIR / module / "metadata.json")["slug"]
+
+
+def generate(module: str, total: int, seed: int = 0, female_share: float = 0.5,
+             failures: Optional[Mapping[str, float]] = None, chunk_size: int = CHUNK_SIZE,
+             start: datetime = datetime(2026, 1, 1), days: int = 365, model=None) -> Iterator[Batch]:
+    """Chunks of ``total`` sheets of ``module``; creation times rise evenly over ``days`` from ``start``."""
+    failures = dict(failures or {})
+    unknown = set(failures) - set(FAILURES)
+    if unknown:
+        raise ValueError(f"unknown failure modes {sorted(unknown)}, expected {', '.join(FAILURES)}")
+    shares = np.array([0.0] + [float(failures.get(mode, 0.0)) for mode in FAILURES])
+    if shares.sum() > 1:
+        raise ValueError("failure rates add up to more than 1")
+    shares[0] = 1 - shares.sum()
+    if model is None:
+        model = smil_model() if module == "smil" else RatedModel.for_module(module)
+    keys = [str(q) for q in range(1, model.question_count + 1)] if module == "smil" else model.keys
+    slug = module_slug(module)
+    rng = np.random.default_rng(seed)
+    first = np.datetime64(start, "s")
+    span = days * 86400
+    for offset in range(0, total, chunk_size):
+        n = min(chunk_size, total - offset)
+        genders = (rng.random(n) < female_share).astype(np.uint8)
+        labels = rng.choice(len(LABELS), n, p=shares).astype(np.uint8) if module == "smil" else np.zeros(n, np.uint8)
+        answers = model.sample(rng, genders, labels) if module == "smil" else model.sample(rng, n)
+        position = (offset + np.arange(n) + rng.random(n)) / total
+        created = first + (position * span).astype("timedelta64[s]")
+        yield Batch(module, slug, keys, answers, genders, labels, created)
+
+
+# --- fixed-width text rendering -------------------------------------------------
+
+def _table(texts: Sequence[str], width: Optional[int] = None) -> np.ndarray:
+    """``(len(texts), width)`` uint8 rows of the encoded texts, space padded."""
+    encoded = [t.encode("utf-8") for t in texts]
+    width = width or max(map(len, encoded))
+    table = np.full((len(encoded), width), ord(" "), dtype=np.uint8)
+    for row, data in enumerate(encoded):
+        table[row, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+    return table
+
+
+def _numbers(high: int) -> np.ndarray:
+    """Right-aligned decimal of 0..high, JSON whitespace padded."""
+    width = len(str(high))
+    return _table([str(v).rjust(width) for v in range(high + 1)], width)
+
+
+def quoted(values: Sequence[str], double: bool = False) -> np.ndarray:
+    """JSON string literals of ``values`` padded to one width (quotes doubled for CSV)."""
+    quote = '""' if double else '"'
+    return _table([f"{quote}{v}{quote}" for v in values])
+
+
+class JsonObject:
+    """Fixed-width ``{"key":value,...}`` rows for a matrix of small integers."""
+
+    def __init__(self, keys: Sequence[str], high: int, tail: str = "", double: bool = False):
+        quote = '""' if double else '"'
+        self.digits = _numbers(high)
+        width = self.digits.shape[1]
+        parts, slots, length = [], [], 0
+        for i, key in enumerate(keys):
+            literal = ("{" if i == 0 else ",") + f"{quote}{key}{quote}:"
+            parts.append(literal.encode("utf-8") + b" " * width)
+            length += len(parts[-1])
+            slots.append(length - width)
+        parts.append(tail.encode("utf-8"))
+        self.template = np.frombuffer(b"".join(parts), dtype=np.uint8)
+        self.slots = (np.array(slots)[:, None] + np.arange(width)).ravel()
+
+    def render(self, values: np.ndarray) -> np.ndarray:
+        rows = np.tile(self.template, (values.shape[0], 1))
+        rows[:, self.slots] = self.digits[values].reshape(values.shape[0], -1)
+        return rows
+
+
+def literal(text: str, n: int) -> np.ndarray:
+    return np.broadcast_to(np.frombuffer(text.encode("utf-8"), dtype=np.uint8), (n, len(text.encode("utf-8"))))
+
+
+def timestamps(values: np.ndarray) -> np.ndarray:
+    """``YYYY-MM-DD HH:MM:SS`` rows of datetime64[s] values."""
+    text = np.datetime_as_string(values.astype("datetime64[s]")).astype("S19")
+    rows = text.view(np.uint8).reshape(len(values), 19).copy()
+    rows[:, 10] = ord(" ")
+    return rows
+
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+def hex_rows(rng: np.random.Generator, n: int, nbytes: int) -> np.ndarray:
+    data = rng.integers(0, 256, (n, nbytes), dtype=np.uint8)
+    return np.stack([_HEX[data >> 4], _HEX[data & 15]], axis=2).reshape(n, 2 * nbytes)
+
+
+def uuid_rows(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Random version 4 UUIDs, ``(n, 36)`` ASCII."""
+    digits = hex_rows(rng, n, 16)
+    digits[:, 12] = ord("4")
+    digits[:, 16] = _HEX[8 + (digits[:, 16] % 4)]
+    dash = literal("-", n)
+    return np.hstack([digits[:, :8], dash, digits[:, 8:12], dash, digits[:, 12:16], dash,
+                      digits[:, 16:20], dash, digits[:, 20:]])
+
+
+def write_rows(file, blocks: Sequence[np.ndarray]):
+    file.write(np.ascontiguousarray(np.hstack(blocks)).tobytes())
+
+
+class Renderer:
+    """Text pieces of a module's rows, shared by the JSONL and CSV writers."""
+
+    def __init__(self, keys: Sequence[str], high: int, smil: bool, double: bool = False):
+        gender_tail = ',{q}gender{q}:'.format(q='""' if double else '"') if smil else "}"
+        self.answers = JsonObject(keys, high, gender_tail, double)
+        self.smil = smil
+        self.genders = quoted(["male", "female"], double)
+        self.labels = quoted(LABELS, double)
+        q = '""' if double else '"'
+        self.gender_key = f"{{{q}gender{q}:"
+        self.synthetic_key = f",{q}synthetic{q}:"
+
+    def answers_json(self, batch: Batch) -> List[np.ndarray]:
+        blocks = [self.answers.render(batch.answers)]
+        if self.smil:
+            blocks += [self.genders[batch.genders], literal("}", len(batch.genders))]
+        return blocks
+
+    def demographics_json(self, batch: Batch) -> List[np.ndarray]:
+        n = len(batch.genders)
+        return [literal(self.gender_key, n), self.genders[batch.genders], literal(self.synthetic_key, n),
+                self.labels[batch.labels], literal("}", n)]
+
+
+def _renderer(cache: Dict[str, Renderer], batch: Batch, double: bool = False) -> Renderer:
+    renderer = cache.get(batch.module)
+    if renderer is None:
+        smil = batch.module == "smil"
+        high = UNKNOWN if smil else RATED[batch.module].high
+        renderer = cache[batch.module] = Renderer(batch.keys, high, smil, double)
+    return renderer
+
+
+class JsonlWriter:
+    """One ``{"test", "created_at", "demographics", "answers"}`` object per line."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "wb")
+        self.renderers: Dict[str, Renderer] = {}
+        self.rows = 0
+
+    def write(self, batch: Batch):
+        renderer = _renderer(self.renderers, batch)
+        n = len(batch.genders)
+        write_rows(self.file, [literal(f'{{"test":"{batch.slug}","created_at":"', n), timestamps(batch.created),
+                               literal('","demographics":', n), *renderer.demographics_json(batch),
+                               literal(',"answers":', n), *renderer.answers_json(batch), literal("}\n", n)])
+        self.rows += n
+
+    def close(self):
+        self.file.close()
+
+
+LOAD_DATA_SQL = """LOAD DATA LOCAL INFILE '{path}'
+INTO TABLE test_sessions
+CHARACTER SET utf8mb4
+FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+LINES TERMINATED BY '\\n'
+IGNORE 1 LINES
+(id, @slug, session_token, demographics, answers, calculated_results, status, retention_class,
+ completed_at, created_at, expires_at)
+SET test_id = (SELECT id FROM tests WHERE slug = @slug);
+"""
+CSV_HEADER = ("id,test_slug,session_token,demographics,answers,calculated_results,status,retention_class,"
+              "completed_at,created_at,expires_at\n")
+
+
+class CsvWriter:
+    """test_sessions rows for ``LOAD DATA``; the statement is written next to the file (.sql).
+
+    JSON columns are quoted with doubled inner quotes; the test is given by
+    slug and resolved to ``test_id`` by the statement.
+    """
+
+    def __init__(self, path: Path, seed: int = 0, retention_class: str = "anonymous",
+                 ttl_days: int = SESSION_TTL_DAYS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "wb")
+        self.file.write(CSV_HEADER.encode("utf-8"))
+        self.path.with_suffix(".sql").write_text(LOAD_DATA_SQL.format(path=self.path.resolve()), encoding="utf-8")
+        self.rng = np.random.default_rng([seed, 1])
+        self.retention_class = retention_class
+        self.ttl = np.timedelta64(ttl_days * 86400, "s")
+        self.renderers: Dict[str, Renderer] = {}
+        self.rows = 0
+
+    def write(self, batch: Batch):
+        renderer = _renderer(self.renderers, batch, double=True)
+        n = len(batch.genders)
+        created = batch.created
+        # Sessions are completed within the hour.
+        completed = created + (self.rng.random(n) * 3600).astype("timedelta64[s]")
+        write_rows(self.file, [
+            uuid_rows(self.rng, n), literal(f",{batch.slug},", n), hex_rows(self.rng, n, 32), literal(',"', n),
+            *renderer.demographics_json(batch), literal('","', n), *renderer.answers_json(batch),
+            literal(f'","{{}}",completed,{self.retention_class},', n), timestamps(completed), literal(",", n),
+            timestamps(created), literal(",", n), timestamps(created + self.ttl), literal("\n", n),
+        ])
+        self.rows += n
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Partitions ``<slug>/<YYYY-MM>/part-NNNN.parquet`` in the session_export layout."""
+
+    def __init__(self, output_dir: Path, fmt: str = "parquet", seed: int = 0):
+        from .session_export import PartitionWriter
+
+        self.writer = PartitionWriter(output_dir, fmt)
+        self.rng = np.random.default_rng([seed, 2])
+        self.renderers: Dict[str, Renderer] = {}
+        self.rows = 0
+
+    def _table(self, batch: Batch, rows: slice):
+        import pyarrow as pa
+
+        from .session_export import ANSWER_WIDTHS, answer_schema
+
+        renderer = _renderer(self.renderers, batch)
+        part = Batch(batch.module, batch.slug, batch.keys, batch.answers[rows], batch.genders[rows],
+                     batch.labels[rows], batch.created[rows])
+        n = len(part.genders)
+        created = part.created
+        completed = created + (self.rng.random(n) * 3600).astype("timedelta64[s]")
+        columns = [
+            _strings(uuid_rows(self.rng, n)),
+            pa.array(np.full(n, "completed")),
+            pa.array(np.full(n, "anonymous")),
+            pa.array(created, pa.timestamp("s")),
+            pa.array(completed, pa.timestamp("s")),
+            _strings(np.hstack(renderer.demographics_json(part))),
+            pa.array(np.full(n, "{}")),
+        ]
+        if batch.slug in ANSWER_WIDTHS:
+            columns.append(pa.array(np.where(part.genders == FEMALE, "female", "male")))
+            matrix = np.asfortranarray(part.answers)
+            columns.extend(pa.array(matrix[:, i]) for i in range(matrix.shape[1]))
+        else:
+            columns.append(_strings(np.hstack(renderer.answers_json(part))))
+        return pa.Table.from_arrays(columns, schema=answer_schema(batch.slug))
+
+    def write(self, batch: Batch):
+        months = batch.created.astype("datetime64[M]")
+        # Creation times rise, so each month is one run of rows.
+        bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+        for start, end in zip([0, *bounds], [*bounds, len(months)]):
+            month = str(months[start])
+            self.writer.write(batch.slug, month, self._table(batch, slice(start, end)))
+        self.rows += len(months)
+
+    def close(self):
+        return self.writer.close()
+
+
+def _strings(rows: np.ndarray):
+    """Arrow string array over the bytes of fixed-width rows, without per-row objects."""
+    import pyarrow as pa
+
+    n, width = rows.shape
+    offsets = np.arange(0, (n + 1) * width, width, dtype=np.int32)
+    return pa.StringArray.from_buffers(n, pa.py_buffer(offsets), pa.py_buffer(np.ascontiguousarray(rows)))
+
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+
+def open_writer(fmt: str, output: Path, seed: int = 0):
+    if fmt == "jsonl":
+        return JsonlWriter(output)
+    if fmt == "csv":
+        return CsvWriter(output, seed)
+    if fmt == "parquet":
+        return ParquetWriter(output, seed=seed)
+    raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
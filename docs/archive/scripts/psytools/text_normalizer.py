@@ -0,0 +1,202 @@
+"""Single-pass normaliser for question text extracted from PDFs.
+
+PDF extraction splits words with stray spaces ("люб лю чит ать") and loosens
+punctuation. :func:`normalize` repairs both in one left-to-right scan over the
+whitespace-separated chunks of the text:
+
+- a chunk is glued onto the previous one when the frequency index
+  (:mod:`psytools.lexicon`) says the joined form is a word or the beginning
+  of one; when both pieces are words too, the joined form must be clearly
+  more frequent than the pair, so "в стаю" becomes "встаю" but "свежим и" stays;
+- a line-break hyphen ("науч- ную") is dropped unless the index knows the
+  hyphenated compound ("научно- технической");
+- without a lexicon the historical rule of clean-questions-text.py applies:
+  a fragment of one or two Cyrillic letters followed by more text is glued
+  onto a chunk ending in a letter, one pair per match and four rounds deep.
+  The four regex passes of the legacy clean_text() become four chained
+  one-pair-lookahead stages of the same scan, so the output is identical;
+- whitespace collapses to single spaces, with none before ``,.:;!?»)`` and
+  none after ``«(``.
+
+With a lexicon, joined chunks stay open for further joins, so chains of
+fragments are repaired in the same scan instead of a fixed number of passes.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, Iterator, Mapping, Optional, Union
+
+from .lexicon import FrequencyLexicon, count_forms, is_word, shared_lexicon
+
+CLOSING = frozenset(",.:;!?»)")
+OPENING = frozenset("«(")
+
+TRAILING_LETTERS_RE = re.compile(r"[а-яА-ЯёЁ]+$")
+# Line-break hyphenation: "науч-" followed by the rest of the word.
+HYPHENATED_RE = re.compile(r"([а-яА-ЯёЁ]+)-$")
+# Right-hand chunk that may be glued on: letters, optionally closing punctuation.
+FRAGMENT_RE = re.compile(r"([а-яА-ЯёЁ]+)[,.:;!?»)]*$")
+
+LEGACY_FRAGMENT_MAX = 2
+LEGACY_FRAGMENT_RE = re.compile(r"[а-яА-ЯёЁ]{1,2}")
+LEGACY_PASSES = 4
+# An observed space is evidence too: "не трудно" stays unless "нетрудно" is
+# this many times more frequent than the pair.
+PAIR_BIAS = 4
+
+
+class WordSet:
+    """In-memory lexicon with the lookups of :class:`~psytools.lexicon.FrequencyLexicon`."""
+
+    def __init__(self, words: Union[Iterable[str], Mapping[str, int]]):
+        counts = words if isinstance(words, Mapping) else Counter(w.lower() for w in words)
+        self._counts = {
+            word: freq for word, freq in counts.items()
+            if " " in word or is_word(word)
+        }
+        self._sorted = sorted(self._counts)
+        # Stands in for the source digest of a FrequencyLexicon.
+        self.digest = hashlib.sha256("\n".join(f"{w}\t{self._counts[w]}" for w in self._sorted).encode()).digest()
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "WordSet":
+        return cls(count_forms(texts))
+
+    def frequency(self, word: str) -> int:
+        return self._counts.get(word, 0)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def has_prefix(self, prefix: str) -> bool:
+        index = bisect_left(self._sorted, prefix)
+        return index < len(self._sorted) and self._sorted[index].startswith(prefix)
+
+
+Lexicon = Union[WordSet, FrequencyLexicon]
+
+
+def bank_lexicon() -> FrequencyLexicon:
+    """The shared frequency index over the question banks and sources (see :mod:`psytools.lexicon`)."""
+    return shared_lexicon()
+
+
+def dehyphenate(left: str, right: str, lexicon: Lexicon) -> Optional[str]:
+    """Join "науч-" + "ную" across a line-break hyphen, keeping real compounds hyphenated."""
+    if not left.endswith("-"):
+        return None
+    stem = HYPHENATED_RE.search(left)
+    fragment = FRAGMENT_RE.match(right)
+    if stem is None or fragment is None:
+        return None
+    stem_word = stem.group(1).lower()
+    right_word = fragment.group(1).lower()
+    if stem_word + right_word in lexicon:
+        return left[:-1] + right
+    if f"{stem_word}-{right_word}" in lexicon or (stem_word in lexicon and right_word in lexicon):
+        return left + right
+    return left[:-1] + right
+
+
+def should_join(left: str, right: str, lexicon: Optional[Lexicon], is_last: bool) -> bool:
+    """Decide whether chunk ``right`` is the continuation of chunk ``left``."""
+    tail = TRAILING_LETTERS_RE.search(left)
+    fragment = FRAGMENT_RE.match(right)
+    if tail is None or fragment is None:
+        return False
+    left_word = tail.group().lower()
+    right_word = fragment.group(1).lower()
+
+    if lexicon is not None:
+        frequency = lexicon.frequency
+        joined = left_word + right_word
+        joined_freq = frequency(joined)
+        left_known = frequency(left_word) > 0
+        right_known = frequency(right_word) > 0
+        if joined_freq:
+            if left_known and right_known:
+                # "с читаю" vs "считаю": trust the reading the corpus saw more.
+                return joined_freq > PAIR_BIAS * frequency(f"{left_word} {right_word}")
+            return True
+        if not left_known and lexicon.has_prefix(joined):
+            return True
+        if left_known or right_known:
+            return False
+
+    # No lexicon evidence: only glue short letter-only fragments followed by more text.
+    return not is_last and len(right) <= LEGACY_FRAGMENT_MAX and fragment.end(1) == len(right)
+
+
+def _legacy_pair(left: str, right: str) -> bool:
+    return TRAILING_LETTERS_RE.search(left) is not None and LEGACY_FRAGMENT_RE.fullmatch(right) is not None
+
+
+def _legacy_round(chunks: Iterable[str], open_end: bool) -> Iterator[str]:
+    """One legacy fragment pass (one regex substitution) over a chunk stream.
+
+    A pair is decided once the chunk after it arrives (the fragment must be
+    followed by whitespace); a joined pair is not joined again in the same
+    round, as the regex resumes after its match. ``open_end``: the text
+    ends in whitespace, so the last chunk counts as followed by some.
+    """
+    held: list = []
+    for chunk in chunks:
+        if len(held) < 2:
+            held.append(chunk)
+            continue
+        left, right = held
+        if _legacy_pair(left, right):
+            yield left + right
+            held = [chunk]
+        else:
+            yield left
+            held = [right, chunk]
+    if len(held) == 2 and open_end and _legacy_pair(*held):
+        yield held[0] + held[1]
+    else:
+        yield from held
+
+
+def legacy_join(chunks: Iterable[str], open_end: bool = False) -> Iterator[str]:
+    """Chunks after the fragment rounds of the legacy clean_text(), in one lazy scan."""
+    for _ in range(LEGACY_PASSES):
+        chunks = _legacy_round(chunks, open_end)
+    return iter(chunks)
+
+
+def normalize(text: str, lexicon: Optional[Lexicon] = None) -> str:
+    """Repair split words and spacing of ``text`` in a single scan."""
+    chunks = text.split()
+    if lexicon is None:
+        return _spaced(legacy_join(chunks, text[-1:].isspace()))
+    merged: list = []
+    last = len(chunks) - 1
+    for index, chunk in enumerate(chunks):
+        if merged:
+            joined = dehyphenate(merged[-1], chunk, lexicon)
+            if joined is not None:
+                merged[-1] = joined
+                continue
+            if should_join(merged[-1], chunk, lexicon, index == last):
+                merged[-1] += chunk
+                continue
+        merged.append(chunk)
+    return _spaced(merged)
+
+
+def _spaced(chunks: Iterable[str]) -> str:
+    """Chunks joined by single spaces, none before closing and after opening punctuation."""
+    out = []
+    previous = None
+    for chunk in chunks:
+        if previous is not None and chunk[0] not in CLOSING and previous[-1] not in OPENING:
+            out.append(" ")
+        out.append(chunk)
+        previous = chunk
+    return "".join(out)
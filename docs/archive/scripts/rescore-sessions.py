@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Re-score completed SMIL sessions after key or norm changes (see psytools/rescore.py).
+
+Usage:
+    python3 docs/archive/scripts/rescore-sessions.py [--dry-run] [--workers 4] [--page-size 2000]
+                                                     [--diff DIR] [--sqlite FILE] [--restart]
+
+Streams the completed sessions by id, recomputes raw/T/corrected scores,
+validity, additional scales and indices with the current key and norms, and
+writes back the sessions whose scores changed, with their profile and
+interpretation rebuilt as SmilModule does, one transaction per page.
+An interrupted run continues from its checkpoints (storage/cache/rescore,
+same --workers); --restart discards them.
+Connects to MySQL with the DB_* settings of .env, or to an SQLite copy with
+--sqlite.
+"""
+import argparse
+import shutil
+
+from psytools.rescore import CHECKPOINT_DIR, PAGE_SIZE, Job, rescore
+from psytools.session_scan import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored SMIL sessions")
+    parser.add_argument("--dry-run", action="store_true", help="diff only, write nothing")
+    parser.add_argument("--workers", type=int, default=1, help="processes, one id range each (max 16)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--diff", help="write the changed scores per session to DIR/*.jsonl")
+    parser.add_argument("--sqlite", help="use this SQLite database instead of MySQL")
+    parser.add_argument("--checkpoints", default=str(CHECKPOINT_DIR))
+    parser.add_argument("--restart", action="store_true", help="ignore and remove earlier checkpoints")
+    args = parser.parse_args()
+
+    if args.restart:
+        shutil.rmtree(args.checkpoints, ignore_errors=True)
+    job = Job(Database(args.sqlite), dry_run=args.dry_run, page_size=args.page_size,
+              checkpoint_dir=args.checkpoints, diff_dir=args.diff)
+    report = rescore(job, args.workers)
+
+    for section, count in sorted(report.sections.items()):
+        print(f"   {section}: {count}")
+    if report.unreadable:
+        print(f"⚠️  {report.unreadable} sessions with unreadable answers or results skipped")
+    verb = "dry run, nothing written" if args.dry_run else f"{report.written} written"
+    rate = report.scanned / report.seconds if report.seconds else 0
+    print(f"✅ {report.scanned} sessions scanned in {report.pages} pages, {report.changed} changed ({verb}), "
+          f"{report.seconds:.2f}s ({rate:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Incremental build of the SMIL question bank (see psytools/smil_pipeline.py).
+
+Usage:
+    python3 docs/archive/scripts/run-pipeline.py [--dry-run] [--force] [--step apply-key ...]
+
+Replaces running convert-txt-to-json.py, clean-questions-text.py,
+merge-question-data.py and apply-mmpi-key.py by hand: steps whose inputs are
+unchanged are skipped, and within a step only questions whose texts or key
+entries changed are rebuilt. Steps whose source files are absent (source/qw.txt,
+questions-566-gender.json, questions-566-correct.json) are skipped.
+"""
+import argparse
+import time
+
+from psytools.smil_pipeline import smil_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental SMIL question bank build")
+    parser.add_argument("--dry-run", action="store_true", help="only show which steps would run")
+    parser.add_argument("--force", action="store_true", help="run steps even if their inputs are unchanged")
+    parser.add_argument("--step", action="append", help="run only this step (repeatable)")
+    args = parser.parse_args()
+
+    pipeline = smil_pipeline()
+    started = time.perf_counter()
+    for result in pipeline.run(force=args.force, only=args.step, dry_run=args.dry_run):
+        detail = f" ({result.detail})" if result.detail else ""
+        if result.status == "ran":
+            print(f"✅ {result.name}: {result.seconds * 1000:.0f} ms{detail}")
+        else:
+            print(f"   {result.name}: {result.status}{detail}")
+    print(f"Total: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Batch raw scoring of SMIL answer sheets (see psytools/smil_scoring.py).
+
+Usage:
+    python3 docs/archive/scripts/score-smil-batch.py sheets.jsonl [-o scores.jsonl] [--key path]
+
+Each input line is either a session's answers object ({"1": 0, ..., "gender": "female"})
+or {"id": ..., "answers": {...}, "gender": ...}. Each output line holds the id
+(or line number), gender, raw, K-corrected raw and T-scores, and the validity
+verdict with its warning bits (psytools.smil_scoring.WARNINGS).
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+from psytools.answers import FEMALE, encode_sheets
+from psytools.smil_scoring import (
+    KEY_PATH,
+    NORMS_PATH,
+    RawScorer,
+    TScorer,
+    as_dicts,
+    control_score,
+    count_unknown,
+    is_valid,
+    validity_codes,
+)
+
+
+def read_sheets(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        answers = record.get("answers", record)
+        yield record.get("id", number), answers, record.get("gender", answers.get("gender"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch SMIL raw scoring")
+    parser.add_argument("input", help="JSONL answer sheets ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="JSONL scores (default: stdout)")
+    parser.add_argument("--key", default=str(KEY_PATH))
+    parser.add_argument("--norms", default=str(NORMS_PATH))
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    scorer = RawScorer.from_key_file(args.key)
+    t_scorer = TScorer.from_norms_file(args.norms)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+    started = time.perf_counter()
+    total = 0
+    with source, target:
+        sheets = read_sheets(source)
+        while True:
+            batch = list(itertools.islice(sheets, args.batch_size))
+            if not batch:
+                break
+            ids, answers, genders = zip(*batch)
+            matrix, gender_codes = encode_sheets(answers, genders)
+            raw = scorer.score(matrix, gender_codes)
+            corrected = t_scorer.corrected(raw)
+            t = t_scorer.score(raw, gender_codes, corrected)
+            unknown = count_unknown(matrix)
+            codes = validity_codes(t, unknown, control_score(matrix))
+            rows = zip(ids, gender_codes, as_dicts(raw), as_dicts(corrected), as_dicts(t), unknown, codes, is_valid(codes))
+            for sheet_id, gender, raw_row, corrected_row, t_row, unknown_row, code, valid in rows:
+                target.write(json.dumps({
+                    "id": sheet_id,
+                    "gender": "female" if gender == FEMALE else "male",
+                    "raw": raw_row,
+                    "corrected": corrected_row,
+                    "t": t_row,
+                    "unknown": int(unknown_row),
+                    "valid": bool(valid),
+                    "validity_code": int(code),
+                }, ensure_ascii=False) + "\n")
+            total += len(batch)
+    print(f"✅ {total} sheets scored in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
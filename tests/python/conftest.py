@@ -0,0 +1,49 @@
+"""Make the ingestion tooling in docs/archive/scripts importable from tests."""
+import json
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SCRIPTS_DIR = PROJECT_ROOT / "docs" / "archive" / "scripts"
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def _insert_sessions(connection, answers, genders=None, *, slug="smil", demographics=None, results=None,
+                     statuses=None, offset=0):
+    """Insert one session per row of an answer-code matrix; returns the ids, ascending.
+
+    ``genders`` are answers.MALE/FEMALE codes (default male), stored in the
+    answers as the web path does. ``demographics`` and ``statuses`` are per
+    row (default: the gender only, "completed"); ``results`` is a list of
+    calculated_results or a function of the answer sheets (default ``{}``).
+    Ids are spread evenly over the UUID space, shifted by ``offset`` so
+    several calls can share a database.
+    """
+    test_id = connection.execute("SELECT id FROM tests WHERE slug = ?", (slug,)).fetchone()[0]
+    count = len(answers)
+    genders = [0] * count if genders is None else list(genders)
+    sheets = [{**{str(q + 1): int(v) for q, v in enumerate(row)}, "gender": "female" if g else "male"}
+              for row, g in zip(answers, genders)]
+    demographics = demographics or [{"gender": sheet["gender"]} for sheet in sheets]
+    results = results(sheets) if callable(results) else results or [{}] * count
+    statuses = statuses or ["completed"] * count
+    ids = [str(uuid.UUID(int=n * (2 ** 128 // max(count, 1)) + 1 + offset)) for n in range(count)]
+    connection.executemany(
+        "INSERT INTO test_sessions (id, test_id, session_token, demographics, answers, calculated_results,"
+        " status, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, '2027-01-01')",
+        [(sid, test_id, sid, json.dumps(d), json.dumps(s), json.dumps(r), status)
+         for sid, s, d, r, status in zip(ids, sheets, demographics, results, statuses)],
+    )
+    connection.commit()
+    return ids
+
+
+@pytest.fixture
+def seed_sessions():
+    """Session-seeding helper for the database jobs (see :func:`_insert_sessions`)."""
+    return _insert_sessions
@@ -0,0 +1,94 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.additional_scales import NORMS_PATH, AdditionalScales, naive_scores, score_sheets  # noqa: E402
+from psytools.answers import MISSING, NO, UNKNOWN, YES, strict_answer_code  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures"
+
+
+@pytest.fixture(scope="module")
+def scales():
+    with open(NORMS_PATH, encoding="utf-8") as f:
+        return json.load(f)["scales"]
+
+
+def test_matches_php_reference_fixture(scales):
+    with open(FIXTURES / "smil-additional-reference-scores.json", encoding="utf-8") as f:
+        expected = json.load(f)
+    with open(FIXTURES / "smil-reference-answers.json", encoding="utf-8") as f:
+        answers = json.load(f)
+
+    [result] = score_sheets(AdditionalScales(scales), [answers], [expected["gender"]])
+
+    assert {code: {"raw": r["raw"], "t": r["t"]} for code, r in result.items()} == expected["scales"]
+    assert result["A"]["name"] == scales["factor"]["A"]["name"]
+    assert result["A"]["M"] == 16.48
+
+
+def test_random_sheets_match_per_scale_loop(scales):
+    rng = random.Random(11)
+    values = [0, 1, 2, "0", "1", "2", True, False, "true", "false", 1.0, None, "yes"]
+    sheets, genders = [], []
+    for _ in range(150):
+        sheets.append({
+            str(qid): rng.choice(values) if rng.random() < 0.3 else rng.choice([0, 1])
+            for qid in range(1, 567)
+            if rng.random() > 0.05
+        })
+        genders.append(rng.choice(["male", "female", "other"]))
+
+    results = score_sheets(AdditionalScales(scales), sheets, genders)
+
+    for result, sheet, gender in zip(results, sheets, genders):
+        assert {code: {"raw": r["raw"], "t": r["t"]} for code, r in result.items()} == naive_scores(scales, sheet, gender)
+
+
+def test_inverted_index_lists_scales_per_answer():
+    compiled = AdditionalScales({
+        "custom": {
+            "X": {"key": {"true": [1, 3, 3], "false": [2]}, "norms": {"male": {"M": 1, "delta": 0}}},
+            "Y": {"key": {"true": [3], "false": []}, "norms": {"male": {"M": 0, "delta": 1}}},
+            "no-norms": {"key": {"true": [1]}},
+        },
+    }, question_count=3)
+
+    assert compiled.codes == ["X", "Y"]
+    assert compiled.postings(3) == ["X", "X", "Y"]
+    assert compiled.postings(2, "false") == ["X"]
+    assert compiled.postings(2) == []
+
+    answers = np.array([[YES, NO, YES], [NO, UNKNOWN, MISSING]], dtype=np.uint8)
+    raw, t = compiled.score(answers, np.array([0, 1], dtype=np.uint8))
+    assert raw.tolist() == [[4, 1], [0, 0]]
+    # delta 0 gives 50; the female norms fall back to the male ones.
+    assert t.tolist() == [[50, 60], [50, 50]]
+
+
+def test_strict_codes_follow_php_identity_comparisons():
+    assert [strict_answer_code(v) for v in (1, "1", True, "true")] == [YES] * 4
+    assert [strict_answer_code(v) for v in (0, "0", False, "false")] == [NO] * 4
+    assert [strict_answer_code(v) for v in (2, 1.0, "yes", None)] == [UNKNOWN, MISSING, MISSING, MISSING]
+
+
+def test_norm_fallback_follows_php_null_coalescing():
+    male = {"M": 5, "delta": 1}
+    scales = {"custom": {
+        "empty": {"key": {"true": [1]}, "norms": {"male": male, "female": {}}},
+        "null-delta": {"key": {"true": [1]}, "norms": {"male": male, "female": {"M": 0, "delta": None}}},
+        "null-female": {"key": {"true": [1]}, "norms": {"male": male, "female": None}},
+        "zero-mean": {"key": {"true": [1]}, "norms": {"male": male, "female": {"M": 0, "delta": 2}}},
+        "null-key": {"key": None, "norms": {"male": male}},
+    }}
+    compiled = AdditionalScales(scales, question_count=1)
+
+    _, t = compiled.score(np.array([[YES]], dtype=np.uint8), np.array([1], dtype=np.uint8))
+    # Only a missing or null female norm falls back to the male one.
+    assert compiled.codes == ["empty", "null-delta", "null-female", "zero-mean"]
+    assert t.tolist() == [[60, 60, 20, 55]]
+    assert [r["t"] for r in naive_scores(scales, {"1": 1}, "female").values()] == [60, 60, 20, 55]
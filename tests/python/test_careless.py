@@ -0,0 +1,97 @@
+import itertools
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.answers import MISSING, NO, UNKNOWN, YES  # noqa: E402
+from psytools.careless import (  # noqa: E402
+    CONTROL_MISMATCH,
+    INCONSISTENT,
+    LONGSTRING,
+    OPPOSITE_PAIRS,
+    REPEATED_PAIRS,
+    UNKNOWN_SHARE,
+    Job,
+    careless_codes,
+    careless_scores,
+    flag_sessions,
+    longest_runs,
+)
+from psytools.db import sqlite_from_schema  # noqa: E402
+from psytools.session_scan import Database  # noqa: E402
+from psytools.smil_records import CONTROL_QUESTIONS  # noqa: E402
+
+
+def consistent(n, seed):
+    """Sheets answering the control items YES and every pair consistently."""
+    rng = np.random.default_rng(seed)
+    answers = rng.choice([NO, YES], size=(n, 566)).astype(np.uint8)
+    answers[:, np.array(CONTROL_QUESTIONS) - 1] = YES
+    for first, second in REPEATED_PAIRS:
+        answers[:, second - 1] = answers[:, first - 1]
+    for first, second in OPPOSITE_PAIRS:
+        answers[:, second - 1] = 1 - answers[:, first - 1]
+    return answers
+
+
+def test_longest_runs_match_a_row_by_row_count():
+    rng = np.random.default_rng(3)
+    answers = rng.choice([NO, YES, UNKNOWN, MISSING], p=[0.5, 0.4, 0.05, 0.05], size=(200, 566)).astype(np.uint8)
+    answers[7, 100:180] = NO
+    answers[8] = YES
+
+    expected = [max(len(list(run)) for _, run in itertools.groupby(row)) for row in answers.tolist()]
+    assert longest_runs(answers).tolist() == expected
+    assert longest_runs(answers)[8] == 566
+
+
+def test_careless_codes():
+    answers = consistent(6, 4)
+    answers[1, 200:240] = YES
+    answers[2, :80] = UNKNOWN
+    answers[2, np.array(CONTROL_QUESTIONS) - 1] = YES
+    answers[3, np.array(CONTROL_QUESTIONS[:10]) - 1] = NO
+    for first, second in REPEATED_PAIRS[:8]:
+        answers[4, second - 1] = 1 - answers[4, first - 1]
+    answers[5, [second - 1 for _, second in REPEATED_PAIRS[4:]]] = UNKNOWN
+
+    scores = careless_scores(answers)
+    codes = careless_codes(scores)
+
+    assert scores.control_mismatch.tolist() == [0, 0, 0, 10, 0, 0]
+    assert scores.inconsistent[4] == 8 and scores.pairs[4] == 21
+    assert scores.pairs[5] == 9 and scores.inconsistent[5] == 0
+    assert codes.tolist() == [0, LONGSTRING, UNKNOWN_SHARE, CONTROL_MISMATCH, INCONSISTENT, 0]
+
+
+def seed(seed_sessions, path, answers):
+    connection = sqlite_from_schema(str(path))
+    demographics = [{"gender": "male"} for _ in answers]
+    demographics[1]["synthetic"] = "random"
+    seed_sessions(connection, answers, demographics=demographics,
+                  results=[{"raw_scores": {"L": n}} for n in range(len(answers))])
+    return connection
+
+
+def test_flag_sessions_stores_a_careless_section(tmp_path, seed_sessions):
+    answers = consistent(20, 5)
+    answers[[3, 11], :] = np.random.default_rng(6).choice([NO, YES], size=(2, 566))
+    connection = seed(seed_sessions, tmp_path / "db.sqlite", answers)
+    job = Job(Database(str(tmp_path / "db.sqlite")), page_size=4)
+
+    report = flag_sessions(job, workers=2)
+    again = flag_sessions(job)
+
+    stored = {sid: json.loads(results) for sid, results in
+              connection.execute("SELECT id, calculated_results FROM test_sessions ORDER BY id")}
+    ids = list(stored)
+    assert (report.scanned, report.synthetic, report.written, again.written) == (20, 1, 19, 0)
+    assert sorted(report.suspects) == sorted([ids[3], ids[11]])
+    assert stored[ids[3]]["careless"]["suspect"] and "control" in stored[ids[3]]["careless"]["flags"]
+    section = stored[ids[0]]["careless"]
+    assert section.pop("longstring") == longest_runs(answers[:1])[0]
+    assert section == {"suspect": False, "flags": [], "unknown_share": 0.0, "control_mismatch": 0,
+                       "inconsistent_pairs": 0, "answered_pairs": 21}
+    assert stored[ids[5]]["raw_scores"] == {"L": 5} and "careless" not in stored[ids[1]]
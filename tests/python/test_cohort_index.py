@@ -0,0 +1,152 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.bitmap import Bitmap  # noqa: E402
+from psytools.cohort_index import CohortIndex, code_types, profile_types, update  # noqa: E402
+from psytools.db import sqlite_from_schema  # noqa: E402
+from psytools.rescore import Job, rescore  # noqa: E402
+from psytools.session_scan import Database  # noqa: E402
+from psytools.synthetic import generate  # noqa: E402
+
+
+def test_bitmap_set_operations_match_python_sets():
+    rng = np.random.default_rng(0)
+    for dense, sparse in ((300_000, 20_000), (1000, 5), (0, 100)):
+        a = rng.choice(400_000, dense, replace=False)
+        b = rng.choice(400_000, sparse, replace=False)
+        left, right = Bitmap.from_rows(a), Bitmap.from_rows(b)
+        sa, sb = set(a.tolist()), set(b.tolist())
+        assert set((left & right).rows().tolist()) == sa & sb
+        assert set((left | right).rows().tolist()) == sa | sb
+        assert set((left - right).rows().tolist()) == sa - sb
+        assert len(left | right) == len(sa | sb)
+        assert Bitmap.from_bytes(left.to_bytes()) == left
+
+
+def test_profile_and_code_types_follow_smil_module():
+    t = np.array([
+        [50, 55, 45, 50, 40, 50, 50, 50, 50, 50],
+        [65, 62, 45, 50, 40, 70, 50, 50, 50, 50],
+        [50, 50, 45, 50, 40, 65, 61, 50, 50, 50],
+        [50, 50, 45, 61, 40, 50, 50, 50, 50, 50],
+        [50, 50, 45, 50, 40, 50, 50, 50, 62, 50],
+        [50, 70, 45, 50, 40, 50, 70, 50, 50, 50],
+    ])
+    assert profile_types(t).tolist() == ["normosthenic", "neurotic", "psychotic", "personal_deviation", "mixed",
+                                         "mixed"]
+    assert code_types(t).tolist() == ["2-1", "6-1", "6-7", "4-1", "9-1", "2-7"]
+
+
+def seed(seed_sessions, connection, count, offset, seed_value):
+    batch = next(generate("smil", count, seed=seed_value, failures={"random": 0.2}))
+    demographics = [{"gender": "female" if g else "male", "age": 20 + n % 5 * 10} for n, g in enumerate(batch.genders)]
+    demographics[3]["synthetic"] = "normal"
+    seed_sessions(connection, batch.answers, batch.genders, demographics=demographics, offset=offset)
+    seed_sessions(connection, np.zeros((1, 0), dtype=np.int8), [1], slug="hads", offset=offset + 2)
+
+
+def brute_force(connection):
+    """``gender=female valid=true t8>=70`` and ``test=hads`` by decoding every stored result."""
+    cohort, hads = set(), set()
+    for sid, slug, demographics, results in connection.execute(
+            "SELECT s.id, t.slug, s.demographics, s.calculated_results FROM test_sessions s"
+            " JOIN tests t ON t.id = s.test_id WHERE s.status = 'completed'"):
+        demographics, results = json.loads(demographics), json.loads(results)
+        if slug == "hads":
+            hads.add(sid)
+        elif (not demographics.get("synthetic") and demographics["gender"] == "female"
+              and results["validity"]["is_valid"] and results["t_scores"]["8"] >= 70):
+            cohort.add(sid)
+    return cohort, hads
+
+
+def test_index_answers_cohorts_and_updates_incrementally(tmp_path, seed_sessions):
+    path = tmp_path / "db.sqlite"
+    connection = sqlite_from_schema(str(path))
+    seed(seed_sessions, connection, 120, 0, 1)
+    job = Job(Database(str(path)), checkpoint_dir=None)
+    rescore(job)
+    sid, rescored = connection.execute("SELECT id, calculated_results FROM test_sessions LIMIT 1").fetchone()
+    code = json.loads(rescored)["profile"]["code_type"]
+
+    index = CohortIndex()
+    assert update(index, connection) == (121, 0, 0)
+    assert sid in index.session_ids(index.query(f"code={code}"))
+    query = "gender=female valid=true t8>=70"
+    cohort, hads = brute_force(connection)
+    assert set(index.session_ids(index.query(query))) == cohort
+    assert set(index.session_ids(index.query("test=hads"))) == hads
+    assert len(index.query("test=smil")) == 119
+    assert len(index.query("test=smil", include_synthetic=True)) == 120
+    assert index.query("t8>=70") == index.query("t8>69") == index.query("test=smil") - index.query("t8<70")
+    assert len(index.query("code=2-7,7-2")) == len(index.query("code=2-7")) + len(index.query("code=7-2"))
+    with pytest.raises(ValueError):
+        index.query("t8>=65")
+
+    index.save(tmp_path / "index.npz")
+    index = CohortIndex.load(tmp_path / "index.npz")
+    seed(seed_sessions, connection, 40, 1000, 2)
+    rescore(job)
+    gone = sorted(cohort)[0]
+    connection.execute("UPDATE test_sessions SET status = 'deleted' WHERE id = ?", (gone,))
+    connection.commit()
+
+    assert update(index, connection) == (41, 0, 1)
+    cohort, hads = brute_force(connection)
+    assert set(index.session_ids(index.query(query))) == cohort and gone not in cohort
+    assert set(index.session_ids(index.query("test=hads"))) == hads and len(hads) == 2
+    assert update(index, connection) == (0, 0, 0)
+
+    # A session changed in place (here: re-scored into the cohort) moves to a new row.
+    index.save(tmp_path / "index.npz")
+    index = CohortIndex.load(tmp_path / "index.npz")
+    moved = sorted(set(index.session_ids(index.query("test=smil gender=female"))) - cohort)[0]
+    results = json.loads(connection.execute("SELECT calculated_results FROM test_sessions WHERE id = ?",
+                                            (moved,)).fetchone()[0])
+    results["validity"]["is_valid"], results["t_scores"]["8"] = True, 75
+    connection.execute("UPDATE test_sessions SET calculated_results = ? WHERE id = ?", (json.dumps(results), moved))
+    connection.commit()
+    assert update(index, connection) == (0, 1, 0)
+    cohort, _ = brute_force(connection)
+    assert moved in cohort and set(index.session_ids(index.query(query))) == cohort
+    assert len(index.query("test=smil")) == 157 and update(index, connection) == (0, 0, 0)
+
+
+def test_update_fetches_new_and_changed_rows_only_and_save_compacts(tmp_path, seed_sessions, monkeypatch):
+    connection = sqlite_from_schema(str(tmp_path / "db.sqlite"))
+    completed = ("UPDATE test_sessions SET completed_at = datetime(?, '+' || rowid || ' seconds')"
+                 " WHERE completed_at IS NULL")
+    seed(seed_sessions, connection, 30, 0, 1)
+    connection.execute(completed, ("2026-01-01",))
+    connection.commit()
+    index = CohortIndex()
+    assert update(index, connection) == (31, 0, 0) and index.watermark == "2026-01-01 00:00:31"
+
+    fetched = []
+    add = CohortIndex.add
+    monkeypatch.setattr(CohortIndex, "add", lambda self, rows: fetched.extend(r[0] for r in rows) or add(self, rows))
+    seed(seed_sessions, connection, 10, 1000, 2)
+    connection.execute(completed, ("2026-02-01",))
+    changed, gone = [sid for (sid,) in connection.execute("SELECT id FROM test_sessions ORDER BY rowid LIMIT 2")]
+    connection.execute("UPDATE test_sessions SET calculated_results = ? WHERE id = ?",
+                       (json.dumps({"careless": {"suspect": True}}), changed))
+    connection.execute("UPDATE test_sessions SET status = 'deleted' WHERE id = ?", (gone,))
+    connection.commit()
+
+    assert update(index, connection) == (11, 1, 1)
+    last = connection.execute("SELECT id FROM test_sessions WHERE rowid = 31").fetchone()[0]
+    new = [sid for (sid,) in connection.execute("SELECT id FROM test_sessions WHERE rowid > 31")]
+    assert sorted(fetched) == sorted(new + [last, changed])  # the row at the watermark is read again
+    assert index.session_ids(index.query("careless=true")) == [changed]
+
+    before = {text: sorted(index.session_ids(index.query(text))) for text in ("test=smil", "gender=female t8>=70")}
+    assert len(index.ids) == 43 and len(index) == 41
+    index.save(tmp_path / "index.npz")
+    loaded = CohortIndex.load(tmp_path / "index.npz")
+    assert len(loaded.ids) == len(loaded) == 41 and loaded.watermark == index.watermark
+    assert {text: sorted(loaded.session_ids(loaded.query(text))) for text in before} == before
+    fetched.clear()
+    assert update(loaded, connection) == (0, 0, 0) and len(fetched) == 1
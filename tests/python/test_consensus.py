@@ -0,0 +1,64 @@
+import random
+
+from psytools.consensus import banded_distance, build_consensus, needs_review, to_questions
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+def test_banded_distance_is_exact_within_the_band():
+    rnd = random.Random(3)
+    for _ in range(500):
+        a = "".join(rnd.choice("аб в") for _ in range(rnd.randrange(0, 30)))
+        b = list(a)
+        for _ in range(rnd.randrange(0, 8)):
+            i = rnd.randrange(len(b) + 1)
+            if rnd.random() < 0.5 or not b[i:]:
+                b.insert(i, rnd.choice("аб в"))
+            else:
+                del b[i]
+        b = "".join(b)
+        expected = levenshtein(a, b)
+        assert banded_distance(a, b, band=4) == (expected if expected <= 4 else None)
+        assert banded_distance(a, b, band=40) == expected
+
+
+def test_hand_fixed_text_wins_over_shared_pdf_artifacts():
+    readings = {
+        "txt": ({1: "Я люблю читать журналы", 2: "Мне нравится работа", 3: "Текст другого вопроса"},
+                {1: "Я люблю читать"}),
+        "pypdf2": ({1: "Я лю блю читать журналы", 2: "Мне нравится работа", 3: "Я встаю свежим и отдохнувшим"},
+                   {1: "Я люблю читать"}),
+        "fitz": ({1: "Я лю блю читать журналы", 2: "Совсем другой текст вопроса", 3: "Я встаю свежим и отдохнувшим"},
+                 {}),
+    }
+
+    items = build_consensus(readings, ids=[1, 2, 3, 4])
+    by_key = {(item.id, item.variant): item for item in items}
+
+    assert [(item.id, item.variant) for item in items] == [(1, "male"), (1, "female"), (2, "male"), (3, "male")]
+    assert by_key[1, "male"].source == "txt" and by_key[1, "male"].text == "Я люблю читать журналы"
+    assert by_key[1, "male"].distances == {"txt": 0, "pypdf2": 1, "fitz": 1}
+    assert by_key[1, "male"].agreement > 0.95
+    assert by_key[2, "male"].source == "txt"
+    assert by_key[2, "male"].distances["fitz"] is None
+    # Both PDFs against an unrelated txt item: the txt text is the outlier.
+    assert by_key[3, "male"].source == "pypdf2"
+    assert [(item.id, item.variant) for item in needs_review(items)] == [(1, "female"), (2, "male"), (3, "male")]
+    assert to_questions(items)[0]["text_female"] == "Я люблю читать"
+
+
+def test_process_pool_gives_the_same_items():
+    rnd = random.Random(5)
+    texts = {q: "".join(rnd.choice("абвгд ") for _ in range(60)) for q in range(1, 41)}
+    readings = {source: ({q: t[:n] + t[n + 1:] for q, t in texts.items()}, texts)
+                for source, n in (("txt", 3), ("pypdf2", 10), ("fitz", 50))}
+
+    assert build_consensus(readings, workers=2, ids=texts) == build_consensus(readings, ids=texts)
@@ -0,0 +1,67 @@
+import dataclasses
+import json
+
+import pytest
+
+from psytools.ingest import build, parse, rebuild, records, render_source, validate
+from psytools.instruments import PROFILES
+from psytools.smil_records import gender_record
+
+PLAIN = [module for module, profile in PROFILES.items() if not profile.variants]
+
+
+@pytest.mark.parametrize("module", PLAIN)
+def test_shipped_banks_rebuild_from_their_source_text(module):
+    profile = PROFILES[module]
+    shipped = json.loads(profile.output.read_text(encoding="utf-8"))
+
+    source = render_source(profile, shipped)
+    rebuilt = list(records(profile, parse(profile, source.splitlines())))
+
+    assert rebuilt == shipped
+    assert validate(profile, rebuilt) == []
+
+
+def test_variant_profile_matches_the_smil_records():
+    profile = dataclasses.replace(PROFILES["smil"], question_count=3, control_items=[2])
+    lines = ["Мужской вариант.", "1. Я люблю читать.", "2. Я мужчина.", "Женский вариант.", "2. Я женщина.",
+             "3. Контроль."]
+
+    questions = list(records(profile, parse(profile, lines)))
+
+    assert questions == [
+        {**gender_record(1, "Я люблю читать.", ""), "is_control": False},
+        {**gender_record(2, "Я мужчина.", "Я женщина."), "is_control": True},
+        {**gender_record(3, "", "Контроль."), "is_control": False},
+    ]
+
+
+def test_problems_block_the_write(tmp_path):
+    profile = dataclasses.replace(PROFILES["hads"], output=tmp_path / "questions.json")
+    lines = ["1. Я напряжен", "0) Нет", "1) Иногда", "3) Всегда", "2. Радуюсь", "0) Да"]
+
+    report = build(profile, lines)
+
+    assert not report.written and not profile.output.exists()
+    assert report.problems[0].startswith("нет вопросов: 3, 4, 5")
+    assert "вопрос 1: варианты ответа [0, 1, 3]" in report.problems
+    assert "ключ scale=HADS-A: вопросы вне банка 3, 5, 7, 9, 11, 13" in report.problems
+
+
+def test_instruments_are_rebuilt_in_parallel(tmp_path):
+    profiles = []
+    for module in PLAIN:
+        profile = PROFILES[module]
+        source = tmp_path / f"{module}.txt"
+        source.write_text(render_source(profile, json.loads(profile.output.read_text(encoding="utf-8"))),
+                          encoding="utf-8")
+        profiles.append(dataclasses.replace(profile, source=source, output=tmp_path / module / "questions.json"))
+        profiles[-1].output.parent.mkdir()
+
+    reports = rebuild(profiles, workers=2)
+
+    assert [r.slug for r in reports] == [p.slug for p in profiles]
+    assert all(r.written and not r.problems for r in reports)
+    for module, profile in zip(PLAIN, profiles):
+        assert json.loads(profile.output.read_text(encoding="utf-8")) == json.loads(
+            PROFILES[module].output.read_text(encoding="utf-8"))
@@ -0,0 +1,73 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools import item_analysis  # noqa: E402
+from psytools.answers import NO, YES  # noqa: E402
+from psytools.item_analysis import ItemAnalysis, Scale, key_scales  # noqa: E402
+
+SCALES = [
+    Scale("test", "A", [1, 2, 3, 4], [5]),
+    Scale("test", "B", [3, 6], [7, 8, 9, 10]),
+    Scale("test", "5M", [1, 6, 7], [2]),
+]
+
+
+def sheets(n, seed):
+    rng = np.random.default_rng(seed)
+    trait = rng.normal(size=(n, 1))
+    answers = np.where(rng.normal(size=(n, 12)) + trait > 0, YES, NO).astype(np.uint8)
+    answers[rng.random((n, 12)) < 0.05] = 2
+    return answers, rng.integers(0, 2, n).astype(np.uint8)
+
+
+def direct(scale, answers):
+    x = np.column_stack([answers[:, q - 1] == YES for q in scale.true]
+                        + [answers[:, q - 1] == NO for q in scale.false]).astype(float)
+    total, k = x.sum(axis=1), x.shape[1]
+    alpha = k / (k - 1) * (1 - x.var(axis=0).sum() / total.var())
+    item_total = [np.corrcoef(x[:, i], total - x[:, i])[0, 1] for i in range(k)]
+    deleted = [(k - 1) / (k - 2) * (1 - (x.var(axis=0).sum() - x[:, i].var()) / (total - x[:, i]).var())
+               for i in range(k)]
+    return alpha, x.mean(axis=0), item_total, deleted
+
+
+def test_one_chunked_pass_matches_per_scale_statistics(monkeypatch):
+    monkeypatch.setattr(item_analysis, "CHUNK_SIZE", 64)
+    answers, genders = sheets(1000, 1)
+
+    analysis = ItemAnalysis(SCALES, question_count=12)
+    analysis.add(answers, genders)
+    results = analysis.results()
+
+    for scale, result in zip(SCALES, results):
+        rows = genders == 0 if scale.code == "5M" else np.ones(len(genders), bool)
+        alpha, endorsement, item_total, deleted = direct(scale, answers[rows])
+        assert result.sheets == rows.sum()
+        assert result.alpha == pytest.approx(alpha)
+        assert [item.endorsement for item in result.items] == pytest.approx(endorsement)
+        assert [item.item_total for item in result.items] == pytest.approx(item_total)
+        assert [item.alpha_if_deleted for item in result.items] == pytest.approx(deleted)
+    assert results[0].items[0].yes_rate == pytest.approx((answers[:, 0] == YES).mean())
+
+
+def test_partial_states_merge():
+    answers, genders = sheets(500, 2)
+    whole = ItemAnalysis(SCALES, question_count=12)
+    whole.add(answers, genders)
+    merged = ItemAnalysis(SCALES, question_count=12)
+    for part in np.array_split(np.arange(500), 3):
+        state = ItemAnalysis(SCALES, question_count=12)
+        state.add(answers[part], genders[part])
+        merged.merge(state)
+
+    assert [r.to_dict() for r in merged.results()] == [r.to_dict() for r in whole.results()]
+
+
+def test_key_scales_cover_the_key_of_record_and_additional_scales():
+    scales = {scale.name: scale for scale in key_scales()}
+
+    assert {"key.scales:L", "key.scales:5M", "key.scales:5F", "additional-scales:A"} <= set(scales)
+    assert len(scales["key.scales:L"].false) == 15
+    with pytest.raises(ValueError):
+        key_scales(["nope"])
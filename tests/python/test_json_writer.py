@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from psytools.json_writer import file_hash, write_json
+from psytools.paths import SMIL_DIR
+from psytools.question_bank import QuestionBank, compile_bank
+
+DOC = {
+    "test": "СМИЛ",
+    "scales": {"L": [1, 2], "F": []},
+    "control_questions": [14, 33],
+    "questions": [{"id": 1, "text": "Люблю \"читать\"", "scales": {"L": "no"}}, {"id": 2, "scales": {}}],
+    "empty": {},
+    "nested": [[1, [2, 3]], {"a": None, "b": 1.5}],
+}
+
+
+@pytest.mark.parametrize("indent", [2, 4])
+def test_output_is_json_dumps_byte_for_byte(tmp_path, indent):
+    path = tmp_path / "bank.json"
+
+    assert write_json(path, DOC, indent=indent)
+    assert path.read_text(encoding="utf-8") == json.dumps(DOC, ensure_ascii=False, indent=indent)
+
+    compact = tmp_path / "bank.min.json"
+    assert write_json(compact, {**DOC, "questions": (q for q in DOC["questions"])}, compact=True)
+    assert compact.read_text(encoding="utf-8") == json.dumps(DOC, ensure_ascii=False, separators=(",", ":"))
+
+
+def test_unchanged_output_is_not_rewritten_but_a_format_switch_is(tmp_path):
+    path = tmp_path / "bank.json"
+    write_json(path, DOC, indent=4)
+    before = os.stat(path)
+
+    assert not write_json(path, json.loads(json.dumps(DOC)), indent=4)
+    after = os.stat(path)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert file_hash(path) == hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+    assert write_json(path, DOC, compact=True)
+    assert path.read_text(encoding="utf-8") == json.dumps(DOC, ensure_ascii=False, separators=(",", ":"))
+    assert not write_json(path, DOC, compact=True)
+    assert write_json(path, DOC, indent=2)
+    assert write_json(path, {**DOC, "test": "MMPI"}, indent=2)
+    assert os.listdir(tmp_path) == ["bank.json"]
+
+
+def test_failed_write_leaves_the_old_file_in_place(tmp_path):
+    path = tmp_path / "bank.json"
+    write_json(path, DOC)
+    original = path.read_bytes()
+
+    def records():
+        yield {"id": 1}
+        raise RuntimeError("source broke")
+
+    with pytest.raises(RuntimeError):
+        write_json(path, {"questions": records()})
+
+    assert path.read_bytes() == original
+    assert os.listdir(tmp_path) == ["bank.json"]
+
+
+def test_compact_bank_compiles(tmp_path):
+    with open(SMIL_DIR / "questions-566-full.json", encoding="utf-8") as f:
+        data = json.load(f)
+    path = tmp_path / "questions-566-full.json"
+    write_json(path, data, compact=True)
+
+    with QuestionBank(compile_bank(path, tmp_path / "bank.bin")) as bank:
+        assert bank.to_dict() == data
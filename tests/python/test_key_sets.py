@@ -0,0 +1,72 @@
+import json
+import shutil
+
+import pytest
+
+from psytools.key_sets import ERROR, INFO, analyse, bits, ids, load_sources, summary
+from psytools.paths import SMIL_DIR
+
+FILES = {
+    "key_path": SMIL_DIR / "Scoring" / "keys" / "mmpi-key-solomin.json",
+    "bank_path": SMIL_DIR / "questions-566-full.json",
+    "norms_path": SMIL_DIR / "basic_scales_norms.json",
+    "additional_path": SMIL_DIR / "additional-scales.json",
+    "additional_norms_path": SMIL_DIR / "additional-scales-norms.json",
+}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = {}
+    for name, path in FILES.items():
+        paths[name] = tmp_path / path.name
+        shutil.copy(path, paths[name])
+    return paths
+
+
+def edit(path, change):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    change(data)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_bitsets_round_trip():
+    assert ids(bits([566, 1, 64, 65])) == [1, 64, 65, 566]
+    assert bits([3]) & bits([3, 4]) == bits([3])
+
+
+def test_shipped_key_of_record_is_consistent():
+    findings = analyse(load_sources())
+
+    assert summary(findings)[ERROR] == 0
+    unscored = next(f for f in findings if f.kind == "unscored")
+    assert unscored.severity == INFO and len(unscored.items) == 566 - 380
+
+
+def test_key_edits_that_break_the_record_are_errors(sources):
+    def flip_bank_item(data):
+        entry = next(e for e in data["questions"][14]["scales"] if e["scale"] == "L")
+        entry["direction"] = 1
+
+    def corrupt_key(data):
+        data["scales"]["K"]["true"] += [30, 600]
+
+    edit(sources["bank_path"], flip_bank_item)
+    edit(sources["key_path"], corrupt_key)
+
+    errors = [f for f in analyse(load_sources(**sources)) if f.severity == ERROR]
+    kinds = {(f.kind, f.items) for f in errors}
+
+    assert ("direction-conflict", (15,)) in kinds  # question 15, L: key says False, bank True
+    assert ("both-directions", (30,)) in kinds
+    assert ("orphan", (600,)) in kinds
+    assert ("direction-conflict", (30,)) in kinds  # K 30 is now True in the scale view only
+
+
+def test_max_raw_mismatch_is_reported(sources):
+    edit(sources["norms_path"], lambda data: data["scales"]["L"]["male"].update(maxRaw=16))
+
+    messages = [f.message for f in analyse(load_sources(**sources)) if f.kind == "max-raw"]
+
+    assert any(m.startswith("basic_scales_norms L (male): maxRaw 16") for m in messages)
+    assert not any(m.startswith("basic_scales_norms L (female)") for m in messages)
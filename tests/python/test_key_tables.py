@@ -0,0 +1,119 @@
+import pytest
+
+fitz = pytest.importorskip("pymupdf")
+
+from psytools.key_tables import KeyTableParser, column_bounds, extract_key, layout_lines  # noqa: E402
+
+LEFT = {
+    ("L", "Неверно"): list(range(15, 240, 15)),
+    ("F", "Верно"): [14, 23, 27, 31, 33, 34, 35, 40, 42, 48, 49, 50],
+    ("F", "Неверно"): [17, 20, 54, 65],
+}
+RIGHT = {
+    ("5 для мужчин", "Верно"): [4, 25, 26, 69, 70, 74, 77, 78, 87, 92, 126],
+    ("К", "Верно"): [96],
+    ("К", "Неверно"): [30, 39, 71, 89, 124, 129, 134, 138, 142, 148, 160, 170, 171],
+}
+
+
+def column_words(x, y, tables):
+    words = []
+    scale = None
+    for (name, direction), items in tables.items():
+        if name != scale:
+            words.append((y, x, f"Шкала {name}:"))
+            y, scale = y + 14, name
+        words.append((y, x, f"{direction} ({len(items)}):"))
+        y += 14
+        for start in range(0, len(items), 5):
+            for column, item in enumerate(items[start:start + 5]):
+                words.append((y, x + 40 * column, str(item)))
+            y += 14
+    return words
+
+
+def make_manual(path, pages=8, key_page=4):
+    font = fitz.Font("cjk")
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        writer.append((40, 30), "Личностный опросник MMPI — методическое руководство", font=font, fontsize=9)
+        if number == key_page:
+            # Typeset row by row across both columns, as a table layout
+            # engine would emit it.
+            for y, x, text in sorted(column_words(40, 80, LEFT) + column_words(320, 80, RIGHT)):
+                writer.append((x, y), text, font=font, fontsize=10)
+        elif number == key_page + 1:
+            writer.append((40, 80), "Т-баллы", font=font, fontsize=10)
+            for row in range(10):
+                writer.append((40, 100 + 14 * row), " ".join(str(row * 7 + c) for c in range(8)), font=font, fontsize=10)
+        else:
+            for row in range(20):
+                writer.append((40, 80 + 14 * row), f"Текст руководства, строка {row} страницы {number}.", font=font,
+                              fontsize=10)
+        writer.write_text(page)
+    doc.save(str(path))
+    doc.close()
+
+
+def expected_scales():
+    scales = {}
+    for tables in (LEFT, RIGHT):
+        for (name, direction), items in tables.items():
+            code = {"К": "K", "5 для мужчин": "5M"}.get(name, name)
+            scales.setdefault(code, {})["true" if direction == "Верно" else "false"] = items
+    return scales
+
+
+def test_two_column_key_page_is_rebuilt_geometrically(tmp_path):
+    path = tmp_path / "manual.pdf"
+    make_manual(path)
+
+    extraction = extract_key(path, workers=2)
+
+    assert extraction.pages == [4, 5]  # the key page and the numeric page after it
+    assert extraction.scales == expected_scales()
+    assert {s: extraction.confidence(s) for s in extraction.scales} == dict.fromkeys(extraction.scales, 1.0)
+
+    # The plain text runs the two columns together and the line parser mixes them up.
+    with fitz.open(str(path)) as doc:
+        plain = KeyTableParser()
+        for line in doc[4].get_text().splitlines():
+            plain.feed(line)
+    assert plain.result.scales != expected_scales()
+
+
+def test_gaps_inside_a_number_grid_do_not_split_columns(tmp_path):
+    path = tmp_path / "manual.pdf"
+    make_manual(path, pages=1, key_page=0)
+    with fitz.open(str(path)) as doc:
+        page = doc[0]
+        words = [w[:5] for w in page.get_text("words")]
+        width = page.rect.width
+
+    [bound] = column_bounds(words, width)
+    lines = layout_lines(words, width)
+
+    assert 280 < bound < 320
+    assert lines.index("Шкала 5 для мужчин:") > lines.index("Шкала F:")
+    assert "15 30 45 60 75" in lines
+
+
+def test_confidence_drops_with_missing_or_unordered_items():
+    parser = KeyTableParser()
+    for line in ["Шкала 2:", "Верно (6):", "5 13 23", "32 41", "Неверно (3):", "9 8 2"]:
+        parser.feed(line)
+
+    extraction = parser.result
+    assert extraction.scales["2"] == {"true": [5, 13, 23, 32, 41], "false": [9, 8, 2]}
+    assert extraction.confidence("2") == round(5 / 6 * (1 / 3), 3)
+
+
+def test_repeated_scale_headers_keep_the_items_read_so_far():
+    parser = KeyTableParser()
+    lines = ["Шкала 2:", "Верно (6):", "5 13 23", "Шкала 2 (продолжение):", "32 41 51", "Шкала 3 — см. ниже:"]
+    for line in lines + ["Шкала 2:", "Неверно (1):", "9"]:
+        parser.feed(line)
+
+    assert parser.result.scales == {"2": {"true": [5, 13, 23, 32, 41, 51], "false": [9]}}
@@ -0,0 +1,81 @@
+import json
+from collections import Counter
+
+import pytest
+
+from psytools import lexicon as lexicon_module
+from psytools.lexicon import (
+    FrequencyLexicon,
+    bank_paths,
+    count_forms,
+    read_word_list,
+    shared_lexicon,
+    source_paths,
+    write_index,
+)
+from psytools.text_normalizer import normalize
+
+
+def test_index_round_trip(tmp_path):
+    counts = count_forms(["Я считаю, что несколько раз", "Я не считаю т.д."])
+    write_index(tmp_path / "lex.idx", counts)
+    lexicon = FrequencyLexicon(tmp_path / "lex.idx")
+
+    assert len(lexicon) == len(counts)
+    assert lexicon.frequency("считаю") == 2
+    assert lexicon.frequency("я считаю") == 1
+    assert "т" not in lexicon and "я" in lexicon
+    assert "считаешь" not in lexicon
+    assert lexicon.has_prefix("несколь") and not lexicon.has_prefix("нескольц")
+
+
+def test_word_list_is_merged_into_counts(tmp_path):
+    words = tmp_path / "words.tsv"
+    words.write_text("Считаю\t10\nнетрудно\nб\t3\n", encoding="utf-8")
+
+    assert read_word_list(words) == Counter({"считаю": 10, "нетрудно": 1})
+
+
+def test_rejects_foreign_file(tmp_path):
+    (tmp_path / "junk.idx").write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        FrequencyLexicon(tmp_path / "junk.idx")
+
+
+def test_shared_index_is_built_once_and_refreshed_when_banks_change(tmp_path, monkeypatch):
+    bank = tmp_path / "questions.json"
+    bank.write_text('[{"id": 1, "text": "Я считаю"}]', encoding="utf-8")
+    monkeypatch.setattr(lexicon_module, "bank_paths", lambda: [bank])
+    path = tmp_path / "lex.idx"
+
+    first = shared_lexicon(path)
+    assert shared_lexicon(path) is first
+    assert "считаю" in first and "встаю" not in first
+
+    bank.write_text('[{"id": 1, "text": "Я встаю"}]', encoding="utf-8")
+    shared_lexicon.cache_clear()
+    assert "встаю" in shared_lexicon(path)
+
+
+def test_pipeline_outputs_are_not_indexed(tmp_path, monkeypatch):
+    modules, source = tmp_path / "modules", tmp_path / "source"
+    (modules / "smil").mkdir(parents=True)
+    (modules / "hads").mkdir()
+    source.mkdir()
+    (modules / "hads" / "questions.json").write_text('[{"id": 1, "text": "Я сплю"}]', encoding="utf-8")
+    (source / "qw.txt").write_text("Мужской вариант.\n1. Я встаю рано\n", encoding="utf-8")
+    dirty = [{"id": n, "text_male": "Я в стаю рано", "text_female": "Я в стаю рано"} for n in range(1, 20)]
+    for name in ("questions-566-gender.json", "questions-566-full.json"):
+        (modules / "smil" / name).write_text(json.dumps({"questions": dirty}), encoding="utf-8")
+    monkeypatch.setattr(lexicon_module, "MODULES_DIR", modules)
+    monkeypatch.setattr(lexicon_module, "SOURCE_DIR", source)
+
+    assert bank_paths() == [modules / "hads" / "questions.json"]
+    assert source_paths() == [modules / "hads" / "questions.json", source / "qw.txt"]
+    lexicon = shared_lexicon(tmp_path / "lex.idx")
+    assert normalize("Я в стаю рано", lexicon) == "Я встаю рано"
+
+    # A pipeline run rewriting its outputs leaves the index as it is.
+    (modules / "smil" / "questions-566-full.json").write_text('{"questions": []}', encoding="utf-8")
+    shared_lexicon.cache_clear()
+    assert shared_lexicon(tmp_path / "lex.idx").digest == lexicon.digest
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.db import sqlite_from_schema  # noqa: E402
+from psytools.norms import (  # noqa: E402
+    Estimator,
+    Stratum,
+    age_band,
+    estimate_from_database,
+    norms_diff,
+    norms_documents,
+)
+from psytools.session_scan import Database  # noqa: E402
+from psytools.smil_scoring import NORMS_PATH, SCALES, TScorer  # noqa: E402
+from psytools.synthetic import generate  # noqa: E402
+
+
+def test_streamed_and_merged_strata_match_the_whole_sample():
+    rng = np.random.default_rng(2)
+    scores = rng.integers(0, 40, size=(1000, 3))
+    scores[:, 2] = rng.integers(0, 5, size=1000)
+
+    whole = Stratum.empty(3)
+    whole.add(scores)
+    parts = [Stratum.empty(3) for _ in range(3)]
+    for part, rows in zip(parts, np.array_split(scores, [1, 400])):
+        part.add(rows)
+    merged = Stratum.empty(3)
+    for part in parts:
+        merged.merge(part)
+
+    for stratum in (whole, merged):
+        assert stratum.count == 1000
+        np.testing.assert_allclose(stratum.mean, scores.mean(axis=0))
+        np.testing.assert_allclose(stratum.std, scores.std(axis=0, ddof=1))
+        np.testing.assert_array_equal(stratum.quantile(0.5), np.quantile(scores, 0.5, axis=0, method="inverted_cdf"))
+    np.testing.assert_array_equal(whole.histogram, merged.histogram)
+
+
+def test_age_bands():
+    assert [age_band(a) for a in (17, "18", 29, 30, 59, 60, None, "", 0, 130)] == [
+        "<18", "18-29", "18-29", "30-44", "45-59", "60+", "unknown", "unknown", "unknown", "unknown"]
+
+
+def seed(seed_sessions, path, count=60):
+    connection = sqlite_from_schema(str(path))
+    batch = next(generate("smil", count, seed=9))
+    demographics = [{"gender": "female" if g else "male", "age": 20 + n % 3 * 20} for n, g in enumerate(batch.genders)]
+    for row in demographics[9::10]:
+        row["synthetic"] = "normal"
+    statuses = ["partial"] + ["completed"] * (count - 1)
+    seed_sessions(connection, batch.answers, batch.genders, demographics=demographics, statuses=statuses)
+    return connection
+
+
+def test_norms_from_a_database_in_the_shipped_schema(tmp_path, seed_sessions):
+    seed(seed_sessions, tmp_path / "db.sqlite")
+    database = Database(str(tmp_path / "db.sqlite"))
+
+    state = estimate_from_database(database, page_size=16)
+    parallel = estimate_from_database(database, workers=3, page_size=16)
+
+    assert (state.scanned, state.synthetic, state.used + state.invalid) == (59, 6, 53)
+    key = ("basic", "male", "all")
+    np.testing.assert_allclose(parallel.strata[key].mean, state.strata[key].mean)
+    np.testing.assert_allclose(parallel.strata[key].m2, state.strata[key].m2)
+    assert sum(state.strata[("basic", g, band)].count for g in ("male", "female")
+               for band in ("18-29", "30-44", "60+")) == state.used
+
+    basic, additional = norms_documents(state, Estimator().additional_codes, min_count=10)
+    with open(NORMS_PATH, encoding="utf-8") as f:
+        shipped = json.load(f)
+
+    stratum = state.strata[key]
+    column = SCALES.index("8")
+    male = basic["scales"]["8"]["male"]
+    assert male["M"] == round(float(stratum.mean[column]), 2)
+    assert male["maxRaw"] == shipped["scales"]["8"]["male"]["maxRaw"]
+    assert male["n"] == stratum.count and set(male["ageBands"]) <= {"18-29", "30-44", "60+"}
+    TScorer(basic["scales"])
+
+    changes = norms_diff({"basic": shipped, "additional": shipped | {"scales": {}}},
+                         {"basic": basic, "additional": additional})
+    change = next(c for c in changes if (c["scale"], c["gender"]) == ("8", "male"))
+    old = shipped["scales"]["8"]["male"]
+    assert change["M"] == [old["M"], male["M"]]
+    assert change["t_shift"] == round(10 * (male["M"] - old["M"]) / old["delta"], 1)
+
+    tiny = norms_documents(state, Estimator().additional_codes, min_count=1000)[0]
+    assert tiny["scales"]["8"]["male"] == shipped["scales"]["8"]["male"]
@@ -0,0 +1,71 @@
+import pytest
+
+from psytools import pdf_text
+from psytools.page_cache import PageCache
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    calls = []
+
+    def extract(pdf_path, backend, workers, pages):
+        calls.append(list(pages))
+        return [f"text of page {page}" for page in pages]
+
+    monkeypatch.setattr(pdf_text, "backend_version", lambda backend: f"{backend}-test/1")
+    monkeypatch.setattr(pdf_text, "page_count", lambda pdf_path, backend: 4)
+    monkeypatch.setattr(pdf_text, "_extract_parallel", extract)
+    return calls
+
+
+def test_second_run_is_served_from_cache(tmp_path, fake_backend):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first")
+
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        first = pdf_text.extract_pages(pdf, cache=cache)
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        second = pdf_text.extract_pages(pdf, cache=cache)
+        assert (cache.hits, cache.misses) == (4, 0)
+
+    assert first == second == [f"text of page {page}" for page in range(4)]
+    assert fake_backend == [[0, 1, 2, 3]]
+
+
+def test_only_missing_pages_are_extracted(tmp_path, fake_backend):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        pdf_text.extract_pages(pdf, pages=[1, 2], cache=cache)
+        assert pdf_text.extract_pages(pdf, pages=[0, 1, 2, 3], cache=cache)[1] == "text of page 1"
+        assert (cache.hits, cache.misses) == (2, 4)
+
+    assert fake_backend == [[1, 2], [0, 3]]
+
+
+def test_changed_content_or_extractor_invalidates_entries(tmp_path, fake_backend, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 v1")
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        pdf_text.extract_pages(pdf, pages=[0], cache=cache)
+
+    pdf.write_bytes(b"%PDF-1.4 v2")
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        pdf_text.extract_pages(pdf, pages=[0], cache=cache)
+        assert cache.misses == 1
+
+    monkeypatch.setattr(pdf_text, "backend_version", lambda backend: f"{backend}-test/2")
+    with PageCache(tmp_path / "cache.sqlite") as cache:
+        pdf_text.extract_pages(pdf, pages=[0], cache=cache)
+        assert cache.misses == 1
+
+
+def test_lru_eviction_keeps_recently_used_pages(tmp_path):
+    with PageCache(tmp_path / "cache.sqlite", max_bytes=25) as cache:
+        cache.put_many("h", "x", {0: "a" * 10, 1: "b" * 10})
+        cache.get_many("h", "x", [0])
+        cache.put_many("h", "x", {2: "c" * 10})
+
+        assert cache.total_bytes() <= 25
+        assert sorted(cache.get_many("h", "x", [0, 1, 2])) == [0, 2]
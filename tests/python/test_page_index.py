@@ -0,0 +1,61 @@
+import pytest
+
+fitz = pytest.importorskip("pymupdf")
+
+from psytools import page_index  # noqa: E402
+from psytools.page_index import load_index, page_features, page_ranges  # noqa: E402
+
+
+def make_book(path):
+    font = fitz.Font("cjk")
+    doc = fitz.open()
+    pages = [
+        ["Содержание", "Мужской вариант ... 3", "Женский вариант ... 5"],
+        ["Введение. Текст руководства без вопросов."],
+        ["Мужской вариант"] + [f"{n}. Мне нравится читать статьи номер {n}." for n in range(1, 11)],
+        [f"{n}. Я часто думаю о вопросе {n}." for n in range(11, 21)],
+        ["Женский вариант"] + [f"{n}. Мне нравится читать статьи номер {n}." for n in range(1, 11)],
+        [f"{n}. Я часто думаю о вопросе {n}." for n in range(11, 21)],
+        ["Ключи", "Шкала L:", "Неверно (4):", "15 30 45 60"],
+        ["75 90 105 120 135", "150 165 180 195"],
+        ["Интерпретация профиля. Текст руководства."],
+    ]
+    for lines in pages:
+        page = doc.new_page()
+        writer = fitz.TextWriter(page.rect)
+        for row, line in enumerate(lines):
+            writer.append((40, 60 + 16 * row), line, font=font, fontsize=10)
+        writer.write_text(page)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_page_features():
+    features = page_features("Мужской вариант\n1. Первый\n2. Второй\n4. Четвёртый\n5. Пятый\n")
+
+    assert features["ids"] == {"count": 4, "first": 1, "last": 5, "run": [2, 1, 2]}
+    assert features["density"] == 0.8
+    assert features["markers"] == ["male"]
+    assert page_features("15 30 45\nШкала")["numbers"] == 0.75
+
+
+def test_index_answers_queries_and_is_reused(tmp_path, monkeypatch):
+    path = tmp_path / "book.pdf"
+    make_book(path)
+
+    index = load_index(path, backend="fitz", workers=1, directory=tmp_path / "index")
+
+    assert index.question_pages() == [2, 3, 4, 5]
+    assert index.question_pages(11, 20) == [3, 5]
+    assert index.questionnaire_span() == [2, 3, 4, 5]  # the contents page names the variants too
+    assert index.key_pages() == [6, 7]
+    assert page_ranges(index.question_pages()) == "3-6"
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("the stored index should be used")
+
+    monkeypatch.setattr(page_index, "build_index", no_rebuild)
+    again = load_index(path, backend="fitz", directory=tmp_path / "index")
+    assert again.pages == index.pages
+    assert [p.name for p in (tmp_path / "index").iterdir()] == [f"{index.pdf_hash}-"
+                                                                f"{index.extractor.replace('/', '_')}.json"]
@@ -0,0 +1,47 @@
+import pytest
+
+from psytools import pdf_text
+
+
+def make_pdf(path, pages):
+    fitz = pytest.importorskip("pymupdf")
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((50, 50), f"{number + 1}. Page marker {number}")
+    doc.save(str(path))
+    doc.close()
+
+
+def test_split_keeps_page_order_and_drops_empty_chunks():
+    assert pdf_text._split(list(range(5)), 3) == [[0, 1], [2, 3], [4]]
+    assert pdf_text._split([7, 8], 4) == [[7], [8]]
+
+
+def test_join_pages_matches_legacy_concatenation():
+    pages = ["first", "", "third"]
+    legacy = ""
+    for text in pages:
+        legacy += text + "\n"
+    assert pdf_text.join_pages(pages) == legacy
+    assert pdf_text.join_pages([]) == ""
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        pdf_text.load_backend("poppler")
+
+
+@pytest.mark.parametrize("backend", pdf_text.BACKENDS)
+def test_parallel_extraction_matches_sequential(tmp_path, backend):
+    pdf_path = tmp_path / "doc.pdf"
+    make_pdf(pdf_path, 9)
+    try:
+        sequential = pdf_text.extract_pages(pdf_path, backend=backend, workers=1)
+    except pdf_text.ExtractionError as e:
+        pytest.skip(str(e))
+
+    parallel = pdf_text.extract_pages(pdf_path, backend=backend, workers=3)
+
+    assert parallel == sequential
+    assert [f"Page marker {n}" in text for n, text in enumerate(parallel)] == [True] * 9
+    assert pdf_text.extract_pages(pdf_path, backend=backend, workers=2, pages=[4, 2]) == [sequential[4], sequential[2]]
@@ -0,0 +1,98 @@
+import json
+import shutil
+
+import pytest
+
+from psytools.paths import SMIL_DIR
+from psytools.pipeline import Pipeline, Step
+from psytools.smil_pipeline import smil_pipeline
+from psytools.smil_records import apply_key_record
+from psytools.text_normalizer import WordSet
+
+
+def copy_step(name, source, target, calls):
+    def run(ctx):
+        calls.append(name)
+        target.write_text(source.read_text().upper())
+    return Step(name, [source], [target], run)
+
+
+def test_steps_run_in_dependency_order_and_skip_when_unchanged(tmp_path):
+    a, b, c = tmp_path / "a.txt", tmp_path / "b.txt", tmp_path / "c.txt"
+    a.write_text("x")
+    calls = []
+    # Declared out of order: "second" reads what "first" writes.
+    pipeline = Pipeline([copy_step("second", b, c, calls), copy_step("first", a, b, calls)], tmp_path / "state.json")
+
+    assert [r.status for r in pipeline.run()] == ["ran", "ran"]
+    assert calls == ["first", "second"]
+    assert [r.status for r in pipeline.run()] == ["up to date", "up to date"]
+
+    a.write_text("y")
+    assert [r.status for r in pipeline.run()] == ["ran", "ran"]
+    assert c.read_text() == "Y"
+
+
+def test_missing_inputs_skip_the_step(tmp_path):
+    pipeline = Pipeline([copy_step("first", tmp_path / "nope.txt", tmp_path / "out.txt", [])], tmp_path / "state.json")
+
+    [result] = pipeline.run()
+    assert result.status == "skipped" and "nope.txt" in result.detail
+
+
+def test_cycles_are_rejected(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    with pytest.raises(ValueError):
+        Pipeline([copy_step("one", a, b, []), copy_step("two", b, a, [])])
+
+
+def test_apply_key_rebuilds_only_edited_questions(tmp_path):
+    smil_dir = tmp_path / "smil"
+    (smil_dir / "Scoring" / "keys").mkdir(parents=True)
+    shutil.copy(SMIL_DIR / "questions-566-full.json", smil_dir)
+    shutil.copy(SMIL_DIR / "Scoring" / "keys" / "mmpi-key-solomin.json", smil_dir / "Scoring" / "keys")
+    full = smil_dir / "questions-566-full.json"
+    original = full.read_bytes()
+    pipeline = smil_pipeline(tmp_path / "state.json", smil_dir=smil_dir, source_dir=tmp_path / "source")
+
+    results = {r.name: r for r in pipeline.run()}
+    assert [results[name].status for name in ("convert", "clean", "merge")] == ["skipped"] * 3
+    assert results["apply-key"].detail == "566 rebuilt, 0 reused"
+    assert full.read_bytes() == original
+
+    data = json.loads(original)
+    data["questions"][4]["text_male"] = "Отредактированный текст"
+    data["questions"][4]["scales"] = []
+    full.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    assert {r.name: r for r in pipeline.run()}["apply-key"].detail == "1 rebuilt, 565 reused"
+    rebuilt = json.loads(full.read_text(encoding="utf-8"))["questions"][4]
+    assert rebuilt["text_male"] == "Отредактированный текст"
+    assert rebuilt["scales"] == json.loads(original)["questions"][4]["scales"]
+    assert {r.name: r for r in pipeline.run()}["apply-key"].status == "up to date"
+
+
+def test_apply_key_keeps_the_field_order():
+    question = {"id": 7, "scales": [], "text_male": "Я устаю", "scale": "2", "direction": "true"}
+    keyed = apply_key_record(question, {"7": [{"scale": "2", "direction": "true"}]})
+
+    assert list(keyed) == ["id", "scales", "text_male"]
+    assert keyed["scales"] == [{"scale": "2", "direction": "true"}]
+
+
+def test_clean_reruns_when_only_the_lexicon_changes(tmp_path):
+    smil_dir = tmp_path / "smil"
+    smil_dir.mkdir()
+    question = {"id": 1, "text_male": "Я в стаю рано", "text_female": "Я в стаю рано", "is_control": False}
+    (smil_dir / "questions-566-gender.json").write_text(json.dumps({"questions": [question]}), encoding="utf-8")
+    lexicons = [WordSet(["я", "рано"])]
+    pipeline = smil_pipeline(tmp_path / "state.json", smil_dir=smil_dir, source_dir=tmp_path / "source",
+                             lexicon_loader=lambda: lexicons[-1])
+
+    assert {r.name: r.status for r in pipeline.run()}["clean"] == "ran"
+    assert {r.name: r.status for r in pipeline.run()}["clean"] == "up to date"
+
+    lexicons.append(WordSet.from_texts(["Я встаю рано"]))
+    assert {r.name: r.detail for r in pipeline.run()}["clean"] == "1 rebuilt, 0 reused"
+    cleaned = json.loads((smil_dir / "questions-566-gender.json").read_text(encoding="utf-8"))["questions"][0]
+    assert cleaned["text_male"] == "Я встаю рано"
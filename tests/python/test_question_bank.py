@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from psytools.paths import SMIL_DIR
+from psytools.question_bank import BankFormatError, QuestionBank, compile_bank, dump_json, encode
+
+FULL_JSON = SMIL_DIR / "questions-566-full.json"
+
+
+def test_compiled_bank_round_trips_byte_for_byte(tmp_path):
+    output = compile_bank(FULL_JSON, tmp_path / "bank.bin")
+
+    with QuestionBank(output) as bank:
+        assert dump_json(bank.to_dict()) == FULL_JSON.read_bytes()
+        assert len(bank) == 566
+        # Identical male/female texts are interned once.
+        assert len(bank.string_offsets) - 1 < 2 * 566
+
+
+def test_lookup_by_id_and_gender(tmp_path):
+    source = json.loads(FULL_JSON.read_bytes())["questions"]
+    with QuestionBank(compile_bank(FULL_JSON, tmp_path / "bank.bin")) as bank:
+        index = bank.position(19)
+        assert bank.question(index) == source[18]
+        assert bank.position(9999) is None
+        assert [q["text"] for q in bank.questions_for_gender("female")] == [q["text_female"] for q in source]
+
+
+def test_rejects_documents_that_would_not_round_trip(tmp_path):
+    data = json.loads(FULL_JSON.read_bytes())
+    data["questions"][3]["comment"] = "extra field"
+    with pytest.raises(BankFormatError):
+        encode(data)
+
+    (tmp_path / "pretty.json").write_text(json.dumps(json.loads(FULL_JSON.read_bytes()), ensure_ascii=False, indent=4))
+    with pytest.raises(BankFormatError):
+        compile_bank(tmp_path / "pretty.json")
+    assert not (tmp_path / "pretty.bin").exists()
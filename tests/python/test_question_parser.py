@@ -0,0 +1,84 @@
+from psytools.question_parser import FEMALE_MARKER, MALE_MARKER, QuestionParser, iter_questions
+
+
+def test_items_continue_over_wrapped_lines():
+    lines = ["1. Я люблю читать", "   научно-техническую литературу", "2.  У меня хороший   аппетит"]
+
+    assert list(iter_questions(lines)) == [
+        (1, "Я люблю читать научно-техническую литературу"),
+        (2, "У меня хороший аппетит"),
+    ]
+
+
+def test_markers_switch_sections_mid_line():
+    parser = QuestionParser(markers=[("male", MALE_MARKER), ("female", FEMALE_MARKER)], initial=None)
+    lines = [
+        "Вступление 1. не вопрос",
+        "Мужской вариант 1. Я встаю свежим",
+        "2. Я устаю",
+        "Женский в ариант",
+        "1. Я встаю свежей",
+    ]
+
+    assert list(parser.parse(lines)) == [
+        ("male", 1, "Я встаю свежим"),
+        ("male", 2, "Я устаю"),
+        ("female", 1, "Я встаю свежей"),
+    ]
+
+
+def test_filters_skip_prefixes_and_blank_line_handling():
+    lines = ['"Цитата эпиграфа"', "3. Короткий", "", "хвост страницы", "567. Вне диапазона номеров", "4. Достаточно длинный текст"]
+
+    assert list(iter_questions(lines, max_id=566, min_length=11, skip_prefixes=('"',), blank_line_ends_item=True)) == [
+        (4, "Достаточно длинный текст"),
+    ]
+    assert dict(iter_questions(lines, skip_prefixes=('"',)))[3] == "Короткий хвост страницы"
+
+
+def test_records_are_yielded_before_input_is_exhausted():
+    consumed = []
+
+    def lines():
+        for n in range(1, 1000):
+            consumed.append(n)
+            yield f"{n}. Утверждение {n}"
+
+    records = iter_questions(lines())
+    assert next(records) == (1, "Утверждение 1")
+    assert len(consumed) == 2
+
+
+def test_markers_ignore_case_and_drop_the_preamble_of_their_section():
+    parser = QuestionParser(markers=[("male", MALE_MARKER), ("female", FEMALE_MARKER), (None, "Ключи")],
+                            initial="male")
+    lines = [
+        "1. Вступление, не вопрос",
+        "МУЖСКОЙ ВАРИАНТ",
+        "1. Мне легко включиться в работу",
+        "женский вариант 1. Я встаю свежей",
+        "ключи не обрывают",
+        "2. Я устаю",
+        "Ключи",
+        "3. Не вопрос",
+    ]
+
+    assert list(parser.parse(lines)) == [
+        ("male", 1, "Мне легко включиться в работу"),
+        ("female", 1, "Я встаю свежей ключи не обрывают"),
+        ("female", 2, "Я устаю"),
+    ]
+    assert list(parser.parse(lines[:1] + lines[3:4])) == [("male", 1, "Вступление, не вопрос"),
+                                                          ("female", 1, "Я встаю свежей")]
+
+
+def test_end_markers_only_close_their_section_and_txt_keeps_inner_spacing():
+    parser = QuestionParser(markers=[("male", MALE_MARKER), ("female", FEMALE_MARKER), (None, "Ключи", "female")],
+                            initial=None)
+    lines = ["Мужской вариант", "1. Ключи от дома я теряю", "Женский вариант", "1. Я встаю свежей", "Ключи",
+             "2. Не вопрос"]
+
+    assert list(parser.parse(lines)) == [("male", 1, "Ключи от дома я теряю"), ("female", 1, "Я встаю свежей")]
+    assert list(iter_questions(["2.  У меня хороший   аппетит ", "  и сон"], collapse_whitespace=False)) == [
+        (2, "У меня хороший   аппетит и сон"),
+    ]
@@ -0,0 +1,150 @@
+import json
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.db import sqlite_from_schema  # noqa: E402
+from psytools.rescore import Job, Rescorer, indices_dicts, rescore  # noqa: E402
+from psytools.session_scan import Database, partitions  # noqa: E402
+from psytools import smil_profile  # noqa: E402
+from psytools.synthetic import generate  # noqa: E402
+
+STALE = 3
+SMIL_MODULE = Path(__file__).resolve().parents[2] / "modules" / "smil" / "SmilModule.php"
+
+
+def seed(seed_sessions, path, count=40):
+    """Completed SMIL sessions scored with the current key, the first STALE of them (by id) with stale raw scores.
+
+    The results have the shape SmilModule::calculateResults() gives them.
+    """
+    connection = sqlite_from_schema(str(path))
+    batch = next(generate("smil", count, seed=4))
+
+    def scored(sheets):
+        results = Rescorer().sections(sheets, [s["gender"] for s in sheets])
+        for n, (sheet, result) in enumerate(zip(sheets, results)):
+            answered = sum(key.isdigit() for key in sheet)
+            result.update(gender=sheet["gender"], answered_count=answered, total_questions=566,
+                          completion_rate=round(answered / 566 * 100, 1))
+            if n < STALE:
+                result["raw_scores"] = {**result["raw_scores"], "8": -1}
+        return results
+
+    return connection, seed_sessions(connection, batch.answers, batch.genders, results=scored)
+
+
+def stored(connection):
+    return {sid: json.loads(r) for sid, r in connection.execute("SELECT id, calculated_results FROM test_sessions")}
+
+
+def test_partitions_cover_the_id_space():
+    parts = partitions(3)
+
+    assert [(p.low, p.high) for p in parts] == [("", "5"), ("5", "a"), ("a", None)]
+    assert len(partitions(40)) == 16
+
+
+def test_dry_run_diffs_without_writing(tmp_path, seed_sessions):
+    connection, ids = seed(seed_sessions, tmp_path / "db.sqlite")
+    before = stored(connection)
+    job = Job(Database(str(tmp_path / "db.sqlite")), dry_run=True, page_size=7,
+              checkpoint_dir=tmp_path / "checkpoints", diff_dir=tmp_path / "diff")
+
+    report = rescore(job)
+
+    assert (report.scanned, report.changed, report.written, report.pages) == (40, STALE, 0, 6)
+    assert report.sections == {"raw_scores": STALE}
+    assert stored(connection) == before
+    assert not (tmp_path / "checkpoints").exists()
+    [diff] = (tmp_path / "diff").iterdir()
+    first = json.loads(diff.read_text(encoding="utf-8").splitlines()[0])
+    assert first["id"] == ids[0] and list(first["raw_scores"]) == ["8"] and first["raw_scores"]["8"][0] == -1
+
+
+def test_workers_write_back_the_changed_sessions(tmp_path, seed_sessions):
+    connection, ids = seed(seed_sessions, tmp_path / "db.sqlite")
+    before = stored(connection)
+    job = Job(Database(str(tmp_path / "db.sqlite")), page_size=5, checkpoint_dir=tmp_path / "checkpoints")
+
+    report = rescore(job, workers=2)
+
+    assert (report.scanned, report.changed, report.written, report.done) == (40, STALE, STALE, True)
+    after = stored(connection)
+    for sid in ids[:STALE]:
+        assert after[sid]["raw_scores"]["8"] >= 0 and after[sid]["answered_count"] == before[sid]["answered_count"]
+    assert {sid: after[sid] for sid in ids[STALE:]} == {sid: before[sid] for sid in ids[STALE:]}
+    assert rescore(Job(Database(str(tmp_path / "db.sqlite")), checkpoint_dir=tmp_path / "again")).changed == 0
+
+
+def test_stale_t_scores_get_a_rebuilt_profile_and_interpretation(tmp_path, seed_sessions):
+    connection, ids = seed(seed_sessions, tmp_path / "db.sqlite")
+    results_of = stored(connection)
+    sid = ids[STALE]
+    fresh = results_of[sid]
+    stale = {**fresh, "t_scores": {**fresh["t_scores"], "8": 120, "9": 110}}
+    stale["corrected_scores"] = stale["t_scores"]
+    stale["profile"] = {**fresh["profile"], "profile_type": "psychotic", "code_type": "8-9"}
+    stale["interpretation"] = {**fresh["interpretation"], "summary": "Код профиля: 8-9. stale"}
+    connection.execute("UPDATE test_sessions SET calculated_results = ? WHERE id = ?", (json.dumps(stale), sid))
+    connection.commit()
+    job = Job(Database(str(tmp_path / "db.sqlite")), checkpoint_dir=None)
+
+    report = rescore(job)
+
+    assert (report.changed, report.written) == (STALE + 1, STALE + 1)
+    assert stored(connection)[sid] == fresh
+    assert fresh["profile"]["code_type"] != "8-9"
+    assert fresh["interpretation"]["summary"].startswith(f"Код профиля: {fresh['profile']['code_type']}. ")
+
+
+def test_profile_and_interpretation_follow_smil_module():
+    answers = next(generate("smil", 1, seed=2)).answers[0]
+    [result] = Rescorer().sections([{str(q + 1): int(v) for q, v in enumerate(answers)}], ["female"])
+    profile, interpretation = result["profile"], result["interpretation"]
+
+    assert list(profile["scales"]) == list("1234567890")
+    assert [entry["score"] for entry in profile["dominant"]] == sorted(result["t_scores"][s] for s in "1234567890")[:-4:-1]
+    assert profile["scales"]["2"]["interpretation"] == smil_profile.INTERPRETATIONS["2"][profile["scales"]["2"]["level"]]
+    assert result["validity"]["is_valid"] and interpretation["code_type"] == profile["code_type"]
+    assert interpretation["indices"] == result["indices"]
+    assert interpretation["scales"]["2"]["description"] == profile["scales"]["2"]["interpretation"]
+    invalid = smil_profile.interpretation({"is_valid": False, "warnings": ["L", "F"]}, profile, result["indices"])
+    assert invalid["warning"].endswith("недостоверны. L; F") and invalid["scales"] == []
+
+
+def test_profile_texts_are_smil_module_constants():
+    source = SMIL_MODULE.read_text(encoding="utf-8")
+    texts = [*smil_profile.SCALE_NAMES.values(), *smil_profile.PROFILE_TYPES.values()]
+    texts += [text for extra in smil_profile.TYPE_RECOMMENDATIONS.values() for text in extra]
+    texts += [text for levels in smil_profile.INTERPRETATIONS.values() for text in levels.values()]
+
+    assert [text for text in texts if f"'{text}'" not in source] == []
+
+
+def test_interrupted_run_resumes_from_its_checkpoint(tmp_path, seed_sessions):
+    seed(seed_sessions, tmp_path / "db.sqlite")
+    job = Job(Database(str(tmp_path / "db.sqlite")), page_size=2, checkpoint_dir=tmp_path / "checkpoints",
+              max_pages=1)
+
+    first = rescore(job)
+    assert (first.scanned, first.written, first.done) == (2, 2, False)
+
+    job.max_pages = None
+    second = rescore(job)
+    assert (second.scanned, second.written, second.done) == (40, STALE, True)
+    assert rescore(job).pages == second.pages  # finished partitions are not read again
+
+
+def test_indices_follow_calculate_indices():
+    raw = np.zeros((2, 13), dtype=np.int32)
+    raw[0, [1, 2]] = [7, 3]  # F, K
+    t = np.full((2, 13), 50.0)
+    t[0, [1, 2, 3, 4, 9]] = [61, 48, 55, 62, 71]  # F, K, 1, 2, 7
+
+    assert indices_dicts(raw, t) == [
+        {"FK_index": 13, "FK_ratio": 2.33, "anxiety_index": 66.5, "depression_index": 58.5},
+        {"FK_index": 0, "FK_ratio": 0, "anxiety_index": 50.0, "depression_index": 50.0},
+    ]
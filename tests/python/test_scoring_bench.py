@@ -0,0 +1,76 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.answers import encode_sheets  # noqa: E402
+from psytools.scoring_bench import PythonScorer, build_corpus, compare, regressions, run_php  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures"
+
+
+def load(name):
+    with open(FIXTURES / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_python_results_match_php_reference_fixtures():
+    answers = load("smil-reference-answers.json")
+    expected = load("smil-reference-scores.json")
+    additional = load("smil-additional-reference-scores.json")["scales"]
+
+    matrix, genders = encode_sheets([answers], [expected["gender"]])
+    [result] = PythonScorer().results(matrix, genders)
+
+    assert result["raw_scores"] == expected["raw"]
+    assert result["t_scores"] == expected["t"]
+    assert {code: {"raw": s["raw"], "t": s["t"]} for code, s in result["additional_scores"].items()
+            if code in additional} == additional
+
+
+def test_compare_names_the_differing_arrays():
+    left = [{"raw_scores": {"L": 1}, "t_scores": {"L": 40.0}}, {"raw_scores": {"L": 2}}]
+    right = [{"raw_scores": {"L": 1}, "t_scores": {"L": 40}}, {"raw_scores": {"L": 3}, "validity": {}}]
+
+    assert compare(left, right) == ["sheet 2: raw_scores, validity"]
+    assert compare(left, right[:1]) == ["2 results vs 1"]
+
+
+def test_regressions_against_the_median_of_previous_runs():
+    def run(p95, rate, host="a"):
+        return {"host": host, "corpus": {"size": 10, "seed": 1},
+                "results": {"php": {"p95_ms": p95, "sheets_per_sec": rate}}}
+
+    history = [run(1.0, 1000), run(5.0, 100), run(1.1, 900), run(9.0, 10, host="b")]
+
+    assert regressions(history, run(1.15, 950)) == []
+    assert regressions(history, run(1.5, 600)) == ["php p95_ms: 1.5 vs 1.1 (+36%)",
+                                                   "php sheets_per_sec: 600 vs 900 (+33%)"]
+    assert regressions(history, run(1.5, 600, host="c")) == []
+
+
+def test_corpus_file_always_matches_the_arrays(tmp_path):
+    stale = tmp_path / "smil-30-5.jsonl"
+    stale.write_text('{"answers": {}}\n', encoding="utf-8")
+
+    corpus = build_corpus(30, seed=5, directory=tmp_path)
+
+    with open(corpus.path, encoding="utf-8") as f:
+        sheets = [json.loads(line)["answers"] for line in f]
+    answers, genders = encode_sheets(sheets)
+    np.testing.assert_array_equal(answers, corpus.answers)
+    np.testing.assert_array_equal(genders, corpus.genders)
+
+
+@pytest.mark.skipif(shutil.which("php") is None or not (FIXTURES.parents[1] / "vendor").exists(),
+                    reason="needs the php CLI and composer dependencies")
+def test_php_calculators_agree_with_the_python_scorer(tmp_path):
+    corpus = build_corpus(200, seed=5, directory=tmp_path)
+
+    results, timing = run_php(corpus, shutil.which("php"))
+
+    assert compare(PythonScorer().results(corpus.answers, corpus.genders), results) == []
+    assert timing.sheets == 200
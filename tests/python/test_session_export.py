@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from psytools.answers import MISSING, NO, UNKNOWN, YES  # noqa: E402
+from psytools import session_export  # noqa: E402
+from psytools.db import db_config, sqlite_from_schema  # noqa: E402
+from psytools.session_export import export_sessions, to_table  # noqa: E402
+
+
+def seed(connection):
+    tests = dict(connection.execute("SELECT slug, id FROM tests"))
+    sessions = []
+    for n in range(7):
+        answers = {str(q): (q + n) % 3 for q in range(1, 567)}
+        answers["gender"] = "female" if n % 2 else "male"
+        del answers[str(10 + n)]
+        month = "2026-08" if n < 5 else "2026-09"
+        sessions.append(("smil", f"s{n}", answers, f"{month}-{10 + n:02d} 12:00:00", "completed"))
+    sessions.append(("smil", "partial", {"1": 1}, "2026-08-01 00:00:00", "partial"))
+    sessions.append(("bdi", "b0", {"q1": 2}, "2026-08-03 09:30:00", "completed"))
+    for slug, sid, answers, created, status in sessions:
+        connection.execute(
+            "INSERT INTO test_sessions (id, test_id, session_token, answers, calculated_results, status, created_at,"
+            " expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (sid, tests[slug], sid, json.dumps(answers), json.dumps({"n": sid}), status, created, "2027-01-01"),
+        )
+    return sessions
+
+
+def test_sessions_are_partitioned_by_test_and_month(tmp_path):
+    connection = sqlite_from_schema()
+    sessions = seed(connection)
+
+    stats = export_sessions(connection, tmp_path, batch_size=2, rows_per_file=3)
+
+    assert stats.rows == 8 and stats.batches == 4
+    assert stats.partitions == {"smil/2026-08": 5, "smil/2026-09": 2, "bdi/2026-08": 1}
+    august = sorted((tmp_path / "smil" / "2026-08").iterdir())
+    assert [p.name for p in august] == ["part-0000.parquet", "part-0001.parquet"]
+    for path in august:
+        metadata = pq.ParquetFile(path).metadata
+        assert all(metadata.row_group(i).num_rows <= 2 for i in range(metadata.num_row_groups))
+
+    table = pq.read_table(tmp_path / "smil" / "2026-08").sort_by("id")
+    assert table.num_columns == 8 + 566
+    assert table.schema.field("q1").type == pa.uint8()
+    assert table.column("id").to_pylist() == ["s0", "s1", "s2", "s3", "s4"]
+    assert table.column("gender").to_pylist() == ["male", "female", "male", "female", "male"]
+    q = np.column_stack([table.column(f"q{i}").to_numpy() for i in range(1, 567)])
+    for row, (_, _, answers, _, _) in enumerate(sessions[:5]):
+        expected = [int(answers[str(i)]) if str(i) in answers else MISSING for i in range(1, 567)]
+        assert q[row].tolist() == expected
+    assert set(np.unique(q)) == {NO, YES, UNKNOWN, MISSING}
+
+    bdi = pq.read_table(tmp_path / "bdi" / "2026-08")
+    assert json.loads(bdi.column("answers")[0].as_py()) == {"q1": 2}
+
+
+def test_reexport_replaces_previous_parts(tmp_path):
+    connection = sqlite_from_schema()
+    seed(connection)
+    export_sessions(connection, tmp_path, tests=["smil"], batch_size=2, rows_per_file=3)
+    connection.execute("DELETE FROM test_sessions WHERE id IN ('s3', 's4')")
+
+    stats = export_sessions(connection, tmp_path, tests=["smil"], statuses=["completed", "partial"], fmt="arrow")
+
+    assert stats.partitions == {"smil/2026-08": 4, "smil/2026-09": 2}
+    assert sorted(p.name for p in (tmp_path / "smil" / "2026-08").iterdir()) == ["part-0000.arrow"]
+    with pa.ipc.open_file(tmp_path / "smil" / "2026-08" / "part-0000.arrow") as reader:
+        assert reader.read_all().column("status").to_pylist() == ["partial", "completed", "completed", "completed"]
+
+
+def test_interrupted_export_keeps_the_previous_partition(tmp_path, monkeypatch):
+    connection = sqlite_from_schema()
+    seed(connection)
+    export_sessions(connection, tmp_path, tests=["smil"], batch_size=2, rows_per_file=3)
+    before = pq.read_table(tmp_path / "smil" / "2026-08").sort_by("id")
+    tables = []
+
+    def failing_table(slug, rows):
+        if tables:
+            raise RuntimeError("connection lost")
+        tables.append(slug)
+        return to_table(slug, rows)
+
+    monkeypatch.setattr(session_export, "to_table", failing_table)
+    with pytest.raises(RuntimeError):
+        export_sessions(connection, tmp_path, tests=["smil"], batch_size=2, rows_per_file=1)
+
+    assert sorted(p.name for p in (tmp_path / "smil" / "2026-08").iterdir()) == ["part-0000.parquet",
+                                                                                  "part-0001.parquet"]
+    assert pq.read_table(tmp_path / "smil" / "2026-08").sort_by("id").equals(before)
+    assert not (tmp_path / ".staging").exists()
+
+
+def test_db_config_prefers_environment_over_env_file(tmp_path):
+    env = tmp_path / ".env"
+    env.write_text("# local\nDB_HOST=db.local\nDB_NAME = psy\n", encoding="utf-8")
+
+    config = db_config({"DB_NAME": "override"}, env)
+
+    assert config["DB_HOST"] == "db.local"
+    assert config["DB_NAME"] == "override"
+    assert config["DB_CHARSET"] == "utf8mb4"
+
+
+def test_gender_falls_back_to_demographics_and_tolerates_null():
+    answers = json.dumps({str(q): 1 for q in range(1, 567)})
+    rows = [
+        (sid, "smil", "completed", "standard", "2026-08-01 00:00:00", None, demographics, answers, "{}")
+        for sid, demographics in (("a", '{"gender": "female"}'), ("b", "null"), ("c", None), ("d", b'[]'))
+    ]
+
+    assert to_table("smil", rows).column("gender").to_pylist() == ["female", "male", "male", "male"]
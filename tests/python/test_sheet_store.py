@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.answers import MISSING, encode_sheets  # noqa: E402
+from psytools.sheet_store import HEADER, SheetStore, pack, packed_size, unpack  # noqa: E402
+from psytools.synthetic import generate  # noqa: E402
+
+
+def json_sheets(n, seed):
+    """Answers JSON as stored: string and int values, "Не знаю", gaps and a gender key."""
+    rng = np.random.default_rng(seed)
+    sheets = []
+    for row in rng.choice(4, size=(n, 566), p=[0.5, 0.4, 0.05, 0.05]).tolist():
+        sheet = {str(q + 1): (str(v) if q % 7 == 0 else v) for q, v in enumerate(row) if v != MISSING}
+        sheet["gender"] = "female" if len(sheet) % 2 else "male"
+        sheets.append(json.dumps(sheet))
+    return sheets
+
+
+def test_pack_round_trips_json_answers():
+    sheets = [json.loads(text) for text in json_sheets(300, 1)]
+    answers, genders = encode_sheets(sheets)
+
+    packed = pack(answers)
+
+    assert packed.shape == (300, 142) and packed_size() == 142
+    np.testing.assert_array_equal(unpack(packed), answers)
+    odd = answers[:, :13]
+    np.testing.assert_array_equal(unpack(pack(odd), 13), odd)
+
+
+def test_store_appends_and_maps_sheets(tmp_path):
+    path = tmp_path / "sheets.bin"
+    batches = list(generate("smil", 250, seed=3, chunk_size=100))
+    store = SheetStore(path)
+    for n, batch in enumerate(batches):
+        ids = [f"{n:08d}-0000-4000-8000-{row:012d}" for row in range(len(batch.genders))]
+        store.append(ids, batch.genders, batch.answers, batch.created)
+
+    reopened = SheetStore(path)
+    records = reopened.records()
+    assert len(reopened) == 250 and path.stat().st_size == HEADER.size + 250 * (36 + 1 + 8 + 142)
+    np.testing.assert_array_equal(reopened.answers(), np.vstack([b.answers for b in batches]))
+    np.testing.assert_array_equal(records["gender"], np.concatenate([b.genders for b in batches]))
+    assert records["created"][0] == batches[0].created[0].astype(np.int64)
+    assert records["id"][101] == b"00000001-0000-4000-8000-000000000001"
+    assert [len(chunk) for chunk, _ in reopened.batches(64)] == [64, 64, 64, 58]
+
+    with open(path, "ab") as f:
+        f.write(b"torn")
+    assert len(SheetStore(path)) == 250
+    assert SheetStore(path).append(["x"], batches[0].genders[:1], batches[0].answers[:1]) == 251
+    np.testing.assert_array_equal(SheetStore(path).answers(250), batches[0].answers[:1])
+
+    with pytest.raises(ValueError):
+        SheetStore(path, question_count=100)
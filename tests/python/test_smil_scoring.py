@@ -0,0 +1,220 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.answers import FEMALE, MISSING, NO, UNKNOWN, YES, encode_sheets, php_int  # noqa: E402
+from psytools.paths import SMIL_DIR  # noqa: E402
+from psytools.smil_records import CONTROL_QUESTIONS  # noqa: E402
+from psytools.smil_scoring import (  # noqa: E402
+    SCALES,
+    RawScorer,
+    TScorer,
+    as_dicts,
+    control_score,
+    count_unknown,
+    is_valid,
+    php_round,
+    validity_codes,
+    validity_dicts,
+)
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures"
+
+
+def load(name):
+    with open(FIXTURES / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def php_calculate(questions, answers, gender):
+    """Line-by-line port of RawScoreCalculator::calculate()."""
+    question_map = {int(q["id"]): q["scales"] for q in questions if q.get("scales")}
+    raw = dict.fromkeys(SCALES, 0)
+    suffix = {"male": "M", "female": "F"}.get(gender, "M")
+    for qid, answer in answers.items():
+        qid = php_int(qid)
+        if qid not in question_map or php_int(answer) == 2:
+            continue
+        for entry in question_map[qid]:
+            scale = entry["scale"]
+            if (scale == "5M" and suffix == "F") or (scale == "5F" and suffix == "M"):
+                continue
+            scale = "5" if scale in ("5M", "5F") else scale
+            is_yes = php_int(answer) == 1
+            raw[scale] += (1 if is_yes else 0) if entry["direction"] == 1 else (0 if is_yes else 1)
+    return raw
+
+
+def test_matches_php_reference_fixture():
+    answers = load("smil-reference-answers.json")
+    expected = load("smil-reference-scores.json")
+
+    matrix, genders = encode_sheets([answers])
+    raw = RawScorer.from_key_file().score(matrix, genders)
+
+    assert as_dicts(raw) == [expected["raw"]]
+
+
+def test_key_file_and_question_bank_give_the_same_weights():
+    with open(SMIL_DIR / "questions-566-full.json", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+
+    assert np.array_equal(RawScorer.from_key_file().weights, RawScorer.from_questions(questions).weights)
+
+
+def test_random_sheets_match_php_port_for_both_genders():
+    with open(SMIL_DIR / "questions-566-full.json", encoding="utf-8") as f:
+        questions = json.load(f)["questions"]
+    rng = random.Random(7)
+    sheets, genders = [], []
+    for _ in range(200):
+        sheet = {}
+        for qid in range(1, 567):
+            roll = rng.random()
+            if roll < 0.05:
+                continue
+            sheet[str(qid)] = rng.choice([0, 1, 2, "1", "0", True, False, 2]) if roll < 0.2 else rng.choice([0, 1])
+        sheets.append(sheet)
+        genders.append(rng.choice(["male", "female", None]))
+
+    matrix, gender_codes = encode_sheets(sheets, genders)
+    raw = RawScorer.from_questions(questions).score(matrix, gender_codes)
+
+    assert as_dicts(raw) == [php_calculate(questions, s, g) for s, g in zip(sheets, genders)]
+    assert list(count_unknown(matrix)) == [sum(php_int(v) == 2 for v in s.values()) for s in sheets]
+
+
+def test_encoding_ignores_non_question_keys():
+    matrix, genders = encode_sheets([{"1": "2", "3": True, "gender": "female", "999": 1}])
+
+    assert list(matrix[0, :4]) == [UNKNOWN, MISSING, 1, MISSING]
+    assert list(genders) == [1]
+
+
+def test_plain_scale_5_entries_count_for_both_genders():
+    items = {"1": [{"scale": "5", "direction": 1}], "2": [{"scale": "5M", "direction": 1}],
+             "3": [{"scale": "5F", "direction": 0}]}
+    questions = [{"id": int(qid), "scales": entries} for qid, entries in items.items()]
+    sheet = {"1": 1, "2": 1, "3": 0}
+
+    matrix, genders = encode_sheets([sheet, sheet], ["male", "female"])
+    raw = RawScorer(items).score(matrix, genders)
+
+    assert raw[:, SCALES.index("5")].tolist() == [2, 2]
+    assert as_dicts(raw) == [php_calculate(questions, sheet, g) for g in ("male", "female")]
+
+
+@pytest.mark.parametrize("value, code", [
+    ("1abc", YES), (" 1", YES), ("\n1 ", YES), ("+1", YES), ("1e0", YES), ("10e-1", YES), ("1.9", YES),
+    ("2.5", UNKNOWN), (" 2x", UNKNOWN), ("abc", NO), ("\u00a01", NO), ("\u0661", NO), ("0x1", NO), ("", NO),
+    (1.7, YES), (float("nan"), NO), (None, NO),
+])
+def test_answer_strings_follow_the_php_int_cast(value, code):
+    matrix, _ = encode_sheets([{"1": value}])
+
+    assert matrix[0, 0] == code
+
+
+def php_t_scores(norms, raw, gender):
+    """Port of TScoreCalculator::calculate()."""
+    t = {}
+    for scale, value in raw.items():
+        if scale not in norms:
+            t[scale] = 50.0
+            continue
+        scale_norms = norms[scale].get(gender) or norms[scale]["male"]
+        corrected = float(value)
+        if norms[scale].get("kCorrectionFactor") is not None:
+            corrected += int(php_round(np.array(raw["K"] * float(norms[scale]["kCorrectionFactor"]))))
+        if float(scale_norms["delta"]) == 0.0:
+            t[scale] = 50.0
+        else:
+            score = 50.0 + 10.0 * (corrected - float(scale_norms["M"])) / float(scale_norms["delta"])
+            t[scale] = float(max(20, min(100, php_round(np.array(score)))))
+    return t
+
+
+def php_assess(t, unknown, control):
+    """Port of ValidityAssessor::assess() given the answer-derived counts."""
+    l_t, f_t, k_t = int(t["L"]), int(t["F"]), int(t["K"])
+    valid, warnings = True, []
+    if control < 20:
+        valid = False
+        warnings.append(f"Протокол недостоверен: низкая внимательность (QC = {control} < 20)")
+    if unknown > 70:
+        valid = False
+        warnings.append(f'Протокол недостоверен: слишком много ответов "Не знаю" ({unknown} > 70)')
+    elif unknown > 60:
+        warnings.append(f'Сомнительная достоверность: много ответов "Не знаю" ({unknown})')
+    elif unknown > 40:
+        warnings.append(f'Настороженность: повышенное количество ответов "Не знаю" ({unknown})')
+    if l_t >= 65:
+        valid = False
+        warnings.append("Высокая социальная желательность — результаты могут быть недостоверны")
+    if f_t >= 70:
+        valid = False
+        warnings.append("Высокий показатель F — возможны случайные ответы или преувеличение проблем")
+    elif f_t >= 65:
+        warnings.append("Повышенный показатель F — возможна тенденция к преувеличению")
+    if k_t >= 65:
+        warnings.append("Высокая защитная позиция — клинические шкалы могут быть занижены")
+    elif k_t <= 35:
+        warnings.append("Низкая защитная позиция — возможна излишняя откровенность")
+    if f_t - k_t > 20:
+        warnings.append("Индекс F-K повышен — возможна симуляция")
+    elif f_t - k_t < -15:
+        warnings.append("Индекс F-K понижен — возможна диссимуляция")
+    return {
+        "is_valid": valid, "warnings": warnings,
+        "L_score": l_t, "F_score": f_t, "K_score": k_t, "FK_index": f_t - k_t,
+        "unknown_count": unknown, "control_score": control,
+    }
+
+
+def test_php_round_is_half_away_from_zero():
+    values = np.array([0.5, 1.5, 2.5, -0.5, -2.5, 2.4999, 25 * 0.3, 15 * 0.3])
+
+    assert list(php_round(values)) == [1, 2, 3, -1, -3, 2, 8, 5]
+
+
+def test_t_scores_match_php_reference_fixture():
+    expected = load("smil-reference-scores.json")
+    raw = np.array([[expected["raw"][s] for s in SCALES]], dtype=np.int32)
+
+    t = TScorer.from_norms_file().score(raw, np.array([FEMALE]))
+
+    assert dict(zip(SCALES, t[0])) == expected["t"]
+
+
+def test_random_profiles_match_php_ports():
+    with open(SMIL_DIR / "basic_scales_norms.json", encoding="utf-8") as f:
+        norms = json.load(f)["scales"]
+    rng = np.random.default_rng(3)
+    raw = rng.integers(0, 45, (500, len(SCALES))).astype(np.int32)
+    genders = rng.integers(0, 2, 500).astype(np.uint8)
+    unknown = rng.integers(0, 90, 500)
+    control = rng.integers(10, 28, 500)
+
+    t = TScorer(norms).score(raw, genders)
+    codes = validity_codes(t, unknown, control)
+
+    for row in range(500):
+        gender = "female" if genders[row] == FEMALE else "male"
+        expected_t = php_t_scores(norms, dict(zip(SCALES, map(int, raw[row]))), gender)
+        assert dict(zip(SCALES, t[row])) == expected_t
+    assert validity_dicts(t, codes, unknown, control) == [
+        php_assess(dict(zip(SCALES, t[row])), int(unknown[row]), int(control[row])) for row in range(500)
+    ]
+    assert list(is_valid(codes)) == [v["is_valid"] for v in validity_dicts(t, codes, unknown, control)]
+
+
+def test_control_score_counts_yes_on_control_questions():
+    answers = load("smil-reference-answers-valid.json")
+    matrix, _ = encode_sheets([answers])
+
+    expected = sum(1 for q in CONTROL_QUESTIONS if answers.get(str(q)) == 1)
+    assert list(control_score(matrix)) == [expected]
@@ -0,0 +1,103 @@
+import csv
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from psytools.answers import FEMALE, MALE, NO, UNKNOWN, YES  # noqa: E402
+from psytools.cohort_index import CLINICAL, profile_types  # noqa: E402
+from psytools.smil_scoring import (  # noqa: E402
+    SCALES,
+    RawScorer,
+    TScorer,
+    control_score,
+    count_unknown,
+    is_valid,
+    validity_codes,
+)
+from psytools.synthetic import LABELS, RATED, SmilModel, generate, open_writer  # noqa: E402
+
+FAILURES = {"random": 0.05, "unknown": 0.05, "control": 0.05, "fake_good": 0.05}
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SmilModel.from_files()
+
+
+def test_sheets_are_reproducible_by_seed(model):
+    first = [b.answers for b in generate("smil", 300, seed=7, chunk_size=128, failures=FAILURES, model=model)]
+    again = [b.answers for b in generate("smil", 300, seed=7, chunk_size=128, failures=FAILURES, model=model)]
+    other = next(generate("smil", 300, seed=8, chunk_size=128, failures=FAILURES, model=model)).answers
+
+    assert [len(a) for a in first] == [128, 128, 44]
+    assert all(np.array_equal(a, b) for a, b in zip(first, again))
+    assert not np.array_equal(first[0], other)
+
+
+def test_only_failing_sheets_are_invalid(model):
+    batch = next(generate("smil", 4000, seed=1, chunk_size=4000, failures=FAILURES, model=model))
+    answers, genders = batch.answers, batch.genders
+
+    assert set(np.unique(answers)) <= {NO, YES, UNKNOWN}
+    t = TScorer.from_norms_file().score(RawScorer.from_key_file().score(answers, genders), genders)
+    valid = is_valid(validity_codes(t, count_unknown(answers), control_score(answers)))
+    normal = batch.labels == LABELS.index("normal")
+    assert 0.75 < normal.mean() < 0.85
+    assert valid[normal].mean() > 0.99
+    assert not valid[~normal].any()
+
+
+def test_normal_profiles_follow_the_norms(model):
+    batch = next(generate("smil", 8000, seed=2, chunk_size=8000, model=model))
+    t = TScorer.from_norms_file().score(RawScorer.from_key_file().score(batch.answers, batch.genders), batch.genders)
+
+    for gender in (MALE, FEMALE):
+        mine = t[batch.genders == gender]
+        for scale in ("K",) + CLINICAL:
+            column = mine[:, SCALES.index(scale)]
+            assert abs(column.mean() - 50) < 2, (gender, scale)
+            assert 8 < column.std() < 12, (gender, scale)
+        # QC >= 20 takes at least 7 True items of F, so F stays at its floor.
+        f = mine[:, SCALES.index("F")]
+        assert 59 <= f.min() and f.mean() < 63
+    profiles = profile_types(t[:, [SCALES.index(scale) for scale in CLINICAL]])
+    assert (profiles == "normosthenic").mean() > (profiles == "psychotic").mean()
+
+
+@pytest.mark.parametrize("module", sorted(RATED))
+def test_rated_sheets_use_the_answer_keys_of_the_module(module):
+    spec = RATED[module]
+    batch = next(generate(module, 500, seed=3))
+
+    assert batch.answers.min() >= spec.low and batch.answers.max() <= spec.high
+    assert len(batch.keys) == batch.answers.shape[1]
+    if module == "lazarus":
+        assert batch.keys[:3] == ["1_self", "1_partner", "2_self"]
+    assert np.all(np.diff(batch.created.astype(np.int64)) >= 0)
+
+
+def test_jsonl_and_csv_rows_hold_the_answer_json(tmp_path, model):
+    batches = list(generate("smil", 50, seed=2, model=model)) + list(generate("hads", 50, seed=2))
+    for fmt in ("jsonl", "csv"):
+        writer = open_writer(fmt, tmp_path / f"sessions.{fmt}", seed=2)
+        for batch in batches:
+            writer.write(batch)
+        writer.close()
+
+    with open(tmp_path / "sessions.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    with open(tmp_path / "sessions.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    smil, hads = batches[0], batches[1]
+    expected = {str(q + 1): int(v) for q, v in enumerate(smil.answers[0])}
+    expected["gender"] = "female" if smil.genders[0] else "male"
+    assert lines[0]["test"] == "smil" and lines[0]["answers"] == expected
+    assert json.loads(rows[0]["answers"]) == expected
+    assert json.loads(rows[0]["demographics"])["synthetic"] == LABELS[smil.labels[0]]
+    assert rows[50]["test_slug"] == "hads" and rows[50]["status"] == "completed"
+    assert json.loads(rows[50]["answers"]) == {str(q + 1): int(v) for q, v in enumerate(hads.answers[0])}
+    assert len(rows[0]["id"]) == 36 and len(rows[0]["session_token"]) == 64
+    assert (tmp_path / "sessions.sql").read_text(encoding="utf-8").startswith("LOAD DATA LOCAL INFILE")